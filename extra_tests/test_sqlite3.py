@@ -391,3 +391,80 @@ def test_description_delete():
         ("x", None, None, None, None, None, None),
         ("y", None, None, None, None, None, None),
     )
+
+
+def test_statement_cache_lru():
+    if not hasattr(_sqlite3, '_ffi'):
+        pytest.skip("tests the statement cache of PyPy's _sqlite3")
+    con = _sqlite3.connect(":memory:", cached_statements=2)
+    cache = con._statement_cache
+    for sql in ["select 1", "select 2",
+                "select 1",     # hit, "select 1" is now the most recent
+                "select 3"]:    # evicts "select 2"
+        con.execute(sql).fetchall()
+    assert list(cache.cache) == ["select 1", "select 3"]
+    con.execute("select 1").fetchall()
+    con.execute("select 2").fetchall()
+    assert cache.stats() == {'hits': 2, 'misses': 4, 'evictions': 2,
+                             'size': 2, 'maxsize': 2}
+
+def test_statement_cache_in_use(con):
+    if not hasattr(_sqlite3, '_ffi'):
+        pytest.skip("tests the statement cache of PyPy's _sqlite3")
+    cur1 = con.execute("select 1 union select 2")
+    cur2 = con.execute("select 1 union select 2")
+    assert cur1.fetchall() == [(1,), (2,)]
+    assert cur2.fetchall() == [(1,), (2,)]
+    assert con._statement_cache.misses == 2
+
+def test_fetchmany_batches(con):
+    con.execute("create table t(a, b)")
+    rows = [(i, u'x%d' % i if i % 3 else None) for i in range(100)]
+    con.executemany("insert into t values (?, ?)", rows)
+    cur = con.execute("select a, b from t order by a")
+    assert cur.fetchmany(30) == rows[:30]
+    assert cur.fetchone() == rows[30]
+    assert cur.fetchmany() == rows[31:32]
+    cur.arraysize = 50
+    assert cur.fetchmany() == rows[32:82]
+    assert cur.fetchmany(50) == rows[82:]
+    assert cur.fetchmany(50) == []
+    assert cur.fetchall() == []
+    cur = con.execute("select a, b from t order by a")
+    cur.row_factory = lambda cursor, row: row[0]
+    assert cur.fetchmany(3) == [0, 1, 2]
+    assert cur.fetchall() == range(3, 100)
+
+def test_fetchmany_converters():
+    con = _sqlite3.connect(":memory:",
+                           detect_types=_sqlite3.PARSE_DECLTYPES)
+    _sqlite3.register_converter("twice", lambda s: s * 2)
+    try:
+        con.execute("create table t(a twice, b integer, c float, d blob)")
+        con.executemany("insert into t values (?, ?, ?, ?)",
+                        [('ab', 1, 1.5, buffer(b'\x00\x01')),
+                         (None, None, None, None)])
+        rows = con.execute("select * from t").fetchmany(5)
+        assert rows[0][:3] == ('abab', 1, 1.5)
+        assert type(rows[0][3]) is buffer and rows[0][3][:] == b'\x00\x01'
+        assert rows[1] == (None, None, None, None)
+    finally:
+        del _sqlite3.converters["TWICE"]
+
+def test_executemany_adapters(con):
+    class Point(object):
+        def __init__(self, x, y):
+            self.x, self.y = x, y
+        def __conform__(self, protocol):
+            return "%d;%d" % (self.x, self.y)
+    con.execute("create table t(a, b)")
+    _sqlite3.register_adapter(int, lambda i: i * 10)
+    try:
+        con.executemany("insert into t values (?, ?)",
+                        [(1, Point(1, 2)), (2, 2.5), (3, u'abc')])
+        con.execute("insert into t values (:a, :b)", {'a': 4, 'b': None})
+    finally:
+        del _sqlite3.adapters[(int, _sqlite3.PrepareProtocol)]
+    con.executemany("insert into t values (?, ?)", [(5, 'x')])
+    assert con.execute("select * from t").fetchall() == [
+        (10, u'1;2'), (20, 2.5), (30, u'abc'), (40, None), (5, u'x')]
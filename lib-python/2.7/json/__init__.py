@@ -182,6 +182,10 @@ def dump(obj, fp, skipkeys=False, ensure_ascii=True, check_circular=True,
         check_circular and allow_nan and
         cls is None and indent is None and separators is None and
         encoding == 'utf-8' and default is None and not sort_keys and not kw):
+        if _pypyjson is not None:
+            # PyPy: write the output in large chunks from interp-level
+            _pypyjson.dump(obj, fp)
+            return
         iterable = _default_encoder.iterencode(obj)
     else:
         if cls is None:
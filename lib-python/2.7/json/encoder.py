@@ -206,6 +206,15 @@ class JSONEncoder(object):
         '{"foo": ["bar", "baz"]}'
 
         """
+        if type(self).iterencode.im_func is not JSONEncoder.iterencode.im_func:
+            # like in CPython, go through an overridden iterencode()
+            return ''.join(self.iterencode(o, _one_shot=True))
+        if (_pypyjson_dumps is not None and self.ensure_ascii and
+                self.encoding == 'utf-8' and self.indent is None and
+                not self.sort_keys):
+            return _pypyjson_dumps(o, self.default, self.skipkeys,
+                                   self.check_circular, self.allow_nan,
+                                   self.item_separator, self.key_separator)
         if self.check_circular:
             markers = {}
         else:
@@ -536,3 +545,8 @@ try:
     from _pypyjson import raw_encode_basestring_ascii
 except ImportError:
     pass
+
+try:
+    from _pypyjson import dumps as _pypyjson_dumps
+except ImportError:
+    _pypyjson_dumps = None
@@ -27,6 +27,15 @@ class TestDump(object):
         self.assertEqual(self.dumps(a, default=crasher),
                  '[null, null, null, null, null]')
 
+    def test_encode_overridden_iterencode(self):
+        class Encoder(self.json.JSONEncoder):
+            def iterencode(self, o, _one_shot=False):
+                for chunk in super(Encoder, self).iterencode(o, _one_shot):
+                    yield chunk.upper()
+        self.assertEqual(Encoder().encode({'a': [True]}), '{"A": [TRUE]}')
+        self.assertEqual(self.dumps({'a': [True]}, cls=Encoder),
+                         '{"A": [TRUE]}')
+
 
 class TestPyDump(TestDump, PyTest): pass
 class TestCDump(TestDump, CTest): pass
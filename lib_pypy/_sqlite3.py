@@ -174,25 +174,42 @@ else:
 
 
 class _StatementCache(object):
+    """ The prepared statements of a connection, keyed by their SQL.  The
+    least recently used statement is finalized when there are more than
+    'maxcount' of them.
+    """
     def __init__(self, connection, maxcount):
         self.connection = connection
         self.maxcount = maxcount
         self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
     def get(self, sql):
         try:
-            stat = self.cache[sql]
+            stat = self.cache.pop(sql)
         except KeyError:
+            self.misses += 1
             stat = Statement(self.connection, sql)
-            self.cache[sql] = stat
-            if len(self.cache) > self.maxcount:
-                self.cache.popitem(0)
         else:
             if stat._in_use:
+                # still used by another cursor: prepare a new one
+                self.misses += 1
                 stat = Statement(self.connection, sql)
-                self.cache[sql] = stat
+            else:
+                self.hits += 1
+        self.cache[sql] = stat
+        if len(self.cache) > self.maxcount:
+            self.cache.popitem(last=False)
+            self.evictions += 1
         return stat
 
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self.cache),
+                'maxsize': self.maxcount}
+
 
 class Connection(object):
     __initialized = False
@@ -771,42 +788,54 @@ class Cursor(object):
             self.__row_cast_map.append(converter)
 
     def __fetch_one_row(self):
-        num_cols = _lib.sqlite3_data_count(self.__statement._statement)
-        row = newlist_hint(num_cols)
-        for i in xrange(num_cols):
-            if self.__connection._detect_types:
-                converter = self.__row_cast_map[i]
-            else:
-                converter = None
+        if self.__connection._detect_types:
+            cast_map = self.__row_cast_map
+        else:
+            cast_map = None
+        return _read_row(self.__statement._statement,
+                         self.__connection.text_factory, cast_map)
+
+    def __fetch_rows(self, size):
+        # fetchmany() and fetchall(): like calling next() up to 'size'
+        # times (or until the end if 'size' is negative), but the lookups
+        # are done once for the whole batch
+        self.__check_cursor()
+        self.__check_reset()
+        if not self.__statement:
+            return []
+        try:
+            next_row = self.__next_row
+        except AttributeError:
+            return []
+        del self.__next_row
 
-            if converter is not None:
-                blob = _lib.sqlite3_column_blob(self.__statement._statement, i)
-                if not blob:
-                    val = None
-                else:
-                    blob_len = _lib.sqlite3_column_bytes(self.__statement._statement, i)
-                    val = _ffi.buffer(blob, blob_len)[:]
-                    val = converter(val)
+        con = self.__connection
+        statement = self.__statement
+        raw_statement = statement._statement
+        if con._detect_types:
+            cast_map = self.__row_cast_map
+        else:
+            cast_map = None
+        row_factory = self.row_factory
+        step = _lib.sqlite3_step
+        rows = []
+        while True:
+            if row_factory is not None:
+                next_row = row_factory(self, next_row)
+            rows.append(next_row)
+            ret = step(raw_statement)
+            if ret == _lib.SQLITE_ROW:
+                next_row = _read_row(raw_statement, con.text_factory,
+                                     cast_map)
+                if len(rows) == size:
+                    self.__next_row = next_row
+                    break
             else:
-                typ = _lib.sqlite3_column_type(self.__statement._statement, i)
-                if typ == _lib.SQLITE_NULL:
-                    val = None
-                elif typ == _lib.SQLITE_INTEGER:
-                    val = _lib.sqlite3_column_int64(self.__statement._statement, i)
-                    val = int(val)
-                elif typ == _lib.SQLITE_FLOAT:
-                    val = _lib.sqlite3_column_double(self.__statement._statement, i)
-                elif typ == _lib.SQLITE_TEXT:
-                    text = _lib.sqlite3_column_text(self.__statement._statement, i)
-                    text_len = _lib.sqlite3_column_bytes(self.__statement._statement, i)
-                    val = _ffi.buffer(text, text_len)[:]
-                    val = self.__connection.text_factory(val)
-                elif typ == _lib.SQLITE_BLOB:
-                    blob = _lib.sqlite3_column_blob(self.__statement._statement, i)
-                    blob_len = _lib.sqlite3_column_bytes(self.__statement._statement, i)
-                    val = _BLOB_TYPE(_ffi.buffer(blob, blob_len)[:])
-            row.append(val)
-        return tuple(row)
+                statement._reset()
+                if ret != _lib.SQLITE_DONE:
+                    raise con._get_exception(ret)
+                break
+        return rows
 
     def __execute(self, multiple, sql, many_params):
         self.__locked = True
@@ -842,8 +871,9 @@ class Cursor(object):
                         raise ProgrammingError("You cannot execute SELECT "
                                                "statements in executemany().")
 
+            plain_types = _unadapted_param_types()
             for params in many_params:
-                self.__statement._set_params(params)
+                self.__statement._set_params(params, plain_types)
 
                 # Actually execute the SQL statement
 
@@ -979,15 +1009,10 @@ class Cursor(object):
     def fetchmany(self, size=None):
         if size is None:
             size = self.arraysize
-        lst = []
-        for row in self:
-            lst.append(row)
-            if len(lst) == size:
-                break
-        return lst
+        return self.__fetch_rows(size)
 
     def fetchall(self):
-        return list(self)
+        return self.__fetch_rows(-1)
 
     def __get_connection(self):
         self.__check_cursor()
@@ -1088,6 +1113,7 @@ class Statement(object):
         if ret != _lib.SQLITE_OK:
             raise self.__con._get_exception(ret)
 
+        self._num_params = _lib.sqlite3_bind_parameter_count(self._statement)
         self.__con._remember_statement(self)
 
         tail = _ffi.string(next_char[0]).decode('utf-8')
@@ -1127,7 +1153,9 @@ class Statement(object):
             param = adapt(param)
         except:
             pass  # And use previous value
+        return self.__bind_param(idx, param)
 
+    def __bind_param(self, idx, param):
         if param is None:
             rc = _lib.sqlite3_bind_null(self._statement, idx)
         elif isinstance(param, (bool, int, long)):
@@ -1153,10 +1181,12 @@ class Statement(object):
             rc = -1
         return rc
 
-    def _set_params(self, params):
+    def _set_params(self, params, plain_types=frozenset()):
+        # the parameters whose type is in 'plain_types' are bound directly,
+        # without calling adapt() on them
         self._in_use = True
 
-        num_params_needed = _lib.sqlite3_bind_parameter_count(self._statement)
+        num_params_needed = self._num_params
         if isinstance(params, (tuple, list)) or \
                 not isinstance(params, dict) and \
                 hasattr(params, '__getitem__'):
@@ -1170,7 +1200,11 @@ class Statement(object):
                                        "there are %d supplied." %
                                        (num_params_needed, num_params))
             for i in range(num_params):
-                rc = self.__set_param(i + 1, params[i])
+                param = params[i]
+                if type(param) in plain_types:
+                    rc = self.__bind_param(i + 1, param)
+                else:
+                    rc = self.__set_param(i + 1, param)
                 if rc != _lib.SQLITE_OK:
                     raise InterfaceError("Error binding parameter %d - "
                                          "probably unsupported type." % i)
@@ -1187,7 +1221,10 @@ class Statement(object):
                 except KeyError:
                     raise ProgrammingError("You did not supply a value for "
                                            "binding %d." % i)
-                rc = self.__set_param(i, param)
+                if type(param) in plain_types:
+                    rc = self.__bind_param(i, param)
+                else:
+                    rc = self.__set_param(i, param)
                 if rc != _lib.SQLITE_OK:
                     raise InterfaceError("Error binding parameter :%s - "
                                          "probably unsupported type." %
@@ -1279,6 +1316,41 @@ def _check_remaining_sql(s):
     return 0
 
 
+def _read_row(statement, text_factory, cast_map):
+    """Return the current row of the statement as a tuple.  'cast_map' is
+    None or the list of converters of the columns, when detect_types is
+    used."""
+    num_cols = _lib.sqlite3_data_count(statement)
+    row = newlist_hint(num_cols)
+    column_type = _lib.sqlite3_column_type
+    for i in xrange(num_cols):
+        if cast_map is not None and cast_map[i] is not None:
+            blob = _lib.sqlite3_column_blob(statement, i)
+            if not blob:
+                val = None
+            else:
+                blob_len = _lib.sqlite3_column_bytes(statement, i)
+                val = cast_map[i](_ffi.buffer(blob, blob_len)[:])
+        else:
+            typ = column_type(statement, i)
+            if typ == _lib.SQLITE_INTEGER:
+                val = int(_lib.sqlite3_column_int64(statement, i))
+            elif typ == _lib.SQLITE_FLOAT:
+                val = _lib.sqlite3_column_double(statement, i)
+            elif typ == _lib.SQLITE_TEXT:
+                text = _lib.sqlite3_column_text(statement, i)
+                text_len = _lib.sqlite3_column_bytes(statement, i)
+                val = text_factory(_ffi.buffer(text, text_len)[:])
+            elif typ == _lib.SQLITE_NULL:
+                val = None
+            else:
+                blob = _lib.sqlite3_column_blob(statement, i)
+                blob_len = _lib.sqlite3_column_bytes(statement, i)
+                val = _BLOB_TYPE(_ffi.buffer(blob, blob_len)[:])
+        row.append(val)
+    return tuple(row)
+
+
 def _convert_params(con, nargs, params):
     _params = []
     for i in range(nargs):
@@ -1375,6 +1447,20 @@ def register_adapters_and_converters():
     register_converter("timestamp", convert_timestamp)
 
 
+_PLAIN_PARAM_TYPES = frozenset([type(None), bool, int, long, float, unicode,
+                                str])
+
+def _unadapted_param_types():
+    """Return the set of parameter types that adapt() returns unchanged:
+    the builtin types that have no registered adapter."""
+    if hasattr(PrepareProtocol, '__adapt__'):
+        return frozenset()
+    if not adapters:
+        return _PLAIN_PARAM_TYPES
+    return _PLAIN_PARAM_TYPES.difference([typ for typ, proto in adapters
+                                          if proto is PrepareProtocol])
+
+
 def adapt(val, proto=PrepareProtocol):
     # look for an adapter in the registry
     adapter = adapters.get((type(val), proto), None)
@@ -114,6 +114,28 @@ class Pickler(PythonPickler):
     def getvalue(self):
         return self.__f and self.__f.getvalue()
 
+try:
+    from _pypy_pickle import Pickler as _NativePickler
+except ImportError:
+    pass
+else:
+    class Pickler(_NativePickler):
+        # the save loop is in the _pypy_pickle module; it calls the methods
+        # below for the objects that it does not handle itself, so that
+        # they can be overridden like in pickle.Pickler
+        __doc__ = PythonPickler.__init__.__doc__
+
+        dispatch = PythonPickler.dispatch
+        _BATCHSIZE = PythonPickler._BATCHSIZE
+        save_reduce = PythonPickler.__dict__['save_reduce']
+        save_global = PythonPickler.__dict__['save_global']
+        save_inst = PythonPickler.__dict__['save_inst']
+        save_function = PythonPickler.__dict__['save_function']
+        _batch_appends = PythonPickler.__dict__['_batch_appends']
+        _batch_setitems = PythonPickler.__dict__['_batch_setitems']
+        _pickle_maybe_moduledict = PythonPickler.__dict__[
+            '_pickle_maybe_moduledict']
+
 @builtinify
 def dump(obj, file, protocol=None):
     if protocol > HIGHEST_PROTOCOL:
@@ -141,6 +163,38 @@ mloads = marshal.loads
 
 # Unpickling machinery
 
+# klass is the class to instantiate, and args the arguments for
+# klass.__init__.  Shared by INST and OBJ, in both unpicklers.
+def _instantiate(klass, args):
+    if (not args and
+            type(klass) is ClassType and
+            not hasattr(klass, "__getinitargs__")):
+        try:
+            value = _EmptyClass()
+            value.__class__ = klass
+            return value
+        except RuntimeError:
+            # In restricted execution, assignment to inst.__class__ is
+            # prohibited
+            pass
+    try:
+        return klass(*args)
+    except TypeError, err:
+        raise TypeError, "in constructor for %s: %s" % (
+            klass.__name__, str(err)), sys.exc_info()[2]
+
+def _get_extension(unpickler, code):
+    nil = []
+    obj = _extension_cache.get(code, nil)
+    if obj is not nil:
+        return obj
+    key = _inverted_registry.get(code)
+    if not key:
+        raise ValueError("unregistered extension code %d" % code)
+    obj = unpickler.find_class(*key)
+    _extension_cache[code] = obj
+    return obj
+
 class _Stack(list):
     def pop(self, index=-1):
         try:
@@ -364,25 +418,7 @@ class Unpickler(object):
     def _instantiate(self, klass, k):
         args = tuple(self.stack[k+1:])
         del self.stack[k:]
-        instantiated = 0
-        if (not args and
-                type(klass) is ClassType and
-                not hasattr(klass, "__getinitargs__")):
-            try:
-                value = _EmptyClass()
-                value.__class__ = klass
-                instantiated = 1
-            except RuntimeError:
-                # In restricted execution, assignment to inst.__class__ is
-                # prohibited
-                pass
-        if not instantiated:
-            try:
-                value = klass(*args)
-            except TypeError, err:
-                raise TypeError, "in constructor for %s: %s" % (
-                    klass.__name__, str(err)), sys.exc_info()[2]
-        self.append(value)
+        self.append(_instantiate(klass, args))
 
     def load_inst(self):
         module = self.readline()[:-1]
@@ -428,17 +464,7 @@ class Unpickler(object):
     dispatch[EXT4] = load_ext4
 
     def get_extension(self, code):
-        nil = []
-        obj = _extension_cache.get(code, nil)
-        if obj is not nil:
-            self.append(obj)
-            return
-        key = _inverted_registry.get(code)
-        if not key:
-            raise ValueError("unregistered extension code %d" % code)
-        obj = self.find_class(*key)
-        _extension_cache[code] = obj
-        self.append(obj)
+        self.append(_get_extension(self, code))
 
     def find_class(self, module, name):
         if self.find_global is None:
@@ -619,6 +645,27 @@ try:
 except ImportError:
     pass
 
+try:
+    from _pypy_pickle import Unpickler as _NativeUnpickler
+except ImportError:
+    pass
+else:
+    PythonUnpickler = Unpickler
+
+    class Unpickler(_NativeUnpickler):
+        # the opcode loop is in the _pypy_pickle module; the methods below
+        # are the ones that it calls back
+        __doc__ = PythonUnpickler.__init__.__doc__
+
+        find_class = PythonUnpickler.__dict__['find_class']
+        find_global = PythonUnpickler.__dict__['find_global']
+
+        def _instantiate(self, klass, args):
+            return _instantiate(klass, args)
+
+        def get_extension(self, code):
+            return _get_extension(self, code)
+
 def load(f):
     return Unpickler(f).load()
 
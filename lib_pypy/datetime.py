@@ -21,8 +21,11 @@ import time as _timemodule
 import math as _math
 import struct as _struct
 
-# for cpyext, use these as base classes
+# for cpyext, use these as base classes.  dateinterop and timeinterop also
+# store the fields (_year, _month, ..., _microsecond) packed in integers, and
+# have fast paths for construction, comparison, hashing and isoformat().
 from __pypy__._pypydatetime import dateinterop, deltainterop, timeinterop
+from __pypy__._pypydatetime import parse_datetime as _parse_datetime
 
 _SENTINEL = object()
 
@@ -701,7 +704,7 @@ class date(dateinterop):
     Properties (readonly):
     year, month, day
     """
-    __slots__ = '_year', '_month', '_day', '_hashcode'
+    __slots__ = '_hashcode',
 
     def __new__(cls, year, month=None, day=None):
         """Constructor.
@@ -717,11 +720,10 @@ class date(dateinterop):
             self.__setstate(year)
             self._hashcode = -1
             return self
-        year, month, day = _check_date_fields(year, month, day)
         self = dateinterop.__new__(cls)
-        self._year = year
-        self._month = month
-        self._day = day
+        if not self._init_date(year, month, day):
+            year, month, day = _check_date_fields(year, month, day)
+            self._init_date(year, month, day)
         self._hashcode = -1
         return self
 
@@ -802,7 +804,7 @@ class date(dateinterop):
         - http://www.w3.org/TR/NOTE-datetime
         - http://www.cl.cam.ac.uk/~mgk25/iso-time.html
         """
-        return "%04d-%02d-%02d" % (self._year, self._month, self._day)
+        return self._format_date()
 
     __str__ = isoformat
 
@@ -899,14 +901,12 @@ class date(dateinterop):
 
     def _cmp(self, other):
         assert isinstance(other, date)
-        y, m, d = self._year, self._month, self._day
-        y2, m2, d2 = other._year, other._month, other._day
-        return _cmp((y, m, d), (y2, m2, d2))
+        return self._cmp_date(other)
 
     def __hash__(self):
         "Hash."
         if self._hashcode == -1:
-            self._hashcode = hash(self._getstate())
+            self._hashcode = self._hash_fields()
         return self._hashcode
 
     # Computations
@@ -1090,7 +1090,7 @@ class time(timeinterop):
     Properties (readonly):
     hour, minute, second, microsecond, tzinfo
     """
-    __slots__ = '_hour', '_minute', '_second', '_microsecond', '_tzinfo', '_hashcode'
+    __slots__ = '_tzinfo', '_hashcode'
 
     def __new__(cls, hour=0, minute=0, second=0, microsecond=0, tzinfo=None):
         """Constructor.
@@ -1107,14 +1107,12 @@ class time(timeinterop):
             self.__setstate(hour, minute or None)
             self._hashcode = -1
             return self
-        hour, minute, second, microsecond = _check_time_fields(
-            hour, minute, second, microsecond)
-        _check_tzinfo_arg(tzinfo)
         self = timeinterop.__new__(cls)
-        self._hour = hour
-        self._minute = minute
-        self._second = second
-        self._microsecond = microsecond
+        if not self._init_time(hour, minute, second, microsecond):
+            hour, minute, second, microsecond = _check_time_fields(
+                hour, minute, second, microsecond)
+            self._init_time(hour, minute, second, microsecond)
+        _check_tzinfo_arg(tzinfo)
         self._tzinfo = tzinfo
         self._hashcode = -1
         return self
@@ -1199,10 +1197,7 @@ class time(timeinterop):
             base_compare = myoff == otoff
 
         if base_compare:
-            return _cmp((self._hour, self._minute, self._second,
-                         self._microsecond),
-                        (other._hour, other._minute, other._second,
-                         other._microsecond))
+            return self._cmp_time(other)
         if myoff is None or otoff is None:
             raise TypeError("can't compare offset-naive and offset-aware times")
         myhhmm = self._hour * 60 + self._minute - myoff
@@ -1215,7 +1210,7 @@ class time(timeinterop):
         if self._hashcode == -1:
             tzoff = self._utcoffset()
             if not tzoff:  # zero or None
-                self._hashcode = hash(self._getstate()[0])
+                self._hashcode = self._hash_fields()
             else:
                 h, m = divmod(self.hour * 60 + self.minute - tzoff, 60)
                 if 0 <= h < 24:
@@ -1262,8 +1257,7 @@ class time(timeinterop):
         This is 'HH:MM:SS.mmmmmm+zz:zz', or 'HH:MM:SS+zz:zz' if
         self.microsecond == 0.
         """
-        s = _format_time(self._hour, self._minute, self._second,
-                         self._microsecond)
+        s = self._format_time()
         tz = self._tzstr()
         if tz:
             s += tz
@@ -1407,7 +1401,7 @@ class datetime(date):
     The year, month and day arguments are required. tzinfo may be None, or an
     instance of a tzinfo subclass. The remaining arguments may be ints or longs.
     """
-    __slots__ = date.__slots__ + time.__slots__
+    __slots__ = '_tzinfo',
 
     def __new__(cls, year, month=None, day=None, hour=0, minute=0, second=0,
                 microsecond=0, tzinfo=None):
@@ -1422,19 +1416,15 @@ class datetime(date):
             # Used by internal functions where the arguments are guaranteed to
             # be valid.
             year, month, day, hour, minute, second, microsecond = year
-        else:
+        self = dateinterop.__new__(cls)
+        if not self._init_datetime(year, month, day, hour, minute, second,
+                                   microsecond):
             year, month, day = _check_date_fields(year, month, day)
             hour, minute, second, microsecond = _check_time_fields(
                 hour, minute, second, microsecond)
+            self._init_datetime(year, month, day, hour, minute, second,
+                                microsecond)
         _check_tzinfo_arg(tzinfo)
-        self = dateinterop.__new__(cls)
-        self._year = year
-        self._month = month
-        self._day = day
-        self._hour = hour
-        self._minute = minute
-        self._second = second
-        self._microsecond = microsecond
         self._tzinfo = tzinfo
         self._hashcode = -1
         return self
@@ -1626,9 +1616,13 @@ class datetime(date):
         Optional argument sep specifies the separator between date and
         time, default 'T'.
         """
-        s = ("%04d-%02d-%02d%c" % (self._year, self._month, self._day, sep) +
-             _format_time(self._hour, self._minute, self._second,
-                          self._microsecond))
+        if type(sep) is str and len(sep) == 1:
+            s = self._format_datetime(sep)
+        else:
+            s = ("%04d-%02d-%02d%c" % (self._year, self._month, self._day,
+                                       sep) +
+                 _format_time(self._hour, self._minute, self._second,
+                              self._microsecond))
         off = self._utcoffset()
         if off is not None:
             if off < 0:
@@ -1663,6 +1657,10 @@ class datetime(date):
     @classmethod
     def strptime(cls, date_string, format):
         'string, format -> new datetime parsed from a string (like time.strptime()).'
+        if type(date_string) is str and type(format) is str:
+            fields = _parse_datetime(date_string, format)
+            if fields is not None:
+                return cls(*fields)
         from _strptime import _strptime
         # _strptime._strptime returns a two-element tuple.  The first
         # element is a time.struct_time object.  The second is the
@@ -1793,12 +1791,7 @@ class datetime(date):
             base_compare = myoff == otoff
 
         if base_compare:
-            return _cmp((self._year, self._month, self._day,
-                         self._hour, self._minute, self._second,
-                         self._microsecond),
-                        (other._year, other._month, other._day,
-                         other._hour, other._minute, other._second,
-                         other._microsecond))
+            return self._cmp_datetime(other)
         if myoff is None or otoff is None:
             raise TypeError("can't compare offset-naive and offset-aware datetimes")
         # XXX What follows could be done more efficiently...
@@ -1853,7 +1846,7 @@ class datetime(date):
         if self._hashcode == -1:
             tzoff = self._utcoffset()
             if tzoff is None:
-                self._hashcode = hash(self._getstate()[0])
+                self._hashcode = self._hash_fields()
             else:
                 days = _ymd2ord(self.year, self.month, self.day)
                 seconds = self.hour * 3600 + (self.minute - tzoff) * 60 + self.second
@@ -25,6 +25,9 @@ class ThreadLocals:
     def try_enter_thread(self, space):
         return False
 
+    def threads_initialized(self):
+        return False
+
     def signals_enabled(self):
         return True
 
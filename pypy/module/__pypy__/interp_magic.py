@@ -120,6 +120,51 @@ def list_get_physical_size(space, w_obj):
         raise oefmt(space.w_TypeError, "expected list")
     return space.newint(w_obj.physical_size())
 
+def list_compact(space, w_obj):
+    """list_compact(list)
+
+    Drop the overallocated part of the list's storage. If the list contains
+    only ints that fit into 8, 16 or 32 bits, they are also stored with that
+    width; the list switches back to full-width ints as soon as an item that
+    doesn't fit is stored."""
+    if not isinstance(w_obj, W_ListObject):
+        raise oefmt(space.w_TypeError, "expected list")
+    w_obj.compact()
+
+
+def jsonmap_cache_stats(space):
+    """jsonmap_cache_stats() -> dict
+
+    Return statistics about the cache of JSON object shapes that
+    _pypyjson.loads shares between all calls."""
+    from pypy.module._pypyjson.interp_decoder import Terminator
+    terminator = space.fromcache(Terminator)
+    w_stats = space.newdict()
+    for name, value in terminator.get_stats():
+        space.setitem_str(w_stats, name, space.newint(value))
+    transitions = terminator.transitions
+    if transitions:
+        hits = transitions - terminator.maps_created
+        hit_rate = hits / float(transitions)
+    else:
+        hit_rate = 0.0
+    space.setitem_str(w_stats, "hit_rate", space.newfloat(hit_rate))
+    return w_stats
+
+@unwrap_spec(limit=int)
+def set_jsonmap_cache_limit(space, limit):
+    """set_jsonmap_cache_limit(limit) -> previous limit
+
+    Set the maximum number of maps in the cache of JSON object shapes. The
+    least recently used maps are evicted when there are more. A negative
+    limit means no limit."""
+    from pypy.module._pypyjson.interp_decoder import Terminator
+    terminator = space.fromcache(Terminator)
+    old_limit = terminator.max_maps
+    terminator.max_maps = limit
+    terminator.maybe_evict()
+    return space.newint(old_limit)
+
 
 def get_console_cp(space):
     """get_console_cp()
@@ -1,6 +1,9 @@
 from pypy.interpreter.baseobjspace import W_Root
-from pypy.interpreter.typedef import TypeDef
-from pypy.interpreter.gateway import interp2app
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from rpython.rlib.rarithmetic import intmask
+from rpython.rlib.rstring import StringBuilder
 from rpython.tool.sourcetools import func_with_new_name
 
 def create_class(name):
@@ -17,8 +20,324 @@ def create_class(name):
     W_Class.typedef.acceptable_as_base_class = True
     return W_Class
 
-W_DateTime_Time = create_class('pypydatetime_time')
-W_DateTime_Date = create_class('pypydatetime_date')
 W_DateTime_Delta = create_class('pypydatetime_delta')
 
+# ____________________________________________________________
+# date, datetime and time objects keep their fields packed in integers:
+#
+#     ymd = year << 12 | month << 8 | day
+#     hms = hour << 16 | minute << 8 | second
+#     us  = microsecond
+#
+# so that comparing (ymd, hms, us) compares all the fields in order.  The
+# fields are exposed as the _year, _month, ... attributes that datetime.py
+# uses.  They are wide enough for any value that the pickle state can give
+# (one byte per field, two for the year, three for the microseconds): the
+# constructors do not check these values, apart from the month.
 
+DAYS_IN_MONTH = [-1, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+def is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+def days_in_month(year, month):
+    if month == 2 and is_leap(year):
+        return 29
+    return DAYS_IN_MONTH[month]
+
+def exact_int(space, w_obj):
+    """Return the value of an exact int object, or -1 for any other object
+    (the fields are never negative)."""
+    if not space.is_w(space.type(w_obj), space.w_int):
+        return -1
+    return space.int_w(w_obj)
+
+def check_date_fields(space, w_year, w_month, w_day):
+    year = exact_int(space, w_year)
+    month = exact_int(space, w_month)
+    day = exact_int(space, w_day)
+    if not (1 <= year <= 9999 and 1 <= month <= 12):
+        return -1
+    if not 1 <= day <= days_in_month(year, month):
+        return -1
+    return year << 12 | month << 8 | day
+
+def check_time_fields(space, w_hour, w_minute, w_second):
+    hour = exact_int(space, w_hour)
+    minute = exact_int(space, w_minute)
+    second = exact_int(space, w_second)
+    if not (0 <= hour <= 23 and 0 <= minute <= 59 and 0 <= second <= 59):
+        return -1
+    return hour << 16 | minute << 8 | second
+
+def cmp_int(x, y):
+    if x < y:
+        return -1
+    return int(x > y)
+
+def hash_fields(ymd, hms, us):
+    h = intmask((ymd * 1000003) ^ (hms * 69069) ^ us)
+    if h == -1:
+        h = -2
+    return h
+
+def append_padded(builder, value, width):
+    s = str(value)
+    if len(s) < width:
+        builder.append_multiple_char('0', width - len(s))
+    builder.append(s)
+
+def format_date(builder, ymd):
+    append_padded(builder, ymd >> 12, 4)
+    builder.append('-')
+    append_padded(builder, (ymd >> 8) & 15, 2)
+    builder.append('-')
+    append_padded(builder, ymd & 255, 2)
+
+def format_time(builder, hms, us):
+    # skip the microseconds when they are zero
+    append_padded(builder, hms >> 16, 2)
+    builder.append(':')
+    append_padded(builder, (hms >> 8) & 255, 2)
+    builder.append(':')
+    append_padded(builder, hms & 255, 2)
+    if us:
+        builder.append('.')
+        append_padded(builder, us, 6)
+
+
+class W_DateTime_Date(W_Root):
+    'builtin base class for datetime.date and datetime.datetime'
+    ymd = 0
+    hms = 0
+    us = 0
+
+    def descr_new__(space, w_type):
+        return space.allocate_instance(W_DateTime_Date, w_type)
+
+    def descr_init_date(self, space, w_year, w_month, w_day):
+        """Set the fields if they are all valid exact ints, and return
+        True.  Otherwise return False, and datetime.py checks them itself."""
+        ymd = check_date_fields(space, w_year, w_month, w_day)
+        if ymd < 0:
+            return space.w_False
+        self.ymd = ymd
+        self.hms = 0
+        self.us = 0
+        return space.w_True
+
+    def descr_init_datetime(self, space, w_year, w_month, w_day, w_hour,
+                            w_minute, w_second, w_microsecond):
+        """Same as _init_date(), for all the fields of a datetime."""
+        ymd = check_date_fields(space, w_year, w_month, w_day)
+        hms = check_time_fields(space, w_hour, w_minute, w_second)
+        us = exact_int(space, w_microsecond)
+        if ymd < 0 or hms < 0 or not 0 <= us <= 999999:
+            return space.w_False
+        self.ymd = ymd
+        self.hms = hms
+        self.us = us
+        return space.w_True
+
+    def descr_cmp_date(self, space, w_other):
+        other = space.interp_w(W_DateTime_Date, w_other)
+        return space.newint(cmp_int(self.ymd, other.ymd))
+
+    def descr_cmp_datetime(self, space, w_other):
+        other = space.interp_w(W_DateTime_Date, w_other)
+        if self.ymd != other.ymd:
+            return space.newint(cmp_int(self.ymd, other.ymd))
+        if self.hms != other.hms:
+            return space.newint(cmp_int(self.hms, other.hms))
+        return space.newint(cmp_int(self.us, other.us))
+
+    def descr_hash_fields(self, space):
+        return space.newint(hash_fields(self.ymd, self.hms, self.us))
+
+    def descr_format_date(self, space):
+        builder = StringBuilder(10)
+        format_date(builder, self.ymd)
+        return space.newtext(builder.build())
+
+    @unwrap_spec(sep='bytes')
+    def descr_format_datetime(self, space, sep):
+        """'YYYY-MM-DD<sep>HH:MM:SS[.ffffff]', without the UTC offset"""
+        builder = StringBuilder(26)
+        format_date(builder, self.ymd)
+        builder.append(sep)
+        format_time(builder, self.hms, self.us)
+        return space.newtext(builder.build())
+
+
+class W_DateTime_Time(W_Root):
+    'builtin base class for datetime.time'
+    hms = 0
+    us = 0
+
+    def descr_new__(space, w_type):
+        return space.allocate_instance(W_DateTime_Time, w_type)
+
+    def descr_init_time(self, space, w_hour, w_minute, w_second,
+                        w_microsecond):
+        """Same as date._init_date(), for the fields of a time."""
+        hms = check_time_fields(space, w_hour, w_minute, w_second)
+        us = exact_int(space, w_microsecond)
+        if hms < 0 or not 0 <= us <= 999999:
+            return space.w_False
+        self.hms = hms
+        self.us = us
+        return space.w_True
+
+    def descr_cmp_time(self, space, w_other):
+        other = space.interp_w(W_DateTime_Time, w_other)
+        if self.hms != other.hms:
+            return space.newint(cmp_int(self.hms, other.hms))
+        return space.newint(cmp_int(self.us, other.us))
+
+    def descr_hash_fields(self, space):
+        return space.newint(hash_fields(0, self.hms, self.us))
+
+    def descr_format_time(self, space):
+        builder = StringBuilder(15)
+        format_time(builder, self.hms, self.us)
+        return space.newtext(builder.build())
+
+
+def make_field(cls, name, attr, shift, bits):
+    maxvalue = (1 << bits) - 1
+    mask = maxvalue << shift
+
+    def fget(self, space):
+        return space.newint((getattr(self, attr) & mask) >> shift)
+
+    def fset(self, space, w_value):
+        value = space.int_w(w_value)
+        if not 0 <= value <= maxvalue:
+            raise oefmt(space.w_ValueError, "%s out of range: %d",
+                        name[1:], value)
+        setattr(self, attr, (getattr(self, attr) & ~mask) | (value << shift))
+
+    prefix = '%s_%s' % (cls.__name__, name)
+    return GetSetProperty(func_with_new_name(fget, prefix + '_get'),
+                          func_with_new_name(fset, prefix + '_set'),
+                          cls=cls)
+
+def time_fields(cls):
+    return {
+        '_hour': make_field(cls, '_hour', 'hms', 16, 8),
+        '_minute': make_field(cls, '_minute', 'hms', 8, 8),
+        '_second': make_field(cls, '_second', 'hms', 0, 8),
+        '_microsecond': make_field(cls, '_microsecond', 'us', 0, 24),
+    }
+
+W_DateTime_Date.typedef = TypeDef('pypydatetime_date',
+    __new__ = interp2app(W_DateTime_Date.descr_new__.im_func),
+    _year = make_field(W_DateTime_Date, '_year', 'ymd', 12, 16),
+    _month = make_field(W_DateTime_Date, '_month', 'ymd', 8, 4),
+    _day = make_field(W_DateTime_Date, '_day', 'ymd', 0, 8),
+    _init_date = interp2app(W_DateTime_Date.descr_init_date),
+    _init_datetime = interp2app(W_DateTime_Date.descr_init_datetime),
+    _cmp_date = interp2app(W_DateTime_Date.descr_cmp_date),
+    _cmp_datetime = interp2app(W_DateTime_Date.descr_cmp_datetime),
+    _hash_fields = interp2app(W_DateTime_Date.descr_hash_fields),
+    _format_date = interp2app(W_DateTime_Date.descr_format_date),
+    _format_datetime = interp2app(W_DateTime_Date.descr_format_datetime),
+    **time_fields(W_DateTime_Date)
+    )
+W_DateTime_Date.typedef.acceptable_as_base_class = True
+
+W_DateTime_Time.typedef = TypeDef('pypydatetime_time',
+    __new__ = interp2app(W_DateTime_Time.descr_new__.im_func),
+    _init_time = interp2app(W_DateTime_Time.descr_init_time),
+    _cmp_time = interp2app(W_DateTime_Time.descr_cmp_time),
+    _hash_fields = interp2app(W_DateTime_Time.descr_hash_fields),
+    _format_time = interp2app(W_DateTime_Time.descr_format_time),
+    **time_fields(W_DateTime_Time)
+    )
+W_DateTime_Time.typedef.acceptable_as_base_class = True
+
+# ____________________________________________________________
+# a fast path for datetime.strptime(), for the formats made only of %Y, %m,
+# %d, %H, %M, %S, %f, whitespace and literal characters
+
+def parse_digits(string, pos, maxwidth):
+    """Return the end of the digits starting at 'pos', or -1 if there are
+    none or more than 'maxwidth' of them."""
+    end = pos
+    while end < len(string) and string[end].isdigit():
+        end += 1
+    if end == pos or end - pos > maxwidth:
+        return -1
+    return end
+
+@unwrap_spec(string='bytes', format='bytes')
+def parse_datetime(space, string, format):
+    """Parse 'string' with the strptime() 'format' and return the tuple
+    (year, month, day, hour, minute, second, microsecond), or None if the
+    format uses other directives or the string does not match exactly.
+    The caller falls back to _strptime in that case, which also gives the
+    proper error messages.  Note that a number must not be followed by a
+    digit, so that the result is the same as with the regular expression
+    of _strptime."""
+    fields = [1900, 1, 1, 0, 0, 0, 0]
+    seen = [False] * 7
+    i = 0
+    j = 0
+    while i < len(format):
+        c = format[i]
+        if c == '%':
+            if i + 1 >= len(format):
+                return space.w_None
+            d = format[i + 1]
+            i += 2
+            if d == '%':
+                if j >= len(string) or string[j] != '%':
+                    return space.w_None
+                j += 1
+                continue
+            if d == 'Y':
+                index, minwidth, maxwidth, lo, hi = 0, 4, 4, 0, 9999
+            elif d == 'm':
+                index, minwidth, maxwidth, lo, hi = 1, 1, 2, 1, 12
+            elif d == 'd':
+                index, minwidth, maxwidth, lo, hi = 2, 1, 2, 1, 31
+            elif d == 'H':
+                index, minwidth, maxwidth, lo, hi = 3, 1, 2, 0, 23
+            elif d == 'M':
+                index, minwidth, maxwidth, lo, hi = 4, 1, 2, 0, 59
+            elif d == 'S':
+                index, minwidth, maxwidth, lo, hi = 5, 1, 2, 0, 59
+            elif d == 'f':
+                index, minwidth, maxwidth, lo, hi = 6, 1, 6, 0, 999999
+            else:
+                return space.w_None
+            if seen[index]:
+                return space.w_None
+            seen[index] = True
+            end = parse_digits(string, j, maxwidth)
+            if end < 0 or end - j < minwidth:
+                return space.w_None
+            value = int(string[j:end])
+            if d == 'f':
+                for k in range(6 - (end - j)):
+                    value *= 10
+            if not lo <= value <= hi:
+                return space.w_None
+            fields[index] = value
+            j = end
+        elif c.isspace():
+            # like _strptime, whitespace matches any non-empty whitespace
+            while i < len(format) and format[i].isspace():
+                i += 1
+            if j >= len(string) or not string[j].isspace():
+                return space.w_None
+            while j < len(string) and string[j].isspace():
+                j += 1
+        else:
+            if j >= len(string) or string[j] != c:
+                return space.w_None
+            i += 1
+            j += 1
+    if j != len(string):
+        return space.w_None
+    return space.newtuple([space.newint(value) for value in fields])
@@ -66,6 +66,7 @@ class PyPyDateTime(MixedModule):
         'dateinterop'  : 'interp_pypydatetime.W_DateTime_Date',
         'timeinterop'  : 'interp_pypydatetime.W_DateTime_Time',
         'deltainterop' : 'interp_pypydatetime.W_DateTime_Delta',
+        'parse_datetime' : 'interp_pypydatetime.parse_datetime',
     }
 
 class PyPyBufferable(MixedModule):
@@ -123,6 +124,7 @@ class Module(MixedModule):
         'newmemoryview'             : 'interp_buffer.newmemoryview',
         'utf8content'               : 'interp_magic.utf8content',
         'list_get_physical_size'    : 'interp_magic.list_get_physical_size',
+        'list_compact'              : 'interp_magic.list_compact',
     }
     if sys.platform == 'win32':
         interpleveldefs['get_console_cp'] = 'interp_magic.get_console_cp'
@@ -147,6 +149,11 @@ class Module(MixedModule):
                                  'interp_magic.reset_method_cache_counter')
             self.extra_interpdef('mapdict_cache_counter',
                                  'interp_magic.mapdict_cache_counter')
+        if self.space.config.objspace.usemodules._pypyjson:
+            self.extra_interpdef('jsonmap_cache_stats',
+                                 'interp_magic.jsonmap_cache_stats')
+            self.extra_interpdef('set_jsonmap_cache_limit',
+                                 'interp_magic.set_jsonmap_cache_limit')
         PYC_MAGIC = get_pyc_magic(self.space)
         self.extra_interpdef('PYC_MAGIC', 'space.wrap(%d)' % PYC_MAGIC)
         try:
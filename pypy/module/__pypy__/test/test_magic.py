@@ -84,3 +84,20 @@ def f():
         l = [1, 2]
         l.append(3)
         assert list_get_physical_size(l) >= 3 # should be 6, but untranslated 3
+
+    def test_list_compact(self):
+        from __pypy__ import list_compact, strategy
+        l = range(100)
+        l.append(-3)
+        list_compact(l)
+        assert strategy(l) == "Int8ListStrategy"
+        assert l[-1] == -3
+        l.append(1000)
+        assert strategy(l) == "IntegerListStrategy"
+        list_compact(l)
+        assert strategy(l) == "Int16ListStrategy"
+        assert l == range(100) + [-3, 1000]
+        l = [1.5, 2.5]
+        list_compact(l)
+        assert strategy(l) == "FloatListStrategy"
+        raises(TypeError, list_compact, (1, 2))
@@ -0,0 +1,118 @@
+class AppTestPyPyDateTime(object):
+    spaceconfig = dict(usemodules=['__pypy__', 'struct', 'time'])
+
+    def test_packed_fields(self):
+        from __pypy__._pypydatetime import dateinterop, timeinterop
+        d = dateinterop.__new__(dateinterop)
+        assert d._init_datetime(2020, 2, 29, 23, 59, 58, 999999)
+        assert (d._year, d._month, d._day, d._hour, d._minute, d._second,
+                d._microsecond) == (2020, 2, 29, 23, 59, 58, 999999)
+        d._day = 3
+        d._hour = 4
+        assert (d._year, d._month, d._day, d._hour, d._minute) == (
+            2020, 2, 3, 4, 59)
+        raises(ValueError, setattr, d, '_month', 16)
+        # the pickle state can give any byte value, without checks
+        d._day = 255
+        d._year = 65535
+        assert (d._year, d._month, d._day, d._hour) == (65535, 2, 255, 4)
+        t = timeinterop.__new__(timeinterop)
+        assert t._init_time(1, 2, 3, 4)
+        assert (t._hour, t._minute, t._second, t._microsecond) == (1, 2, 3, 4)
+        t._hour = 255
+        t._microsecond = 0xffffff
+        assert (t._hour, t._minute, t._second, t._microsecond) == (
+            255, 2, 3, 0xffffff)
+
+    def test_init_only_valid_exact_ints(self):
+        from __pypy__._pypydatetime import dateinterop
+        d = dateinterop.__new__(dateinterop)
+        assert d._init_date(2000, 2, 29)
+        assert not d._init_date(1900, 2, 29)
+        assert not d._init_date(2000, 13, 1)
+        assert not d._init_date(0, 1, 1)
+        assert not d._init_date(2000, 1, 1.0)
+        assert not d._init_date(2000, True, 1)
+        assert not d._init_date(2000L, 1, 1)
+        assert not d._init_datetime(2000, 1, 1, 24, 0, 0, 0)
+        assert not d._init_datetime(2000, 1, 1, 0, 0, 0, 1000000)
+        assert (d._year, d._month, d._day) == (2000, 2, 29)
+
+    def test_cmp_hash_format(self):
+        from __pypy__._pypydatetime import dateinterop, timeinterop
+        def make(*args):
+            d = dateinterop.__new__(dateinterop)
+            d._init_datetime(*args)
+            return d
+        a = make(2020, 1, 2, 3, 4, 5, 6)
+        b = make(2020, 1, 2, 3, 4, 5, 7)
+        c = make(2019, 12, 31, 23, 0, 0, 0)
+        assert a._cmp_datetime(b) == -1
+        assert b._cmp_datetime(a) == 1
+        assert a._cmp_datetime(a) == 0
+        assert c._cmp_datetime(a) == -1
+        assert a._cmp_date(b) == 0
+        assert a._hash_fields() == make(2020, 1, 2, 3, 4, 5, 6)._hash_fields()
+        assert a._format_date() == '2020-01-02'
+        assert a._format_datetime('T') == '2020-01-02T03:04:05.000006'
+        assert c._format_datetime(' ') == '2019-12-31 23:00:00'
+        t = timeinterop.__new__(timeinterop)
+        t._init_time(9, 8, 7, 120000)
+        assert t._format_time() == '09:08:07.120000'
+
+    def test_parse_datetime(self):
+        from __pypy__._pypydatetime import parse_datetime
+        assert parse_datetime('2020-01-02 03:04:05', '%Y-%m-%d %H:%M:%S') == (
+            2020, 1, 2, 3, 4, 5, 0)
+        assert parse_datetime('2020-1-2T3:04:05.12', '%Y-%m-%dT%H:%M:%S.%f') \
+            == (2020, 1, 2, 3, 4, 5, 120000)
+        assert parse_datetime('12/31/1999', '%m/%d/%Y') == (
+            1999, 12, 31, 0, 0, 0, 0)
+        assert parse_datetime('10:30  \t31%', '%H:%M %d%%') == (
+            1900, 1, 31, 10, 30, 0, 0)
+        # cases left to _strptime
+        for string, format in [('2020-01-02', '%Y-%m-%d %H'),
+                               ('2020-01-02x', '%Y-%m-%d'),
+                               ('20200102', '%Y%m%d'),
+                               ('2020-13-02', '%Y-%m-%d'),
+                               ('23:59:60', '%H:%M:%S'),
+                               ('2020-01-02', '%Y-%m-%e'),
+                               ('2020t01', '%YT%m'),
+                               ('2020', '%Y%'),
+                               ('2020 2021', '%Y %Y')]:
+            assert parse_datetime(string, format) is None
+
+    def test_datetime_module(self):
+        import datetime
+        d = datetime.datetime(2020, 2, 29, 13, 4, 5, 60)
+        assert (d.year, d.month, d.day, d.hour, d.minute, d.second,
+                d.microsecond) == (2020, 2, 29, 13, 4, 5, 60)
+        assert d.isoformat() == '2020-02-29T13:04:05.000060'
+        assert str(d) == '2020-02-29 13:04:05.000060'
+        assert d.isoformat(sep=u' ') == u'2020-02-29 13:04:05.000060'
+        assert str(d.date()) == '2020-02-29'
+        assert str(d.time()) == '13:04:05.000060'
+        assert d < datetime.datetime(2020, 3, 1)
+        assert d == datetime.datetime(2020, 2, 29, 13, 4, 5, 60)
+        assert len(set([d, datetime.datetime(2020, 2, 29, 13, 4, 5, 60)])) == 1
+        assert datetime.date(2020, 1, 2) < datetime.date(2020, 1, 3)
+        assert datetime.datetime(2020, True, 1L).month == 1
+        raises(ValueError, datetime.datetime, 2019, 2, 29)
+        raises(TypeError, datetime.date, 2019, 2, 2.0)
+        raises(ValueError, datetime.time, 24)
+        # the pickle state is not checked, apart from the month
+        d = datetime.datetime('19\x01\xff\xff\xff\xff\xff\xff\xff')
+        assert (d.year, d.month, d.day, d.hour, d.minute, d.second,
+                d.microsecond) == (12601, 1, 255, 255, 255, 255, 0xffffff)
+        raises(TypeError, datetime.datetime,
+               '19\x0d\x01\x00\x00\x00\x00\x00\x00')
+        assert datetime.datetime.strptime('2020-01-02 03:04:05.5',
+                    '%Y-%m-%d %H:%M:%S.%f') == datetime.datetime(
+                        2020, 1, 2, 3, 4, 5, 500000)
+        assert datetime.datetime.strptime(u'2020-01-02', u'%Y-%m-%d') == \
+            datetime.datetime(2020, 1, 2)
+        raises(ValueError, datetime.datetime.strptime, '2019-02-29',
+               '%Y-%m-%d')
+        exc = raises(ValueError, datetime.datetime.strptime, '2019-02-28x',
+                     '%Y-%m-%d')
+        assert 'unconverted data remains' in str(exc.value)
@@ -0,0 +1,114 @@
+""" Compares csv writer.writerows() with calling writer.writerow() for each
+row, for rows of various shapes.  Run it with the pypy to be measured:
+
+    pypy bench_writer.py [-n REPEAT] [-s SCALE] [-k FILTER] [--file]
+
+By default the output goes to a list of strings, so that only the csv
+module is measured; with --file it goes to a temporary file opened in
+binary mode.  The best of REPEAT runs is reported for both paths.
+"""
+
+import sys, os, time, tempfile
+import csv
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    clock = time.time
+
+
+class ListFile(object):
+    def __init__(self):
+        self.parts = []
+        self.write = self.parts.append
+
+
+# ____________________________________________________________
+# workloads
+#
+# each workload is a function taking the scale, which returns the rows to
+# write and the keyword arguments of csv.writer().
+
+WORKLOADS = []
+
+def workload(func):
+    WORKLOADS.append((func.__name__, func))
+    return func
+
+@workload
+def int_rows(scale):
+    return [[i, i * 2, i * 3, -i, i % 7] for i in range(100000 * scale)], {}
+
+@workload
+def float_rows(scale):
+    return [[i * 0.5, i / 3.0, -1.25] for i in range(100000 * scale)], {}
+
+@workload
+def str_rows(scale):
+    return [['name%d' % i, 'city', 'some longer text field']
+            for i in range(100000 * scale)], {}
+
+@workload
+def mixed_tuples(scale):
+    return [(i, 'name%d' % i, i * 0.5, 'a,b' if i % 10 == 0 else 'ab')
+            for i in range(100000 * scale)], {}
+
+@workload
+def quote_all(scale):
+    return ([('abc', i, 'x"y') for i in range(100000 * scale)],
+            {'quoting': csv.QUOTE_ALL})
+
+@workload
+def nonnumeric(scale):
+    return ([('abc', i, i * 0.25) for i in range(100000 * scale)],
+            {'quoting': csv.QUOTE_NONNUMERIC})
+
+
+# ____________________________________________________________
+
+def open_output(use_file):
+    if use_file:
+        return tempfile.TemporaryFile('w+b')
+    return ListFile()
+
+def run_writerows(rows, kwargs, use_file):
+    f = open_output(use_file)
+    t0 = clock()
+    csv.writer(f, **kwargs).writerows(rows)
+    return clock() - t0
+
+def run_writerow(rows, kwargs, use_file):
+    f = open_output(use_file)
+    t0 = clock()
+    writerow = csv.writer(f, **kwargs).writerow
+    for row in rows:
+        writerow(row)
+    return clock() - t0
+
+def main(argv):
+    import optparse
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option('-n', '--repeat', type=int, default=5,
+                      help="number of runs per workload (default: 5)")
+    parser.add_option('-s', '--scale', type=int, default=1,
+                      help="multiply the size of the workloads (default: 1)")
+    parser.add_option('-k', dest='filter', default='',
+                      help="only run the workloads whose name contains this")
+    parser.add_option('--file', action='store_true',
+                      help="write to a temporary file")
+    options, args = parser.parse_args(argv)
+    print '%-14s %10s %10s %8s' % ('workload', 'writerow', 'writerows',
+                                   'speedup')
+    for name, func in WORKLOADS:
+        if options.filter not in name:
+            continue
+        rows, kwargs = func(options.scale)
+        per_row = min([run_writerow(rows, kwargs, options.file)
+                       for i in range(options.repeat)])
+        bulk = min([run_writerows(rows, kwargs, options.file)
+                    for i in range(options.repeat)])
+        print '%-14s %9.3fs %9.3fs %7.2fx' % (name, per_row, bulk,
+                                              per_row / bulk)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,4 +1,7 @@
-from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rarithmetic import string_to_int
+from rpython.rlib.rstring import (StringBuilder, ParseStringError,
+                                  ParseStringOverflowError)
+from rpython.rlib.rfloat import string_to_float
 from rpython.rlib import objectmodel
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.error import OperationError, oefmt
@@ -8,6 +11,8 @@ from pypy.interpreter.typedef import interp_attrproperty_w, interp_attrproperty
 from pypy.module._csv.interp_csv import _build_dialect
 from pypy.module._csv.interp_csv import (QUOTE_MINIMAL, QUOTE_ALL,
                                          QUOTE_NONNUMERIC, QUOTE_NONE)
+from pypy.objspace.std.columns import Column
+from pypy.objspace.std.intobject import _string_to_int_or_long
 from pypy.objspace.std.util import wrap_parsestringerror
 
 (START_RECORD, START_FIELD, ESCAPED_CHAR, IN_FIELD,
@@ -43,8 +48,6 @@ class W_Reader(W_Root):
         space = self.space
         field = field_builder.build()
         if self.numeric_field:
-            from rpython.rlib.rstring import ParseStringError
-            from rpython.rlib.rfloat import string_to_float
             self.numeric_field = False
             try:
                 ff = string_to_float(field)
@@ -257,6 +260,451 @@ Reader objects are responsible for reading and parsing tabular data
 in CSV format.""")
 W_Reader.typedef.acceptable_as_base_class = False
 
+# ____________________________________________________________
+# block reader
+
+KIND_STR, KIND_INT, KIND_FLOAT = range(3)
+
+# results of W_BlockReader._parse_row() other than a position
+NEED_MORE = -1
+NO_ROW = -2
+
+
+class W_BlockReader(W_Root):
+    """ A reader that gets its input by calling source.read() with a large
+    size, and splits it into rows and fields without going through the
+    per-character state machine of W_Reader for unquoted fields.  The
+    values of typed columns are converted at interp-level, and in columns
+    mode the rows are returned in batches of columns, as lists of the
+    matching strategy. """
+
+    def __init__(self, space, dialect, w_read, kinds, columns, batch_size,
+                 block_size):
+        self.space = space
+        self.dialect = dialect
+        self.w_read = w_read
+        self.kinds = kinds        # a KIND_xxx for the first len(kinds) fields
+        self.columns = columns
+        self.batch_size = batch_size
+        self.block_size = block_size
+        self.line_num = 0
+        self.ncolumns = -1        # in columns mode, the number of fields
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        # the fields of the last row parsed, and whether they were quoted;
+        # while a row is parsed, the ones that are complete
+        self.fields = None
+        self.quoted = None
+        self.row_lines = 0
+
+    def iter_w(self):
+        return self
+
+    @objectmodel.dont_inline
+    def error(self, msg):
+        space = self.space
+        w_module = space.getbuiltinmodule('_csv')
+        w_error = space.getattr(w_module, space.newtext('Error'))
+        raise oefmt(w_error, "line %d: %s", self.line_num, msg)
+
+    def parse_error(self, msg):
+        # the error is in the line being parsed
+        self.line_num += self.row_lines + 1
+        return self.error(msg)
+
+    def next_w(self):
+        if self.columns:
+            return self._next_batch()
+        if not self._next_row():
+            raise OperationError(self.space.w_StopIteration,
+                                 self.space.w_None)
+        return self._wrap_row()
+
+    def _fill(self):
+        # drop the part of the buffer that was parsed, and append a block.
+        # The block is at least as big as what is left, so that a field
+        # that spans many blocks is not parsed again for each of them
+        space = self.space
+        pos = self.pos
+        assert pos >= 0
+        size = max(self.block_size, len(self.buf) - pos)
+        w_data = space.call_function(self.w_read, space.newint(size))
+        data = space.bytes_w(w_data)
+        self.buf = self.buf[pos:] + data
+        self.pos = 0
+        if not data:
+            self.eof = True
+
+    def _next_row(self):
+        """ Parse the next row into self.fields and self.quoted.  Returns
+        False at the end of the input. """
+        self.fields = None
+        self.row_lines = 0
+        while True:
+            end = self._parse_row(self.buf, self.pos)
+            if end >= 0:
+                self.line_num += self.row_lines
+                self.row_lines = 0
+                self.pos = end
+                return True
+            if end == NO_ROW:
+                return False
+            # the row goes on after the end of the buffer; self.pos is the
+            # start of the field that is not complete, parse it again once
+            # the next block is in
+            self._fill()
+
+    def _parse_row(self, s, i):
+        dialect = self.dialect
+        end = len(s)
+        if self.fields is None:
+            # start of a row
+            if i == end:
+                if self.eof:
+                    return NO_ROW
+                return NEED_MORE
+            c = s[i]
+            if c == '\n' or c == '\r':
+                # empty line
+                i = self._skip_newline(s, i)
+                if i == NEED_MORE:
+                    self.row_lines = 0
+                else:
+                    self.fields = []
+                    self.quoted = []
+                return i
+            self.fields = []
+            self.quoted = []
+        while True:
+            # start of a field
+            field_start = i
+            nfields = len(self.fields)
+            row_lines = self.row_lines
+            if dialect.skipinitialspace:
+                while i < end and s[i] == ' ':
+                    i += 1
+            if i == end:
+                if not self.eof:
+                    return self._need_more(field_start, nfields, row_lines)
+                self._save_field('', False)
+                self.row_lines += 1
+                return i
+            c = s[i]
+            if c == dialect.quotechar and dialect.quoting != QUOTE_NONE:
+                i = self._parse_quoted_field(s, i + 1)
+            else:
+                i = self._parse_unquoted_field(s, i)
+            if i < 0:
+                return self._need_more(field_start, nfields, row_lines)
+            if i == end:
+                if not self.eof:
+                    return self._need_more(field_start, nfields, row_lines)
+                self.row_lines += 1
+                return i
+            if s[i] == dialect.delimiter:
+                i += 1
+            else:
+                i = self._skip_newline(s, i)
+                if i == NEED_MORE:
+                    return self._need_more(field_start, nfields, row_lines)
+                return i
+
+    def _need_more(self, field_start, nfields, row_lines):
+        # forget the field that starts at field_start, but keep the ones
+        # before it
+        assert nfields >= 0
+        del self.fields[nfields:]
+        del self.quoted[nfields:]
+        self.row_lines = row_lines
+        self.pos = field_start
+        return NEED_MORE
+
+    def _skip_newline(self, s, i):
+        # s[i] is '\r' or '\n'; \r\n counts as a single newline
+        self.row_lines += 1
+        if s[i] == '\r':
+            if i + 1 == len(s) and not self.eof:
+                return NEED_MORE
+            if i + 1 < len(s) and s[i + 1] == '\n':
+                return i + 2
+        return i + 1
+
+    def _save_field(self, field, quoted):
+        if len(field) > field_limit.limit:
+            raise self.parse_error("field larger than field limit")
+        self.fields.append(field)
+        self.quoted.append(quoted)
+
+    def _parse_unquoted_field(self, s, i):
+        dialect = self.dialect
+        delimiter = dialect.delimiter
+        start = i
+        end = len(s)
+        while i < end:
+            c = s[i]
+            if c == delimiter or c == '\n' or c == '\r':
+                break
+            if c == '\0' or c == dialect.escapechar:
+                builder = StringBuilder(i - start + 16)
+                builder.append_slice(s, start, i)
+                i = self._scan_unquoted(s, i, builder)
+                if i >= 0:
+                    self._save_field(builder.build(), False)
+                return i
+            i += 1
+        self._save_field(s[start:i], False)
+        return i
+
+    def _scan_unquoted(self, s, i, builder):
+        # the slow path of _parse_unquoted_field(), for escaped characters
+        dialect = self.dialect
+        end = len(s)
+        while i < end:
+            c = s[i]
+            if c == dialect.delimiter or c == '\n' or c == '\r':
+                break
+            if c == '\0':
+                raise self.parse_error("line contains NULL byte")
+            if c == dialect.escapechar:
+                if i + 1 == end:
+                    if not self.eof:
+                        return NEED_MORE
+                    if self.dialect.strict:
+                        raise self.parse_error("newline inside string")
+                    # like W_Reader, which sees the end of the line
+                    builder.append('\n')
+                    return end
+                i += 1
+                c = s[i]
+            builder.append(c)
+            i += 1
+        return i
+
+    def _parse_quoted_field(self, s, i):
+        dialect = self.dialect
+        quotechar = dialect.quotechar
+        end = len(s)
+        builder = StringBuilder(64)
+        while True:
+            if i == end:
+                if not self.eof:
+                    return NEED_MORE
+                if dialect.strict:
+                    raise self.parse_error("newline inside string")
+                break
+            c = s[i]
+            if c == '\0':
+                raise self.parse_error("line contains NULL byte")
+            if c == dialect.escapechar:
+                if i + 1 == end:
+                    if not self.eof:
+                        return NEED_MORE
+                    if dialect.strict:
+                        raise self.parse_error("newline inside string")
+                    builder.append('\n')
+                    i = end
+                    continue
+                i += 1
+                c = s[i]
+            elif c == quotechar:
+                i += 1
+                if not dialect.doublequote:
+                    # end of the quoted part, the field goes on unquoted
+                    i = self._scan_unquoted(s, i, builder)
+                    break
+                if i == end and not self.eof:
+                    return NEED_MORE
+                if i < end and s[i] == quotechar:
+                    # "" represents "
+                    builder.append(c)
+                    i += 1
+                    continue
+                if i < end:
+                    c = s[i]
+                    if not (c == dialect.delimiter or c == '\n' or
+                            c == '\r'):
+                        if dialect.strict:
+                            raise self.parse_error(
+                                "'%s' expected after '%s'" % (
+                                dialect.delimiter, dialect.quotechar))
+                        builder.append(c)
+                        i = self._scan_unquoted(s, i + 1, builder)
+                break
+            elif c == '\n' or (c == '\r' and
+                               (i + 1 == end or s[i + 1] != '\n')):
+                self.row_lines += 1
+            builder.append(c)
+            i += 1
+        if i >= 0:
+            self._save_field(builder.build(), True)
+        return i
+
+    def _wrap_row(self):
+        space = self.space
+        kinds = self.kinds
+        numeric = self.dialect.quoting == QUOTE_NONNUMERIC
+        fields_w = []
+        for i in range(len(self.fields)):
+            field = self.fields[i]
+            if i < len(kinds):
+                kind = kinds[i]
+            elif numeric and not self.quoted[i] and field:
+                kind = KIND_FLOAT
+            else:
+                kind = KIND_STR
+            if kind == KIND_INT:
+                try:
+                    w_value = space.newint(string_to_int(field))
+                except (ParseStringError, ParseStringOverflowError):
+                    w_value = self._int_slowpath(field)
+            elif kind == KIND_FLOAT:
+                w_value = space.newfloat(self._parse_float(field))
+            else:
+                w_value = space.newtext(field)
+            fields_w.append(w_value)
+        return space.newlist(fields_w)
+
+    def _int_slowpath(self, field):
+        # raises ValueError, or returns a long
+        space = self.space
+        value, w_longval = _string_to_int_or_long(space, space.newtext(field),
+                                                  field)
+        if w_longval is None:
+            return space.newint(value)
+        return w_longval
+
+    def _parse_float(self, field):
+        try:
+            return string_to_float(field)
+        except ParseStringError as e:
+            space = self.space
+            raise wrap_parsestringerror(space, e, space.newtext(field))
+
+    def _next_batch(self):
+        space = self.space
+        numeric = self.dialect.quoting == QUOTE_NONNUMERIC
+        columns = []
+        nrows = 0
+        while nrows < self.batch_size:
+            if not self._next_row():
+                break
+            fields = self.fields
+            if not fields:
+                continue     # skip empty lines
+            if self.ncolumns < 0:
+                self.ncolumns = len(fields)
+            if len(fields) != self.ncolumns:
+                raise self.error("expected %d fields, saw %d" % (
+                    self.ncolumns, len(fields)))
+            if not columns:
+                columns = [Column() for i in range(self.ncolumns)]
+            for i in range(len(fields)):
+                if i < len(self.kinds):
+                    self._append_field(columns[i], self.kinds[i], fields[i])
+                else:
+                    self._append_untyped_field(columns[i], fields[i],
+                                               numeric and not self.quoted[i])
+            nrows += 1
+        if nrows == 0:
+            raise OperationError(space.w_StopIteration, space.w_None)
+        return space.newlist([column.wrap(space) for column in columns])
+
+    def _append_field(self, column, kind, field):
+        space = self.space
+        if kind == KIND_STR:
+            column.append_bytes(space, field)
+        elif kind == KIND_INT:
+            try:
+                column.append_int(space, string_to_int(field))
+            except (ParseStringError, ParseStringOverflowError):
+                # a long
+                column.append_w(space, self._int_slowpath(field))
+        else:
+            column.append_float(space, self._parse_float(field))
+
+    def _append_untyped_field(self, column, field, numeric):
+        # like in _wrap_row(), with QUOTE_NONNUMERIC the fields that are not
+        # quoted are floats; a column that has both becomes a column of
+        # objects
+        space = self.space
+        if numeric and field:
+            column.append_float(space, self._parse_float(field))
+        else:
+            column.append_bytes(space, field)
+
+
+def _get_kinds(space, w_types):
+    kinds = []
+    if space.is_none(w_types):
+        return kinds
+    for w_type in space.listview(w_types):
+        if space.is_w(w_type, space.w_int):
+            kinds.append(KIND_INT)
+        elif space.is_w(w_type, space.w_float):
+            kinds.append(KIND_FLOAT)
+        elif space.is_w(w_type, space.w_bytes) or space.is_none(w_type):
+            kinds.append(KIND_STR)
+        else:
+            raise oefmt(space.w_TypeError,
+                        "types must contain int, float, str or None, not %R",
+                        w_type)
+    return kinds
+
+@unwrap_spec(columns=bool, batch_size=int, block_size=int)
+def csv_block_reader(space, w_source, w_dialect=None,
+                  w_delimiter        = None,
+                  w_doublequote      = None,
+                  w_escapechar       = None,
+                  w_lineterminator   = None,
+                  w_quotechar        = None,
+                  w_quoting          = None,
+                  w_skipinitialspace = None,
+                  w_strict           = None,
+                  w_types            = None,
+                  columns            = False,
+                  batch_size         = 1024,
+                  block_size         = 65536,
+                  ):
+    """
+    block_reader(source [, dialect='excel'] [, types=None]
+                 [, columns=False] [, batch_size=1024]
+                 [, block_size=65536] [optional keyword args])
+
+    Like reader(), but the input is read from source.read(block_size),
+    which must return byte strings, e.g. a file opened in binary mode.
+    Rows end with '\\r\\n', '\\r' or '\\n'.
+
+    If given, types is a sequence of int, float, str or None: the first
+    fields of every row are converted to these types, like int(field) or
+    float(field) would.  If columns is true, the empty lines are skipped,
+    all rows must have the same number of fields, and each iteration
+    returns a list of columns, each a list of the values of up to
+    batch_size rows."""
+    w_read = space.getattr(w_source, space.newtext('read'))
+    dialect = _build_dialect(space, w_dialect, w_delimiter, w_doublequote,
+                             w_escapechar, w_lineterminator, w_quotechar,
+                             w_quoting, w_skipinitialspace, w_strict)
+    kinds = _get_kinds(space, w_types)
+    if batch_size <= 0 or block_size <= 0:
+        raise oefmt(space.w_ValueError,
+                    "batch_size and block_size must be positive")
+    return W_BlockReader(space, dialect, w_read, kinds, columns, batch_size,
+                         block_size)
+
+W_BlockReader.typedef = TypeDef(
+        '_csv.block_reader',
+        dialect = interp_attrproperty_w('dialect', W_BlockReader),
+        line_num = interp_attrproperty('line_num', W_BlockReader,
+            wrapfn="newint"),
+        __iter__ = interp2app(W_BlockReader.iter_w),
+        next = interp2app(W_BlockReader.next_w),
+        __doc__ = """CSV block reader
+
+Reads CSV data from a file-like object in large blocks, converting the
+typed columns and returning rows or batches of columns.""")
+W_BlockReader.typedef.acceptable_as_base_class = False
+
 # ____________________________________________________________
 
 class FieldLimit:
@@ -7,6 +7,9 @@ from pypy.interpreter.typedef import interp_attrproperty_w
 from pypy.module._csv.interp_csv import _build_dialect
 from pypy.module._csv.interp_csv import (QUOTE_MINIMAL, QUOTE_ALL,
                                          QUOTE_NONNUMERIC, QUOTE_NONE)
+from pypy.objspace.std.floatobject import float_repr
+
+WRITE_CHUNK_SIZE = 65536   # writerows() calls write() with about that much
 
 
 class W_Writer(W_Root):
@@ -33,87 +36,8 @@ class W_Writer(W_Root):
         """Construct and write a CSV record from a sequence of fields.
         Non-string elements will be converted to string."""
         space = self.space
-        fields_w = space.listview(w_fields)
-        dialect = self.dialect
         rec = StringBuilder(80)
-        #
-        for field_index in range(len(fields_w)):
-            w_field = fields_w[field_index]
-            if space.is_w(w_field, space.w_None):
-                field = ""
-            elif space.isinstance_w(w_field, space.w_float):
-                field = space.text_w(space.repr(w_field))
-            else:
-                field = space.text_w(space.str(w_field))
-            #
-            if dialect.quoting == QUOTE_NONNUMERIC:
-                try:
-                    space.float_w(w_field)    # is it an int/long/float?
-                    quoted = False
-                except OperationError as e:
-                    if e.async(space):
-                        raise
-                    quoted = True
-            elif dialect.quoting == QUOTE_ALL:
-                quoted = True
-            elif dialect.quoting == QUOTE_MINIMAL:
-                # Find out if we really quoting
-                special_characters = self.special_characters
-                for c in field:
-                    if c in special_characters:
-                        if c != dialect.quotechar or dialect.doublequote:
-                            quoted = True
-                            break
-                else:
-                    quoted = False
-            else:
-                quoted = False
-
-            # If field is empty check if it needs to be quoted
-            if len(field) == 0 and len(fields_w) == 1:
-                if dialect.quoting == QUOTE_NONE:
-                    raise self.error("single empty field record "
-                                     "must be quoted")
-                quoted = True
-
-            # If this is not the first field we need a field separator
-            if field_index > 0:
-                rec.append(dialect.delimiter)
-
-            # Handle preceding quote
-            if quoted:
-                rec.append(dialect.quotechar)
-
-            # Copy field data
-            special_characters = self.special_characters
-            for c in field:
-                if c in special_characters:
-                    if dialect.quoting == QUOTE_NONE:
-                        want_escape = True
-                    else:
-                        want_escape = False
-                        if c == dialect.quotechar:
-                            if dialect.doublequote:
-                                rec.append(dialect.quotechar)
-                            else:
-                                want_escape = True
-                    if want_escape:
-                        if dialect.escapechar == '\0':
-                            raise self.error("need to escape, "
-                                             "but no escapechar set")
-                        rec.append(dialect.escapechar)
-                    else:
-                        assert quoted
-                # Copy field character into record buffer
-                rec.append(c)
-
-            # Handle final quote
-            if quoted:
-                rec.append(dialect.quotechar)
-
-        # Add line terminator
-        rec.append(dialect.lineterminator)
-
+        self._append_row(rec, w_fields)
         line = rec.build()
         return space.call_function(self.w_filewrite, space.newtext(line))
 
@@ -122,14 +46,153 @@ class W_Writer(W_Root):
         Non-string elements will be converted to string."""
         space = self.space
         w_iter = space.iter(w_seqseq)
+        # many rows are collected before calling write()
+        rec = StringBuilder(WRITE_CHUNK_SIZE)
         while True:
             try:
                 w_seq = space.next(w_iter)
             except OperationError as e:
                 if e.match(space, space.w_StopIteration):
                     break
+                self._write_rows(rec, rec.getlength())
                 raise
-            self.writerow(w_seq)
+            done = rec.getlength()
+            try:
+                self._append_row(rec, w_seq)
+            except OperationError:
+                # write the rows before the broken one, like writerow()
+                # would have done
+                self._write_rows(rec, done)
+                raise
+            if rec.getlength() >= WRITE_CHUNK_SIZE:
+                self._write_rows(rec, rec.getlength())
+                rec = StringBuilder(WRITE_CHUNK_SIZE)
+        self._write_rows(rec, rec.getlength())
+
+    def _write_rows(self, rec, length):
+        if length > 0:
+            data = rec.build()
+            if length < len(data):
+                data = data[:length]
+            space = self.space
+            space.call_function(self.w_filewrite, space.newtext(data))
+
+    def _append_row(self, rec, w_fields):
+        space = self.space
+        # rows that are lists of ints, floats or strings are not unwrapped
+        # field by field
+        ints = space.listview_int(w_fields)
+        if ints is not None:
+            for i in range(len(ints)):
+                self._append_field(rec, i, len(ints), str(ints[i]), True)
+            rec.append(self.dialect.lineterminator)
+            return
+        floats = space.listview_float(w_fields)
+        if floats is not None:
+            for i in range(len(floats)):
+                self._append_field(rec, i, len(floats), float_repr(floats[i]),
+                                   True)
+            rec.append(self.dialect.lineterminator)
+            return
+        strings = space.listview_bytes(w_fields)
+        if strings is not None:
+            for i in range(len(strings)):
+                self._append_field(rec, i, len(strings), strings[i], False)
+            rec.append(self.dialect.lineterminator)
+            return
+        fields_w = space.listview(w_fields)
+        for field_index in range(len(fields_w)):
+            w_field = fields_w[field_index]
+            w_type = space.type(w_field)
+            if space.is_w(w_type, space.w_bytes):
+                field = space.bytes_w(w_field)
+                numeric = False
+            elif space.is_w(w_type, space.w_int):
+                field = str(space.int_w(w_field))
+                numeric = True
+            elif space.is_w(w_type, space.w_float):
+                field = float_repr(space.float_w(w_field))
+                numeric = True
+            else:
+                if space.is_w(w_field, space.w_None):
+                    field = ""
+                elif space.isinstance_w(w_field, space.w_float):
+                    field = space.text_w(space.repr(w_field))
+                else:
+                    field = space.text_w(space.str(w_field))
+                numeric = False
+                if self.dialect.quoting == QUOTE_NONNUMERIC:
+                    try:
+                        space.float_w(w_field)    # is it an int/long/float?
+                        numeric = True
+                    except OperationError as e:
+                        if e.async(space):
+                            raise
+            self._append_field(rec, field_index, len(fields_w), field, numeric)
+        #
+        # Add line terminator
+        rec.append(self.dialect.lineterminator)
+
+    def _append_field(self, rec, field_index, nfields, field, numeric):
+        dialect = self.dialect
+        if dialect.quoting == QUOTE_NONNUMERIC:
+            quoted = not numeric
+        elif dialect.quoting == QUOTE_ALL:
+            quoted = True
+        elif dialect.quoting == QUOTE_MINIMAL:
+            # Find out if we really quoting
+            special_characters = self.special_characters
+            for c in field:
+                if c in special_characters:
+                    if c != dialect.quotechar or dialect.doublequote:
+                        quoted = True
+                        break
+            else:
+                quoted = False
+        else:
+            quoted = False
+
+        # If field is empty check if it needs to be quoted
+        if len(field) == 0 and nfields == 1:
+            if dialect.quoting == QUOTE_NONE:
+                raise self.error("single empty field record "
+                                 "must be quoted")
+            quoted = True
+
+        # If this is not the first field we need a field separator
+        if field_index > 0:
+            rec.append(dialect.delimiter)
+
+        # Handle preceding quote
+        if quoted:
+            rec.append(dialect.quotechar)
+
+        # Copy field data
+        special_characters = self.special_characters
+        for c in field:
+            if c in special_characters:
+                if dialect.quoting == QUOTE_NONE:
+                    want_escape = True
+                else:
+                    want_escape = False
+                    if c == dialect.quotechar:
+                        if dialect.doublequote:
+                            rec.append(dialect.quotechar)
+                        else:
+                            want_escape = True
+                if want_escape:
+                    if dialect.escapechar == '\0':
+                        raise self.error("need to escape, "
+                                         "but no escapechar set")
+                    rec.append(dialect.escapechar)
+                else:
+                    assert quoted
+            # Copy field character into record buffer
+            rec.append(c)
+
+        # Handle final quote
+        if quoted:
+            rec.append(dialect.quotechar)
 
 
 def csv_writer(space, w_fileobj, w_dialect=None,
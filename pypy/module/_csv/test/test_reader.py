@@ -104,3 +104,107 @@ class AppTestReader(object):
         self._read_test(['a,"'], 'Error', strict=True)
         self._read_test(['"a'], 'Error', strict=True)
         self._read_test(['^'], 'Error', escapechar='^', strict=True)
+
+
+class AppTestBlockReader(object):
+    spaceconfig = dict(usemodules=['_csv'])
+
+    def setup_class(cls):
+        w__read_test = cls.space.appexec([], r"""():
+            import _csv, StringIO
+            def _read_test(input, expect, **kwargs):
+                for block_size in [1, 2, 3, 7, 65536]:
+                    f = StringIO.StringIO(''.join(input))
+                    reader = _csv.block_reader(f, block_size=block_size,
+                                               **kwargs)
+                    if expect == 'Error':
+                        raises(_csv.Error, list, reader)
+                        continue
+                    result = list(reader)
+                    assert result == expect, 'result: %r\nexpect: %r' % (
+                        result, expect)
+            return _read_test
+        """)
+        if type(w__read_test) is type(lambda:0):
+            w__read_test = staticmethod(w__read_test)
+        cls.w__read_test = w__read_test
+
+    def test_same_as_reader(self):
+        import _csv
+        self._read_test(['a,b\r\n', 'c,d\n', '\n', 'e,f\r', 'g'],
+                        [['a', 'b'], ['c', 'd'], [], ['e', 'f'], ['g']])
+        self._read_test(['a,"b\r\nc",d\n', '"x""y",""\n'],
+                        [['a', 'b\r\nc', 'd'], ['x"y', '']])
+        self._read_test(['a,\\b,c\n', '"b\\,c",d\\\n'],
+                        [['a', 'b', 'c'], ['b,c', 'd\n']], escapechar='\\')
+        self._read_test(['a, b,  "c"'], [['a', 'b', 'c']],
+                        skipinitialspace=True)
+        self._read_test(['a:b:\n'], [['a', 'b', '']], delimiter=':')
+        self._read_test(['"ab"c'], [['abc']], doublequote=0)
+        self._read_test(['a,"b"c'], [['a', 'bc']])
+        self._read_test(['a,"b"c'], 'Error', strict=1)
+        self._read_test(['a,"b'], [['a', 'b']])
+        self._read_test(['a,"b'], 'Error', strict=1)
+        self._read_test(['ab\0c'], 'Error')
+        self._read_test([',3,"5",7.3, 9'], [['', 3, '5', 7.3, 9]],
+                        quoting=_csv.QUOTE_NONNUMERIC)
+
+    def test_types(self):
+        self._read_test(['1,2.5,x,y\n', '-3,4,z,w\n'],
+                        [[1, 2.5, 'x', 'y'], [-3, 4.0, 'z', 'w']],
+                        types=[int, float, None])
+        self._read_test(['12345678901234567890123,x\n'],
+                        [[12345678901234567890123, 'x']], types=[int])
+        raises(ValueError, self._read_test, ['1,x\n'], None,
+               types=[int, int])
+        raises(ValueError, self._read_test, ['1,x\n'], None,
+               types=[int, float])
+        raises(TypeError, self._read_test, [''], None, types=[list])
+
+    def test_columns(self):
+        import _csv, StringIO
+        data = ''.join(['%d,%d.5,name%d\n' % (i, i, i) for i in range(10)])
+        f = StringIO.StringIO(data + '\n')
+        reader = _csv.block_reader(f, types=[int, float], columns=True,
+                                   batch_size=4, block_size=16)
+        batches = list(reader)
+        assert len(batches) == 3
+        assert batches[0] == [[0, 1, 2, 3], [0.5, 1.5, 2.5, 3.5],
+                              ['name0', 'name1', 'name2', 'name3']]
+        assert batches[2] == [[8, 9], [8.5, 9.5], ['name8', 'name9']]
+        assert reader.line_num == 11
+        try:
+            from __pypy__ import strategy
+        except ImportError:
+            pass
+        else:
+            assert [strategy(c) for c in batches[1]] == [
+                'IntegerListStrategy', 'FloatListStrategy',
+                'BytesListStrategy']
+        f = StringIO.StringIO('1,2\n3\n')
+        reader = _csv.block_reader(f, columns=True)
+        exc = raises(_csv.Error, list, reader)
+        assert 'line 2' in str(exc.value)
+        f = StringIO.StringIO('1\n99999999999999999999999\n')
+        reader = _csv.block_reader(f, types=[int], columns=True)
+        assert list(reader) == [[[1, 99999999999999999999999]]]
+
+    def test_columns_nonnumeric(self):
+        import _csv, StringIO
+        f = StringIO.StringIO('1,"a",2,"x"\n3,"b","c",4\n')
+        reader = _csv.block_reader(f, columns=True,
+                                   quoting=_csv.QUOTE_NONNUMERIC)
+        assert list(reader) == [[[1.0, 3.0], ['a', 'b'], [2.0, 'c'],
+                                 ['x', 4.0]]]
+
+    def test_long_rows(self):
+        import _csv, StringIO
+        row = ['x' * 1000, 'a\nb' * 300, '', 'y' * 50]
+        line = ','.join(['"%s"' % (field,) for field in row]) + '\r\n'
+        f = StringIO.StringIO(line * 3)
+        reader = _csv.block_reader(f, block_size=7)
+        assert list(reader) == [row] * 3
+        assert reader.line_num == 3 * 301
+        f = StringIO.StringIO(line * 3)
+        reader = _csv.block_reader(f, columns=True, block_size=7)
+        assert list(reader) == [[[field] * 3 for field in row]]
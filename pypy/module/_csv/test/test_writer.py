@@ -85,3 +85,51 @@ class AppTestWriter(object):
 
     def test_writerows(self):
         self._write_test([['a'],['b','c']], 'a\r\nb,c')
+
+    def test_writerows_typed_rows(self):
+        import _csv as csv
+        self._write_test([[1, 2, -3], [1.5, 2.0], ['a', 'b,c'], (4, 'd', 0.1)],
+                         '1,2,-3\r\n1.5,2.0\r\na,"b,c"\r\n4,d,0.1')
+        self._write_test([[1, 2], [1.5], ['a', 'b']],
+                         '1,2\r\n1.5\r\n"a","b"', quoting=csv.QUOTE_NONNUMERIC)
+        self._write_test([[1, 2], ['']], '"1","2"\r\n""',
+                         quoting=csv.QUOTE_ALL)
+        self._write_test([[1, 2], [3.5]], '1;2\r\n3.5', delimiter=';')
+        self._write_test([[12, 3]], '123"3"', delimiter='3')
+
+    def test_writerows_many(self):
+        import _csv
+        class DummyFile(object):
+            def __init__(self):
+                self.parts = []
+            def write(self, data):
+                self.parts.append(data)
+        rows = [[i, 'x' * (i % 50), i * 0.5] for i in range(3000)]
+        f = DummyFile()
+        _csv.writer(f).writerows(rows)
+        expected = ''.join(['%d,%s,%r\r\n' % (i, 'x' * (i % 50), i * 0.5)
+                            for i in range(3000)])
+        assert ''.join(f.parts) == expected
+        assert 1 < len(f.parts) < 100
+
+    def test_writerows_error(self):
+        import _csv
+        class DummyFile(object):
+            def __init__(self):
+                self.parts = []
+            def write(self, data):
+                self.parts.append(data)
+        class BadItem:
+            def __str__(self):
+                raise IOError
+        f = DummyFile()
+        writer = _csv.writer(f)
+        raises(IOError, writer.writerows, [[1, 2], ['a', BadItem()], [3]])
+        assert ''.join(f.parts) == '1,2\r\n'
+        def gen():
+            yield ['a']
+            raise ValueError
+        f = DummyFile()
+        writer = _csv.writer(f)
+        raises(ValueError, writer.writerows, gen())
+        assert ''.join(f.parts) == 'a\r\n'
@@ -0,0 +1,153 @@
+""" Per-call latency of small operations on buffered files.
+
+Measures readline() on a BufferedReader and small write() calls on a
+BufferedWriter over a text-heavy log file, which is the case where the
+per-call overhead of the buffered layer (and of its lock) dominates.  Run
+it with the pypy to be measured:
+
+    pypy bench_bufferedio.py [-n REPEAT] [-s SCALE] [-k FILTER] [--threads]
+
+With --threads a dummy thread is started before the workloads run, which
+makes the buffered objects take their lock on every call; comparing the
+two runs shows the cost of the locking.  The latency reported is the best
+of REPEAT runs, divided by the number of calls.
+"""
+
+import sys, os, time, tempfile, threading
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    clock = time.time
+
+
+LOG_LINE = ('2024-03-01 12:00:%02d,%03d INFO  [worker-%d] request handled '
+            'path=/api/v1/items/%d status=200 duration=%dms\n')
+
+def make_log(filename, nlines):
+    with open(filename, 'wb') as f:
+        for i in range(nlines):
+            f.write(LOG_LINE % (i % 60, i % 1000, i % 8, i, i % 97))
+
+
+# ____________________________________________________________
+# workloads
+#
+# each workload is a function taking the file name and the scale; it
+# prepares its inputs, then returns a function that runs the workload and
+# returns the number of calls done.
+
+WORKLOADS = []
+
+def workload(func):
+    WORKLOADS.append((func.__name__, func))
+    return func
+
+@workload
+def readline(filename, scale):
+    def run():
+        n = 0
+        with open(filename, 'rb') as f:
+            readline = f.readline
+            while readline():
+                n += 1
+        return n
+    return run
+
+@workload
+def iterate_lines(filename, scale):
+    def run():
+        n = 0
+        with open(filename, 'rb') as f:
+            for line in f:
+                n += 1
+        return n
+    return run
+
+@workload
+def small_read(filename, scale):
+    def run():
+        n = 0
+        with open(filename, 'rb') as f:
+            read = f.read
+            while read(16):
+                n += 1
+        return n
+    return run
+
+@workload
+def write_lines(filename, scale):
+    lines = [LOG_LINE % (i % 60, i % 1000, i % 8, i, i % 97)
+             for i in range(1000)]
+    nlines = 100000 * scale
+    def run():
+        with open(filename + '.out', 'wb') as f:
+            write = f.write
+            for i in range(nlines):
+                write(lines[i % 1000])
+        return nlines
+    return run
+
+@workload
+def write_fields(filename, scale):
+    # a log line written piece by piece, the typical shape of a formatter
+    nlines = 50000 * scale
+    def run():
+        with open(filename + '.out', 'wb') as f:
+            write = f.write
+            for i in range(nlines):
+                write('2024-03-01 12:00:00 ')
+                write('INFO  ')
+                write('request handled')
+                write('\n')
+        return nlines * 4
+    return run
+
+
+# ____________________________________________________________
+
+def run_workload(func, filename, scale, repeat):
+    run = func(filename, scale)
+    best = None
+    for i in range(repeat):
+        t0 = clock()
+        ncalls = run()
+        t = clock() - t0
+        if best is None or t < best:
+            best = t
+    return best, ncalls
+
+def main(argv):
+    import optparse
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option('-n', '--repeat', type=int, default=5,
+                      help="number of runs per workload (default: 5)")
+    parser.add_option('-s', '--scale', type=int, default=1,
+                      help="multiply the size of the workloads (default: 1)")
+    parser.add_option('-k', dest='filter', default='',
+                      help="only run the workloads whose name contains this")
+    parser.add_option('--threads', action='store_true',
+                      help="start a thread before running the workloads")
+    options, args = parser.parse_args(argv)
+    if options.threads:
+        t = threading.Thread(target=lambda: None)
+        t.start()
+        t.join()
+    fd, filename = tempfile.mkstemp(suffix='.log')
+    os.close(fd)
+    try:
+        make_log(filename, 100000 * options.scale)
+        print '%-16s %10s %12s' % ('workload', 'calls', 'ns/call')
+        for name, func in WORKLOADS:
+            if options.filter not in name:
+                continue
+            best, ncalls = run_workload(func, filename, options.scale,
+                                        options.repeat)
+            print '%-16s %10d %12.1f' % (name, ncalls, best * 1e9 / ncalls)
+    finally:
+        for fn in [filename, filename + '.out']:
+            if os.path.exists(fn):
+                os.unlink(fn)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
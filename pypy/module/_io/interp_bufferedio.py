@@ -40,25 +40,51 @@ def make_write_blocking_error(space, written):
 
 
 class TryLock(object):
-    "A Lock that raises RuntimeError when acquired twice by the same thread"
+    """A Lock that raises RuntimeError when acquired twice by the same thread.
+
+    As long as the program didn't start any thread, no lock is allocated or
+    acquired at all: only the owner field is set, which is enough to detect
+    reentrant calls.  The real lock is allocated by the first thread that
+    enters after threads have been started."""
+
     def __init__(self, space):
-        ## XXX cannot free a Lock?
-        ## if self.lock:
-        ##     self.lock.free()
-        self.lock = space.allocate_lock()
+        self.space = space
+        self.lock = None
         self.owner = 0
-        self.operr = oefmt(space.w_RuntimeError, "reentrant call")
 
     def __enter__(self):
+        if self.lock is None:
+            if not self.space.threadlocals.threads_initialized():
+                if self.owner != 0:
+                    raise self._reentrant_call()
+                self.owner = rthread.get_ident()
+                return
+            self._allocate_lock()
         if not self.lock.acquire(False):
             if self.owner == rthread.get_ident():
-                raise self.operr
+                raise self._reentrant_call()
             self.lock.acquire(True)
         self.owner = rthread.get_ident()
 
+    def _reentrant_call(self):
+        # not prebuilt: the traceback attached to it would keep the frames
+        # (and the buffered object) alive
+        return oefmt(self.space.w_RuntimeError, "reentrant call")
+
+    def _allocate_lock(self):
+        ## XXX cannot free a Lock?
+        lock = self.space.allocate_lock()
+        if self.owner != 0:
+            # another thread entered before threads were started, and
+            # didn't leave yet: acquire the lock on its behalf, its
+            # __exit__() will release it
+            lock.acquire(True)
+        self.lock = lock
+
     def __exit__(self,*args):
         self.owner = 0
-        self.lock.release()
+        if self.lock is not None:
+            self.lock.release()
 
 
 class BlockingIOError(Exception):
@@ -483,6 +509,55 @@ class BufferedMixin:
             self.pos = endpos
             return space.newbytes(data)
 
+    def readinto_w(self, space, w_buffer):
+        self._check_init(space)
+        self._check_closed(space, "readinto of closed file")
+        rwbuffer = space.writebuf_w(w_buffer)
+        length = rwbuffer.getlength()
+        with self.lock:
+            have = self._readahead()
+            if have >= length:
+                self.output_slice(space, rwbuffer, 0,
+                                  self.buffer[self.pos:self.pos + length])
+                self.pos += length
+                return space.newint(length)
+            written = 0
+            if have > 0:
+                self.output_slice(space, rwbuffer, 0,
+                                  self.buffer[self.pos:self.pos + have])
+                self.pos += have
+                written = have
+
+            # Flush the write buffer if necessary
+            if self.writable:
+                self._flush_and_rewind_unlocked(space)
+            self._reader_reset_buf()
+            self.pos = 0
+
+            while written < length:
+                remaining = length - written
+                try:
+                    if remaining > self.buffer_size:
+                        # Large reads go directly into the caller's buffer,
+                        # without copying them through ours
+                        size = self._raw_read(space, rwbuffer, written,
+                                              remaining)
+                    else:
+                        size = self._fill_buffer(space)
+                        if size > remaining:
+                            size = remaining
+                        self.output_slice(space, rwbuffer, written,
+                                          self.buffer[self.pos:self.pos + size])
+                        self.pos += size
+                except BlockingIOError:
+                    if written == 0:
+                        return space.w_None
+                    size = 0
+                if size == 0:
+                    break
+                written += size
+            return space.newint(written)
+
     def _read_all(self, space):
         "Read all the file, don't update the cache"
         # Must run with the lock held!
@@ -850,6 +925,7 @@ W_BufferedReader.typedef = TypeDef(
     read = interp2app(W_BufferedReader.read_w),
     peek = interp2app(W_BufferedReader.peek_w),
     read1 = interp2app(W_BufferedReader.read1_w),
+    readinto = interp2app(W_BufferedReader.readinto_w),
     raw = interp_attrproperty_w("w_raw", cls=W_BufferedReader),
     readline = interp2app(W_BufferedReader.readline_w),
 
@@ -1047,6 +1123,7 @@ W_BufferedRandom.typedef = TypeDef(
     read = interp2app(W_BufferedRandom.read_w),
     peek = interp2app(W_BufferedRandom.peek_w),
     read1 = interp2app(W_BufferedRandom.read1_w),
+    readinto = interp2app(W_BufferedRandom.readinto_w),
     readline = interp2app(W_BufferedRandom.readline_w),
 
     write = interp2app(W_BufferedRandom.write_w),
@@ -4,6 +4,7 @@ from pypy.interpreter.error import (
     OperationError, oefmt, wrap_oserror, wrap_oserror2)
 from rpython.rlib.objectmodel import keepalive_until_here
 from rpython.rlib.rarithmetic import r_longlong
+from rpython.rlib import rposix
 from rpython.rlib.rposix import c_read, get_saved_errno, open
 from rpython.rlib.rstring import StringBuilder
 from rpython.rtyper.lltypesystem import lltype, rffi
@@ -32,6 +33,7 @@ def interp_member_w(name, cls, doc=None):
 
 O_BINARY = getattr(os, "O_BINARY", 0)
 O_APPEND = getattr(os, "O_APPEND", 0)
+_WIN32 = sys.platform == 'win32'
 
 def _bad_mode(space):
     raise oefmt(space.w_ValueError,
@@ -404,6 +406,84 @@ class W_FileIO(W_RawIOBase):
                 e = OSError(err, "read failed")
                 raise wrap_oserror(space, e, w_exception_class=space.w_IOError)
 
+    def readinto_many_w(self, space, w_buffers):
+        """readinto_many(buffers) -> int.  Read into each buffer of the list
+        in turn, using a single system call.  Returns the total number of
+        bytes read, or None if the file is non-blocking and no data is
+        available."""
+        self._check_closed(space)
+        self._check_readable(space)
+        rwbuffers = [space.getarg_w('w*', w_buffer)
+                     for w_buffer in space.listview(w_buffers)]
+        if _WIN32:
+            return self._readinto_many_fallback(space, rwbuffers)
+        if len(rwbuffers) > rposix.IOV_MAX:
+            raise oefmt(space.w_ValueError,
+                        "readinto_many() takes at most %d buffers",
+                        rposix.IOV_MAX)
+        addresses = []
+        lengths = []
+        offsets = []
+        # buffers without a raw address are read into a temporary raw
+        # buffer, and copied afterwards
+        copied = []
+        total = 0
+        try:
+            for rwbuffer in rwbuffers:
+                length = rwbuffer.getlength()
+                address = lltype.nullptr(rffi.CCHARP.TO)
+                try:
+                    address = rwbuffer.get_raw_address()
+                except ValueError:
+                    pass
+                if not address:
+                    address = lltype.malloc(rffi.CCHARP.TO, length,
+                                            flavor='raw')
+                    copied.append(len(addresses))
+                offsets.append(total)
+                addresses.append(address)
+                lengths.append(length)
+                total += length
+            try:
+                got = rposix.readv(self.fd, addresses, lengths)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return space.w_None
+                raise wrap_oserror(space, e,
+                                   w_exception_class=space.w_IOError)
+            keepalive_until_here(rwbuffers)
+            for index in copied:
+                start = offsets[index]
+                if start >= got:
+                    break
+                size = min(lengths[index], got - start)
+                rwbuffers[index].setslice(
+                    0, rffi.charpsize2str(addresses[index], size))
+            return space.newint(got)
+        finally:
+            for index in copied:
+                lltype.free(addresses[index], flavor='raw')
+
+    def _readinto_many_fallback(self, space, rwbuffers):
+        total = 0
+        for rwbuffer in rwbuffers:
+            total += rwbuffer.getlength()
+        try:
+            data = os.read(self.fd, total)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return space.w_None
+            raise wrap_oserror(space, e,
+                               w_exception_class=space.w_IOError)
+        start = 0
+        for rwbuffer in rwbuffers:
+            if start >= len(data):
+                break
+            end = min(start + rwbuffer.getlength(), len(data))
+            rwbuffer.setslice(0, data[start:end])
+            start = end
+        return space.newint(len(data))
+
     def readall_w(self, space):
         self._check_closed(space)
         self._check_readable(space)
@@ -465,6 +545,7 @@ W_FileIO.typedef = TypeDef(
     write = interp2app(W_FileIO.write_w),
     read = interp2app(W_FileIO.read_w),
     readinto = interp2app(W_FileIO.readinto_w),
+    readinto_many = interp2app(W_FileIO.readinto_many_w),
     readall = interp2app(W_FileIO.readall_w),
     truncate = interp2app(W_FileIO.truncate_w),
     close = interp2app(W_FileIO.close_w),
@@ -296,7 +296,7 @@ class W_StringIO(W_TextIOBase):
         """Switch from ACCUMULATING to READING"""
         s = self.builder.build()
         length = self.builder.getlength()
-        self.w_value = space.newutf8(s, length)
+        self.w_value = W_UnicodeObject(s, length)
         self.builder = None
         self.state = READING
 
@@ -11,9 +11,10 @@ from pypy.module._io.interp_iobase import W_IOBase, convert_size, trap_eintr
 from rpython.rlib.rarithmetic import intmask, r_uint, r_ulonglong
 from rpython.rlib.rbigint import rbigint
 from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.runicode import _utf8_code_length
 from rpython.rlib.rutf8 import (check_utf8, next_codepoint_pos,
-                                codepoints_in_utf8, codepoints_in_utf8,
-                                Utf8StringBuilder)
+                                codepoints_in_utf8, has_surrogates,
+                                CheckError, Utf8StringBuilder)
 
 
 STATE_ZERO, STATE_OK, STATE_DETACHED = range(3)
@@ -25,10 +26,40 @@ SEEN_ALL  = SEEN_CR | SEEN_LF | SEEN_CRLF
 
 _WINDOWS = sys.platform == 'win32'
 
+# codecs whose incremental decoder W_IncrementalNewlineDecoder can replace
+# by a check of the input, because their output is the utf-8 input itself
+FAST_NONE, FAST_UTF8, FAST_ASCII = range(3)
+FAST_CODECS = {'utf-8': FAST_UTF8, 'ascii': FAST_ASCII}
+
+def _get_fast_codec(space, w_codec):
+    w_name = space.findattr(w_codec, space.newtext("name"))
+    if w_name is None or not space.isinstance_w(w_name, space.w_text):
+        return FAST_NONE
+    return FAST_CODECS.get(space.text_w(w_name), FAST_NONE)
+
+def _utf8_tail_start(s):
+    """ Return the start of the incomplete utf-8 sequence at the end of s,
+    or len(s) if s does not end with one. """
+    end = len(s)
+    i = end - 1
+    stop = max(end - 4, -1)
+    while i > stop:
+        ordch = ord(s[i])
+        if ordch < 0x80:
+            break
+        if ordch >= 0xC0:
+            if i + ord(_utf8_code_length[ordch - 0x80]) > end:
+                return i
+            break
+        i -= 1
+    return end
+
 class W_IncrementalNewlineDecoder(W_Root):
     seennl = 0
     pendingcr = False
     w_decoder = None
+    fastcodec = FAST_NONE
+    pending_input = ""  # undecoded input, only used with a fastcodec
 
     def __init__(self, space):
         self.w_newlines_dict = {
@@ -60,28 +91,82 @@ class W_IncrementalNewlineDecoder(W_Root):
             self.w_errors = w_errors
 
         self.seennl = 0
+        self.fastcodec = FAST_NONE
+        self.pending_input = ""
+
+    def enable_fast_decoding(self, fastcodec):
+        """ Called by TextIOWrapper when self.w_decoder is the incremental
+        decoder of one of the FAST_CODECS, which is then only used if the
+        input turns out not to be valid. """
+        self.fastcodec = fastcodec
+        self.pending_input = ""
+
+    def _leave_fast_mode(self, space):
+        # hand the input we kept over to the real decoder, which was never
+        # called so far and is used from now on
+        if self.pending_input:
+            w_state = space.newtuple2(space.newbytes(self.pending_input),
+                                      space.newint(0))
+            space.call_method(self.w_decoder, "setstate", w_state)
+        self.fastcodec = FAST_NONE
+        self.pending_input = ""
+
+    def _decode_fast(self, space, w_input, final):
+        # Returns the decoded input, or None if the real decoder has to be
+        # used instead, e.g. to report or replace invalid input
+        if not space.isinstance_w(w_input, space.w_bytes):
+            self._leave_fast_mode(space)
+            return None
+        data = space.bytes_w(w_input)
+        if self.pending_input:
+            data = self.pending_input + data
+        end = len(data)
+        if self.fastcodec == FAST_UTF8 and not final:
+            end = _utf8_tail_start(data)
+        try:
+            lgt = check_utf8(data, True, stop=end)
+        except CheckError:
+            lgt = -1
+        if lgt < 0 or (self.fastcodec == FAST_ASCII and lgt != end):
+            self._leave_fast_mode(space)
+            return None
+        if end == len(data):
+            self.pending_input = ""
+            return data
+        assert end >= 0
+        self.pending_input = data[end:]
+        return data[:end]
 
     def newlines_get_w(self, space):
         return self.w_newlines_dict.get(self.seennl, space.w_None)
 
     @unwrap_spec(final=int)
     def decode_w(self, space, w_input, final=False):
+        output, lgt = self.decode(space, w_input, bool(final))
+        return space.newutf8(output, lgt)
+
+    def decode(self, space, w_input, final):
+        """ Same as decode_w(), but returns a tuple (utf8, lgt). """
         if self.w_decoder is None:
             raise oefmt(space.w_ValueError,
                         "IncrementalNewlineDecoder.__init__ not called")
 
-        # decode input (with the eventual \r from a previous pass)
-        if not space.is_w(self.w_decoder, space.w_None):
-            w_output = space.call_method(self.w_decoder, "decode",
-                                         w_input, space.newbool(bool(final)))
-        else:
-            w_output = w_input
+        output = None
+        if self.fastcodec != FAST_NONE:
+            output = self._decode_fast(space, w_input, final)
+        if output is None:
+            # decode input (with the eventual \r from a previous pass)
+            if not space.is_w(self.w_decoder, space.w_None):
+                w_output = space.call_method(self.w_decoder, "decode",
+                                             w_input, space.newbool(final))
+            else:
+                w_output = w_input
 
-        if not space.isinstance_w(w_output, space.w_unicode):
-            raise oefmt(space.w_TypeError,
-                        "decoder should return a string result")
+            if not space.isinstance_w(w_output, space.w_unicode):
+                raise oefmt(space.w_TypeError,
+                            "decoder should return a string result")
 
-        output, output_len = space.utf8_len_w(w_output)
+            output = space.utf8_w(w_output)
         output_len = len(output)
         if self.pendingcr and (final or output_len):
             output = '\r' + output
@@ -99,7 +184,7 @@ class W_IncrementalNewlineDecoder(W_Root):
                 output_len -= 1
 
         if output_len == 0:
-            return space.newutf8("", 0)
+            return "", 0
 
         # Record which newlines are read and do newline translation if
         # desired, all in one pass.
@@ -148,17 +233,22 @@ class W_IncrementalNewlineDecoder(W_Root):
             output = builder.build()
 
         self.seennl |= seennl
-        lgt = check_utf8(output, True)
-        return space.newutf8(output, lgt)
+        return output, codepoints_in_utf8(output)
 
     def reset_w(self, space):
         self.seennl = 0
         self.pendingcr = False
+        self.pending_input = ""
+        if self.fastcodec != FAST_NONE:
+            return    # the real decoder was never called
         if self.w_decoder and not space.is_w(self.w_decoder, space.w_None):
             space.call_method(self.w_decoder, "reset")
 
     def getstate_w(self, space):
-        if self.w_decoder and not space.is_w(self.w_decoder, space.w_None):
+        if self.fastcodec != FAST_NONE:
+            w_buffer = space.newbytes(self.pending_input)
+            flag = 0
+        elif self.w_decoder and not space.is_w(self.w_decoder, space.w_None):
             w_state = space.call_method(self.w_decoder, "getstate")
             w_buffer, w_flag = space.unpackiterable(w_state, 2)
             flag = space.r_longlong_w(w_flag)
@@ -176,6 +266,12 @@ class W_IncrementalNewlineDecoder(W_Root):
         self.pendingcr = bool(flag & 1)
         flag >>= 1
 
+        if self.fastcodec != FAST_NONE:
+            buffer = space.bytes_w(w_buffer)
+            if flag == 0 and (self.fastcodec == FAST_UTF8 or not buffer):
+                self.pending_input = buffer
+                return
+            self._leave_fast_mode(space)
         if self.w_decoder and not space.is_w(self.w_decoder, space.w_None):
             w_state = space.newtuple2(w_buffer, space.newint(flag))
             space.call_method(self.w_decoder, "setstate", w_state)
@@ -309,6 +405,12 @@ class DecodeBuffer(object):
         self.pos = 0
         self.upos = 0
 
+    def set_utf8(self, text, ulen):
+        self.text = text
+        self.ulen = ulen
+        self.pos = 0
+        self.upos = 0
+
     def reset(self):
         self.text = None
         self.pos = 0
@@ -442,10 +544,21 @@ class DecodeBuffer(object):
                 self.pos = self.upos = end
                 return False
 
-        if limit < 0:
-            limit = sys.maxint
-        # XXX it might be better to search for the marker quickly, then compute
-        # the new upos afterwards.
+        # search the marker in the utf-8 bytes, then count the codepoints
+        # skipped, unless that goes beyond the limit
+        start = self.pos
+        assert start >= 0
+        pos = self.text.find(marker, start)
+        if pos >= 0:
+            stop = pos + 1
+        else:
+            stop = len(self.text)
+        skipped = codepoints_in_utf8(self.text, start, stop)
+        if limit < 0 or skipped <= limit:
+            self.pos = stop
+            self.upos += skipped
+            return pos >= 0
+
         scanned = 0
         while scanned < limit:
             # don't use next_char here, since that computes a slice etc
@@ -478,6 +591,8 @@ class W_TextIOWrapper(W_TextIOBase):
         self.state = STATE_ZERO
         self.w_encoder = None
         self.w_decoder = None
+        self.nldecoder = None   # self.w_decoder, if we created it as a
+                                # W_IncrementalNewlineDecoder
 
         self.decoded = DecodeBuffer()
         self.pending_bytes = None   # list of bytes objects waiting to be
@@ -488,7 +603,9 @@ class W_TextIOWrapper(W_TextIOBase):
         self.readtranslate = False
         self.readnl = None
 
-        self.encodefunc = None # Specialized encoding func (see below)
+        self.fastencoder = FAST_NONE # if not FAST_NONE, w_encoder is only
+                                     # called for text that cannot be
+                                     # written as its utf-8 storage
         self.encoding_start_of_stream = False # Whether or not it's the start
                                               # of the stream
         self.snapshot = None
@@ -529,6 +646,7 @@ class W_TextIOWrapper(W_TextIOBase):
             self.writenl = None
 
         # build the decoder object
+        self.nldecoder = None
         if space.is_true(space.call_method(w_buffer, "readable")):
             w_codec = interp_codecs.lookup_codec(space,
                                                  space.text_w(self.w_encoding))
@@ -538,13 +656,20 @@ class W_TextIOWrapper(W_TextIOBase):
                 self.w_decoder = space.call_function(
                     space.gettypeobject(W_IncrementalNewlineDecoder.typedef),
                     self.w_decoder, space.newbool(self.readtranslate))
+                self.nldecoder = space.interp_w(W_IncrementalNewlineDecoder,
+                                                self.w_decoder)
+                fastcodec = _get_fast_codec(space, w_codec)
+                if fastcodec != FAST_NONE:
+                    self.nldecoder.enable_fast_decoding(fastcodec)
 
         # build the encoder object
+        self.fastencoder = FAST_NONE
         if space.is_true(space.call_method(w_buffer, "writable")):
             w_codec = interp_codecs.lookup_codec(space,
                                                  space.text_w(self.w_encoding))
             self.w_encoder = space.call_method(w_codec,
                                                "incrementalencoder", w_errors)
+            self.fastencoder = _get_fast_codec(space, w_codec)
 
         self.seekable = space.is_true(space.call_method(w_buffer, "seekable"))
         self.telling = self.seekable
@@ -660,7 +785,10 @@ class W_TextIOWrapper(W_TextIOBase):
         if self.telling:
             # To prepare for tell(), we need to snapshot a point in the file
             # where the decoder's input buffer is empty.
-            w_state = space.call_method(self.w_decoder, "getstate")
+            if self.nldecoder is not None:
+                w_state = self.nldecoder.getstate_w(space)
+            else:
+                w_state = space.call_method(self.w_decoder, "getstate")
             if (not space.isinstance_w(w_state, space.w_tuple)
                     or space.len_w(w_state) != 2):
                 raise oefmt(space.w_TypeError, "illegal decoder state")
@@ -683,10 +811,16 @@ class W_TextIOWrapper(W_TextIOBase):
             raise oefmt(space.w_TypeError, msg, w_input)
 
         eof = space.len_w(w_input) == 0
-        w_decoded = space.call_method(self.w_decoder, "decode",
-                                      w_input, space.newbool(eof))
-        self.decoded.set(space, w_decoded)
-        if space.len_w(w_decoded) > 0:
+        if self.nldecoder is not None:
+            # no need to wrap the decoded text
+            text, lgt = self.nldecoder.decode(space, w_input, eof)
+            self.decoded.set_utf8(text, lgt)
+        else:
+            w_decoded = space.call_method(self.w_decoder, "decode",
+                                          w_input, space.newbool(eof))
+            self.decoded.set(space, w_decoded)
+            lgt = self.decoded.ulen
+        if lgt > 0:
             eof = False
 
         if self.telling:
@@ -713,6 +847,16 @@ class W_TextIOWrapper(W_TextIOBase):
     def next_w(self, space):
         self._check_attached(space)
         self.telling = False
+        if space.is_w(space.type(self),
+                      space.gettypeobject(W_TextIOWrapper.typedef)):
+            # readline() cannot be overridden, skip the method lookup
+            self._check_closed(space)
+            self._writeflush(space)
+            text, lgt = self._readline(space, -1)
+            if lgt == 0:
+                self.telling = self.seekable
+                raise OperationError(space.w_StopIteration, space.w_None)
+            return space.newutf8(text, lgt)
         try:
             return W_TextIOBase.next_w(self, space)
         except OperationError as e:
@@ -755,15 +899,14 @@ class W_TextIOWrapper(W_TextIOBase):
         return space.newutf8(builder.build(), builder.getlength())
 
     def _scan_line_ending(self, limit):
-        if self.readuniversal:
+        if self.readtranslate:
+            # Newlines are already translated, only search for \n
+            return self.decoded.find_char('\n', limit)
+        elif self.readuniversal:
             return self.decoded.find_newline_universal(limit)
         else:
-            if self.readtranslate:
-                # Newlines are already translated, only search for \n
-                newline = '\n'
-            else:
-                # Non-universal mode.
-                newline = self.readnl
+            # Non-universal mode.
+            newline = self.readnl
             if newline == '\r\n':
                 return self.decoded.find_crlf(limit)
             else:
@@ -819,6 +962,11 @@ class W_TextIOWrapper(W_TextIOBase):
             found = self._scan_line_ending(remaining)
             end_scan = self.decoded.pos
             uend_scan = self.decoded.upos
+            assert end_scan >= 0
+            if found and builder.getlength() == 0:
+                # the whole line is in the decoded chunk, no need to copy it
+                # into the builder
+                return self.decoded.text[start:end_scan], uend_scan - ustart
             if end_scan > start:
                 builder.append_utf8_slice(self.decoded.text, start, end_scan, uend_scan - ustart)
 
@@ -851,6 +999,7 @@ class W_TextIOWrapper(W_TextIOBase):
                         "unicode argument expected, got '%T'", w_text)
 
         text, textlen = space.utf8_len_w(w_text)
+        isascii = len(text) == textlen
 
         haslf = False
         if (self.writetranslate and self.writenl) or self.line_buffering:
@@ -866,17 +1015,21 @@ class W_TextIOWrapper(W_TextIOBase):
             needflush = True
 
         # XXX What if we were just reading?
-        if self.encodefunc:
-            w_bytes = self.encodefunc(space, w_text, self.errors)
+        if self.fastencoder != FAST_NONE and (isascii or
+                (self.fastencoder == FAST_UTF8 and not has_surrogates(text))):
+            # the utf-8 storage is already the encoded text: the utf-8
+            # and ascii encoders are stateless, and only need to be called
+            # for surrogates, or for non-ascii text to report the error
+            b = text
             self.encoding_start_of_stream = False
         else:
             w_bytes = space.call_method(self.w_encoder, "encode", w_text)
+            if not space.isinstance_w(w_bytes, space.w_bytes):
+                raise oefmt(space.w_TypeError,
+                            "encoder should return a bytes object, not '%T'",
+                            w_bytes)
+            b = space.bytes_w(w_bytes)
 
-        if not space.isinstance_w(w_bytes, space.w_bytes):
-            raise oefmt(space.w_TypeError,
-                        "encoder should return a bytes object, not '%T'", w_bytes)
-
-        b = space.bytes_w(w_bytes)
         if not self.pending_bytes:
             self.pending_bytes = []
             self.pending_bytes_count = 0
@@ -892,7 +1045,9 @@ class W_TextIOWrapper(W_TextIOBase):
         self.decoded.reset()
         self.snapshot = None
 
-        if self.w_decoder:
+        if self.nldecoder is not None:
+            self.nldecoder.reset_w(space)
+        elif self.w_decoder:
             space.call_method(self.w_decoder, "reset")
 
         return space.newint(textlen)
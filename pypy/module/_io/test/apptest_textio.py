@@ -200,6 +200,84 @@ def test_readline():
     reads += txt.readline()
     assert reads == r
 
+def test_iterate_utf8_small_chunks():
+    lines = [u"h\xe9llo\n", u"\u20ac\u20ac\r\n", u"\U0001f600x\r", u"\n",
+             u"plain ascii\n", u"last \u1234"]
+    data = u"".join(lines).encode("utf-8")
+    expected = u"".join(lines).replace(u"\r\n", u"\n").replace(u"\r", u"\n")
+    expected = expected.splitlines(True)
+    for chunk_size in [1, 2, 3, 5, 7, 8192]:
+        t = _io.TextIOWrapper(_io.BytesIO(data), encoding="utf-8")
+        t._CHUNK_SIZE = chunk_size
+        assert list(t) == expected
+        t.seek(0)
+        got = []
+        while True:
+            line = t.readline()
+            if not line:
+                break
+            got.append((line, t.tell()))
+        assert [line for line, pos in got] == expected
+        for i in range(len(got) - 1):
+            t.seek(got[i][1])
+            assert t.readline() == expected[i + 1]
+        t.seek(0)
+        assert t.readline(3) == u"h\xe9l"
+
+def test_iterate_utf8_invalid():
+    data = b"abc\n" * 100 + b"d\xffe\n" + b"\xe2\x82\n"
+    t = _io.TextIOWrapper(_io.BytesIO(data), encoding="utf-8",
+                          errors="replace")
+    t._CHUNK_SIZE = 7
+    assert list(t) == data.decode("utf-8", "replace").splitlines(True)
+    t = _io.TextIOWrapper(_io.BytesIO(data), encoding="utf-8")
+    raises(UnicodeDecodeError, list, t)
+    t = _io.TextIOWrapper(_io.BytesIO(b"abc\n\xe2\x82"), encoding="utf-8")
+    assert t.readline() == u"abc\n"
+    raises(UnicodeDecodeError, t.readline)
+
+def test_iterate_ascii_nonascii():
+    data = b"abc\ndef\xe9\n"
+    t = _io.TextIOWrapper(_io.BytesIO(data), encoding="ascii",
+                          errors="replace")
+    assert list(t) == [u"abc\n", u"def\ufffd\n"]
+    t = _io.TextIOWrapper(_io.BytesIO(data), encoding="ascii")
+    raises(UnicodeDecodeError, list, t)
+
+def test_write_utf8_ascii():
+    pieces = [u"abc", u"\xe9t\xe9\n", u"\u20ac", u"\ud800", u"\U0001f600", u""]
+    r = _io.BytesIO()
+    t = _io.TextIOWrapper(r, encoding="utf-8")
+    t._CHUNK_SIZE = 4
+    for i in range(100):
+        for piece in pieces:
+            assert t.write(piece) == len(piece)
+    t.flush()
+    assert r.getvalue() == (u"".join(pieces) * 100).encode("utf-8")
+
+    r = _io.BytesIO()
+    t = _io.TextIOWrapper(r, encoding="ascii")
+    t.write(u"abc\n")
+    raises(UnicodeEncodeError, t.write, u"\xe9")
+    t.flush()
+    assert r.getvalue() == b"abc\n"
+    r = _io.BytesIO()
+    t = _io.TextIOWrapper(r, encoding="ascii", errors="replace")
+    t.write(u"a\xe9b")
+    t.flush()
+    assert r.getvalue() == b"a?b"
+
+def test_write_then_read_utf8():
+    r = _io.BytesIO()
+    t = _io.TextIOWrapper(r, encoding="utf-8")
+    t.write(u"h\xe9llo\nw\xf6rld\n")
+    t.seek(0)
+    assert t.readline() == u"h\xe9llo\n"
+    assert t.read() == u"w\xf6rld\n"
+    t.write(u"\u20ac\n")
+    t.seek(0)
+    assert list(t) == [u"h\xe9llo\n", u"w\xf6rld\n", u"\u20ac\n"]
+
 def test_name():
     t = _io.TextIOWrapper(_io.BytesIO(""))
     # CPython raises an AttributeError, we raise a TypeError.
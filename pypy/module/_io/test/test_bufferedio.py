@@ -169,6 +169,29 @@ class AppTestBufferedReader:
         assert f.readinto(a) == 99
         assert a == '\nb\nc' + 'a\nb\nc' * 19 + 'x' * 100
 
+    def test_readinto_larger_than_buffer(self):
+        import _io
+        data = 'a\nb\nc' * 20
+        raw = _io.FileIO(self.bigtmpfile)
+        f = _io.BufferedReader(raw, buffer_size=16)
+        assert f.read(3) == data[:3]
+        a = bytearray(50)
+        # 13 bytes come from the buffer, the rest directly from the raw file
+        assert f.readinto(a) == 50
+        assert a == data[3:53]
+        assert f.tell() == 53
+        assert f.read(2) == data[53:55]
+        m = memoryview(bytearray(60))
+        assert f.readinto(m[10:]) == 45
+        assert m[10:55].tobytes() == data[55:]
+        assert f.tell() == 100
+        assert f.readinto(bytearray(20)) == 0
+        f.seek(90)
+        a = bytearray(5)
+        assert f.readinto(a) == 5
+        assert a == data[90:95]
+        f.close()
+
     def test_seek(self):
         import _io
         raw = _io.FileIO(self.tmpfile)
@@ -235,6 +258,19 @@ class AppTestBufferedReader:
         f = _io.BufferedReader(raw)
         assert repr(f) == '<_io.BufferedReader name=%r>' % (self.tmpfile,)
 
+    def test_reentrant_read_without_threads(self):
+        import _io
+        class MockRawIO(_io._RawIOBase):
+            def readable(self):
+                return True
+            def readinto(self, buf):
+                bufio.read(1)
+        rawio = MockRawIO()
+        bufio = _io.BufferedReader(rawio)
+        exc = raises(RuntimeError, bufio.read, 1)
+        assert "reentrant" in str(exc.value)
+        bufio.close()
+
     def test_read_interrupted(self):
         import _io, errno
         class MockRawIO(_io._RawIOBase):
@@ -272,6 +308,32 @@ class AppTestBufferedReaderWithThreads(AppTestBufferedReader):
         assert f.readinto(a) == 10
         assert a == 'abcdefghij'
 
+    def test_lock_allocated_by_second_thread(self):
+        import _io, thread, time
+        order = []
+        class MockRawIO(_io._RawIOBase):
+            def readable(self):
+                return True
+            def readinto(self, buf):
+                if not order:
+                    order.append('first read')
+                    # the second thread must wait for this read to finish
+                    thread.start_new_thread(other, ())
+                    time.sleep(0.3)
+                    order.append('first read done')
+                buf[0] = 'x'
+                return 1
+        def other():
+            bufio.read(1)
+            order.append('second read')
+        rawio = MockRawIO()
+        bufio = _io.BufferedReader(rawio)
+        assert bufio.read(1) == 'x'
+        while len(order) < 3:
+            time.sleep(0.01)
+        assert order == ['first read', 'first read done', 'second read']
+        bufio.close()
+
 @py.test.yield_fixture
 def forbid_nonmoving_raw_ptr_for_resizable_list(space):
     orig_nonmoving_raw_ptr_for_resizable_list = rlib.buffer.nonmoving_raw_ptr_for_resizable_list
@@ -166,6 +166,22 @@ class AppTestFileIO:
         assert f.readinto(a) == 1000
         assert a == 'a' * 1000 + 'x' * 24
 
+    def test_readinto_many(self):
+        import _io
+        a = bytearray('x' * 2)
+        b = bytearray('x' * 100)
+        c = bytearray('x' * 3)
+        f = _io.FileIO(self.tmpfile, 'r+')
+        assert f.readinto_many([a, memoryview(b)[:2], c]) == 5
+        assert a == 'a\n'
+        assert b[:3] == 'b\nx'
+        assert c == 'cxx'
+        assert f.readinto_many([a]) == 0
+        assert f.readinto_many([]) == 0
+        raises(TypeError, f.readinto_many, [a, b"hello"])
+        f.close()
+        raises(ValueError, f.readinto_many, [a])
+
     def test_nonblocking_read(self):
         try:
             import os, fcntl
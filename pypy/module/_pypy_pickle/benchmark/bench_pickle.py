@@ -0,0 +1,45 @@
+""" Pickling speed of cPickle, on the workloads of bench_unpickle.py.  Run
+it with the pypy to be measured:
+
+    pypy bench_pickle.py [-n REPEAT] [-s SCALE] [-k FILTER] [-p PROTO]
+
+Every workload is dumped with cPickle.dumps() and, for comparison, with the
+pure Python pickle.dumps(), for the protocols given with -p (default: 0 and
+2).  The best of REPEAT runs is reported.
+"""
+
+import sys, pickle, cPickle
+from bench_unpickle import WORKLOADS, best_time
+
+
+def main(argv):
+    import optparse
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option('-n', '--repeat', type=int, default=5,
+                      help="number of runs per workload (default: 5)")
+    parser.add_option('-s', '--scale', type=int, default=1,
+                      help="multiply the size of the workloads (default: 1)")
+    parser.add_option('-k', dest='filter', default='',
+                      help="only run the workloads whose name contains this")
+    parser.add_option('-p', '--protocol', type=int, action='append',
+                      dest='protocols',
+                      help="pickle protocol, can be repeated (default: 0, 2)")
+    options, args = parser.parse_args(argv)
+    protocols = options.protocols or [0, 2]
+    print '%-18s %5s %10s %10s %10s %8s' % ('workload', 'proto', 'size',
+                                            'cPickle', 'pickle', 'speedup')
+    for name, func in WORKLOADS:
+        if options.filter not in name:
+            continue
+        obj = func(options.scale)
+        for proto in protocols:
+            size = len(cPickle.dumps(obj, proto))
+            native = best_time(lambda obj: cPickle.dumps(obj, proto), obj,
+                               options.repeat)
+            python = best_time(lambda obj: pickle.dumps(obj, proto), obj,
+                               options.repeat)
+            print '%-18s %5d %9dk %9.3fs %9.3fs %7.2fx' % (
+                name, proto, size // 1024, native, python, python / native)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,133 @@
+""" Unpickling speed of cPickle on pickles of realistic shapes: caches of
+records, multiprocessing payloads, object graphs.  Run it with the pypy to
+be measured:
+
+    pypy bench_unpickle.py [-n REPEAT] [-s SCALE] [-k FILTER] [-p PROTO]
+
+Every workload is pickled once with pickle.dumps() and the protocols given
+with -p (default: 0 and 2), then loaded with cPickle.loads() and, for
+comparison, with the pure Python pickle.loads().  The best of REPEAT runs
+is reported.
+"""
+
+import sys, time, pickle, cPickle
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    clock = time.time
+
+
+class Record(object):
+    def __init__(self, i):
+        self.id = i
+        self.name = 'user%d' % i
+        self.email = 'user%d@example.com' % i
+        self.score = i * 0.25
+        self.tags = ['a', 'b'] if i % 3 else []
+
+class Node(object):
+    def __init__(self, value, children):
+        self.value = value
+        self.children = children
+
+def make_tree(depth, width):
+    if depth == 0:
+        return Node(depth, [])
+    return Node(depth, [make_tree(depth - 1, width) for i in range(width)])
+
+
+# ____________________________________________________________
+# workloads
+#
+# each workload is a function taking the scale, which returns the object
+# to pickle.
+
+WORKLOADS = []
+
+def workload(func):
+    WORKLOADS.append((func.__name__, func))
+    return func
+
+@workload
+def int_list(scale):
+    return range(-1000, 200000 * scale)
+
+@workload
+def float_list(scale):
+    return [i * 0.5 for i in range(100000 * scale)]
+
+@workload
+def str_dict(scale):
+    # a typical cache: short string keys, string values
+    return dict(('key:%d' % i, 'value %d' % i) for i in range(50000 * scale))
+
+@workload
+def records_as_dicts(scale):
+    return [{'id': i, 'name': u'user%d' % i, 'score': i * 0.5,
+             'active': bool(i % 2), 'tags': ('a', 'b')}
+            for i in range(20000 * scale)]
+
+@workload
+def row_tuples(scale):
+    # the shape of a multiprocessing result set
+    return [(i, 'name%d' % i, i * 1.5, None, 2 ** 40 + i)
+            for i in range(50000 * scale)]
+
+@workload
+def objects(scale):
+    return [Record(i) for i in range(20000 * scale)]
+
+@workload
+def object_tree(scale):
+    return [make_tree(7, 3) for i in range(2 * scale)]
+
+@workload
+def shared_refs(scale):
+    # many references to the same few objects, which stresses the memo
+    shared = [('x', i) for i in range(100)]
+    return [shared[i % 100] for i in range(100000 * scale)]
+
+
+# ____________________________________________________________
+
+def best_time(loads, data, repeat):
+    best = None
+    for i in range(repeat):
+        t0 = clock()
+        loads(data)
+        t = clock() - t0
+        if best is None or t < best:
+            best = t
+    return best
+
+def main(argv):
+    import optparse
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option('-n', '--repeat', type=int, default=5,
+                      help="number of runs per workload (default: 5)")
+    parser.add_option('-s', '--scale', type=int, default=1,
+                      help="multiply the size of the workloads (default: 1)")
+    parser.add_option('-k', dest='filter', default='',
+                      help="only run the workloads whose name contains this")
+    parser.add_option('-p', '--protocol', type=int, action='append',
+                      dest='protocols',
+                      help="pickle protocol, can be repeated (default: 0, 2)")
+    options, args = parser.parse_args(argv)
+    protocols = options.protocols or [0, 2]
+    print '%-18s %5s %10s %10s %10s %8s' % ('workload', 'proto', 'size',
+                                            'cPickle', 'pickle', 'speedup')
+    for name, func in WORKLOADS:
+        if options.filter not in name:
+            continue
+        obj = func(options.scale)
+        for proto in protocols:
+            data = pickle.dumps(obj, proto)
+            native = best_time(cPickle.loads, data, options.repeat)
+            python = best_time(pickle.loads, data, options.repeat)
+            print '%-18s %5d %9dk %9.3fs %9.3fs %7.2fx' % (
+                name, proto, len(data) // 1024, native, python,
+                python / native)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,775 @@
+from rpython.rlib.rarithmetic import intmask
+from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rstruct.ieee import float_pack
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app, applevel
+from pypy.interpreter.typedef import (TypeDef, GetSetProperty,
+    interp_attrproperty)
+from pypy.module.cStringIO.interp_stringio import W_OutputType
+from pypy.module._pypy_pickle.interp_unpickler import HIGHEST_PROTOCOL
+from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+from pypy.objspace.std.floatobject import float_repr
+from pypy.objspace.std.listobject import W_ListObject
+
+
+BATCHSIZE = 1000          # items per APPENDS or SETITEMS, as in pickle.py
+FLUSH_SIZE = 65536        # write to the file in chunks of about this size
+
+
+class W_Pickler(W_Root):
+    """ The save loop of cPickle.Pickler.  Output goes to a StringBuilder
+    that is written to the file in chunks, and the memo is an identity dict
+    from the objects to their memo index, so that it keeps the objects
+    alive without storing their id() and the object in a tuple.
+
+    None, bools, ints, longs, floats, strings, unicodes, tuples, lists and
+    dicts of exactly these types are pickled here; lists of the int or float
+    strategy are written without boxing their items.  Everything else goes
+    through the app-level save_other() below, which is the generic part of
+    pickle.Pickler.save(): it calls the dispatch table and the save_global(),
+    save_reduce() etc. methods of the app-level subclass in cPickle.py, which
+    are the ones of pickle.Pickler.  If the dispatch table of a subclass
+    overrides one of the types handled here, objects of that type go through
+    save_other() too.
+    """
+
+    def __init__(self, space):
+        self.space = space
+        self.builder = StringBuilder()
+        self.stream = None
+        self.w_write = None
+        self.memo = {}
+        self.memo_w = []          # the keys of self.memo, in order
+        self.memo_ids = {}        # {id(obj): position in memo_w}
+        self.memo_ids_done = 0
+        self.memo_extra_w = {}    # the other items set in the app-level memo
+        self.w_memo_view = None
+        self.proto = 0
+        self.bin = False
+        self.fast = 0
+        self.w_persistent_id = None
+        self.overridden_w = None
+
+    def descr_init(self, space, w_file, w_protocol=None):
+        # cPickle allows Pickler(protocol), with getvalue() returning the
+        # whole output
+        if w_protocol is None and space.isinstance_w(w_file, space.w_int):
+            w_protocol = w_file
+            w_file = None
+        if w_protocol is None or space.is_w(w_protocol, space.w_None):
+            proto = 0
+        else:
+            proto = space.int_w(w_protocol)
+        if proto < 0:
+            proto = HIGHEST_PROTOCOL
+        elif proto > HIGHEST_PROTOCOL:
+            raise oefmt(space.w_ValueError,
+                        "pickle protocol must be <= %d", HIGHEST_PROTOCOL)
+        self.stream = None
+        self.w_write = None
+        if isinstance(w_file, W_OutputType):
+            self.stream = w_file
+        elif w_file is not None:
+            self.w_write = space.getattr(w_file, space.newtext("write"))
+        self.builder = StringBuilder()
+        self.reset_memo()
+        self.proto = proto
+        self.bin = proto >= 1
+        self.fast = 0
+
+    def has_file(self):
+        return self.stream is not None or self.w_write is not None
+
+    # ____________________________________________________________
+    # app-level interface
+
+    def descr_dump(self, space, w_obj):
+        """dump(obj) -- Write a pickled representation of obj to the
+        open file."""
+        w_persistent_id = space.findattr(self, space.newtext("persistent_id"))
+        if w_persistent_id is not None and space.is_w(w_persistent_id,
+                                                      space.w_None):
+            w_persistent_id = None
+        self.w_persistent_id = w_persistent_id
+        w_overridden = overridden_types(space, self)
+        if space.is_w(w_overridden, space.w_None):
+            self.overridden_w = None
+        else:
+            self.overridden_w = space.listview(w_overridden)
+        try:
+            if self.proto >= 2:
+                self.builder.append('\x80')
+                self.builder.append(chr(self.proto))
+            self.save(w_obj)
+            self.builder.append('.')
+        finally:
+            self.w_persistent_id = None
+            self.flush()
+
+    def descr_save(self, space, w_obj):
+        self.save(w_obj)
+
+    def descr_write(self, space, w_data):
+        self.builder.append(space.bytes_w(w_data))
+
+    def descr_memoize(self, space, w_obj):
+        self.memoize(w_obj)
+
+    def descr_get(self, space, w_index):
+        return space.newbytes(self.get_opcode(space.int_w(w_index)))
+
+    def descr_put(self, space, w_index):
+        return space.newbytes(self.put_opcode(space.int_w(w_index)))
+
+    def descr_clear_memo(self, space):
+        """clear_memo() -- Clear the picklers memo"""
+        self.reset_memo()
+
+    def descr_getvalue(self, space):
+        """getvalue() -- The output of a pickler created without a file"""
+        if self.has_file():
+            return space.w_None
+        return space.newbytes(self.builder.build())
+
+    def descr_get_memo(self, space):
+        """ A view of the memo, in the format of pickle.Pickler.memo """
+        if self.w_memo_view is None:
+            self.w_memo_view = W_PicklerMemo(self)
+        return self.w_memo_view
+
+    def descr_set_memo(self, space, w_memo):
+        w_items = space.call_method(w_memo, "items")
+        items_w = space.listview(w_items)
+        self.reset_memo()
+        for w_item in items_w:
+            w_key, w_value = space.fixedview(w_item, 2)
+            self.set_memo_item(w_key, w_value)
+
+    def descr_get_fast(self, space):
+        return space.newint(self.fast)
+
+    def descr_set_fast(self, space, w_value):
+        self.fast = space.int_w(w_value)
+
+    # ____________________________________________________________
+    # output
+
+    def maybe_flush(self):
+        if self.builder.getlength() >= FLUSH_SIZE and self.has_file():
+            self.flush()
+
+    def flush(self):
+        if not self.has_file() or self.builder.getlength() == 0:
+            return
+        s = self.builder.build()
+        self.builder = StringBuilder()
+        if self.stream is not None:
+            self.stream.check_closed()
+            self.stream.write(s)
+        else:
+            self.space.call_function(self.w_write, self.space.newbytes(s))
+
+    def write_int4(self, value):
+        builder = self.builder
+        builder.append(chr(value & 0xff))
+        builder.append(chr((value >> 8) & 0xff))
+        builder.append(chr((value >> 16) & 0xff))
+        builder.append(chr((value >> 24) & 0xff))
+
+    def get_opcode(self, index):
+        if self.bin:
+            if index < 256:
+                return 'h' + chr(index)
+            return 'j' + _int4(index)
+        return 'g%d\n' % (index,)
+
+    def put_opcode(self, index):
+        if self.bin:
+            if index < 256:
+                return 'q' + chr(index)
+            return 'r' + _int4(index)
+        return 'p%d\n' % (index,)
+
+    def memoize(self, w_obj):
+        if self.fast:
+            return
+        index = len(self.memo) + 1      # cPickle starts counting at one
+        self.builder.append(self.put_opcode(index))
+        self.memo[w_obj] = index
+        self.memo_w.append(w_obj)
+
+    # ____________________________________________________________
+    # the memo
+
+    def reset_memo(self):
+        self.memo = {}
+        self.memo_w = []
+        self.memo_ids = {}
+        self.memo_ids_done = 0
+        self.memo_extra_w = {}
+
+    def memo_lookup_id(self, ident):
+        """ The memoized object whose id() is 'ident', or None.  The ids are
+        only computed when the app-level code looks up the memo, which
+        pickle.Pickler.save_reduce() does, and once per object.
+        """
+        space = self.space
+        while self.memo_ids_done < len(self.memo_w):
+            w_obj = self.memo_w[self.memo_ids_done]
+            w_id = space.id(w_obj)
+            if space.isinstance_w(w_id, space.w_int):
+                self.memo_ids[space.int_w(w_id)] = self.memo_ids_done
+            self.memo_ids_done += 1
+        position = self.memo_ids.get(ident, -1)
+        if position < 0:
+            return None
+        return self.memo_w[position]
+
+    def memo_getitem(self, w_key):
+        """ The value of the app-level memo for w_key, or None """
+        space = self.space
+        if not space.isinstance_w(w_key, space.w_int):
+            return None
+        ident = space.int_w(w_key)
+        w_obj = self.memo_lookup_id(ident)
+        if w_obj is not None:
+            index = self.memo.get(w_obj, -1)
+            if index >= 0:
+                return space.newtuple([space.newint(index), w_obj])
+        return self.memo_extra_w.get(ident, None)
+
+    def set_memo_item(self, w_key, w_value):
+        # values (index, obj) go to the real memo; anything else, like the
+        # lists of pickle._keep_alive(), is only stored
+        space = self.space
+        ident = space.int_w(w_key)
+        if (space.isinstance_w(w_value, space.w_tuple) and
+                space.len_w(w_value) == 2):
+            w_index, w_obj = space.fixedview(w_value, 2)
+            if space.isinstance_w(w_index, space.w_int):
+                if w_obj not in self.memo:
+                    self.memo_w.append(w_obj)
+                self.memo[w_obj] = space.int_w(w_index)
+                return
+        self.memo_extra_w[ident] = w_value
+
+    def memo_copy(self):
+        space = self.space
+        w_memo = space.newdict()
+        for w_obj, index in self.memo.items():
+            w_entry = space.newtuple([space.newint(index), w_obj])
+            space.setitem(w_memo, space.id(w_obj), w_entry)
+        for ident, w_value in self.memo_extra_w.items():
+            space.setitem(w_memo, space.newint(ident), w_value)
+        return w_memo
+
+    # ____________________________________________________________
+    # the save loop
+
+    def save(self, w_obj):
+        space = self.space
+        if self.w_persistent_id is not None:
+            w_pid = space.call_function(self.w_persistent_id, w_obj)
+            if not space.is_w(w_pid, space.w_None):
+                self.save_pers(w_pid)
+                return
+        w_type = space.type(w_obj)
+        if self.overridden_w is not None and self.is_overridden(w_type):
+            index = self.memo.get(w_obj, -1)
+            if index >= 0:
+                self.builder.append(self.get_opcode(index))
+            else:
+                save_other(space, self, w_obj)
+            return
+        # the types that are never memoized come first
+        if space.is_w(w_type, space.w_int):
+            self.save_int(space.int_w(w_obj))
+            return
+        if space.is_w(w_type, space.w_float):
+            self.save_float(space.float_w(w_obj))
+            return
+        if space.is_w(w_obj, space.w_None):
+            self.builder.append('N')
+            return
+        if space.is_w(w_type, space.w_bool):
+            self.save_bool(space.is_true(w_obj))
+            return
+        if space.is_w(w_type, space.w_long):
+            self.save_long(w_obj)
+            return
+        index = self.memo.get(w_obj, -1)
+        if index >= 0:
+            self.builder.append(self.get_opcode(index))
+            return
+        if space.is_w(w_type, space.w_bytes):
+            self.save_bytes(w_obj)
+        elif space.is_w(w_type, space.w_unicode):
+            self.save_unicode(w_obj)
+        elif space.is_w(w_type, space.w_tuple):
+            self.save_tuple(w_obj)
+        elif space.is_w(w_type, space.w_list):
+            self.save_list(w_obj)
+        elif space.is_w(w_type, space.w_dict):
+            self.save_dict(w_obj)
+        else:
+            save_other(space, self, w_obj)
+        self.maybe_flush()
+
+    def is_overridden(self, w_type):
+        for w_overridden in self.overridden_w:
+            if self.space.is_w(w_type, w_overridden):
+                return True
+        return False
+
+    def save_pers(self, w_pid):
+        if self.bin:
+            self.save(w_pid)
+            self.builder.append('Q')
+        else:
+            self.builder.append('P')
+            self.builder.append(self.space.text_w(self.space.str(w_pid)))
+            self.builder.append('\n')
+
+    def save_bool(self, value):
+        if self.proto >= 2:
+            self.builder.append('\x88' if value else '\x89')
+        else:
+            self.builder.append('I01\n' if value else 'I00\n')
+
+    def save_int(self, value):
+        builder = self.builder
+        if self.bin:
+            if value >= 0:
+                if value <= 0xff:
+                    builder.append('K')
+                    builder.append(chr(value))
+                    return
+                if value <= 0xffff:
+                    builder.append('M')
+                    builder.append(chr(value & 0xff))
+                    builder.append(chr(value >> 8))
+                    return
+            high_bits = value >> 31
+            if high_bits == 0 or high_bits == -1:
+                builder.append('J')
+                self.write_int4(value)
+                return
+        builder.append('I')
+        builder.append(str(value))
+        builder.append('\n')
+
+    def save_long(self, w_obj):
+        space = self.space
+        bigint = space.bigint_w(w_obj)
+        if self.proto >= 2:
+            data = _encode_long(bigint)
+            if len(data) < 256:
+                self.builder.append('\x8a')
+                self.builder.append(chr(len(data)))
+            else:
+                self.builder.append('\x8b')
+                self.write_int4(len(data))
+            self.builder.append(data)
+            return
+        self.builder.append('L')
+        self.builder.append(bigint.str())
+        self.builder.append('L\n')
+
+    def save_float(self, value):
+        if self.bin:
+            bits = float_pack(value, 8)
+            self.builder.append('G')
+            for i in range(7, -1, -1):
+                self.builder.append(chr(intmask(bits >> (i * 8)) & 0xff))
+        else:
+            self.builder.append('F')
+            self.builder.append(float_repr(value))
+            self.builder.append('\n')
+
+    def save_bytes(self, w_obj):
+        space = self.space
+        if self.bin:
+            data = space.bytes_w(w_obj)
+            if len(data) < 256:
+                self.builder.append('U')
+                self.builder.append(chr(len(data)))
+            else:
+                self.builder.append('T')
+                self.write_int4(len(data))
+            self.builder.append(data)
+        else:
+            self.builder.append('S')
+            self.builder.append(space.text_w(space.repr(w_obj)))
+            self.builder.append('\n')
+        self.memoize(w_obj)
+
+    def save_unicode(self, w_obj):
+        space = self.space
+        if self.bin:
+            data = space.utf8_w(w_obj)
+            self.builder.append('X')
+            self.write_int4(len(data))
+            self.builder.append(data)
+        else:
+            self.builder.append('V')
+            self.builder.append(space.bytes_w(unicode_escape(space, w_obj)))
+            self.builder.append('\n')
+        self.memoize(w_obj)
+
+    def save_tuple(self, w_tuple):
+        space = self.space
+        items_w = space.fixedview(w_tuple)
+        n = len(items_w)
+        if n == 0:
+            self.builder.append(')' if self.proto else '(t')
+            return
+        if n <= 3 and self.proto >= 2:
+            for w_item in items_w:
+                self.save(w_item)
+            index = self.memo.get(w_tuple, -1)
+            if index >= 0:
+                # recursive tuple
+                self.builder.append('0' * n)
+                self.builder.append(self.get_opcode(index))
+            else:
+                self.builder.append(chr(0x84 + n))     # TUPLE1..3
+                self.memoize(w_tuple)
+            return
+        self.builder.append('(')
+        for w_item in items_w:
+            self.save(w_item)
+        index = self.memo.get(w_tuple, -1)
+        if index >= 0:
+            # recursive tuple
+            if self.proto:
+                self.builder.append('1')
+            else:
+                self.builder.append('0' * (n + 1))
+            self.builder.append(self.get_opcode(index))
+            return
+        self.builder.append('t')
+        self.memoize(w_tuple)
+
+    def save_list(self, w_list):
+        self.builder.append(']' if self.bin else '(l')
+        self.memoize(w_list)
+        if self.w_persistent_id is None and type(w_list) is W_ListObject:
+            intlist = w_list.getitems_int()
+            if intlist is not None:
+                self.save_int_items(intlist)
+                return
+            floatlist = w_list.getitems_float()
+            if floatlist is not None:
+                self.save_float_items(floatlist)
+                return
+        if type(w_list) is W_ListObject:
+            items_w = w_list.getitems_copy()
+        else:
+            items_w = self.space.listview(w_list)
+        self.batch_appends(items_w)
+
+    def batch_appends(self, items_w):
+        if not self.bin:
+            for w_item in items_w:
+                self.save(w_item)
+                self.builder.append('a')
+            return
+        for start in range(0, len(items_w), BATCHSIZE):
+            n = min(len(items_w) - start, BATCHSIZE)
+            if n > 1:
+                self.builder.append('(')
+            for i in range(start, start + n):
+                self.save(items_w[i])
+            self.builder.append('e' if n > 1 else 'a')
+
+    def save_int_items(self, intlist):
+        # the items of lists of the int strategy are never memoized
+        if not self.bin:
+            for value in intlist:
+                self.save_int(value)
+                self.builder.append('a')
+            self.maybe_flush()
+            return
+        for start in range(0, len(intlist), BATCHSIZE):
+            n = min(len(intlist) - start, BATCHSIZE)
+            if n > 1:
+                self.builder.append('(')
+            for i in range(start, start + n):
+                self.save_int(intlist[i])
+            self.builder.append('e' if n > 1 else 'a')
+            self.maybe_flush()
+
+    def save_float_items(self, floatlist):
+        if not self.bin:
+            for value in floatlist:
+                self.save_float(value)
+                self.builder.append('a')
+            self.maybe_flush()
+            return
+        for start in range(0, len(floatlist), BATCHSIZE):
+            n = min(len(floatlist) - start, BATCHSIZE)
+            if n > 1:
+                self.builder.append('(')
+            for i in range(start, start + n):
+                self.save_float(floatlist[i])
+            self.builder.append('e' if n > 1 else 'a')
+            self.maybe_flush()
+
+    def save_dict(self, w_dict):
+        space = self.space
+        assert isinstance(w_dict, W_DictMultiObject)
+        if (w_dict.getitem_str("__name__") is not None and
+                space.is_true(save_module_dict(space, self, w_dict))):
+            return
+        self.builder.append('}' if self.bin else '(d')
+        self.memoize(w_dict)
+        iterator = w_dict.iteritems()
+        if not self.bin:
+            while True:
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    break
+                self.save(w_key)
+                self.save(w_value)
+                self.builder.append('s')
+            return
+        keys_w = [None] * BATCHSIZE
+        values_w = [None] * BATCHSIZE
+        while True:
+            # like pickle.py, collect a batch before writing it, to know
+            # if it has one item or more
+            n = 0
+            while n < BATCHSIZE:
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    break
+                keys_w[n] = w_key
+                values_w[n] = w_value
+                n += 1
+            if n == 0:
+                break
+            if n > 1:
+                self.builder.append('(')
+            for i in range(n):
+                self.save(keys_w[i])
+                self.save(values_w[i])
+                keys_w[i] = None
+                values_w[i] = None
+            self.builder.append('u' if n > 1 else 's')
+            if n < BATCHSIZE:
+                break
+
+
+def _int4(value):
+    return (chr(value & 0xff) + chr((value >> 8) & 0xff) +
+            chr((value >> 16) & 0xff) + chr((value >> 24) & 0xff))
+
+def _encode_long(bigint):
+    # two's complement little-endian, in as few bytes as possible, and
+    # no bytes at all for zero; see pickle.encode_long()
+    sign = bigint.get_sign()
+    if sign == 0:
+        return ''
+    if sign > 0:
+        nbits = bigint.bit_length()
+    else:
+        nbits = bigint.invert().bit_length()
+    return bigint.tobytes(nbits // 8 + 1, 'little', True)
+
+
+def descr__new__(space, w_subtype, __args__):
+    w_self = space.allocate_instance(W_Pickler, w_subtype)
+    W_Pickler.__init__(space.interp_w(W_Pickler, w_self), space)
+    return w_self
+
+W_Pickler.typedef = TypeDef("_pypy_pickle.Pickler",
+    __doc__ = W_Pickler.__doc__,
+    __new__ = interp2app(descr__new__),
+    __init__ = interp2app(W_Pickler.descr_init),
+    dump = interp2app(W_Pickler.descr_dump),
+    save = interp2app(W_Pickler.descr_save),
+    write = interp2app(W_Pickler.descr_write),
+    memoize = interp2app(W_Pickler.descr_memoize),
+    get = interp2app(W_Pickler.descr_get),
+    put = interp2app(W_Pickler.descr_put),
+    clear_memo = interp2app(W_Pickler.descr_clear_memo),
+    getvalue = interp2app(W_Pickler.descr_getvalue),
+    memo = GetSetProperty(W_Pickler.descr_get_memo, W_Pickler.descr_set_memo),
+    fast = GetSetProperty(W_Pickler.descr_get_fast, W_Pickler.descr_set_fast),
+    proto = interp_attrproperty("proto", W_Pickler, wrapfn="newint"),
+    bin = interp_attrproperty("bin", W_Pickler, wrapfn="newbool"),
+)
+
+class W_PicklerMemo(W_Root):
+    """ The memo of a Pickler, seen as a dict {id(obj): (index, obj)} like
+    pickle.Pickler.memo.  Changing it changes the memo of the pickler.
+    """
+
+    def __init__(self, pickler):
+        self.pickler = pickler
+
+    def descr_len(self, space):
+        pickler = self.pickler
+        return space.newint(len(pickler.memo) + len(pickler.memo_extra_w))
+
+    def descr_contains(self, space, w_key):
+        return space.newbool(self.pickler.memo_getitem(w_key) is not None)
+
+    def descr_getitem(self, space, w_key):
+        w_value = self.pickler.memo_getitem(w_key)
+        if w_value is None:
+            raise OperationError(space.w_KeyError, w_key)
+        return w_value
+
+    def descr_setitem(self, space, w_key, w_value):
+        self.pickler.set_memo_item(w_key, w_value)
+
+    def descr_get(self, space, w_key, w_default=None):
+        w_value = self.pickler.memo_getitem(w_key)
+        if w_value is None:
+            if w_default is None:
+                return space.w_None
+            return w_default
+        return w_value
+
+    def descr_clear(self, space):
+        self.pickler.reset_memo()
+
+    def descr_copy(self, space):
+        return self.pickler.memo_copy()
+
+    def descr_keys(self, space):
+        return space.call_method(self.pickler.memo_copy(), "keys")
+
+    def descr_values(self, space):
+        return space.call_method(self.pickler.memo_copy(), "values")
+
+    def descr_items(self, space):
+        return space.call_method(self.pickler.memo_copy(), "items")
+
+    def descr_iter(self, space):
+        return space.iter(self.descr_keys(space))
+
+    def descr_eq(self, space, w_other):
+        return space.eq(self.pickler.memo_copy(), w_other)
+
+    def descr_ne(self, space, w_other):
+        return space.ne(self.pickler.memo_copy(), w_other)
+
+W_PicklerMemo.typedef = TypeDef("_pypy_pickle.PicklerMemo",
+    __doc__ = W_PicklerMemo.__doc__,
+    __len__ = interp2app(W_PicklerMemo.descr_len),
+    __contains__ = interp2app(W_PicklerMemo.descr_contains),
+    __getitem__ = interp2app(W_PicklerMemo.descr_getitem),
+    __setitem__ = interp2app(W_PicklerMemo.descr_setitem),
+    __iter__ = interp2app(W_PicklerMemo.descr_iter),
+    __eq__ = interp2app(W_PicklerMemo.descr_eq),
+    __ne__ = interp2app(W_PicklerMemo.descr_ne),
+    get = interp2app(W_PicklerMemo.descr_get),
+    clear = interp2app(W_PicklerMemo.descr_clear),
+    copy = interp2app(W_PicklerMemo.descr_copy),
+    keys = interp2app(W_PicklerMemo.descr_keys),
+    values = interp2app(W_PicklerMemo.descr_values),
+    items = interp2app(W_PicklerMemo.descr_items),
+)
+W_PicklerMemo.typedef.acceptable_as_base_class = False
+
+# ____________________________________________________________
+# the generic part of pickle.Pickler.save(), for the objects that are not
+# handled above; 'pickler' is the W_Pickler.  The methods that it calls are
+# the ones of pickle.Pickler, copied in cPickle.py, or overridden by a
+# subclass.
+
+app = applevel(r'''
+    from types import NoneType, StringType, TupleType, TypeType
+    from copy_reg import dispatch_table
+    from pickle import Pickler, PicklingError
+
+    # the dispatch table of pickle.Pickler before anybody could change it
+    default_dispatch = Pickler.dispatch.copy()
+    native_types = [NoneType, bool, int, long, float, str, unicode, tuple,
+                    list, dict]
+
+    def unicode_escape(obj):
+        obj = obj.replace("\\", "\\u005c")
+        obj = obj.replace("\n", "\\u000a")
+        return obj.encode('raw-unicode-escape')
+
+    def overridden_types(pickler):
+        # the types that are handled at interp-level, but for which the
+        # dispatch table of the pickler has another function
+        dispatch = getattr(pickler, 'dispatch', default_dispatch)
+        result = None
+        for t in native_types:
+            if dispatch.get(t) is not default_dispatch.get(t):
+                if result is None:
+                    result = []
+                result.append(t)
+        return result
+
+    def save_other(pickler, obj):
+        # Check the type dispatch table
+        t = type(obj)
+        f = pickler.dispatch.get(t)
+        if f:
+            f(pickler, obj) # Call unbound method with explicit self
+            return
+
+        # Check copy_reg.dispatch_table
+        reduce = dispatch_table.get(t)
+        if reduce:
+            rv = reduce(obj)
+        else:
+            # Check for a class with a custom metaclass; treat as regular
+            # class
+            try:
+                issc = issubclass(t, TypeType)
+            except TypeError: # t is not a class (old Boost; see SF #502085)
+                issc = 0
+            if issc:
+                pickler.save_global(obj)
+                return
+
+            # Check for a __reduce_ex__ method, fall back to __reduce__
+            reduce = getattr(obj, "__reduce_ex__", None)
+            if reduce:
+                rv = reduce(pickler.proto)
+            else:
+                reduce = getattr(obj, "__reduce__", None)
+                if reduce:
+                    rv = reduce()
+                else:
+                    raise PicklingError("Can't pickle %r object: %r" %
+                                        (t.__name__, obj))
+
+        # Check for string returned by reduce(), meaning "save as global"
+        if type(rv) is StringType:
+            pickler.save_global(obj, rv)
+            return
+
+        # Assert that reduce() returned a tuple
+        if type(rv) is not TupleType:
+            raise PicklingError("%s must return string or tuple" % reduce)
+
+        # Assert that it returned an appropriately sized tuple
+        l = len(rv)
+        if not (2 <= l <= 5):
+            raise PicklingError("Tuple returned by %s must have "
+                                "two to five elements" % reduce)
+
+        # Save the reduce() output and finally memoize the object
+        pickler.save_reduce(obj=obj, *rv)
+
+    def save_module_dict(pickler, obj):
+        modict_saver = pickler._pickle_maybe_moduledict(obj)
+        if modict_saver is None:
+            return False
+        pickler.save_reduce(*modict_saver)
+        return True
+''', filename=__file__)
+
+unicode_escape = app.interphook("unicode_escape")
+save_other = app.interphook("save_other")
+save_module_dict = app.interphook("save_module_dict")
+overridden_types = app.interphook("overridden_types")
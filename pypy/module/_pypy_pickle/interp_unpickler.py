@@ -0,0 +1,707 @@
+from rpython.rlib import rutf8
+from rpython.rlib.rarithmetic import string_to_int
+from rpython.rlib.rbigint import rbigint
+from rpython.rlib.rfloat import string_to_float
+from rpython.rlib.rstring import ParseStringError, ParseStringOverflowError
+from rpython.rlib.rstruct.ieee import unpack_float
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter.pyparser.parsestring import PyString_DecodeEscape
+from pypy.module.cStringIO.interp_stringio import (W_InputOutputType,
+    W_InputType)
+from pypy.objspace.std.dictmultiobject import W_DictObject
+from pypy.objspace.std.listobject import W_ListObject
+
+
+# opcodes, see pickletools.py for their description
+MARK            = '('
+STOP            = '.'
+POP             = '0'
+POP_MARK        = '1'
+DUP             = '2'
+FLOAT           = 'F'
+INT             = 'I'
+BININT          = 'J'
+BININT1         = 'K'
+LONG            = 'L'
+BININT2         = 'M'
+NONE            = 'N'
+PERSID          = 'P'
+BINPERSID       = 'Q'
+REDUCE          = 'R'
+STRING          = 'S'
+BINSTRING       = 'T'
+SHORT_BINSTRING = 'U'
+UNICODE         = 'V'
+BINUNICODE      = 'X'
+APPEND          = 'a'
+BUILD           = 'b'
+GLOBAL          = 'c'
+DICT            = 'd'
+EMPTY_DICT      = '}'
+APPENDS         = 'e'
+GET             = 'g'
+BINGET          = 'h'
+INST            = 'i'
+LONG_BINGET     = 'j'
+LIST            = 'l'
+EMPTY_LIST      = ']'
+OBJ             = 'o'
+PUT             = 'p'
+BINPUT          = 'q'
+LONG_BINPUT     = 'r'
+SETITEM         = 's'
+TUPLE           = 't'
+EMPTY_TUPLE     = ')'
+SETITEMS        = 'u'
+BINFLOAT        = 'G'
+
+# protocol 2
+PROTO           = '\x80'
+NEWOBJ          = '\x81'
+EXT1            = '\x82'
+EXT2            = '\x83'
+EXT4            = '\x84'
+TUPLE1          = '\x85'
+TUPLE2          = '\x86'
+TUPLE3          = '\x87'
+NEWTRUE         = '\x88'
+NEWFALSE        = '\x89'
+LONG1           = '\x8a'
+LONG4           = '\x8b'
+
+HIGHEST_PROTOCOL = 2
+
+
+class State(object):
+    def __init__(self, space):
+        self.w_UnpicklingError = None
+
+def get_unpickling_error(space):
+    state = space.fromcache(State)
+    if state.w_UnpicklingError is None:
+        w_builtin = space.getbuiltinmodule('__builtin__')
+        w_import = space.getattr(w_builtin, space.newtext("__import__"))
+        w_pickle = space.call_function(w_import, space.newtext("pickle"))
+        state.w_UnpicklingError = space.getattr(
+            w_pickle, space.newtext("UnpicklingError"))
+    return state.w_UnpicklingError
+
+def _signed_int4(s, i):
+    # little-endian signed 32-bit integer at s[i:i+4]
+    high = ord(s[i + 3])
+    if high >= 0x80:
+        high -= 0x100
+    return (ord(s[i]) | (ord(s[i + 1]) << 8) | (ord(s[i + 2]) << 16) |
+            (high << 24))
+
+
+class W_Unpickler(W_Root):
+    """ The opcode loop of cPickle.Unpickler.  The stack and the memo are
+    kept at interp-level; the opcodes that need to look up or instantiate
+    classes call back the find_class(), persistent_load(), _instantiate()
+    and get_extension() methods of the app-level subclass in cPickle.py.
+
+    When the input is a cStringIO object, the data is read directly from
+    it instead of calling its read() and readline() methods.
+    """
+
+    def __init__(self, space):
+        self.space = space
+        self.stream = None
+        self.w_read = None
+        self.w_readline = None
+        self.memo = {}
+        self.w_memo_view = None
+        self.stack_w = []
+        self.marks = []
+
+    def descr_init(self, space, w_file):
+        if isinstance(w_file, W_InputOutputType):
+            self.stream = w_file
+            self.w_read = None
+            self.w_readline = None
+        else:
+            self.stream = None
+            self.w_read = space.getattr(w_file, space.newtext("read"))
+            self.w_readline = space.getattr(w_file, space.newtext("readline"))
+        self.memo = {}
+
+    def descr_get_memo(self, space):
+        """ A view of the memo, keyed by the string of the index like
+        pickle.Unpickler.memo.  Changing it changes the memo of the
+        unpickler. """
+        if self.w_memo_view is None:
+            self.w_memo_view = W_UnpicklerMemo(self)
+        return self.w_memo_view
+
+    def descr_set_memo(self, space, w_memo):
+        if not (space.isinstance_w(w_memo, space.w_dict) or
+                isinstance(w_memo, W_UnpicklerMemo)):
+            raise oefmt(space.w_TypeError, "memo must be a dictionary")
+        memo = {}
+        w_items = space.call_method(w_memo, "items")
+        for w_item in space.listview(w_items):
+            w_key, w_value = space.fixedview(w_item, 2)
+            memo[self.memo_key_w(w_key)] = w_value
+        self.memo = memo
+
+    def memo_key_w(self, w_key):
+        space = self.space
+        if space.isinstance_w(w_key, space.w_int):
+            return space.int_w(w_key)
+        return self.memo_key(space.text_w(w_key))
+
+    def memo_copy(self):
+        space = self.space
+        w_memo = space.newdict()
+        for key, w_value in self.memo.items():
+            space.setitem(w_memo, space.newtext(str(key)), w_value)
+        return w_memo
+
+    # ____________________________________________________________
+    # input
+
+    def eof_error(self):
+        return OperationError(self.space.w_EOFError, self.space.w_None)
+
+    def read(self, n):
+        space = self.space
+        if self.stream is not None:
+            self.stream.check_closed()
+            s = self.stream.read(n)
+        elif self.w_read is not None:
+            s = space.bytes_w(space.call_function(self.w_read,
+                                                  space.newint(n)))
+        else:
+            raise oefmt(space.w_ValueError,
+                        "Unpickler.__init__() was not called")
+        if len(s) < n:
+            raise self.eof_error()
+        return s
+
+    def read_byte(self):
+        stream = self.stream
+        if isinstance(stream, W_InputType) and stream.string is not None:
+            pos = stream.pos
+            if pos >= len(stream.string):
+                raise self.eof_error()
+            stream.pos = pos + 1
+            return stream.string[pos]
+        return self.read(1)[0]
+
+    def readline(self):
+        """ Read a line, without its final newline """
+        space = self.space
+        if self.stream is not None:
+            self.stream.check_closed()
+            s = self.stream.readline()
+        elif self.w_readline is not None:
+            s = space.bytes_w(space.call_function(self.w_readline))
+        else:
+            raise oefmt(space.w_ValueError,
+                        "Unpickler.__init__() was not called")
+        if not s:
+            raise self.eof_error()
+        end = len(s) - 1
+        if s[end] == '\n':
+            assert end >= 0
+            s = s[:end]
+        return s
+
+    def read_int4(self):
+        return _signed_int4(self.read(4), 0)
+
+    def read_uint2(self):
+        s = self.read(2)
+        return ord(s[0]) | (ord(s[1]) << 8)
+
+    def read_size4(self, opname):
+        n = self.read_int4()
+        if n < 0:
+            raise oefmt(get_unpickling_error(self.space),
+                        "%s pickle has negative byte count", opname)
+        return n
+
+    # ____________________________________________________________
+    # the stack
+
+    def push(self, w_obj):
+        self.stack_w.append(w_obj)
+
+    def stack_underflow(self):
+        return oefmt(get_unpickling_error(self.space),
+                     "unpickling stack underflow")
+
+    def _check_fence(self, n):
+        # the n topmost items must exist and be above the last mark
+        size = len(self.stack_w)
+        if size < n or (self.marks and size - n < self.marks[-1]):
+            raise self.stack_underflow()
+
+    def pop(self):
+        self._check_fence(1)
+        return self.stack_w.pop()
+
+    def top(self):
+        self._check_fence(1)
+        return self.stack_w[-1]
+
+    def set_top(self, w_obj):
+        self.stack_w[len(self.stack_w) - 1] = w_obj
+
+    def pop_mark(self):
+        """ Return the index of the first item after the topmost mark
+        and remove that mark """
+        if not self.marks:
+            raise oefmt(get_unpickling_error(self.space),
+                        "could not find MARK")
+        return self.marks.pop()
+
+    def pop_slice(self, start):
+        assert start >= 0
+        items_w = self.stack_w[start:]
+        del self.stack_w[start:]
+        return items_w
+
+    def pop_items(self, start):
+        # like pop_slice(), but returns a list that is never resized, as
+        # needed by newtuple()
+        assert start >= 0
+        stack_w = self.stack_w
+        items_w = [None] * (len(stack_w) - start)
+        for i in range(len(items_w)):
+            items_w[i] = stack_w[start + i]
+        del stack_w[start:]
+        return items_w
+
+    def object_below_mark(self, start):
+        # the object that APPENDS or SETITEMS applies to
+        if start < 1:
+            raise self.stack_underflow()
+        if self.marks and start - 1 < self.marks[-1]:
+            raise self.stack_underflow()
+        return self.stack_w[start - 1]
+
+    # ____________________________________________________________
+    # the opcode loop
+
+    def descr_load(self, space):
+        """load() -- Read a pickled object representation from the open
+        file and return the reconstituted object hierarchy specified in
+        the file."""
+        self.stack_w = []
+        self.marks = []
+        while True:
+            op = self.read_byte()
+            if op == BINPUT:
+                self.memo[ord(self.read_byte())] = self.top()
+            elif op == BINGET:
+                self.load_get(ord(self.read_byte()))
+            elif op == MARK:
+                self.marks.append(len(self.stack_w))
+            elif op == BININT1:
+                self.push(space.newint(ord(self.read_byte())))
+            elif op == BININT2:
+                self.push(space.newint(self.read_uint2()))
+            elif op == BININT:
+                self.push(space.newint(self.read_int4()))
+            elif op == SHORT_BINSTRING:
+                self.push(space.newbytes(self.read(ord(self.read_byte()))))
+            elif op == BINSTRING:
+                self.push(space.newbytes(self.read(
+                    self.read_size4("BINSTRING"))))
+            elif op == BINUNICODE:
+                self.load_binunicode()
+            elif op == BINFLOAT:
+                self.push(space.newfloat(unpack_float(self.read(8), True)))
+            elif op == NONE:
+                self.push(space.w_None)
+            elif op == NEWTRUE:
+                self.push(space.w_True)
+            elif op == NEWFALSE:
+                self.push(space.w_False)
+            elif op == EMPTY_LIST:
+                self.push(space.newlist([]))
+            elif op == EMPTY_DICT:
+                self.push(space.newdict())
+            elif op == EMPTY_TUPLE:
+                self.push(space.newtuple([]))
+            elif op == TUPLE1:
+                self._check_fence(1)
+                self.push(space.newtuple(self.pop_items(
+                    len(self.stack_w) - 1)))
+            elif op == TUPLE2:
+                self._check_fence(2)
+                self.push(space.newtuple(self.pop_items(
+                    len(self.stack_w) - 2)))
+            elif op == TUPLE3:
+                self._check_fence(3)
+                self.push(space.newtuple(self.pop_items(
+                    len(self.stack_w) - 3)))
+            elif op == TUPLE:
+                self.push(space.newtuple(self.pop_items(self.pop_mark())))
+            elif op == LIST:
+                self.push(space.newlist(self.pop_slice(self.pop_mark())))
+            elif op == DICT:
+                self.load_dict()
+            elif op == APPEND:
+                w_value = self.pop()
+                self.append_items(self.top(), [w_value])
+            elif op == APPENDS:
+                start = self.pop_mark()
+                w_list = self.object_below_mark(start)
+                self.append_items(w_list, self.pop_slice(start))
+            elif op == SETITEM:
+                self._check_fence(3)
+                items_w = self.pop_slice(len(self.stack_w) - 2)
+                self.set_items(self.top(), items_w)
+            elif op == SETITEMS:
+                start = self.pop_mark()
+                w_dict = self.object_below_mark(start)
+                self.set_items(w_dict, self.pop_slice(start))
+            elif op == LONG_BINPUT:
+                self.memo[self.read_int4()] = self.top()
+            elif op == LONG_BINGET:
+                self.load_get(self.read_int4())
+            elif op == PUT:
+                self.memo[self.memo_key(self.readline())] = self.top()
+            elif op == GET:
+                line = self.readline()
+                w_obj = self.memo.get(self.memo_key(line), None)
+                if w_obj is None:
+                    raise OperationError(space.w_KeyError,
+                                         space.newtext(line))
+                self.push(w_obj)
+            elif op == GLOBAL:
+                self.push(self.find_class())
+            elif op == REDUCE:
+                w_args = self.pop()
+                self.set_top(space.call(self.top(), w_args))
+            elif op == NEWOBJ:
+                self.load_newobj()
+            elif op == BUILD:
+                w_state = self.pop()
+                self.load_build(self.top(), w_state)
+            elif op == INST:
+                w_class = self.find_class()
+                self.instantiate(w_class, self.pop_items(self.pop_mark()))
+            elif op == OBJ:
+                items_w = self.pop_items(self.pop_mark())
+                if not items_w:
+                    raise self.stack_underflow()
+                self.instantiate(items_w[0], items_w[1:])
+            elif op == LONG1:
+                self.load_binlong(ord(self.read_byte()))
+            elif op == LONG4:
+                self.load_binlong(self.read_size4("LONG"))
+            elif op == INT:
+                self.load_int()
+            elif op == LONG:
+                self.push(space.call_function(
+                    space.w_long, space.newbytes(self.readline()),
+                    space.newint(0)))
+            elif op == FLOAT:
+                self.load_float()
+            elif op == STRING:
+                self.load_string()
+            elif op == UNICODE:
+                self.push(space.call_method(
+                    space.newbytes(self.readline()), "decode",
+                    space.newtext("raw-unicode-escape")))
+            elif op == EXT1:
+                self.load_ext(ord(self.read_byte()))
+            elif op == EXT2:
+                self.load_ext(self.read_uint2())
+            elif op == EXT4:
+                self.load_ext(self.read_int4())
+            elif op == PERSID:
+                self.push(space.call_method(self, "persistent_load",
+                                            space.newbytes(self.readline())))
+            elif op == BINPERSID:
+                w_pid = self.pop()
+                self.push(space.call_method(self, "persistent_load", w_pid))
+            elif op == POP:
+                self.pop()
+            elif op == POP_MARK:
+                self.pop_slice(self.pop_mark())
+            elif op == DUP:
+                self.push(self.top())
+            elif op == PROTO:
+                proto = ord(self.read_byte())
+                if proto > HIGHEST_PROTOCOL:
+                    raise oefmt(space.w_ValueError,
+                                "unsupported pickle protocol: %d", proto)
+            elif op == STOP:
+                break
+            else:
+                raise oefmt(get_unpickling_error(space),
+                            "invalid load key, %R.", space.newbytes(op))
+        w_result = self.pop()
+        self.stack_w = []
+        return w_result
+
+    # ____________________________________________________________
+    # opcodes
+
+    def memo_key(self, line):
+        # PUT and GET take the index as a decimal string
+        try:
+            return string_to_int(line)
+        except (ParseStringError, ParseStringOverflowError):
+            raise OperationError(self.space.w_KeyError,
+                                 self.space.newtext(line))
+
+    def load_get(self, key):
+        w_obj = self.memo.get(key, None)
+        if w_obj is None:
+            raise OperationError(self.space.w_KeyError,
+                                 self.space.newtext(str(key)))
+        self.push(w_obj)
+
+    def load_int(self):
+        space = self.space
+        data = self.readline()
+        if data == "01":
+            w_obj = space.w_True
+        elif data == "00":
+            w_obj = space.w_False
+        else:
+            try:
+                w_obj = space.newint(string_to_int(data))
+            except (ParseStringError, ParseStringOverflowError):
+                # a long, or an error
+                w_obj = space.call_function(space.w_int,
+                                            space.newbytes(data))
+        self.push(w_obj)
+
+    def load_binlong(self, n):
+        data = self.read(n)
+        self.push(self.space.newlong_from_rbigint(
+            rbigint.frombytes(data, 'little', True)))
+
+    def load_float(self):
+        space = self.space
+        data = self.readline()
+        try:
+            w_obj = space.newfloat(string_to_float(data))
+        except ParseStringError:
+            w_obj = space.call_function(space.w_float, space.newbytes(data))
+        self.push(w_obj)
+
+    def load_string(self):
+        space = self.space
+        rep = self.readline()
+        end = len(rep) - 1
+        if end < 1 or (rep[0] != '"' and rep[0] != "'") or rep[end] != rep[0]:
+            raise oefmt(space.w_ValueError, "insecure string pickle")
+        rep = rep[1:end]
+        if '\\' in rep:
+            rep = PyString_DecodeEscape(space, rep, 'strict', None)
+        self.push(space.newbytes(rep))
+
+    def load_binunicode(self):
+        space = self.space
+        data = self.read(self.read_size4("BINUNICODE"))
+        try:
+            length = rutf8.check_utf8(data, allow_surrogates=False)
+        except rutf8.CheckError:
+            # let the codec produce the error, or the surrogates
+            w_obj = space.call_method(space.newbytes(data), "decode",
+                                      space.newtext("utf-8"))
+        else:
+            w_obj = space.newutf8(data, length)
+        self.push(w_obj)
+
+    def load_dict(self):
+        space = self.space
+        items_w = self.pop_slice(self.pop_mark())
+        if len(items_w) & 1:
+            raise oefmt(get_unpickling_error(space),
+                        "odd number of items for DICT")
+        w_dict = space.newdict()
+        self.set_items(w_dict, items_w)
+        self.push(w_dict)
+
+    def append_items(self, w_list, items_w):
+        space = self.space
+        if type(w_list) is W_ListObject:
+            # a list of ints, floats or strings gets the matching strategy
+            # from newlist(), and extend() then copies the storage
+            if len(items_w) == 1:
+                w_list.append(items_w[0])
+            else:
+                w_list.extend(space.newlist(items_w))
+        elif len(items_w) == 1:
+            space.call_method(w_list, "append", items_w[0])
+        else:
+            space.call_method(w_list, "extend", space.newlist(items_w))
+
+    def set_items(self, w_dict, items_w):
+        space = self.space
+        if type(w_dict) is W_DictObject:
+            for i in range(0, len(items_w) - 1, 2):
+                w_dict.setitem(items_w[i], items_w[i + 1])
+        else:
+            for i in range(0, len(items_w) - 1, 2):
+                space.setitem(w_dict, items_w[i], items_w[i + 1])
+
+    def find_class(self):
+        space = self.space
+        module = self.readline()
+        name = self.readline()
+        return space.call_method(self, "find_class", space.newtext(module),
+                                 space.newtext(name))
+
+    def instantiate(self, w_class, args_w):
+        space = self.space
+        self.push(space.call_method(self, "_instantiate", w_class,
+                                    space.newtuple(args_w)))
+
+    def load_ext(self, code):
+        space = self.space
+        self.push(space.call_method(self, "get_extension",
+                                    space.newint(code)))
+
+    def load_newobj(self):
+        space = self.space
+        w_args = self.pop()
+        w_class = self.top()
+        w_new = space.getattr(w_class, space.newtext("__new__"))
+        args_w = [w_class] + space.fixedview(w_args)
+        self.set_top(space.call(w_new, space.newtuple(args_w)))
+
+    def load_build(self, w_inst, w_state):
+        space = self.space
+        w_setstate = space.findattr(w_inst, space.newtext("__setstate__"))
+        if w_setstate is not None:
+            space.call_function(w_setstate, w_state)
+            return
+        w_slotstate = None
+        if (space.isinstance_w(w_state, space.w_tuple) and
+                space.len_w(w_state) == 2):
+            w_state, w_slotstate = space.fixedview(w_state, 2)
+        if space.is_true(w_state):
+            w_dict = space.getattr(w_inst, space.newtext("__dict__"))
+            w_items = space.call_method(w_state, "items")
+            for w_item in space.listview(w_items):
+                w_key, w_value = space.fixedview(w_item, 2)
+                if not space.is_w(space.type(w_key), space.w_bytes):
+                    # keys in state don't have to be strings
+                    space.call_method(w_dict, "update", w_state)
+                    break
+                space.setitem(w_dict, space.new_interned_w_str(w_key),
+                              w_value)
+        if w_slotstate is not None and space.is_true(w_slotstate):
+            w_items = space.call_method(w_slotstate, "items")
+            for w_item in space.listview(w_items):
+                w_key, w_value = space.fixedview(w_item, 2)
+                space.setattr(w_inst, w_key, w_value)
+
+
+class W_UnpicklerMemo(W_Root):
+    """ The memo of an Unpickler, seen as a dict {str(index): obj} like
+    pickle.Unpickler.memo.  Changing it changes the memo of the unpickler.
+    Integer keys are accepted too.
+    """
+
+    def __init__(self, unpickler):
+        self.unpickler = unpickler
+
+    def _lookup(self, w_key):
+        try:
+            key = self.unpickler.memo_key_w(w_key)
+        except OperationError as e:
+            if not e.match(self.unpickler.space,
+                           self.unpickler.space.w_KeyError):
+                raise
+            return None
+        return self.unpickler.memo.get(key, None)
+
+    def descr_len(self, space):
+        return space.newint(len(self.unpickler.memo))
+
+    def descr_contains(self, space, w_key):
+        return space.newbool(self._lookup(w_key) is not None)
+
+    def descr_getitem(self, space, w_key):
+        w_value = self._lookup(w_key)
+        if w_value is None:
+            raise OperationError(space.w_KeyError, w_key)
+        return w_value
+
+    def descr_setitem(self, space, w_key, w_value):
+        self.unpickler.memo[self.unpickler.memo_key_w(w_key)] = w_value
+
+    def descr_delitem(self, space, w_key):
+        if self._lookup(w_key) is None:
+            raise OperationError(space.w_KeyError, w_key)
+        del self.unpickler.memo[self.unpickler.memo_key_w(w_key)]
+
+    def descr_get(self, space, w_key, w_default=None):
+        w_value = self._lookup(w_key)
+        if w_value is None:
+            if w_default is None:
+                return space.w_None
+            return w_default
+        return w_value
+
+    def descr_clear(self, space):
+        self.unpickler.memo = {}
+
+    def descr_copy(self, space):
+        return self.unpickler.memo_copy()
+
+    def descr_keys(self, space):
+        return space.call_method(self.unpickler.memo_copy(), "keys")
+
+    def descr_values(self, space):
+        return space.call_method(self.unpickler.memo_copy(), "values")
+
+    def descr_items(self, space):
+        return space.call_method(self.unpickler.memo_copy(), "items")
+
+    def descr_iter(self, space):
+        return space.iter(self.descr_keys(space))
+
+    def descr_eq(self, space, w_other):
+        return space.eq(self.unpickler.memo_copy(), w_other)
+
+    def descr_ne(self, space, w_other):
+        return space.ne(self.unpickler.memo_copy(), w_other)
+
+W_UnpicklerMemo.typedef = TypeDef("_pypy_pickle.UnpicklerMemo",
+    __doc__ = W_UnpicklerMemo.__doc__,
+    __len__ = interp2app(W_UnpicklerMemo.descr_len),
+    __contains__ = interp2app(W_UnpicklerMemo.descr_contains),
+    __getitem__ = interp2app(W_UnpicklerMemo.descr_getitem),
+    __setitem__ = interp2app(W_UnpicklerMemo.descr_setitem),
+    __delitem__ = interp2app(W_UnpicklerMemo.descr_delitem),
+    __iter__ = interp2app(W_UnpicklerMemo.descr_iter),
+    __eq__ = interp2app(W_UnpicklerMemo.descr_eq),
+    __ne__ = interp2app(W_UnpicklerMemo.descr_ne),
+    get = interp2app(W_UnpicklerMemo.descr_get),
+    clear = interp2app(W_UnpicklerMemo.descr_clear),
+    copy = interp2app(W_UnpicklerMemo.descr_copy),
+    keys = interp2app(W_UnpicklerMemo.descr_keys),
+    values = interp2app(W_UnpicklerMemo.descr_values),
+    items = interp2app(W_UnpicklerMemo.descr_items),
+)
+W_UnpicklerMemo.typedef.acceptable_as_base_class = False
+
+
+def descr__new__(space, w_subtype, __args__):
+    w_self = space.allocate_instance(W_Unpickler, w_subtype)
+    W_Unpickler.__init__(space.interp_w(W_Unpickler, w_self), space)
+    return w_self
+
+W_Unpickler.typedef = TypeDef("_pypy_pickle.Unpickler",
+    __doc__ = W_Unpickler.__doc__,
+    __new__ = interp2app(descr__new__),
+    __init__ = interp2app(W_Unpickler.descr_init),
+    load = interp2app(W_Unpickler.descr_load),
+    memo = GetSetProperty(W_Unpickler.descr_get_memo,
+                          W_Unpickler.descr_set_memo),
+)
@@ -0,0 +1,12 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    """Interp-level parts of cPickle"""
+
+    appleveldefs = {
+        }
+
+    interpleveldefs = {
+        'Pickler' : 'interp_pickler.W_Pickler',
+        'Unpickler' : 'interp_unpickler.W_Unpickler',
+        }
@@ -0,0 +1,217 @@
+class AppTestPickler(object):
+    spaceconfig = dict(usemodules=['_pypy_pickle', 'cStringIO', 'struct',
+                                   'binascii'])
+
+    def setup_class(cls):
+        # classes that pickle can find by name
+        cls.space.appexec([], """():
+            import sys, types
+            mod = types.ModuleType('pickler_test_classes')
+            sys.modules[mod.__name__] = mod
+            exec '''if 1:
+            class Point(object):
+                def __init__(self, x, y):
+                    self.x = x
+                    self.y = y
+            class OldStyle:
+                def __init__(self, value):
+                    self.value = value
+            class WithInitArgs:
+                def __init__(self, a):
+                    self.a = a
+                def __getinitargs__(self):
+                    return (self.a,)
+            class Reduced(object):
+                def __init__(self, value):
+                    self.value = value
+                def __reduce__(self):
+                    return (Reduced, (self.value,))
+            class MyList(list):
+                pass
+            class MyDict(dict):
+                pass
+            def function():
+                pass
+            ''' in mod.__dict__
+        """)
+
+    def test_uses_native_pickler(self):
+        import cPickle, _pypy_pickle
+        assert issubclass(cPickle.Pickler, _pypy_pickle.Pickler)
+
+    def test_exact_output(self):
+        import cPickle
+        assert cPickle.dumps([1, 2], 2) == '\x80\x02]q\x01(K\x01K\x02e.'
+        assert cPickle.dumps([1, 2], 0) == '(lp1\nI1\naI2\na.'
+        assert cPickle.dumps(('a', 'a'), 1) == '(U\x01aq\x01h\x01tq\x02.'
+        assert cPickle.dumps({'a': None}, 2) == '\x80\x02}q\x01U\x01aq\x02Ns.'
+        assert cPickle.dumps(-1, 1) == 'J\xff\xff\xff\xff.'
+        assert cPickle.dumps(65536, 1) == 'J\x00\x00\x01\x00.'
+        assert cPickle.dumps(1.5, 1) == 'G?\xf8\x00\x00\x00\x00\x00\x00.'
+        assert cPickle.dumps(1.5, 0) == 'F1.5\n.'
+        assert cPickle.dumps(True, 2) == '\x80\x02\x88.'
+        assert cPickle.dumps(True, 0) == 'I01\n.'
+        assert cPickle.dumps(255L, 2) == '\x80\x02\x8a\x02\xff\x00.'
+        assert cPickle.dumps(-256L, 2) == '\x80\x02\x8a\x02\x00\xff.'
+        assert cPickle.dumps(0L, 2) == '\x80\x02\x8a\x00.'
+        assert cPickle.dumps(12L, 0) == 'L12L\n.'
+        assert cPickle.dumps(u'\xe9', 2) == '\x80\x02X\x02\x00\x00\x00\xc3\xa9q\x01.'
+        assert cPickle.dumps(u'a\\b\n', 0) == 'Va\\u005cb\\u000a\np1\n.'
+
+    def test_roundtrip(self):
+        import cPickle, pickle
+        lst = [1, 2]
+        values = [None, True, 0, 255, 256, 65536, -1, 2**31, -2**31 - 1,
+                  2**100, -2**100, 0L, 1.5, float('inf'), '', 'abc', 'x' * 300,
+                  u'', u'\xe9\u1234', u'\U00012345', u'\ud800', (), (1,),
+                  (1, 2), (1, 2, 3), (1, 2, 3, 4), range(2500),
+                  [i * 0.5 for i in range(2500)], ['a', u'b', 3] * 1000,
+                  dict.fromkeys(range(2500)), {'a': [lst, lst], (1, 2): {}}]
+        for proto in range(3):
+            for value in values:
+                s = cPickle.dumps(value, proto)
+                res = pickle.loads(s)
+                assert res == value, (proto, value)
+                assert type(res) is type(value)
+                assert cPickle.loads(s) == value
+            res = pickle.loads(cPickle.dumps(values[-1], proto))
+            assert res['a'][0] is res['a'][1]
+
+    def test_recursive(self):
+        import cPickle, pickle
+        lst = []
+        lst.append(lst)
+        d = {}
+        d[1] = d
+        t = ([],)
+        t[0].append(t)
+        for proto in range(3):
+            res = pickle.loads(cPickle.dumps([lst, d, t], proto))
+            assert res[0][0] is res[0]
+            assert res[1][1] is res[1]
+            assert res[2][0][0] is res[2]
+
+    def test_objects(self):
+        import cPickle, pickle, collections
+        from pickler_test_classes import (Point, OldStyle, WithInitArgs,
+            Reduced, MyList, MyDict, function)
+        p = Point(1, 2)
+        p.self = p
+        ml = MyList([1, 2])
+        ml.attr = 5
+        md = MyDict(a=1)
+        values = [p, OldStyle(3), WithInitArgs(4), Reduced(5), ml, md,
+                  function, Point, OldStyle, len, collections.OrderedDict(a=1),
+                  collections.deque([1, 2]), set([1, 2]), frozenset('ab'),
+                  complex(1, 2)]
+        for proto in range(3):
+            res = pickle.loads(cPickle.dumps(values, proto))
+            assert res[0].x == 1 and res[0].self is res[0]
+            assert res[1].value == 3 and res[2].a == 4
+            assert type(res[3]) is Reduced and res[3].value == 5
+            assert type(res[4]) is MyList and res[4] == [1, 2]
+            assert res[4].attr == 5
+            assert type(res[5]) is MyDict and res[5] == {'a': 1}
+            assert res[6:10] == [function, Point, OldStyle, len]
+            assert res[10:] == values[10:]
+            assert type(res[10]) is collections.OrderedDict
+
+    def test_module_dict(self):
+        import cPickle, pickle, sys
+        res = pickle.loads(cPickle.dumps(sys.__dict__, 2))
+        assert res is sys.__dict__
+
+    def test_errors(self):
+        import cPickle
+        class Local(object):
+            pass
+        class BadReduce(object):
+            def __reduce__(self):
+                return 42
+        raises(cPickle.PicklingError, cPickle.dumps, Local)
+        raises(cPickle.PicklingError, cPickle.dumps, [BadReduce()], 2)
+        raises(ValueError, cPickle.Pickler, None, 3)
+
+    def test_persistent_id(self):
+        import cPickle, pickle, cStringIO
+        f = cStringIO.StringIO()
+        p = cPickle.Pickler(f, 2)
+        p.persistent_id = lambda obj: 'X' if obj == 42 else None
+        p.dump([1, 42, 3])
+        u = pickle.Unpickler(cStringIO.StringIO(f.getvalue()))
+        u.persistent_load = lambda pid: pid * 2
+        assert u.load() == [1, 'XX', 3]
+
+    def test_memo_and_clear_memo(self):
+        import cPickle, pickle, cStringIO
+        f = cStringIO.StringIO()
+        p = cPickle.Pickler(f, 2)
+        lst = ['a']
+        p.dump(lst)
+        p.dump(lst)
+        assert p.memo[id(lst)] == (1, lst)
+        p.clear_memo()
+        assert p.memo == {}
+        p.dump(lst)
+        u = pickle.Unpickler(cStringIO.StringIO(f.getvalue()))
+        assert [u.load() for i in range(3)] == [lst] * 3
+
+    def test_set_memo(self):
+        import cPickle
+        lst = ['a']
+        p = cPickle.Pickler(2)
+        p.memo = {id(lst): (7, lst)}
+        assert p.memo == {id(lst): (7, lst)}
+        assert id(lst) in p.memo and len(p.memo) == 1
+        p.dump([lst])
+        assert p.getvalue() == '\x80\x02]q\x02h\x07a.'
+        p2 = cPickle.Pickler(2)
+        p2.memo = p.memo
+        assert p2.memo == p.memo
+        p.memo.clear()
+        assert p.memo == {} and len(p2.memo) == 2
+
+    def test_subclass_overrides(self):
+        import cPickle, pickle, copy_reg
+        from pickler_test_classes import Point, OldStyle, function
+        saved = []
+        class MyPickler(cPickle.Pickler):
+            dispatch = cPickle.Pickler.dispatch.copy()
+            def save_global(self, obj, name=None):
+                saved.append(obj)
+                cPickle.Pickler.save_global(self, obj, name)
+            def save_reduce(self, func, args, *rest, **kwds):
+                saved.append(func)
+                cPickle.Pickler.save_reduce(self, func, args, *rest, **kwds)
+            def save_float(self, obj):
+                self.save(repr(obj))
+            dispatch[float] = save_float
+        p = MyPickler(2)
+        value = [function, Point(1, 2), 1.5, OldStyle(3)]
+        p.dump(value)
+        res = pickle.loads(p.getvalue())
+        assert res[0] is function and res[1].x == 1
+        assert res[2] == '1.5' and res[3].value == 3
+        # like in pickle.Pickler, functions go through self.save_global()
+        # and instances of new-style classes through self.save_reduce()
+        assert saved == [function, copy_reg.__newobj__]
+        # the dispatch table of cPickle.Pickler is not changed
+        assert pickle.loads(cPickle.dumps(1.5, 2)) == 1.5
+
+    def test_file_and_getvalue(self):
+        import cPickle
+        class Writer(object):
+            def __init__(self):
+                self.parts = []
+            def write(self, data):
+                self.parts.append(data)
+        w = Writer()
+        value = [str(i) for i in range(50000)]
+        cPickle.dump(value, w, 2)
+        assert len(w.parts) > 1
+        assert cPickle.loads(''.join(w.parts)) == value
+        p = cPickle.Pickler(2)
+        p.dump(1)
+        p.dump(2)
+        assert p.getvalue() == '\x80\x02K\x01.\x80\x02K\x02.'
+        assert cPickle.Pickler(w).getvalue() is None
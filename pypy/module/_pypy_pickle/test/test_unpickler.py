@@ -0,0 +1,200 @@
+class AppTestUnpickler(object):
+    spaceconfig = dict(usemodules=['_pypy_pickle', 'cStringIO', 'struct',
+                                   'binascii'])
+
+    def setup_class(cls):
+        # classes that pickle can find by name
+        cls.space.appexec([], """():
+            import sys, types
+            mod = types.ModuleType('pickle_test_classes')
+            sys.modules[mod.__name__] = mod
+            exec '''if 1:
+            class Point(object):
+                def __init__(self, x, y):
+                    self.x = x
+                    self.y = y
+            class OldStyle:
+                def __init__(self, value):
+                    self.value = value
+            class WithState(object):
+                def __init__(self, state):
+                    self.state = state
+                def __getstate__(self):
+                    return {'s': self.state}
+                def __setstate__(self, d):
+                    self.state = d['s']
+            class Slotted(object):
+                __slots__ = ['a']
+                def __init__(self, a):
+                    self.a = a
+            ''' in mod.__dict__
+        """)
+
+    def test_uses_native_unpickler(self):
+        import cPickle, _pypy_pickle
+        assert issubclass(cPickle.Unpickler, _pypy_pickle.Unpickler)
+
+    def test_primitives(self):
+        import cPickle, pickle
+        values = [None, True, False, 0, 1, 255, 256, 65535, 65536, -1,
+                  -2**31, 2**31 - 1, 2**31, 2**63, -2**100, 0L, 12L,
+                  1.5, -0.0, 1e300, float('inf'), '', 'abc', 'a\x00\xff',
+                  'x' * 300, u'', u'abc', u'\xe9\u1234', u'\U00012345',
+                  u'\ud800', 'q\\"\'\n']
+        for proto in range(3):
+            for value in values:
+                s = pickle.dumps(value, proto)
+                res = cPickle.loads(s)
+                assert res == value, (proto, value, res)
+                assert type(res) is type(value), (proto, value)
+
+    def test_containers(self):
+        import cPickle, pickle
+        lst = [1, 2, 3]
+        value = {'ints': range(2000), 'floats': [i * 0.5 for i in range(50)],
+                 'strs': ['a', 'b'] * 600, 'tuple': (1, 'a', None),
+                 'nested': {(1, 2): [lst, lst], u'k': {}}, 'empty': ((), [])}
+        for proto in range(3):
+            res = cPickle.loads(pickle.dumps(value, proto))
+            assert res == value
+            assert res['nested'][(1, 2)][0] is res['nested'][(1, 2)][1]
+
+    def test_recursive(self):
+        import cPickle
+        lst = []
+        lst.append(lst)
+        d = {}
+        d['d'] = d
+        for proto in range(3):
+            res = cPickle.loads(cPickle.dumps([lst, d], proto))
+            assert res[0][0] is res[0]
+            assert res[1]['d'] is res[1]
+
+    def test_instances(self):
+        import cPickle, pickle, collections
+        from pickle_test_classes import Point, OldStyle, WithState, Slotted
+        res = cPickle.loads(pickle.dumps(collections.OrderedDict(a=1), 2))
+        assert res == {'a': 1} and type(res) is collections.OrderedDict
+        for proto in range(3):
+            x = Point(3, 4)
+            x.extra = [x]
+            res = cPickle.loads(pickle.dumps(x, proto))
+            assert type(res) is Point
+            assert (res.x, res.y) == (3, 4)
+            assert res.extra[0] is res
+            res = cPickle.loads(pickle.dumps(OldStyle(5), proto))
+            assert res.__class__ is OldStyle and res.value == 5
+            res = cPickle.loads(pickle.dumps(WithState(7), proto))
+            assert res.state == 7
+        res = cPickle.loads(pickle.dumps(Slotted(8), 2))
+        assert res.a == 8
+
+    def test_find_global(self):
+        import cPickle, pickle, cStringIO
+        from pickle_test_classes import Point
+        s = pickle.dumps(Point(1, 2), 2)
+        u = cPickle.Unpickler(cStringIO.StringIO(s))
+        u.find_global = None
+        raises(cPickle.UnpicklingError, u.load)
+        u = cPickle.Unpickler(cStringIO.StringIO(pickle.dumps(Point, 0)))
+        u.find_global = lambda module, name: (module, name)
+        assert u.load() == ('pickle_test_classes', 'Point')
+
+    def test_persistent_load(self):
+        import cPickle, pickle, cStringIO
+        f = cStringIO.StringIO()
+        p = pickle.Pickler(f, 0)
+        p.persistent_id = lambda obj: 'X' if obj == 42 else None
+        p.dump([1, 42, 3])
+        p = pickle.Pickler(f, 2)
+        p.persistent_id = lambda obj: 'X' if obj == 42 else None
+        p.dump([1, 42, 3])
+        u = cPickle.Unpickler(cStringIO.StringIO(f.getvalue()))
+        u.persistent_load = lambda pid: pid * 2
+        assert u.load() == [1, 'XX', 3]
+        assert u.load() == [1, 'XX', 3]
+
+    def test_several_pickles_and_memo(self):
+        import cPickle, pickle, cStringIO
+        f = cStringIO.StringIO()
+        p = pickle.Pickler(f, 2)
+        p.dump(['a'])
+        p.dump(['b'])
+        u = cPickle.Unpickler(cStringIO.StringIO(f.getvalue()))
+        assert u.load() == ['a']
+        assert u.load() == ['b']
+        assert sorted(u.memo.keys()) == ['0', '1', '2', '3']
+        raises(EOFError, u.load)
+
+    def test_set_memo(self):
+        import cPickle, cStringIO
+        obj = ['shared']
+        u = cPickle.Unpickler(cStringIO.StringIO('g1\n.h\x02.j\x03\x00\x00\x00.'))
+        u.memo = {'1': obj, 2: obj, '3': 42}
+        assert u.load() is obj
+        assert u.load() is obj
+        assert u.load() == 42
+        assert u.memo == {'1': obj, '2': obj, '3': 42}
+        u.memo = {}
+        assert u.memo == {}
+        raises(TypeError, "u.memo = [1]")
+        raises(KeyError, "u.memo = {'x': 1}")
+
+    def test_live_memo(self):
+        import cPickle, cStringIO
+        obj = ['shared']
+        u = cPickle.Unpickler(cStringIO.StringIO('g1\n.h\x02.'))
+        memo = u.memo
+        memo['1'] = obj
+        memo[2] = 42
+        assert u.memo is memo
+        assert len(memo) == 2 and '2' in memo and 'x' not in memo
+        assert u.load() is obj
+        assert u.load() == 42
+        assert sorted(memo.items()) == [('1', obj), ('2', 42)]
+        del memo['2']
+        assert memo.get('2') is None and memo.get('1') is obj
+        raises(KeyError, "memo['2']")
+        memo.clear()
+        assert u.memo == {}
+        u2 = cPickle.Unpickler(cStringIO.StringIO(''))
+        u.memo['5'] = obj
+        u2.memo = u.memo
+        assert u2.memo == {'5': obj}
+
+    def test_file_like_object(self):
+        import cPickle, pickle
+        class Reader(object):
+            def __init__(self, data):
+                self.data = data
+                self.pos = 0
+            def read(self, n):
+                res = self.data[self.pos:self.pos + n]
+                self.pos += len(res)
+                return res
+            def readline(self):
+                i = self.data.find('\n', self.pos) + 1 or len(self.data)
+                res = self.data[self.pos:i]
+                self.pos = i
+                return res
+        value = [1, 'abc', {'x': (2.5, u'\xe9')}, 2**70]
+        for proto in range(3):
+            reader = Reader(pickle.dumps(value, proto) + 'rest')
+            assert cPickle.load(reader) == value
+            assert reader.read(4) == 'rest'
+
+    def test_errors(self):
+        import cPickle
+        raises(EOFError, cPickle.loads, '')
+        raises(EOFError, cPickle.loads, 'I12\n')
+        raises(EOFError, cPickle.loads, '\x80\x02U\x05abc')
+        raises(cPickle.UnpicklingError, cPickle.loads, 'z')
+        raises(cPickle.UnpicklingError, cPickle.loads, '.')
+        raises(cPickle.UnpicklingError, cPickle.loads, '(0.')
+        raises(cPickle.UnpicklingError, cPickle.loads, 't.')
+        raises(cPickle.BadPickleGet, cPickle.loads, 'h\x05.')
+        raises(cPickle.BadPickleGet, cPickle.loads, 'g5\n.')
+        raises(ValueError, cPickle.loads, '\x80\x03N.')
+        raises(ValueError, cPickle.loads, "S'abc\n.")
+        raises(ValueError, cPickle.loads, 'Ixyz\n.')
+        raises(UnicodeDecodeError, cPickle.loads, 'X\x01\x00\x00\x00\xff.')
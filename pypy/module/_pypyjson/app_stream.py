@@ -0,0 +1,14 @@
+def iterload(fp, items=False, chunk_size=65536):
+    """Decode the JSON values read from the file-like object fp one by one,
+    reading it in chunks of chunk_size bytes.  If items is true, fp must
+    contain a single array, and its elements are produced instead."""
+    from _pypyjson import StreamDecoder
+    decoder = StreamDecoder(items)
+    while True:
+        data = fp.read(chunk_size)
+        if not data:
+            break
+        for value in decoder.feed(data):
+            yield value
+    for value in decoder.close():
+        yield value
@@ -3,11 +3,13 @@ from rpython.rlib.rstring import StringBuilder
 from rpython.rlib.objectmodel import specialize, always_inline
 from rpython.rlib import rfloat, jit, objectmodel, rutf8
 from rpython.rtyper.lltypesystem import lltype, rffi
-from rpython.rlib.rarithmetic import r_uint
+from rpython.rlib.rarithmetic import r_uint, LONG_BIT
+from rpython.rlib.listsort import make_timsort_class
 from pypy.interpreter.error import oefmt
 from pypy.interpreter import unicodehelper
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.module._pypyjson import simd
+from pypy.objspace.std.columns import Column
 
 OVF_DIGITS = len(str(sys.maxint))
 
@@ -74,9 +76,6 @@ class JSONDecoder(W_Root):
 
 
     def __init__(self, space, s):
-        self.space = space
-        self.w_empty_string = space.newutf8("", 0)
-
         self.s = s
 
         # we put our string in a raw buffer so:
@@ -84,6 +83,12 @@ class JSONDecoder(W_Root):
         #    which means that we never have to check for the "end of string"
         # 2) we can pass the buffer directly to strtod
         self.ll_chars, self.llobj, self.flag = rffi.get_nonmovingbuffer_ll_final_null(self.s)
+        self._init(space, len(s))
+
+    def _init(self, space, length):
+        self.space = space
+        self.w_empty_string = space.newutf8("", 0)
+        self.length = length
         self.end_ptr = lltype.malloc(rffi.CCHARPP.TO, 1, flavor='raw')
         self.pos = 0
         self.intcache = space.fromcache(IntCache)
@@ -114,19 +119,32 @@ class JSONDecoder(W_Root):
 
 
     def close(self):
-        rffi.free_nonmovingbuffer_ll(self.ll_chars, self.llobj, self.flag)
+        self._free_input()
         lltype.free(self.end_ptr, flavor='raw')
         # clean up objects that are instances of now blocked maps
         for w_obj in self.unclear_objects:
             jsonmap = self._get_jsonmap_from_dict(w_obj)
             if jsonmap.is_state_blocked():
                 self._devolve_jsonmap_dict(w_obj)
+        # the map tree is shared by all calls, keep its size bounded
+        self.startmap.maybe_evict()
+
+    def _free_input(self):
+        rffi.free_nonmovingbuffer_ll(self.ll_chars, self.llobj, self.flag)
 
     def getslice(self, start, end):
         assert start >= 0
         assert end >= 0
         return self.s[start:end]
 
+    def append_slice(self, builder, start, end):
+        assert start >= 0
+        assert end >= 0
+        builder.append_slice(self.s, start, end)
+
+    def get_next_map(self, currmap, w_key, start, end):
+        return currmap.get_next(w_key, self.s, start, end, self.startmap)
+
     def skip_whitespace(self, i):
         ll_chars = self.ll_chars
         while True:
@@ -236,12 +254,15 @@ class JSONDecoder(W_Root):
         return self.intcache.newint(intval)
 
     def decode_float(self, i):
+        return self.space.newfloat(self.parse_float(i))
+
+    def parse_float(self, i):
         from rpython.rlib import rdtoa
         start = rffi.ptradd(self.ll_chars, i)
         floatval = rdtoa.dg_strtod(rffi.cast(rffi.CONST_CCHARP, start), self.end_ptr)
         diff = rffi.cast(rffi.SIGNED, self.end_ptr[0]) - rffi.cast(rffi.SIGNED, start)
         self.pos = i + diff
-        return self.space.newfloat(floatval)
+        return floatval
 
     def decode_int_slow(self, i):
         start = i
@@ -429,7 +450,7 @@ class JSONDecoder(W_Root):
     def decode_string_uncached(self, i):
         start = i
         ll_chars = self.ll_chars
-        nonascii, i = simd.find_end_of_string_no_hash(ll_chars, i, len(self.s))
+        nonascii, i = simd.find_end_of_string_no_hash(ll_chars, i, self.length)
         ch = ll_chars[i]
         if ch == '\\':
             self.pos = i
@@ -465,7 +486,7 @@ class JSONDecoder(W_Root):
         builder = StringBuilder((i - start) * 2) # just an estimate
         assert start >= 0
         assert i >= 0
-        builder.append_slice(self.s, start, i)
+        self.append_slice(builder, start, i)
         while True:
             ch = self.ll_chars[i]
             i += 1
@@ -569,13 +590,13 @@ class JSONDecoder(W_Root):
             contextmap.decoded_strings += 1
             if not contextmap.should_cache_strings():
                 cache = False
-        if len(self.s) < self.MIN_SIZE_FOR_STRING_CACHE:
+        if self.length < self.MIN_SIZE_FOR_STRING_CACHE:
             cache = False
 
         if not cache:
             return self.decode_string_uncached(i)
 
-        strhash, nonascii, i = simd.find_end_of_string(ll_chars, i, len(self.s))
+        strhash, nonascii, i = simd.find_end_of_string(ll_chars, i, self.length)
         ch = ll_chars[i]
         if ch == '\\':
             self.pos = i
@@ -638,7 +659,7 @@ class JSONDecoder(W_Root):
             self._raise("Key name must be string at char %d", i)
         i += 1
         w_key = self._decode_key_string(i)
-        return currmap.get_next(w_key, self.s, start, self.pos, self.startmap)
+        return self.get_next_map(currmap, w_key, start, self.pos)
 
     def _decode_key_string(self, i):
         """ decode key at position i as a string. Key strings are always
@@ -646,7 +667,7 @@ class JSONDecoder(W_Root):
         ll_chars = self.ll_chars
         start = i
 
-        strhash, nonascii, i = simd.find_end_of_string(ll_chars, i, len(self.s))
+        strhash, nonascii, i = simd.find_end_of_string(ll_chars, i, self.length)
 
         ch = ll_chars[i]
         if ch == '\\':
@@ -682,6 +703,202 @@ class JSONDecoder(W_Root):
         i += 1
         return self._decode_key_string(i)
 
+    # _____________________________________________________
+    # columnar decoding, see loads_columns()
+
+    def decode_columns(self, i):
+        """ Decode an array of objects that all have the same keys in the
+        same order into a dict mapping every key to the list of its values.
+        No dict is created per object, and int and float columns are
+        collected without boxing the values. """
+        i = self.skip_whitespace(i)
+        if self.ll_chars[i] != '[':
+            self._raise("Expected an array of objects at char %d", i)
+        start = i + 1
+        i = self.skip_whitespace(start)
+        if self.ll_chars[i] == ']':
+            self.pos = i + 1
+            return self.space.newdict()
+        keys_w = []
+        key_reprs = []
+        columns = []
+        while True:
+            if self.ll_chars[i] != '{':
+                self._raise("Expected an object at char %d", i)
+            if not columns:
+                self.decode_first_record(i + 1, keys_w, key_reprs, columns)
+            else:
+                self.decode_record(i + 1, keys_w, key_reprs, columns)
+            i = self.skip_whitespace(self.pos)
+            ch = self.ll_chars[i]
+            i += 1
+            if ch == ']':
+                break
+            elif ch == ',':
+                i = self.skip_whitespace(i)
+            elif ch == '\0':
+                self._raise("Unterminated array starting at char %d", start)
+            else:
+                self._raise("Unexpected '%s' when decoding array (char %d)",
+                            ch, i-1)
+        self.pos = i
+        dict_w = self._create_empty_dict()
+        for index in range(len(keys_w)):
+            dict_w[keys_w[index]] = columns[index].wrap(self.space)
+        return self._create_dict(dict_w)
+
+    def decode_first_record(self, i, keys_w, key_reprs, columns):
+        """ Decode the first object of decode_columns(), which determines the
+        keys. i must be after the opening '{' """
+        start = i
+        i = self.skip_whitespace(i)
+        if self.ll_chars[i] == '}':
+            self._raise("Expected a non-empty object at char %d", start - 1)
+        while True:
+            keystart = i
+            w_key = self.decode_key_string(i)
+            for w_other in keys_w:
+                if w_other._utf8 == w_key._utf8:
+                    self._raise("Repeated key in object at char %d", keystart)
+            keys_w.append(w_key)
+            key_reprs.append(self.getslice(keystart, self.pos))
+            column = Column()
+            columns.append(column)
+            i = self.decode_record_value(self.pos, column)
+            ch = self.ll_chars[i]
+            i += 1
+            if ch == '}':
+                self.pos = i
+                return
+            elif ch == ',':
+                i = self.skip_whitespace(i)
+            else:
+                self._raise_object_error(ch, start, i - 1)
+
+    def decode_record(self, i, keys_w, key_reprs, columns):
+        """ Decode an object whose keys must be keys_w, in this order, and
+        append its values to columns. i must be after the opening '{' """
+        start = i
+        i = self.skip_whitespace(i)
+        index = 0
+        while True:
+            if index == len(keys_w) or self.ll_chars[i] == '}':
+                self._raise("Object at char %d doesn't have the same keys as "
+                            "the first one", start - 1)
+            key_repr = key_reprs[index]
+            if self.key_repr_matches(key_repr, i):
+                # fast path, the key is spelled exactly like in the first
+                # object
+                self.pos = i + len(key_repr)
+            else:
+                w_key = self.decode_key_string(i)
+                if w_key._utf8 != keys_w[index]._utf8:
+                    self._raise("Object at char %d doesn't have the same keys "
+                                "as the first one", start - 1)
+            i = self.decode_record_value(self.pos, columns[index])
+            index += 1
+            ch = self.ll_chars[i]
+            i += 1
+            if ch == '}':
+                if index != len(keys_w):
+                    self._raise("Object at char %d doesn't have the same keys "
+                                "as the first one", start - 1)
+                self.pos = i
+                return
+            elif ch == ',':
+                i = self.skip_whitespace(i)
+            else:
+                self._raise_object_error(ch, start, i - 1)
+
+    def key_repr_matches(self, key_repr, i):
+        ll_chars = self.ll_chars
+        for c in key_repr:
+            if ll_chars[i] != c:
+                return False
+            i += 1
+        return True
+
+    def decode_record_value(self, i, column):
+        """ Decode the ': value' part of an object member at position i into
+        column. Returns the position of the next non-whitespace char. """
+        i = self.skip_whitespace(i)
+        if self.ll_chars[i] != ':':
+            self._raise("No ':' found at char %d", i)
+        i = self.skip_whitespace(i + 1)
+        ch = self.ll_chars[i]
+        if ch.isdigit() or (ch == '-' and self.ll_chars[i+1] != 'I'):
+            self.decode_numeric_into_column(i, column)
+        else:
+            column.append_w(self.space, self.decode_any(i))
+        return self.skip_whitespace(self.pos)
+
+    def decode_numeric_into_column(self, i, column):
+        start = i
+        i, ovf_maybe, intval = self.parse_integer(i)
+        ch = self.ll_chars[i]
+        if ch == '.':
+            if not self.ll_chars[i+1].isdigit():
+                self._raise("Expected digit at char %d", i+1)
+            column.append_float(self.space, self.parse_float(start))
+        elif ch == 'e' or ch == 'E':
+            column.append_float(self.space, self.parse_float(start))
+        elif ovf_maybe:
+            column.append_w(self.space, self.decode_int_slow(start))
+        else:
+            self.pos = i
+            column.append_int(self.space, intval)
+
+
+class RawBufferJSONDecoder(JSONDecoder):
+    """ A decoder that reads from a buffer that has a raw address (bytearray,
+    mmap, ...) instead of from a string. The scanning loops rely on a '\0'
+    sentinel after the input instead of checking the length, so the buffer
+    is copied once into raw memory (with a single memcpy, no GC string and no
+    unicode is created). Strings are only materialized for the values that
+    are actually extracted. """
+
+    def __init__(self, space, raw_address, length):
+        self.ll_chars = lltype.malloc(rffi.CCHARP.TO, length + 1, flavor='raw')
+        rffi.c_memcpy(rffi.cast(rffi.VOIDP, self.ll_chars),
+                      rffi.cast(rffi.CONST_VOIDP, raw_address), length)
+        self.ll_chars[length] = '\0'
+        self._init(space, length)
+
+    def _free_input(self):
+        lltype.free(self.ll_chars, flavor='raw')
+
+    def getslice(self, start, end):
+        assert start >= 0
+        assert end >= start
+        return rffi.charpsize2str(rffi.ptradd(self.ll_chars, start),
+                                  end - start)
+
+    def append_slice(self, builder, start, end):
+        assert start >= 0
+        assert end >= start
+        builder.append_charpsize(rffi.ptradd(self.ll_chars, start),
+                                 end - start)
+
+    def get_next_map(self, currmap, w_key, start, end):
+        return currmap.get_next(w_key, self.getslice(start, end), 0,
+                                end - start, self.startmap)
+
+
+def make_decoder(space, w_s):
+    """ Return a decoder for w_s, which can be a str or any object supporting
+    the buffer interface. """
+    if space.isinstance_w(w_s, space.w_unicode):
+        raise oefmt(space.w_TypeError,
+                    "Expected utf8-encoded str, got unicode")
+    if space.isinstance_w(w_s, space.w_bytes):
+        return JSONDecoder(space, space.bytes_w(w_s))
+    buf = space.readbuf_w(w_s)
+    try:
+        raw_address = buf.get_raw_address()
+    except ValueError:
+        return JSONDecoder(space, buf.as_str())
+    return RawBufferJSONDecoder(space, raw_address, buf.getlength())
+
 
 class StringCacheEntry(object):
     """ A cache entry, bundling the encoded version of a string as it appears
@@ -819,7 +1036,7 @@ class MapBase(object):
 
         if nextmap_first is None:
             # first transition ever seen, don't initialize nextmap_all
-            next = self._make_next_map(w_key, string[start:stop])
+            next = self._make_next_map(w_key, string[start:stop], terminator)
             if next is None:
                 return None
             self.nextmap_first = next
@@ -835,7 +1052,7 @@ class MapBase(object):
                     return next
             # if we are at this point we didn't find the transition yet, so
             # create a new one
-            next = self._make_next_map(w_key, string[start:stop])
+            next = self._make_next_map(w_key, string[start:stop], terminator)
             if next is None:
                 return None
             self.nextmap_all[w_key] = next
@@ -875,11 +1092,16 @@ class MapBase(object):
         the knowledge that one object transitioned from self to newmap.
         also it potentially decides that self should move to state USEFUL."""
         newmap.instantiation_count += 1
+        if not isinstance(self, JSONMap):
+            # the first key of a new object
+            terminator.clock += 1
+        newmap.last_used = terminator.clock
+        terminator.transitions += 1
         if isinstance(self, JSONMap) and self.state == MapBase.FRINGE:
             if self.is_useful():
                 self.mark_useful(terminator)
 
-    def _make_next_map(self, w_key, key_repr):
+    def _make_next_map(self, w_key, key_repr, terminator):
         # Check whether w_key is already part of the self.prev chain
         # to prevent strangeness in the json dict implementation.
         # This is slow, but it should be rare to call this function.
@@ -888,8 +1110,48 @@ class MapBase(object):
             if check.w_key._utf8 == w_key._utf8:
                 return None
             check = check.prev
+        terminator.num_maps += 1
+        terminator.maps_created += 1
         return JSONMap(self.space, self, w_key, key_repr)
 
+    def remove_child(self, child):
+        """ Remove the transition from self to child, e.g. because child is
+        evicted. """
+        nextmap_all = self.nextmap_all
+        if nextmap_all is not None:
+            del nextmap_all[child.w_key]
+            remaining = len(nextmap_all)
+            if self.nextmap_first is child:
+                # keep the most commonly instantiated remaining child
+                best = None
+                for other in nextmap_all.itervalues():
+                    if (best is None or
+                            other.instantiation_count > best.instantiation_count):
+                        best = other
+                self.nextmap_first = best
+            if remaining == 0:
+                self.nextmap_all = None
+        else:
+            assert self.nextmap_first is child
+            self.nextmap_first = None
+            remaining = 0
+        if remaining == 0:
+            # self becomes a leaf
+            self.change_number_of_leaves(1 - child.number_of_leaves)
+        else:
+            self.change_number_of_leaves(-child.number_of_leaves)
+
+    def _collect_maps(self, result):
+        """ Append all maps of the subtree below self to result. """
+        if self.nextmap_all is not None:
+            for next in self.nextmap_all.itervalues():
+                result.append(next)
+                next._collect_maps(result)
+        elif self.nextmap_first is not None:
+            next = self.nextmap_first
+            result.append(next)
+            next._collect_maps(result)
+
     def fill_dict(self, dict_w, values_w):
         """ recursively fill the dictionary dict_w in the correct order,
         reading from values_w."""
@@ -931,11 +1193,33 @@ class MapBase(object):
 
 class Terminator(MapBase):
     """ The root node of the map transition tree. """
+
+    # the maximum number of maps in the tree, it is shared by all loads()
+    # calls of the process. If there are more, the least recently used ones
+    # are evicted. Can be changed with __pypy__.set_jsonmap_cache_limit(),
+    # a negative value means no limit.
+    DEFAULT_MAX_MAPS = 100000
+
+    # when evicting, shrink the tree to this fraction of max_maps, to not
+    # have to evict again right after the next loads() call
+    EVICTION_FACTOR = 0.75
+
     def __init__(self, space):
         MapBase.__init__(self, space)
         # a set of all map nodes that are currently in the FRINGE state
         self.current_fringe = {}
 
+        self.max_maps = self.DEFAULT_MAX_MAPS
+        # incremented for every decoded object, the maps remember its value
+        # when they were last used (for LRU eviction)
+        self.clock = 0
+
+        # statistics, see get_stats()
+        self.num_maps = 0
+        self.maps_created = 0
+        self.maps_evicted = 0
+        self.transitions = 0
+
     def register_potential_fringe(self, prelim):
         """ add prelim to the fringe, if its prev is either a Terminator or
         useful. """
@@ -965,16 +1249,75 @@ class Terminator(MapBase):
                 min_avg = avg
                 min_fringe = f
         assert min_fringe
-        min_fringe.mark_blocked(self)
+        self.num_maps -= min_fringe.mark_blocked(self)
 
     def fill_dict(self, dict_w, values_w):
         """ recursively fill the dictionary dict_w in the correct order,
         reading from values_w."""
         return 0
 
+    def maybe_evict(self):
+        if 0 <= self.max_maps < self.num_maps:
+            self.evict(int(self.max_maps * self.EVICTION_FACTOR))
+
+    def evict(self, target):
+        """ Detach the least recently used maps (with the subtrees below them)
+        from the tree until at most target maps are left. Dicts that use
+        these maps keep working, only objects decoded in the future will not
+        find them any more. Must not be called in the middle of decoding. """
+        all_maps = []
+        self._collect_maps(all_maps)
+        MapLRUSort(all_maps, len(all_maps)).sort()
+        for jsonmap in all_maps:
+            if self.num_maps <= target:
+                break
+            if jsonmap.evicted:
+                continue   # part of an already evicted subtree
+            jsonmap.prev.remove_child(jsonmap)
+            count = jsonmap.mark_evicted(self)
+            self.num_maps -= count
+            self.maps_evicted += count
+
+    def get_stats(self):
+        """ Return a list of (name, value) pairs describing the current state
+        of the tree. bytes_held is an estimate. """
+        all_maps = []
+        self._collect_maps(all_maps)
+        useful = fringe = preliminary = blocked = 0
+        instantiations = 0
+        bytes_held = 0
+        for jsonmap in all_maps:
+            state = jsonmap.state
+            if state == MapBase.USEFUL:
+                useful += 1
+            elif state == MapBase.FRINGE:
+                fringe += 1
+            elif state == MapBase.PRELIMINARY:
+                preliminary += 1
+            else:
+                blocked += 1
+            instantiations += jsonmap.instantiation_count
+            bytes_held += jsonmap.estimate_size()
+        return [
+            ("maps", len(all_maps)),
+            ("max_maps", self.max_maps),
+            ("useful", useful),
+            ("fringe", fringe),
+            ("preliminary", preliminary),
+            ("blocked", blocked),
+            ("instantiations", instantiations),
+            ("transitions", self.transitions),
+            ("maps_created", self.maps_created),
+            ("maps_evicted", self.maps_evicted),
+            ("bytes_held", bytes_held),
+        ]
+
     def _check_invariants(self):
         for fringe in self.current_fringe:
             assert fringe.state == MapBase.FRINGE
+        all_maps = []
+        self._collect_maps(all_maps)
+        assert len(all_maps) == self.num_maps
 
 class JSONMap(MapBase):
     """ A map implementation to speed up parsing """
@@ -997,6 +1340,13 @@ class JSONMap(MapBase):
         self.keys_in_order = None
         self.strategy_instance = None
 
+        # for the encoder
+        self.encoded_keys_in_order = None
+
+        # for the eviction of least recently used maps
+        self.last_used = 0
+        self.evicted = False
+
     def __repr__(self):
         return "<JSONMap key_repr=%s #instantiation=%s #leaves=%s prev=%r>" % (
                 self.key_repr, self.instantiation_count, self.number_of_leaves, self.prev)
@@ -1063,19 +1413,54 @@ class JSONMap(MapBase):
                 self.nextmap_first = maxchild
 
     def mark_blocked(self, terminator):
-        """ mark self and recursively all its children as blocked."""
+        """ mark self and recursively all its children as blocked, and drop
+        the links to the children. Returns the number of maps that are no
+        longer part of the tree (all of them, except self). """
+        count = 0
         was_fringe = self.state == MapBase.FRINGE
         self.state = MapBase.BLOCKED
         if was_fringe:
             terminator.remove_from_fringe(self)
         if self.nextmap_all:
             for next in self.nextmap_all.itervalues():
-                next.mark_blocked(terminator)
+                count += 1 + next.mark_blocked(terminator)
         elif self.nextmap_first:
-            self.nextmap_first.mark_blocked(terminator)
+            count += 1 + self.nextmap_first.mark_blocked(terminator)
         self.nextmap_first = None
         self.nextmap_all = None
         self.change_number_of_leaves(-self.number_of_leaves + 1)
+        return count
+
+    def mark_evicted(self, terminator):
+        """ mark self and recursively all its children as evicted, and drop
+        the links to the children. Returns the number of evicted maps. """
+        count = 1
+        self.evicted = True
+        if self.state == MapBase.FRINGE:
+            del terminator.current_fringe[self]
+        if self.nextmap_all is not None:
+            for next in self.nextmap_all.itervalues():
+                count += next.mark_evicted(terminator)
+        elif self.nextmap_first is not None:
+            count += self.nextmap_first.mark_evicted(terminator)
+        self.nextmap_first = None
+        self.nextmap_all = None
+        return count
+
+    def estimate_size(self):
+        """ a rough estimate of the memory used by self, in bytes """
+        word = LONG_BIT // 8
+        size = 16 * word + len(self.key_repr) + len(self.w_key._utf8)
+        if self.nextmap_all is not None:
+            size += 3 * word * len(self.nextmap_all)
+        if self.key_to_index is not None:
+            size += 3 * word * len(self.key_to_index)
+        if self.keys_in_order is not None:
+            size += word * len(self.keys_in_order)
+        if self.encoded_keys_in_order is not None:
+            for key in self.encoded_keys_in_order:
+                size += word + len(key)
+        return size
 
     def is_state_blocked(self):
         return self.state == MapBase.BLOCKED
@@ -1157,6 +1542,26 @@ class JSONMap(MapBase):
                 keys_in_order[index] = w_key
         return keys_in_order
 
+    # _____________________________________________________
+    # methods for the encoder
+
+    def get_encoded_keys_in_order(self):
+        """ Return the keys in order, each one already encoded as an
+        ascii-only JSON string including the quotes. """
+        from pypy.module._pypyjson.interp_encoder import encode_utf8_ascii_into
+        encoded_keys = self.encoded_keys_in_order
+        if encoded_keys is None:
+            keys_in_order = self.get_keys_in_order()
+            encoded_keys = [None] * len(keys_in_order)
+            for index, w_key in enumerate(keys_in_order):
+                sb = StringBuilder(len(w_key._utf8) + 2)
+                sb.append('"')
+                encode_utf8_ascii_into(sb, w_key._utf8)
+                sb.append('"')
+                encoded_keys[index] = sb.build()
+            self.encoded_keys_in_order = encoded_keys
+        return encoded_keys
+
     # _____________________________________________________
 
     def _get_dot_text(self):
@@ -1176,19 +1581,40 @@ class JSONMap(MapBase):
             res += ", fillcolor=lightslategray"
         return res
 
+MapLRUBaseTimSort = make_timsort_class()
+
+class MapLRUSort(MapLRUBaseTimSort):
+    def lt(self, a, b):
+        return a.last_used < b.last_used
+
+
 @jit.dont_look_inside
 def loads(space, w_s):
-    if space.isinstance_w(w_s, space.w_unicode):
-        raise oefmt(space.w_TypeError,
-                    "Expected utf8-encoded str, got unicode")
-    s = space.bytes_w(w_s)
-    decoder = JSONDecoder(space, s)
+    """ Decode the JSON document in w_s, which can be a utf-8 encoded str or
+    any object supporting the buffer interface (bytearray, memoryview,
+    mmap...). """
+    return _loads(space, w_s, columns=False)
+
+@jit.dont_look_inside
+def loads_columns(space, w_s):
+    """ Decode a JSON array of objects that all have the same keys in the
+    same order, and return a dict mapping every key to the list of its
+    values, e.g. '[{"a": 1, "b": 2}, {"a": 3, "b": 4}]' gives
+    {u"a": [1, 3], u"b": [2, 4]}. Raises ValueError if the objects don't
+    have the same keys. """
+    return _loads(space, w_s, columns=True)
+
+def _loads(space, w_s, columns):
+    decoder = make_decoder(space, w_s)
     try:
-        w_res = decoder.decode_any(0)
+        if columns:
+            w_res = decoder.decode_columns(0)
+        else:
+            w_res = decoder.decode_any(0)
         i = decoder.skip_whitespace(decoder.pos)
-        if i < len(s):
+        if i < decoder.length:
             start = i
-            end = len(s) - 1
+            end = decoder.length - 1
             raise oefmt(space.w_ValueError,
                         "Extra data: char %d - %d", start, end)
         return w_res
@@ -1,6 +1,9 @@
 from rpython.rlib.rstring import StringBuilder
-from rpython.rlib import rutf8
+from rpython.rlib import rutf8, jit
+from rpython.rlib.rfloat import isfinite
 from pypy.interpreter import unicodehelper
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import unwrap_spec
 
 
 HEX = '0123456789abcdef'
@@ -16,35 +19,10 @@ ESCAPE_BEFORE_SPACE = [ESCAPE_DICT.get(chr(_i), '\\u%04x' % _i)
                        for _i in range(32)]
 
 
-def raw_encode_basestring_ascii(space, w_string):
-    if space.isinstance_w(w_string, space.w_bytes):
-        s = space.bytes_w(w_string)
-        for i in range(len(s)):
-            c = s[i]
-            if c >= ' ' and c <= '~' and c != '"' and c != '\\':
-                pass
-            else:
-                first = i
-                break
-        else:
-            # the input is a string with only non-special ascii chars
-            return w_string
-
-        unicodehelper.check_utf8_or_raise(space, s)
-        sb = StringBuilder(len(s))
-        sb.append_slice(s, 0, first)
-    else:
-        # We used to check if 'u' contains only safe characters, and return
-        # 'w_string' directly.  But this requires an extra pass over all
-        # characters, and the expected use case of this function, from
-        # json.encoder, will anyway re-encode a unicode result back to
-        # a string (with the ascii encoding).  This requires two passes
-        # over the characters.  So we may as well directly turn it into a
-        # string here --- only one pass.
-        s = space.utf8_w(w_string)
-        sb = StringBuilder(len(s))
-        first = 0
-
+def encode_utf8_ascii_into(sb, s, first=0):
+    """ Append the ASCII-only JSON representation of the valid utf-8 string
+    's' (without the surrounding quotes) to the StringBuilder 'sb'. The first
+    'first' characters are assumed to have been appended already. """
     it = rutf8.Utf8StringIterator(s)
     for i in range(first):
         it.next()
@@ -77,5 +55,407 @@ def raw_encode_basestring_ascii(space, w_string):
                 sb.append(HEX[(s2 >> 4) & 0x0f])
                 sb.append(HEX[s2 & 0x0f])
 
+
+def raw_encode_basestring_ascii(space, w_string):
+    if space.isinstance_w(w_string, space.w_bytes):
+        s = space.bytes_w(w_string)
+        for i in range(len(s)):
+            c = s[i]
+            if c >= ' ' and c <= '~' and c != '"' and c != '\\':
+                pass
+            else:
+                first = i
+                break
+        else:
+            # the input is a string with only non-special ascii chars
+            return w_string
+
+        unicodehelper.check_utf8_or_raise(space, s)
+        sb = StringBuilder(len(s))
+        sb.append_slice(s, 0, first)
+    else:
+        # We used to check if 'u' contains only safe characters, and return
+        # 'w_string' directly.  But this requires an extra pass over all
+        # characters, and the expected use case of this function, from
+        # json.encoder, will anyway re-encode a unicode result back to
+        # a string (with the ascii encoding).  This requires two passes
+        # over the characters.  So we may as well directly turn it into a
+        # string here --- only one pass.
+        s = space.utf8_w(w_string)
+        sb = StringBuilder(len(s))
+        first = 0
+
+    encode_utf8_ascii_into(sb, s, first)
     res = sb.build()
     return space.newtext(res)
+
+
+def _is_plain_ascii(s):
+    """ Return True if 's' contains only printable ascii characters that
+    don't need escaping, i.e. if it can be copied to the output as is. """
+    for c in s:
+        if not (c >= ' ' and c <= '~' and c != '"' and c != '\\'):
+            return False
+    return True
+
+
+class JSONEncoder(object):
+    """ Serializes a tree of dicts, lists, tuples, strings, numbers, bools and
+    None directly into a StringBuilder, without going through the app-level
+    json.encoder loop. The output is always ascii-only (like ensure_ascii=True
+    in json.encoder). If w_write is not None, the output is passed to it in
+    chunks of roughly chunk_size bytes instead of being built as a whole. """
+
+    DEFAULT_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, space, w_default, skipkeys, check_circular, allow_nan,
+                 item_separator, key_separator, w_write=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        self.space = space
+        self.w_default = w_default
+        self.skipkeys = skipkeys
+        self.check_circular = check_circular
+        self.allow_nan = allow_nan
+        self.item_separator = item_separator
+        self.key_separator = key_separator
+        self.w_write = w_write
+        self.chunk_size = chunk_size
+        self.builder = StringBuilder()
+        # the containers that are currently being encoded, for detecting
+        # circular references
+        self.markers = {}
+
+    # ____________________________________________________________
+    # output
+
+    def maybe_flush(self):
+        if (self.w_write is not None and
+                self.builder.getlength() >= self.chunk_size):
+            self.flush()
+
+    def flush(self):
+        if self.builder.getlength() == 0:
+            return
+        s = self.builder.build()
+        self.builder = StringBuilder()
+        self.space.call_function(self.w_write, self.space.newbytes(s))
+
+    def build(self):
+        return self.builder.build()
+
+    # ____________________________________________________________
+    # markers
+
+    def mark(self, w_obj):
+        if self.check_circular:
+            if w_obj in self.markers:
+                raise oefmt(self.space.w_ValueError,
+                            "Circular reference detected")
+            self.markers[w_obj] = None
+
+    def unmark(self, w_obj):
+        if self.check_circular:
+            del self.markers[w_obj]
+
+    # ____________________________________________________________
+    # leaves
+
+    def append_bytes(self, s):
+        sb = self.builder
+        sb.append('"')
+        if _is_plain_ascii(s):
+            sb.append(s)
+        else:
+            unicodehelper.check_utf8_or_raise(self.space, s)
+            encode_utf8_ascii_into(sb, s)
+        sb.append('"')
+
+    def append_utf8(self, s):
+        sb = self.builder
+        sb.append('"')
+        encode_utf8_ascii_into(sb, s)
+        sb.append('"')
+
+    def append_string(self, w_obj):
+        space = self.space
+        if space.isinstance_w(w_obj, space.w_bytes):
+            self.append_bytes(space.bytes_w(w_obj))
+        else:
+            self.append_utf8(space.utf8_w(w_obj))
+
+    def floatstr(self, x):
+        from pypy.objspace.std.floatobject import float_repr
+        if isfinite(x):
+            return float_repr(x)
+        if x != x:
+            text = 'NaN'
+        elif x > 0.0:
+            text = 'Infinity'
+        else:
+            text = '-Infinity'
+        if not self.allow_nan:
+            raise oefmt(self.space.w_ValueError,
+                        "Out of range float values are not JSON compliant: "
+                        "%s", float_repr(x))
+        return text
+
+    def append_int_or_long(self, w_obj):
+        space = self.space
+        if space.is_w(space.type(w_obj), space.w_int):
+            self.builder.append(str(space.int_w(w_obj)))
+        else:
+            self.builder.append(space.text_w(space.str(w_obj)))
+
+    # ____________________________________________________________
+    # generic dispatch
+
+    def encode(self, w_obj):
+        space = self.space
+        if space.isinstance_w(w_obj, space.w_basestring):
+            self.append_string(w_obj)
+        elif space.is_w(w_obj, space.w_None):
+            self.builder.append('null')
+        elif space.is_w(w_obj, space.w_True):
+            self.builder.append('true')
+        elif space.is_w(w_obj, space.w_False):
+            self.builder.append('false')
+        elif (space.isinstance_w(w_obj, space.w_int) or
+                space.isinstance_w(w_obj, space.w_long)):
+            self.append_int_or_long(w_obj)
+        elif space.isinstance_w(w_obj, space.w_float):
+            self.builder.append(self.floatstr(space.float_w(w_obj)))
+        elif (space.isinstance_w(w_obj, space.w_list) or
+                space.isinstance_w(w_obj, space.w_tuple)):
+            self.encode_list(w_obj)
+        elif space.isinstance_w(w_obj, space.w_dict):
+            self.encode_dict(w_obj)
+        else:
+            self.encode_default(w_obj)
+
+    def encode_default(self, w_obj):
+        space = self.space
+        if self.w_default is None:
+            raise oefmt(space.w_TypeError, "%R is not JSON serializable",
+                        w_obj)
+        self.mark(w_obj)
+        w_res = space.call_function(self.w_default, w_obj)
+        self.encode(w_res)
+        self.unmark(w_obj)
+
+    # ____________________________________________________________
+    # lists
+
+    def encode_list(self, w_list):
+        from pypy.objspace.std.listobject import W_ListObject
+        space = self.space
+        if (type(w_list) is W_ListObject and
+                self.encode_list_unwrapped(w_list)):
+            return
+        if space.is_w(space.type(w_list), space.w_list):
+            items_w = w_list.getitems_copy()
+        else:
+            items_w = space.listview(w_list)
+        if not items_w:
+            self.builder.append('[]')
+            return
+        self.mark(w_list)
+        self.builder.append('[')
+        for i in range(len(items_w)):
+            if i:
+                self.builder.append(self.item_separator)
+            self.encode(items_w[i])
+            self.maybe_flush()
+        self.builder.append(']')
+        self.unmark(w_list)
+
+    def encode_list_unwrapped(self, w_list):
+        """ Fast paths for lists using the int, float or bytes strategies,
+        which never need to box the items. Return False if w_list uses some
+        other strategy. """
+        # none of these paths can call back into app-level code, so there is
+        # no need to mark the list for circularity checks
+        sb = self.builder
+        intlist = w_list.getitems_int()
+        if intlist is not None:
+            sb.append('[')
+            for i in range(len(intlist)):
+                if i:
+                    sb.append(self.item_separator)
+                sb.append(str(intlist[i]))
+                self.maybe_flush()
+            sb.append(']')
+            return True
+        floatlist = w_list.getitems_float()
+        if floatlist is not None:
+            sb.append('[')
+            for i in range(len(floatlist)):
+                if i:
+                    sb.append(self.item_separator)
+                sb.append(self.floatstr(floatlist[i]))
+                self.maybe_flush()
+            sb.append(']')
+            return True
+        byteslist = w_list.getitems_bytes()
+        if byteslist is not None:
+            sb.append('[')
+            for i in range(len(byteslist)):
+                if i:
+                    sb.append(self.item_separator)
+                self.append_bytes(byteslist[i])
+                self.maybe_flush()
+            sb.append(']')
+            return True
+        asciilist = w_list.getitems_ascii()
+        if asciilist is not None:
+            sb.append('[')
+            for i in range(len(asciilist)):
+                if i:
+                    sb.append(self.item_separator)
+                self.append_utf8(asciilist[i])
+                self.maybe_flush()
+            sb.append(']')
+            return True
+        return False
+
+    # ____________________________________________________________
+    # dicts
+
+    def encode_dict(self, w_dict):
+        from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+        from pypy.objspace.std.jsondict import JsonDictStrategy
+        space = self.space
+        if space.is_w(space.type(w_dict), space.w_dict):
+            assert isinstance(w_dict, W_DictMultiObject)
+            if w_dict.length() == 0:
+                self.builder.append('{}')
+                return
+            self.mark(w_dict)
+            self.builder.append('{')
+            strategy = w_dict.get_strategy()
+            if isinstance(strategy, JsonDictStrategy):
+                self.encode_jsondict_items(w_dict, strategy)
+            else:
+                self.encode_dict_items(w_dict)
+        else:
+            # dict subclass: respect an overridden iteritems()
+            if space.len_w(w_dict) == 0:
+                self.builder.append('{}')
+                return
+            self.mark(w_dict)
+            self.builder.append('{')
+            self.encode_dict_subclass_items(w_dict)
+        self.builder.append('}')
+        self.unmark(w_dict)
+
+    def encode_jsondict_items(self, w_dict, strategy):
+        # dicts that come from _pypyjson.loads share their keys (and their
+        # encoded form) with all other dicts of the same jsonmap
+        keys = strategy.jsonmap.get_encoded_keys_in_order()
+        values_w = strategy.unerase(w_dict.dstorage)
+        for i in range(len(values_w)):
+            if i:
+                self.builder.append(self.item_separator)
+            self.builder.append(keys[i])
+            self.builder.append(self.key_separator)
+            self.encode(values_w[i])
+            self.maybe_flush()
+
+    def encode_dict_items(self, w_dict):
+        iterator = w_dict.iteritems()
+        first = True
+        while True:
+            w_key, w_value = iterator.next_item()
+            if w_key is None:
+                break
+            first = self.encode_item(w_key, w_value, first)
+
+    def encode_dict_subclass_items(self, w_dict):
+        space = self.space
+        w_iter = space.iter(space.call_method(w_dict, 'iteritems'))
+        first = True
+        while True:
+            try:
+                w_item = space.next(w_iter)
+            except OperationError as e:
+                if not e.match(space, space.w_StopIteration):
+                    raise
+                break
+            w_key, w_value = space.fixedview(w_item, 2)
+            first = self.encode_item(w_key, w_value, first)
+
+    def encode_item(self, w_key, w_value, first):
+        """ Encode one key/value pair of a dict. Return the new value of
+        'first', i.e. False unless the item was skipped. """
+        space = self.space
+        sb = self.builder
+        if space.isinstance_w(w_key, space.w_basestring):
+            if not first:
+                sb.append(self.item_separator)
+            self.append_string(w_key)
+        else:
+            # JavaScript is weakly typed for these, so it makes sense to
+            # also allow them (same as json.encoder)
+            if space.isinstance_w(w_key, space.w_float):
+                key = self.floatstr(space.float_w(w_key))
+            elif space.is_w(w_key, space.w_True):
+                key = 'true'
+            elif space.is_w(w_key, space.w_False):
+                key = 'false'
+            elif space.is_w(w_key, space.w_None):
+                key = 'null'
+            elif (space.isinstance_w(w_key, space.w_int) or
+                    space.isinstance_w(w_key, space.w_long)):
+                key = space.text_w(space.str(w_key))
+            elif self.skipkeys:
+                return first
+            else:
+                raise oefmt(space.w_TypeError, "key %R is not a string",
+                            w_key)
+            if not first:
+                sb.append(self.item_separator)
+            sb.append('"')
+            sb.append(key)
+            sb.append('"')
+        sb.append(self.key_separator)
+        self.encode(w_value)
+        self.maybe_flush()
+        return False
+
+
+def _make_encoder(space, w_default, skipkeys, check_circular, allow_nan,
+                  item_separator, key_separator, w_write=None,
+                  chunk_size=JSONEncoder.DEFAULT_CHUNK_SIZE):
+    if space.is_none(w_default):
+        w_default = None
+    return JSONEncoder(space, w_default, skipkeys, check_circular, allow_nan,
+                       item_separator, key_separator, w_write, chunk_size)
+
+@jit.dont_look_inside
+@unwrap_spec(skipkeys=bool, check_circular=bool, allow_nan=bool,
+             item_separator='text', key_separator='text')
+def dumps(space, w_obj, w_default=None, skipkeys=False, check_circular=True,
+          allow_nan=True, item_separator=', ', key_separator=': '):
+    """ Serialize obj to an ascii-only JSON str. The arguments have the same
+    meaning as for json.JSONEncoder (separators are passed separately). """
+    encoder = _make_encoder(space, w_default, skipkeys, check_circular,
+                            allow_nan, item_separator, key_separator)
+    encoder.encode(w_obj)
+    return space.newbytes(encoder.build())
+
+@jit.dont_look_inside
+@unwrap_spec(skipkeys=bool, check_circular=bool, allow_nan=bool,
+             item_separator='text', key_separator='text', chunk_size=int)
+def dump(space, w_obj, w_fp, w_default=None, skipkeys=False,
+         check_circular=True, allow_nan=True, item_separator=', ',
+         key_separator=': ', chunk_size=JSONEncoder.DEFAULT_CHUNK_SIZE):
+    """ Like dumps(), but write the result to the file-like object fp in
+    chunks of about chunk_size bytes, so that the whole document never needs
+    to exist as one string. """
+    if chunk_size <= 0:
+        raise oefmt(space.w_ValueError, "chunk_size must be positive")
+    w_write = space.getattr(w_fp, space.newtext('write'))
+    encoder = _make_encoder(space, w_default, skipkeys, check_circular,
+                            allow_nan, item_separator, key_separator,
+                            w_write, chunk_size)
+    encoder.encode(w_obj)
+    encoder.flush()
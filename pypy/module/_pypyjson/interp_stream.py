@@ -0,0 +1,335 @@
+from rpython.rlib import jit
+from rpython.rlib.objectmodel import specialize
+from rpython.rlib.rstring import StringBuilder
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef, interp_attrproperty
+from pypy.module._pypyjson.interp_decoder import JSONDecoder, is_whitespace
+
+# states of the scanner that splits the input into top-level values
+# (or, in items mode, into the elements of the top-level array).
+# SKIP_LINE skips the rest of a line that had a syntax error.
+(BEFORE_VALUE, IN_VALUE, IN_SCALAR, SKIP_LINE,
+ BEFORE_ARRAY, BEFORE_ITEM, AFTER_ITEM, AFTER_ARRAY) = range(8)
+
+
+def is_scalar_end(ch):
+    return (is_whitespace(ch) or ch == ',' or ch == ':' or
+            ch == '[' or ch == ']' or ch == '{' or ch == '}' or ch == '"')
+
+
+class W_StreamDecoder(W_Root):
+    """ A push-parser for JSON. Input is passed to feed() in chunks of any
+    size, and every call returns the values that were completed by that
+    chunk. The input is either a sequence of whitespace-separated values
+    (e.g. newline-delimited JSON), or, in items mode, a single array whose
+    elements are returned one by one.
+
+    After a ValueError, decoding goes on with the next value: a value that
+    cannot be decoded is skipped, and a syntax error between values skips
+    the rest of its line, so that a broken record of newline-delimited JSON
+    only loses that record. In items mode the array cannot be resynchronized
+    after a syntax error, and all later calls raise ValueError.
+
+    Only the not yet decoded tail of the input is kept around, so memory is
+    bounded by the size of the largest value plus one chunk. The chunks of
+    a value that spans several of them are only joined once it is complete.
+    The actual decoding is done by JSONDecoder, which means that the JSONMap
+    tree and the IntCache stay warm across values and chunks. """
+
+    # the cache of keys is emptied when it gets bigger than this
+    MAX_CACHED_KEYS = 4096
+
+    def __init__(self, space, items):
+        self.space = space
+        self.items = items
+        self.buf = ""         # the input that was not decoded yet
+        # the chunks after buf, already scanned, in the middle of a value
+        self.chunks = []
+        self.consumed = 0     # number of bytes dropped from the front of buf
+        self.pos = 0          # scanning position in buf
+        self.start = 0        # start of the value being scanned
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.item_expected = False
+        if items:
+            self.state = BEFORE_ARRAY
+        else:
+            self.state = BEFORE_VALUE
+        self.closed = False
+        self.failed = False
+        # values that were decoded before an error occurred, returned by the
+        # next call to feed() or close()
+        self.pending_w = []
+        # the cache of keys is kept across values and chunks, up to
+        # MAX_CACHED_KEYS keys
+        self.cache_keys = {}
+
+    @jit.dont_look_inside
+    def feed_w(self, w_data):
+        """ Pass the next chunk of the input. Returns a list of the values
+        that were completed by it. """
+        space = self.space
+        if space.isinstance_w(w_data, space.w_unicode):
+            raise oefmt(space.w_TypeError,
+                        "Expected utf8-encoded str, got unicode")
+        data = space.bytes_w(w_data)
+        self._check_not_closed()
+        self._append(data)
+        return space.newlist(self._decode_available(eof=False))
+
+    @jit.dont_look_inside
+    def close_w(self):
+        """ Signal the end of the input. Returns a list of the remaining
+        values, raises ValueError if the input ended in the middle of a
+        value. """
+        space = self.space
+        self._check_not_closed()
+        self.closed = True
+        if self.chunks:
+            self._join_chunks("")
+        result_w = self._decode_available(eof=True)
+        state = self.state
+        if state == IN_VALUE:
+            raise oefmt(space.w_ValueError,
+                        "Unterminated value starting at char %d",
+                        self.consumed + self.start)
+        elif state == BEFORE_ARRAY:
+            raise oefmt(space.w_ValueError, "No JSON array could be decoded")
+        elif state == BEFORE_ITEM or state == AFTER_ITEM:
+            raise oefmt(space.w_ValueError, "Unterminated array")
+        self.buf = ""
+        return space.newlist(result_w)
+
+    def _check_not_closed(self):
+        if self.closed:
+            raise oefmt(self.space.w_ValueError,
+                        "operation on closed StreamDecoder")
+        if self.failed:
+            raise oefmt(self.space.w_ValueError,
+                        "operation on a StreamDecoder that failed on an "
+                        "invalid array")
+
+    def _append(self, data):
+        state = self.state
+        if ((state == IN_VALUE or state == IN_SCALAR) and
+                self.pos == len(self.buf)):
+            # in the middle of a value: as long as it does not end, keep the
+            # chunks in a list instead of copying the whole value every time
+            if not self._ends_in(data):
+                self.chunks.append(data)
+                return
+        self._join_chunks(data)
+
+    def _ends_in(self, data):
+        if self.state == IN_VALUE:
+            # this only saves the state of the scanner if the value does not
+            # end in data
+            return self._scan_in_value(data, 0) >= 0
+        for ch in data:
+            if is_scalar_end(ch):
+                return True
+        return False
+
+    def _join_chunks(self, data):
+        # drop everything before the value that is being scanned
+        if self.state == IN_VALUE or self.state == IN_SCALAR:
+            drop = self.start
+        else:
+            drop = self.pos
+        assert drop >= 0
+        builder = StringBuilder()
+        builder.append_slice(self.buf, drop, len(self.buf))
+        scanned = 0
+        for chunk in self.chunks:
+            builder.append(chunk)
+            scanned += len(chunk)
+        builder.append(data)
+        self.buf = builder.build()
+        self.chunks = []
+        self.consumed += drop
+        self.pos += scanned - drop
+        self.start -= drop
+
+    def _decode_available(self, eof):
+        space = self.space
+        result_w = self.pending_w
+        self.pending_w = []
+        decoder = None
+        try:
+            while True:
+                end = self._scan(eof)
+                if end < 0:
+                    break
+                if decoder is None:
+                    decoder = JSONDecoder(space, self.buf)
+                    decoder.cache_keys = self.cache_keys
+                w_value = decoder.decode_any(self.start)
+                if decoder.pos != end:
+                    raise oefmt(space.w_ValueError,
+                                "Extra data: char %d - %d",
+                                self.consumed + decoder.pos,
+                                self.consumed + end - 1)
+                result_w.append(w_value)
+                if len(self.cache_keys) > self.MAX_CACHED_KEYS:
+                    self.cache_keys = {}
+                    decoder.cache_keys = self.cache_keys
+        except OperationError:
+            # the broken value is skipped, keep the ones before it
+            self.pending_w = result_w
+            raise
+        finally:
+            if decoder is not None:
+                decoder.close()
+        return result_w
+
+    def _value_found(self, end):
+        if self.items:
+            self.state = AFTER_ITEM
+        else:
+            self.state = BEFORE_VALUE
+        self.pos = end
+        return end
+
+    @specialize.arg(1)
+    def _error(self, msg, ch, i):
+        if self.items:
+            self.failed = True
+        else:
+            # the next value is looked for on the next line
+            self.state = SKIP_LINE
+            self.pos = i + 1
+        raise oefmt(self.space.w_ValueError, msg, ch, self.consumed + i)
+
+    def _scan(self, eof):
+        """ Advance the scanner over self.buf. Returns the end of the next
+        complete value (which starts at self.start), or -1 if more input is
+        needed. """
+        buf = self.buf
+        length = len(buf)
+        i = self.pos
+        while i < length:
+            state = self.state
+            if state == IN_VALUE:
+                i = self._scan_in_value(buf, i)
+                if i < 0:
+                    break
+                return self._value_found(i)
+            ch = buf[i]
+            if state == IN_SCALAR:
+                if is_scalar_end(ch):
+                    return self._value_found(i)
+            elif state == SKIP_LINE:
+                if ch == '\n':
+                    self.state = BEFORE_VALUE
+            elif is_whitespace(ch):
+                pass
+            elif state == BEFORE_VALUE:
+                self._start_value(ch, i)
+            elif state == BEFORE_ITEM:
+                if ch == ']' and not self.item_expected:
+                    self.state = AFTER_ARRAY
+                else:
+                    self._start_value(ch, i)
+            elif state == AFTER_ITEM:
+                if ch == ',':
+                    self.state = BEFORE_ITEM
+                    self.item_expected = True
+                elif ch == ']':
+                    self.state = AFTER_ARRAY
+                else:
+                    self._error("Unexpected '%s' when decoding array (char %d)",
+                                ch, i)
+            elif state == BEFORE_ARRAY:
+                if ch != '[':
+                    self._error("Unexpected '%s' instead of an array (char %d)",
+                                ch, i)
+                self.state = BEFORE_ITEM
+                self.item_expected = False
+            else:
+                assert state == AFTER_ARRAY
+                self._error("Extra data: unexpected '%s' at char %d", ch, i)
+            i += 1
+        else:
+            if eof and self.state == IN_SCALAR:
+                return self._value_found(length)
+        self.pos = length
+        return -1
+
+    def _start_value(self, ch, i):
+        if ch == ']' or ch == '}' or ch == ',' or ch == ':':
+            self._error("No JSON object could be decoded: unexpected '%s' "
+                        "at char %d", ch, i)
+        self.start = i
+        if ch == '{' or ch == '[':
+            self.state = IN_VALUE
+            self.depth = 1
+            self.in_string = False
+        elif ch == '"':
+            self.state = IN_VALUE
+            self.depth = 0
+            self.in_string = True
+        else:
+            self.state = IN_SCALAR
+        self.escaped = False
+        self.item_expected = False
+
+    def _scan_in_value(self, buf, i):
+        """ Find the end of the string, array or object that is being
+        scanned, starting from position i. Returns -1 if it doesn't end
+        within buf. """
+        depth = self.depth
+        in_string = self.in_string
+        escaped = self.escaped
+        length = len(buf)
+        while i < length:
+            ch = buf[i]
+            i += 1
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == '\\':
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+                    if depth == 0:
+                        return i
+            elif ch == '"':
+                in_string = True
+            elif ch == '[' or ch == '{':
+                depth += 1
+            elif ch == ']' or ch == '}':
+                depth -= 1
+                if depth == 0:
+                    return i
+        self.depth = depth
+        self.in_string = in_string
+        self.escaped = escaped
+        return -1
+
+
+@unwrap_spec(items=bool)
+def W_StreamDecoder___new__(space, w_subtype, items=False):
+    w_decoder = space.allocate_instance(W_StreamDecoder, w_subtype)
+    decoder = space.interp_w(W_StreamDecoder, w_decoder)
+    W_StreamDecoder.__init__(decoder, space, items)
+    return w_decoder
+
+W_StreamDecoder.typedef = TypeDef(
+    '_pypyjson.StreamDecoder',
+    __new__ = interp2app(W_StreamDecoder___new__),
+    feed = interp2app(W_StreamDecoder.feed_w),
+    close = interp2app(W_StreamDecoder.close_w),
+    items = interp_attrproperty('items', W_StreamDecoder, wrapfn="newbool"),
+    __doc__ = """StreamDecoder(items=False)
+
+Incremental JSON decoder. Pass the input in chunks to feed(), which
+returns the list of values completed so far, and finish with close().
+If items is true, the input must be a single array and its elements are
+returned one by one.
+
+After a ValueError, decoding goes on with the next value; a syntax error
+between values skips the rest of its line. In items mode, a syntax error
+in the array makes all later calls raise ValueError.""")
@@ -3,10 +3,16 @@ from pypy.interpreter.mixedmodule import MixedModule
 class Module(MixedModule):
     """fast json implementation"""
 
-    appleveldefs = {}
+    appleveldefs = {
+        'iterload' : 'app_stream.iterload',
+        }
 
     interpleveldefs = {
         'loads' : 'interp_decoder.loads',
+        'loads_columns' : 'interp_decoder.loads_columns',
+        'StreamDecoder' : 'interp_stream.W_StreamDecoder',
+        'dumps' : 'interp_encoder.dumps',
+        'dump' : 'interp_encoder.dump',
         'raw_encode_basestring_ascii':
             'interp_encoder.raw_encode_basestring_ascii',
         }
@@ -225,6 +225,9 @@ class TestJson(object):
         assert m5.state == MapBase.BLOCKED
         assert m5.nextmap_first is None
         assert m5.nextmap_all is None
+        # m5 is not part of the tree any more
+        assert base.num_maps == 4
+        base._check_invariants()
 
     def test_deal_with_blocked(self):
         w_a = self.space.newutf8("a", 1)
@@ -272,6 +275,87 @@ class TestJson(object):
         assert m2.instantiation_count == 2
         dec.close()
 
+    def _decode_with_terminator(self, base, s):
+        dec = JSONDecoder(self.space, s)
+        dec.startmap = base
+        try:
+            return dec.decode_any(0)
+        finally:
+            dec.close()
+
+    def test_map_stats(self):
+        base = Terminator(self.space)
+        self._decode_with_terminator(base, '[{"a": 1, "b": 2}, {"a": 3, "b": 4}, {"a": 5}]')
+        stats = dict(base.get_stats())
+        assert stats["maps"] == base.num_maps == 2
+        assert stats["maps_created"] == 2
+        assert stats["transitions"] == 5
+        assert stats["instantiations"] == 5
+        assert stats["maps_evicted"] == 0
+        assert stats["bytes_held"] > 0
+        assert base.clock == 3
+
+    def test_evict_lru(self):
+        space = self.space
+        base = Terminator(space)
+        self._decode_with_terminator(base, '[{"a": 1, "b": 2}, {"a": 1, "c": 2}]')
+        self._decode_with_terminator(base, '[{"x": 1, "y": 2}]')
+        self._decode_with_terminator(base, '[{"a": 1, "b": 2}]')
+        assert base.num_maps == 5
+        m_a = base.nextmap_all[space.newutf8("a", 1)]
+        m_ab = m_a.nextmap_all[space.newutf8("b", 1)]
+        m_ac = m_a.nextmap_all[space.newutf8("c", 1)]
+        m_x = base.nextmap_all[space.newutf8("x", 1)]
+        base._check_invariants()
+        base.evict(4)
+        # "a" -> "c" was used least recently
+        assert base.num_maps == 4
+        assert base.maps_evicted == 1
+        assert m_ac.evicted
+        assert [w_key._utf8 for w_key in m_a.nextmap_all] == ["b"]
+        assert m_a.nextmap_first is m_ab
+        base._check_invariants()
+        base.evict(2)
+        # then the subtree of "x"
+        assert base.num_maps == 3 - 1
+        assert m_x.evicted
+        assert not m_ab.evicted
+        assert base.number_of_leaves == 1
+        base._check_invariants()
+        # evicted maps are created anew
+        w_res = self._decode_with_terminator(base, '{"x": 1, "y": 2}')
+        assert base.nextmap_all[space.newutf8("x", 1)] is not m_x
+        assert space.int_w(space.len(w_res)) == 2
+
+    def test_evict_in_close(self):
+        base = Terminator(self.space)
+        base.max_maps = 4
+        s = "[" + ", ".join(['{"k%d": 1, "v": 2}' % i for i in range(10)]) + "]"
+        self._decode_with_terminator(base, s)
+        # whole subtrees are evicted, until at most 3 maps are left
+        assert base.num_maps == 2
+        assert base.maps_created == 20
+        assert base.maps_evicted == 18
+        base._check_invariants()
+
+    def test_evict_after_blocking(self):
+        base = Terminator(self.space)
+        # more than MAX_FRINGE distinct schemas: some maps get blocked
+        for i in range(MapBase.MAX_FRINGE * 3):
+            self._decode_with_terminator(
+                base, '[{"k%d": 1, "a": {"x": 1}, "b": 2}]' % i)
+            base._check_invariants()
+        assert dict(base.get_stats())["blocked"] > 0
+        base.max_maps = 40
+        self._decode_with_terminator(base, '{"k0": 1}')
+        all_maps = []
+        base._collect_maps(all_maps)
+        assert len(all_maps) == base.num_maps <= 30
+        # the tree is not emptied again by the following calls
+        self._decode_with_terminator(base, '{"k0": 1}')
+        assert base.num_maps > 0
+        base._check_invariants()
+
 
 class AppTest(object):
     spaceconfig = {"objspace.usemodules._pypyjson": True}
@@ -541,3 +625,300 @@ class AppTest(object):
         a = '{"abc": "4", "k": 1, "k": 1.5, "c": null, "k": 2}'
         d = _pypyjson.loads(a)
         assert d == {u"abc": u"4", u"c": None, u"k": 2}
+
+    def test_dumps_constants_and_numbers(self):
+        import _pypyjson
+        assert _pypyjson.dumps(None) == 'null'
+        assert _pypyjson.dumps(True) == 'true'
+        assert _pypyjson.dumps(False) == 'false'
+        assert _pypyjson.dumps(42) == '42'
+        assert _pypyjson.dumps(-42L) == '-42'
+        assert _pypyjson.dumps(1 << 100) == str(1 << 100)
+        assert _pypyjson.dumps(1.5) == '1.5'
+        assert _pypyjson.dumps(1e300) == '1e+300'
+        assert _pypyjson.dumps(float('inf')) == 'Infinity'
+        assert _pypyjson.dumps(float('-inf')) == '-Infinity'
+        assert _pypyjson.dumps(float('nan')) == 'NaN'
+        raises(ValueError, _pypyjson.dumps, float('nan'), allow_nan=False)
+
+    def test_dumps_strings(self):
+        import _pypyjson
+        assert _pypyjson.dumps("abc") == '"abc"'
+        assert _pypyjson.dumps(u"abc") == '"abc"'
+        res = _pypyjson.dumps(u"a\xe9\U00012345\"\\\n")
+        assert type(res) is str
+        assert res == '"a\\u00e9\\ud808\\udf45\\"\\\\\\n"'
+        assert _pypyjson.dumps("\xc3\xa9") == '"\\u00e9"'
+        raises(UnicodeDecodeError, _pypyjson.dumps, "\xc0")
+
+    def test_dumps_lists(self):
+        import _pypyjson
+        assert _pypyjson.dumps([]) == '[]'
+        assert _pypyjson.dumps(()) == '[]'
+        assert _pypyjson.dumps([1, 2, 3]) == '[1, 2, 3]'
+        assert _pypyjson.dumps([1.5, 2.0]) == '[1.5, 2.0]'
+        assert _pypyjson.dumps(["a", "b\n"]) == '["a", "b\\n"]'
+        assert _pypyjson.dumps([u"a", u"b"]) == '["a", "b"]'
+        assert _pypyjson.dumps((1, "x", None, [True])) == \
+            '[1, "x", null, [true]]'
+        assert _pypyjson.dumps([1, 2], item_separator=',') == '[1,2]'
+        class MyList(list):
+            def __iter__(self):
+                return iter([42])
+        assert _pypyjson.dumps(MyList([1, 2])) == '[42]'
+
+    def test_dumps_dicts(self):
+        import _pypyjson
+        assert _pypyjson.dumps({}) == '{}'
+        assert _pypyjson.dumps({"a": 1}) == '{"a": 1}'
+        assert _pypyjson.dumps({u"a": [1, {}]}) == '{"a": [1, {}]}'
+        assert _pypyjson.dumps({1: 2}) == '{"1": 2}'
+        assert _pypyjson.dumps({1.5: 2}) == '{"1.5": 2}'
+        assert _pypyjson.dumps({True: None}) == '{"true": null}'
+        assert _pypyjson.dumps({None: 1}) == '{"null": 1}'
+        assert _pypyjson.dumps({"a": 1}, key_separator=':') == '{"a":1}'
+        raises(TypeError, _pypyjson.dumps, {(1,): 2})
+        assert _pypyjson.dumps({(1,): 2}, skipkeys=True) == '{}'
+        assert _pypyjson.dumps({(1,): 2, "a": 3}, skipkeys=True) == '{"a": 3}'
+
+    def test_dumps_jsondict(self):
+        import _pypyjson
+        s = '[{"a": 1, "b\\u00e9": [1.5, "x"]}, {"a": 2, "b\\u00e9": null}]'
+        obj = _pypyjson.loads(s)
+        res = _pypyjson.dumps(obj)
+        assert res == '[{"a": 1, "b\\u00e9": [1.5, "x"]}, {"a": 2, "b\\u00e9": null}]'
+        assert _pypyjson.loads(res) == obj
+
+    def test_dumps_default(self):
+        import _pypyjson
+        class A(object):
+            pass
+        raises(TypeError, _pypyjson.dumps, A())
+        raises(TypeError, _pypyjson.dumps, [A()])
+        assert _pypyjson.dumps([A()], lambda o: "A") == '["A"]'
+        assert _pypyjson.dumps(A(), lambda o: [1, o.__class__.__name__]) == \
+            '[1, "A"]'
+
+    def test_dumps_circular(self):
+        import _pypyjson
+        l = [1]
+        l.append(l)
+        raises(ValueError, _pypyjson.dumps, l)
+        d = {}
+        d["d"] = d
+        raises(ValueError, _pypyjson.dumps, d)
+        a = object()
+        raises(ValueError, _pypyjson.dumps, a, lambda o: [o])
+        raises(RuntimeError, _pypyjson.dumps, l, check_circular=False)
+
+    def test_dump_chunked(self):
+        import _pypyjson
+        class F(object):
+            def __init__(self):
+                self.chunks = []
+            def write(self, s):
+                assert type(s) is str
+                self.chunks.append(s)
+        obj = [{"key": i, "value": [i * 0.5, str(i)]} for i in range(1000)]
+        f = F()
+        _pypyjson.dump(obj, f, chunk_size=100)
+        assert len(f.chunks) > 10
+        assert "".join(f.chunks) == _pypyjson.dumps(obj)
+        f = F()
+        _pypyjson.dump(obj, f)
+        assert len(f.chunks) == 1
+        f = F()
+        _pypyjson.dump([], f)
+        assert f.chunks == ["[]"]
+        raises(ValueError, _pypyjson.dump, obj, f, chunk_size=0)
+
+    def test_stream_decoder_values(self):
+        import _pypyjson
+        d = _pypyjson.StreamDecoder()
+        assert d.items is False
+        assert d.feed('{"a": 1, "b": [1, 2]}\n{"a"') == [{u"a": 1, u"b": [1, 2]}]
+        assert d.feed(': 2, "b": "x]}"}\n') == [{u"a": 2, u"b": u"x]}"}]
+        assert d.feed('"str\\"') == []
+        assert d.feed('ing" 12') == [u'str"ing']
+        assert d.feed('3 true') == [123]
+        assert d.feed(' null [] {} 1') == [True, None, [], {}]
+        assert d.close() == [1]
+        raises(ValueError, d.feed, '1')
+
+    def test_stream_decoder_char_by_char(self):
+        import _pypyjson
+        s = '{"a": [1, 2.5, "x\\\\"], "b": {"c": null}} -12 "\\u1234" [] 1E3'
+        expected = [{u"a": [1, 2.5, u"x\\"], u"b": {u"c": None}}, -12,
+                    u"\u1234", [], 1000.0]
+        d = _pypyjson.StreamDecoder()
+        res = []
+        for c in s:
+            res.extend(d.feed(c))
+        res.extend(d.close())
+        assert res == expected
+
+    def test_stream_decoder_long_value(self):
+        import _pypyjson
+        d = _pypyjson.StreamDecoder()
+        assert d.feed('1 [') == [1]
+        for i in range(1000):
+            assert d.feed('{"k%d": "a\\"' % i) == []
+            assert d.feed(',]"}, ') == []
+        expected = [{u"k%d" % i: u'a",]'} for i in range(1000)] + [0]
+        assert d.feed('0] 12') == [expected]
+        assert d.feed('3') == []
+        assert d.feed('4') == []
+        assert d.close() == [1234]
+
+    def test_stream_decoder_items(self):
+        import _pypyjson
+        d = _pypyjson.StreamDecoder(items=True)
+        assert d.feed(' [ 1, {"a": [') == [1]
+        assert d.feed('2]}, "x", 3') == [{u"a": [2]}, u"x"]
+        assert d.feed(']  ') == [3]
+        assert d.close() == []
+        d = _pypyjson.StreamDecoder(items=True)
+        assert d.feed('[]') == []
+        assert d.close() == []
+
+    def test_stream_decoder_errors(self):
+        import _pypyjson
+        d = _pypyjson.StreamDecoder()
+        raises(TypeError, d.feed, u'1')
+        d = _pypyjson.StreamDecoder()
+        assert d.feed('[1, 2') == []
+        raises(ValueError, d.close)
+        d = _pypyjson.StreamDecoder()
+        exc = raises(ValueError, d.feed, '1 2 tru 3 ')
+        assert d.feed('4 ') == [1, 2, 3, 4]
+        d = _pypyjson.StreamDecoder()
+        raises(ValueError, d.feed, '{"a": 1 "b": 2} ')
+        d = _pypyjson.StreamDecoder(items=True)
+        raises(ValueError, d.feed, '{}')
+        d = _pypyjson.StreamDecoder(items=True)
+        raises(ValueError, d.feed, '[1 2]')
+        d = _pypyjson.StreamDecoder(items=True)
+        raises(ValueError, d.feed, '[1,]')
+        d = _pypyjson.StreamDecoder(items=True)
+        raises(ValueError, d.feed, '[1] 2')
+        d = _pypyjson.StreamDecoder(items=True)
+        d.feed('[1, 2')
+        raises(ValueError, d.close)
+        d = _pypyjson.StreamDecoder(items=True)
+        raises(ValueError, d.close)
+
+    def test_stream_decoder_recovers(self):
+        import _pypyjson
+        d = _pypyjson.StreamDecoder()
+        assert d.feed('{"a": 1}\n') == [{u"a": 1}]
+        raises(ValueError, d.feed, '{"a": 2}}, {"a": ')
+        # the rest of the broken line is skipped, also in the next chunks
+        assert d.feed('3}\n{"a": 4}\n') == [{u"a": 2}, {u"a": 4}]
+        raises(ValueError, d.feed, '] 5\n6 ')
+        assert d.feed('7') == [6]
+        assert d.close() == [7]
+        # in items mode, the decoder is unusable after a syntax error
+        d = _pypyjson.StreamDecoder(items=True)
+        raises(ValueError, d.feed, '[1 2]')
+        exc = raises(ValueError, d.feed, '')
+        assert "failed" in str(exc.value)
+        raises(ValueError, d.close)
+
+    def test_iterload(self):
+        import _pypyjson
+        from StringIO import StringIO
+        lines = ['{"id": %d, "name": "n%d"}' % (i, i) for i in range(100)]
+        f = StringIO("\n".join(lines))
+        res = list(_pypyjson.iterload(f, chunk_size=7))
+        assert res == [{u"id": i, u"name": u"n%d" % i} for i in range(100)]
+        f = StringIO("[" + ", ".join(lines) + "]")
+        res = list(_pypyjson.iterload(f, items=True, chunk_size=13))
+        assert res == [{u"id": i, u"name": u"n%d" % i} for i in range(100)]
+
+    def test_loads_buffers(self):
+        import _pypyjson
+        s = '{"a": [1, 2.5, "x\\u00e9"], "b": {"c": null}, "d\\n": "\\\\"}'
+        expected = {u"a": [1, 2.5, u"x\xe9"], u"b": {u"c": None},
+                    u"d\n": u"\\"}
+        assert _pypyjson.loads(bytearray(s)) == expected
+        assert _pypyjson.loads(memoryview(s)) == expected
+        assert _pypyjson.loads(memoryview(bytearray(s))) == expected
+        assert _pypyjson.loads(buffer('  [1, 2]', 2)) == [1, 2]
+        raises(ValueError, _pypyjson.loads, bytearray('[1, 2] x'))
+        raises(ValueError, _pypyjson.loads, bytearray(''))
+        raises(TypeError, _pypyjson.loads, 42)
+        # a '\0' in the buffer is an error, like in a str
+        for s in ['[1, 2]\0', '\0', '["ab\0', '"\\u12\0', '[1.5e\0',
+                  '{"a\0', '{"a": tru\0']:
+            raises(ValueError, _pypyjson.loads, bytearray(s))
+        assert _pypyjson.loads(buffer('[1, 2]\0', 0, 6)) == [1, 2]
+
+    def test_loads_columns(self):
+        import _pypyjson
+        import __pypy__
+        s = '[' + ', '.join(['{"id": %d, "x": %d.5, "name": "n%d", "o": %s}'
+                             % (i, i, i, ["null", "true", "[1]"][i % 3])
+                             for i in range(50)]) + ']'
+        res = _pypyjson.loads_columns(s)
+        assert res == {u"id": range(50),
+                       u"x": [i + 0.5 for i in range(50)],
+                       u"name": [u"n%d" % i for i in range(50)],
+                       u"o": [[None, True, [1]][i % 3] for i in range(50)]}
+        assert __pypy__.strategy(res[u"id"]) == "IntegerListStrategy"
+        assert __pypy__.strategy(res[u"x"]) == "FloatListStrategy"
+        assert _pypyjson.loads_columns(' [ ] ') == {}
+        assert _pypyjson.loads_columns(bytearray('[{"a": -1e2}]')) == {
+            u"a": [-100.0]}
+
+    def test_loads_columns_mixed(self):
+        import _pypyjson
+        res = _pypyjson.loads_columns(
+            '[{"a": 1, "b": 1.5}, {"a": 2.5, "b": 2}, '
+            '{"a": 123456789012345678901234567890, "b": -Infinity}]')
+        assert res == {u"a": [1, 2.5, 123456789012345678901234567890],
+                       u"b": [1.5, 2, float("-inf")]}
+        # keys are compared by value, not by spelling
+        res = _pypyjson.loads_columns('[{"a": 1}, {"\\u0061": 2}]')
+        assert res == {u"a": [1, 2]}
+
+    def test_loads_columns_errors(self):
+        import _pypyjson
+        for s in ['{"a": 1}', '[1, 2]', '[{}]', '[{"a": 1}, {"b": 2}]',
+                  '[{"a": 1}, {"a": 1, "b": 2}]', '[{"a": 1, "b": 2}, {"a": 1}]',
+                  '[{"a": 1, "b": 2}, {"b": 2, "a": 1}]', '[{"a": 1, "a": 2}]',
+                  '[{"a": 1}', '[{"a": 1}] x', '[{"a": 01}]', '[{"a" 1}]']:
+            raises(ValueError, _pypyjson.loads_columns, s)
+
+
+class AppTestMmap(object):
+    spaceconfig = {"usemodules": ["_pypyjson", "mmap"]}
+
+    def test_loads_mmap(self):
+        import _pypyjson, mmap
+        s = '[' + ', '.join(['{"id": %d, "tag": "t%d"}' % (i, i % 3)
+                             for i in range(500)]) + ']'
+        m = mmap.mmap(-1, len(s))
+        m.write(s)
+        res = _pypyjson.loads(m)
+        assert res == [{u"id": i, u"tag": u"t%d" % (i % 3)}
+                       for i in range(500)]
+        m.close()
+
+    def test_jsonmap_cache_stats(self):
+        import _pypyjson, __pypy__
+        _pypyjson.loads('[{"stats_a": 1, "stats_b": 2}] ' * 1)
+        stats = __pypy__.jsonmap_cache_stats()
+        assert stats["maps"] >= 2
+        assert stats["maps_created"] >= 2
+        assert 0.0 <= stats["hit_rate"] <= 1.0
+        old = __pypy__.set_jsonmap_cache_limit(0)
+        try:
+            assert old == stats["max_maps"]
+            stats = __pypy__.jsonmap_cache_stats()
+            assert stats["maps"] == 0
+            assert stats["max_maps"] == 0
+            assert stats["maps_evicted"] >= 2
+            assert _pypyjson.loads('{"stats_a": 1}') == {u"stats_a": 1}
+            assert __pypy__.jsonmap_cache_stats()["maps"] == 0
+        finally:
+            __pypy__.set_jsonmap_cache_limit(old)
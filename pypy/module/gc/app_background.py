@@ -0,0 +1,51 @@
+# NOT_RPYTHON
+
+import gc
+
+_running = []
+
+def start_background_collector(max_steps=8, interval=0.001,
+                               max_interval=0.1):
+    """Start a helper thread that runs the major collection steps, instead
+    of the threads allocating memory.  The helper wakes up every 'interval'
+    seconds and runs the steps that are pending; it needs the GIL to do so,
+    which it usually gets while the other threads wait for I/O.  While no
+    step is pending, it sleeps twice as long each time, up to
+    'max_interval' seconds.  If more than 'max_steps' steps are pending,
+    the allocating threads run them again.  See gc.set_deferred_steps().
+    """
+    if _running:
+        raise RuntimeError("the background collector is already running")
+    if max_steps <= 0:
+        raise ValueError("max_steps must be > 0")
+    if interval <= 0 or max_interval < interval:
+        raise ValueError("need 0 < interval <= max_interval")
+    import thread, time
+    token = object()
+    _running.append(token)
+
+    def collector():
+        delay = interval
+        while _running and _running[0] is token:
+            time.sleep(delay)
+            if gc.collect_deferred_steps() > 0:
+                delay = interval
+            else:
+                delay = min(delay * 2, max_interval)
+
+    gc.set_deferred_steps(max_steps)
+    try:
+        thread.start_new_thread(collector, ())
+    except:
+        gc.set_deferred_steps(0)
+        del _running[:]
+        raise
+
+def stop_background_collector():
+    """Stop the helper thread started by start_background_collector().
+    From now on, the threads allocating memory run all the major collection
+    steps again."""
+    if not _running:
+        return
+    del _running[:]
+    gc.set_deferred_steps(0)
@@ -34,7 +34,8 @@ class LowLevelGcHooks(GcHooks):
     def is_gc_collect_enabled(self):
         return self.w_hooks.gc_collect_enabled
 
-    def on_gc_minor(self, duration, total_memory_used, pinned_objects):
+    def on_gc_minor(self, duration, total_memory_used, pinned_objects,
+                    nursery_size, surviving_size):
         action = self.w_hooks.gc_minor
         action.count += 1
         action.duration += duration
@@ -42,6 +43,8 @@ class LowLevelGcHooks(GcHooks):
         action.duration_max = max(action.duration_max, duration)
         action.total_memory_used = total_memory_used
         action.pinned_objects = pinned_objects
+        action.nursery_size = nursery_size
+        action.surviving_size = surviving_size
         action.fire()
 
     def on_gc_collect_step(self, duration, oldstate, newstate):
@@ -134,6 +137,8 @@ class NoRecursiveAction(AsyncAction):
 class GcMinorHookAction(NoRecursiveAction):
     total_memory_used = 0
     pinned_objects = 0
+    nursery_size = 0
+    surviving_size = 0
 
     def __init__(self, space):
         NoRecursiveAction.__init__(self, space)
@@ -157,6 +162,8 @@ class GcMinorHookAction(NoRecursiveAction):
             self.duration_max = NonConstant(-53.2)
             self.total_memory_used = NonConstant(r_uint(42))
             self.pinned_objects = NonConstant(-42)
+            self.nursery_size = NonConstant(-42)
+            self.surviving_size = NonConstant(-42)
             self.fire()
 
     def _do_perform(self, ec, frame):
@@ -166,7 +173,9 @@ class GcMinorHookAction(NoRecursiveAction):
             self.duration_min,
             self.duration_max,
             self.total_memory_used,
-            self.pinned_objects)
+            self.pinned_objects,
+            self.nursery_size,
+            self.surviving_size)
         self.reset()
         self.space.call_function(self.w_callable, w_stats)
 
@@ -261,13 +270,16 @@ class GcCollectHookAction(NoRecursiveAction):
 class W_GcMinorStats(W_Root):
 
     def __init__(self, count, duration, duration_min, duration_max,
-                 total_memory_used, pinned_objects):
+                 total_memory_used, pinned_objects, nursery_size,
+                 surviving_size):
         self.count = count
         self.duration = duration
         self.duration_min = duration_min
         self.duration_max = duration_max
         self.total_memory_used = total_memory_used
         self.pinned_objects = pinned_objects
+        self.nursery_size = nursery_size
+        self.surviving_size = surviving_size
 
 
 class W_GcCollectStepStats(W_Root):
@@ -352,7 +364,9 @@ W_GcMinorStats.typedef = TypeDef(
         "duration_min",
         "duration_max",
         "total_memory_used",
-        "pinned_objects"))
+        "pinned_objects",
+        "nursery_size",
+        "surviving_size"))
     )
 
 W_GcCollectStepStats.typedef = TypeDef(
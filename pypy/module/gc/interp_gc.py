@@ -119,9 +119,24 @@ class StepCollector(object):
             newstate = newstate,
             major_is_done = major_is_done)
 
+    def do_deferred(self):
+        """
+        Run the major collection steps that the GC left pending, and then
+        the app-level finalizers if the major collection is done.  Return
+        the number of steps.
+        """
+        count = 0
+        while self.finalizing or self._deferred_steps() > 0:
+            self.do()
+            count += 1
+        return count
+
     def _collect_step(self):
         return rgc.collect_step()
 
+    def _deferred_steps(self):
+        return rgc.get_stats(rgc.DEFERRED_MAJOR_STEPS)
+
     def _run_finalizers(self):
         _run_finalizers(self.space)
 
@@ -135,6 +150,26 @@ def collect_step(space):
     w_stats = sc.do()
     return w_stats
 
+@unwrap_spec(max_steps=int)
+def set_deferred_steps(space, max_steps):
+    """
+    Let up to 'max_steps' major collection steps be skipped by the program
+    while it allocates, and be left to collect_deferred_steps() instead.
+    If more steps are pending, the program runs all of them again.
+    The default, 0, means that no step is ever deferred.
+    """
+    if max_steps < 0:
+        raise oefmt(space.w_ValueError, "max_steps must be >= 0")
+    rgc.set_deferred_major_steps(max_steps)
+
+def collect_deferred_steps(space):
+    """
+    Run the major collection steps left pending since set_deferred_steps()
+    was called, typically from a helper thread.  Return the number of steps.
+    """
+    sc = space.fromcache(StepCollector)
+    return space.newint(sc.do_deferred())
+
 # ____________________________________________________________
 
 @unwrap_spec(filename='fsencode')
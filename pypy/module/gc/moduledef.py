@@ -20,9 +20,15 @@ class Module(MixedModule):
             self.appleveldefs.update({
                 'dump_rpy_heap': 'app_referents.dump_rpy_heap',
                 'get_stats': 'app_referents.get_stats',
+                'start_background_collector':
+                    'app_background.start_background_collector',
+                'stop_background_collector':
+                    'app_background.stop_background_collector',
                 })
             self.interpleveldefs.update({
                 'collect_step': 'interp_gc.collect_step',
+                'set_deferred_steps': 'interp_gc.set_deferred_steps',
+                'collect_deferred_steps': 'interp_gc.collect_deferred_steps',
                 'get_rpy_roots': 'referents.get_rpy_roots',
                 'get_rpy_referents': 'referents.get_rpy_referents',
                 'get_rpy_memory_usage': 'referents.get_rpy_memory_usage',
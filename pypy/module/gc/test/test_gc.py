@@ -119,6 +119,16 @@ class AppTestGC(object):
         assert n >= 2 # at least one step + 1 finalizing
         assert X.deleted == 3
 
+    def test_set_deferred_steps(self):
+        import gc
+        raises(ValueError, gc.set_deferred_steps, -1)
+        gc.set_deferred_steps(4)
+        gc.set_deferred_steps(0)
+        assert callable(gc.start_background_collector)
+        raises(ValueError, gc.start_background_collector, 0)
+        raises(ValueError, gc.start_background_collector, 8, 0.5, 0.1)
+        gc.stop_background_collector()    # not running: ignored
+
 class AppTestGcDumpHeap(object):
     pytestmark = py.test.mark.xfail(run=False)
 
@@ -243,3 +253,48 @@ def test_StepCollector():
     # there is one more transition than actual step, because
     # FINALIZING->USERDEL is "virtual"
     assert sc.my_steps == len(transitions) - 1
+
+def test_StepCollector_do_deferred():
+    W = W_GcCollectStepStats
+    SCANNING = W.STATE_SCANNING
+    MARKING = W.STATE_MARKING
+    SWEEPING = W.STATE_SWEEPING
+    FINALIZING = W.STATE_FINALIZING
+
+    class MyStepCollector(StepCollector):
+        my_finalized = 0
+
+        def __init__(self):
+            StepCollector.__init__(self, space=None)
+            self.pending = 0
+            self._state_transitions = iter([
+                (SCANNING, MARKING),
+                (MARKING, SWEEPING),
+                (SWEEPING, FINALIZING),
+                (FINALIZING, SCANNING)])
+
+        def _collect_step(self):
+            oldstate, newstate = next(self._state_transitions)
+            if newstate == SCANNING:
+                self.pending = 0
+            elif self.pending > 0:
+                self.pending -= 1
+            return rgc._encode_states(oldstate, newstate)
+
+        def _deferred_steps(self):
+            return self.pending
+
+        def _run_finalizers(self):
+            self.my_finalized += 1
+
+    sc = MyStepCollector()
+    assert sc.do_deferred() == 0
+    sc.pending = 2
+    assert sc.do_deferred() == 2
+    assert not sc.finalizing
+    # the end of the major collection is followed by the finalizers
+    sc.pending = 5
+    assert sc.do_deferred() == 3
+    assert sc.my_finalized == 1
+    assert not sc.finalizing
+    assert sc.do_deferred() == 0
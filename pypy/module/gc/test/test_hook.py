@@ -16,6 +16,10 @@ class AppTestGcHooks(object):
         def fire_gc_minor(space, duration, total_memory_used, pinned_objects):
             gchooks.fire_gc_minor(duration, total_memory_used, pinned_objects)
 
+        @unwrap_spec(ObjSpace, int, int)
+        def fire_gc_minor_nursery(space, nursery_size, surviving_size):
+            gchooks.fire_gc_minor(1.0, 0, 0, nursery_size, surviving_size)
+
         @unwrap_spec(ObjSpace, int, int, int)
         def fire_gc_collect_step(space, duration, oldstate, newstate):
             gchooks.fire_gc_collect_step(duration, oldstate, newstate)
@@ -34,6 +38,8 @@ class AppTestGcHooks(object):
             gchooks.fire_gc_collect(1, 2, 3, 4, 5, 6, 7)
 
         cls.w_fire_gc_minor = space.wrap(interp2app(fire_gc_minor))
+        cls.w_fire_gc_minor_nursery = space.wrap(
+            interp2app(fire_gc_minor_nursery))
         cls.w_fire_gc_collect_step = space.wrap(interp2app(fire_gc_collect_step))
         cls.w_fire_gc_collect = space.wrap(interp2app(fire_gc_collect))
         cls.w_fire_many = space.wrap(interp2app(fire_many))
@@ -67,6 +73,17 @@ class AppTestGcHooks(object):
             (1, 40, 50, 60),
             ]
 
+    def test_on_gc_minor_nursery_size(self):
+        import gc
+        lst = []
+        def on_gc_minor(stats):
+            lst.append((stats.nursery_size, stats.surviving_size))
+        gc.hooks.on_gc_minor = on_gc_minor
+        self.fire_gc_minor_nursery(4096, 100)
+        self.fire_gc_minor_nursery(8192, 0)
+        gc.hooks.on_gc_minor = None
+        assert lst == [(4096, 100), (8192, 0)]
+
     def test_on_gc_collect_step(self):
         import gc
         SCANNING = 0
@@ -0,0 +1,114 @@
+""" Speed of marshal.dump() and marshal.load() on files, compared with
+dumps() and loads() on strings.  Run it with the pypy to be measured:
+
+    pypy bench_marshal.py [-n REPEAT] [-s SCALE] [-k FILTER]
+
+For every workload this reports the best of REPEAT runs of:
+
+    dumps      marshal.dumps(obj)
+    dump       marshal.dump(obj, f) to a file-like object with a write method
+    loads      marshal.loads(s)
+    load       marshal.load(f) from an io.BytesIO
+    mmap       marshal.loads(m) directly from an anonymous mmap
+"""
+
+import sys, time, io, mmap, marshal
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    clock = time.time
+
+
+class ListFile(object):
+    def __init__(self):
+        self.parts = []
+        self.write = self.parts.append
+
+
+# ____________________________________________________________
+# workloads
+#
+# each workload is a function taking the scale, which returns the object
+# to marshal.
+
+WORKLOADS = []
+
+def workload(func):
+    WORKLOADS.append((func.__name__, func))
+    return func
+
+@workload
+def int_list(scale):
+    return range(-1000, 200000 * scale)
+
+@workload
+def float_list(scale):
+    return [i * 0.5 for i in range(100000 * scale)]
+
+@workload
+def str_dict(scale):
+    return dict(('key:%d' % i, 'value %d' % i) for i in range(50000 * scale))
+
+@workload
+def row_tuples(scale):
+    return [(i, 'name%d' % i, i * 1.5, None, 2 ** 40 + i)
+            for i in range(50000 * scale)]
+
+@workload
+def big_strings(scale):
+    return ['x' * 100000] * (50 * scale)
+
+@workload
+def code_objects(scale):
+    import os
+    source = open(os.__file__.rstrip('c')).read()
+    return [compile(source, 'os.py', 'exec') for i in range(5 * scale)]
+
+
+# ____________________________________________________________
+
+def best_time(func, arg, repeat):
+    best = None
+    for i in range(repeat):
+        t0 = clock()
+        func(arg)
+        t = clock() - t0
+        if best is None or t < best:
+            best = t
+    return best
+
+def main(argv):
+    import optparse
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option('-n', '--repeat', type=int, default=5,
+                      help="number of runs per workload (default: 5)")
+    parser.add_option('-s', '--scale', type=int, default=1,
+                      help="multiply the size of the workloads (default: 1)")
+    parser.add_option('-k', dest='filter', default='',
+                      help="only run the workloads whose name contains this")
+    options, args = parser.parse_args(argv)
+    print '%-14s %8s %9s %9s %9s %9s %9s' % ('workload', 'size', 'dumps',
+                                             'dump', 'loads', 'load', 'mmap')
+    for name, func in WORKLOADS:
+        if options.filter not in name:
+            continue
+        obj = func(options.scale)
+        data = marshal.dumps(obj)
+        m = mmap.mmap(-1, len(data))
+        m.write(data)
+        times = [
+            best_time(marshal.dumps, obj, options.repeat),
+            best_time(lambda obj: marshal.dump(obj, ListFile()), obj,
+                      options.repeat),
+            best_time(marshal.loads, data, options.repeat),
+            best_time(lambda data: marshal.load(io.BytesIO(data)), data,
+                      options.repeat),
+            best_time(marshal.loads, m, options.repeat),
+        ]
+        m.close()
+        print '%-14s %7dk %8.3fs %8.3fs %8.3fs %8.3fs %8.3fs' % (
+            (name, len(data) // 1024) + tuple(times))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,13 +1,21 @@
 from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter.gateway import WrappedDefault, unwrap_spec
+from pypy.interpreter.buffer import BufferInterfaceNotFound
 from rpython.rlib.rarithmetic import intmask
+from rpython.rlib.rstring import StringBuilder
 from rpython.rlib import rstackovf
 from pypy.module._file.interp_file import W_File
+from pypy.module._io.interp_iobase import W_IOBase
+from pypy.module.cStringIO.interp_stringio import W_InputOutputType
+from pypy.module.mmap.interp_mmap import W_MMap
 from pypy.objspace.std.marshal_impl import marshal, get_unmarshallers
 
 
 Py_MARSHAL_VERSION = 2
 
+FLUSH_SIZE = 65536      # dump() writes to the file in chunks of this size
+READAHEAD_SIZE = 65536  # load() reads seekable files in blocks of this size
+
 @unwrap_spec(w_version=WrappedDefault(Py_MARSHAL_VERSION))
 def dump(space, w_data, w_f, w_version):
     """Write the 'data' object into the open file 'f'."""
@@ -22,6 +30,7 @@ def dump(space, w_data, w_f, w_version):
         ##m = Marshaller(space, writer.write, space.int_w(w_version))
         m = Marshaller(space, writer, space.int_w(w_version))
         m.dump_w_obj(w_data)
+        m.flush()
     finally:
         writer.finished()
 
@@ -38,6 +47,8 @@ def load(space, w_f):
     # special case real files for performance
     if isinstance(w_f, W_File):
         reader = DirectStreamReader(space, w_f)
+    elif can_read_ahead(space, w_f):
+        reader = ReadAheadFileReader(space, w_f)
     else:
         reader = FileReader(space, w_f)
     try:
@@ -49,10 +60,33 @@ def load(space, w_f):
 def loads(space, w_str):
     """Convert a string back to a value.  Extra characters in the string are
 ignored."""
-    u = StringUnmarshaller(space, w_str)
+    if (space.isinstance_w(w_str, space.w_bytes) or
+            space.isinstance_w(w_str, space.w_unicode)):
+        u = StringUnmarshaller(space, w_str)
+    else:
+        # other buffers, like an mmap, are read in place instead of
+        # being copied to a string first
+        try:
+            buf = w_str.readbuf_w(space)
+        except BufferInterfaceNotFound:
+            u = StringUnmarshaller(space, w_str)     # raises TypeError
+        else:
+            u = BufferUnmarshaller(space, buf)
     obj = u.load_w_obj()
     return obj
 
+def can_read_ahead(space, w_f):
+    """Check if load() may read more than it needs from 'w_f' and seek back
+to the end of the object afterwards.  This is only done for the file types
+where a small backward seek is cheap."""
+    if isinstance(w_f, W_InputOutputType) or isinstance(w_f, W_MMap):
+        return True
+    if isinstance(w_f, W_IOBase):
+        w_seekable = space.findattr(w_f, space.newtext('seekable'))
+        return (w_seekable is not None and
+                space.is_true(space.call_function(w_seekable)))
+    return False
+
 
 class AbstractReaderWriter(object):
     def __init__(self, space):
@@ -109,6 +143,55 @@ class FileReader(AbstractReaderWriter):
         return ret
 
 
+class ReadAheadFileReader(FileReader):
+    """Calls read() on the file in large blocks, and seeks back over the
+    data that was not used when the object is loaded."""
+
+    def __init__(self, space, w_f):
+        FileReader.__init__(self, space, w_f)
+        self.w_seek = space.getattr(w_f, space.newtext('seek'))
+        self.buf = ''
+        self.pos = 0
+
+    def read(self, n):
+        pos = self.pos
+        newpos = pos + n
+        if newpos <= len(self.buf):
+            self.pos = newpos
+            if pos == 0 and newpos == len(self.buf):
+                return self.buf
+            return self.buf[pos:newpos]
+        space = self.space
+        builder = StringBuilder(n)
+        builder.append_slice(self.buf, pos, len(self.buf))
+        self.buf = ''
+        self.pos = 0
+        missing = n - builder.getlength()
+        while missing > 0:
+            w_ret = space.call_function(self.func,
+                    space.newint(max(missing, READAHEAD_SIZE)))
+            data = space.bytes_w(w_ret)
+            if not data:
+                self.raise_eof()
+            if len(data) > missing:
+                builder.append_slice(data, 0, missing)
+                self.buf = data
+                self.pos = missing
+                break
+            builder.append(data)
+            missing -= len(data)
+        return builder.build()
+
+    def finished(self):
+        unused = len(self.buf) - self.pos
+        self.buf = ''
+        self.pos = 0
+        if unused > 0:
+            space = self.space
+            space.call_function(self.w_seek, space.newint(-unused),
+                                space.newint(1))
+
+
 class StreamReaderWriter(AbstractReaderWriter):
     def __init__(self, space, file):
         AbstractReaderWriter.__init__(self, space)
@@ -161,14 +244,17 @@ class Marshaller(_Base):
         self.writer = writer
         self.version = version
         self.stringtable = {}
+        # the output is collected here, and written to the writer (if any)
+        # in chunks of about FLUSH_SIZE bytes
+        self.builder = StringBuilder()
 
     ## currently we cannot use a put that is a bound method
     ## from outside. Same holds for get.
     def put(self, s):
-        self.writer.write(s)
+        self.builder.append(s)
 
     def put1(self, c):
-        self.writer.write(c)
+        self.builder.append(c)
 
     def atom(self, typecode):
         #assert type(typecode) is str and len(typecode) == 1
@@ -176,14 +262,8 @@ class Marshaller(_Base):
         self.put1(typecode)
 
     def atom_int(self, typecode, x):
-        a = chr(x & 0xff)
-        x >>= 8
-        b = chr(x & 0xff)
-        x >>= 8
-        c = chr(x & 0xff)
-        x >>= 8
-        d = chr(x & 0xff)
-        self.put(typecode + a + b + c + d)
+        self.put1(typecode)
+        self.put_int(x)
 
     def atom_int64(self, typecode, x):
         self.atom_int(typecode, x)
@@ -192,26 +272,23 @@ class Marshaller(_Base):
     def atom_str(self, typecode, x):
         self.atom_int(typecode, len(x))
         self.put(x)
+        self.maybe_flush()
 
     def start(self, typecode):
         # type(char) not supported
         self.put(typecode)
 
     def put_short(self, x):
-        a = chr(x & 0xff)
-        x >>= 8
-        b = chr(x & 0xff)
-        self.put(a + b)
+        builder = self.builder
+        builder.append(chr(x & 0xff))
+        builder.append(chr((x >> 8) & 0xff))
 
     def put_int(self, x):
-        a = chr(x & 0xff)
-        x >>= 8
-        b = chr(x & 0xff)
-        x >>= 8
-        c = chr(x & 0xff)
-        x >>= 8
-        d = chr(x & 0xff)
-        self.put(a + b + c + d)
+        builder = self.builder
+        builder.append(chr(x & 0xff))
+        builder.append(chr((x >> 8) & 0xff))
+        builder.append(chr((x >> 16) & 0xff))
+        builder.append(chr((x >> 24) & 0xff))
 
     def put_pascal(self, x):
         lng = len(x)
@@ -222,6 +299,7 @@ class Marshaller(_Base):
 
     def put_w_obj(self, w_obj):
         marshal(self.space, w_obj, self)
+        self.maybe_flush()
 
     def dump_w_obj(self, w_obj):
         space = self.space
@@ -239,8 +317,22 @@ class Marshaller(_Base):
         while idx < lng:
             w_obj = lst_w[idx]
             marshal(self.space, w_obj, self)
+            self.maybe_flush()
             idx += 1
 
+    def maybe_flush(self):
+        if self.writer is not None and self.builder.getlength() >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.builder.getlength() > 0:
+            data = self.builder.build()
+            self.builder = StringBuilder()
+            self.writer.write(data)
+
+    def get_value(self):
+        return self.builder.build()
+
     def _overflow(self):
         self.raise_exc('object too deeply nested to marshal')
 
@@ -248,80 +340,6 @@ class Marshaller(_Base):
 class StringMarshaller(Marshaller):
     def __init__(self, space, version):
         Marshaller.__init__(self, space, None, version)
-        self.buflis = [chr(0)] * 128
-        self.bufpos = 0
-
-    def put(self, s):
-        pos = self.bufpos
-        lng = len(s)
-        newpos = pos + lng
-        while len(self.buflis) < newpos:
-            self.buflis *= 2
-        idx = 0
-        while idx < lng:
-            self.buflis[pos + idx] = s[idx]
-            idx += 1
-        self.bufpos = newpos
-
-    def put1(self, c):
-        pos = self.bufpos
-        newpos = pos + 1
-        if len(self.buflis) < newpos:
-            self.buflis *= 2
-        self.buflis[pos] = c
-        self.bufpos = newpos
-
-    def atom_int(self, typecode, x):
-        a = chr(x & 0xff)
-        x >>= 8
-        b = chr(x & 0xff)
-        x >>= 8
-        c = chr(x & 0xff)
-        x >>= 8
-        d = chr(x & 0xff)
-        pos = self.bufpos
-        newpos = pos + 5
-        if len(self.buflis) < newpos:
-            self.buflis *= 2
-        self.buflis[pos] = typecode
-        self.buflis[pos+1] = a
-        self.buflis[pos+2] = b
-        self.buflis[pos+3] = c
-        self.buflis[pos+4] = d
-        self.bufpos = newpos
-
-    def put_short(self, x):
-        a = chr(x & 0xff)
-        x >>= 8
-        b = chr(x & 0xff)
-        pos = self.bufpos
-        newpos = pos + 2
-        if len(self.buflis) < newpos:
-            self.buflis *= 2
-        self.buflis[pos]   = a
-        self.buflis[pos+1] = b
-        self.bufpos = newpos
-
-    def put_int(self, x):
-        a = chr(x & 0xff)
-        x >>= 8
-        b = chr(x & 0xff)
-        x >>= 8
-        c = chr(x & 0xff)
-        x >>= 8
-        d = chr(x & 0xff)
-        pos = self.bufpos
-        newpos = pos + 4
-        if len(self.buflis) < newpos:
-            self.buflis *= 2
-        self.buflis[pos]   = a
-        self.buflis[pos+1] = b
-        self.buflis[pos+2] = c
-        self.buflis[pos+3] = d
-        self.bufpos = newpos
-
-    def get_value(self):
-        return ''.join(self.buflis[:self.bufpos])
 
 
 def invalid_typecode(space, u, tc):
@@ -498,3 +516,65 @@ class StringUnmarshaller(Unmarshaller):
             return x
         else:
             self.raise_exc('bad marshal data')
+
+
+class BufferUnmarshaller(Unmarshaller):
+    # Unmarshaller reading directly from a buffer, like an mmap, without
+    # making a copy of the whole content first
+    def __init__(self, space, buf):
+        Unmarshaller.__init__(self, space, None)
+        self.buf = buf
+        self.bufpos = 0
+        self.limit = buf.getlength()
+
+    def raise_eof(self):
+        space = self.space
+        raise oefmt(space.w_EOFError, "EOF read where object expected")
+
+    def get(self, n):
+        pos = self.bufpos
+        newpos = pos + n
+        if newpos > self.limit:
+            self.raise_eof()
+        self.bufpos = newpos
+        return self.buf.getslice(pos, 1, n)
+
+    def get1(self):
+        pos = self.bufpos
+        if pos >= self.limit:
+            self.raise_eof()
+        self.bufpos = pos + 1
+        return self.buf.getitem(pos)
+
+    def get_int(self):
+        pos = self.bufpos
+        newpos = pos + 4
+        if newpos > self.limit:
+            self.raise_eof()
+        self.bufpos = newpos
+        buf = self.buf
+        a = ord(buf.getitem(pos))
+        b = ord(buf.getitem(pos+1))
+        c = ord(buf.getitem(pos+2))
+        d = ord(buf.getitem(pos+3))
+        if d & 0x80:
+            d -= 0x100
+        x = a | (b<<8) | (c<<16) | (d<<24)
+        return intmask(x)
+
+    def get_lng(self):
+        pos = self.bufpos
+        newpos = pos + 4
+        if newpos > self.limit:
+            self.raise_eof()
+        self.bufpos = newpos
+        buf = self.buf
+        a = ord(buf.getitem(pos))
+        b = ord(buf.getitem(pos+1))
+        c = ord(buf.getitem(pos+2))
+        d = ord(buf.getitem(pos+3))
+        x = a | (b<<8) | (c<<16) | (d<<24)
+        if x >= 0:
+            return x
+        else:
+            self.raise_exc('bad marshal data')
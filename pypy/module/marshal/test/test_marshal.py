@@ -2,7 +2,7 @@ from rpython.tool.udir import udir
 
 
 class AppTestMarshal:
-    spaceconfig = {'usemodules': ['array']}
+    spaceconfig = {'usemodules': ['array', 'mmap', '_io', 'cStringIO']}
 
     def setup_class(cls):
         tmpfile = udir.join('AppTestMarshal.tmp')
@@ -168,6 +168,67 @@ class AppTestMarshal:
         assert obj2b == obj2
         assert tail == 'END'
 
+    def test_loads_buffer(self):
+        import marshal, mmap, array
+        obj = [1, 'abc' * 1000, (2.5, u'\xe9'), {None: 2**70}]
+        s = marshal.dumps(obj) + 'tail'
+        assert marshal.loads(buffer(s)) == obj
+        assert marshal.loads(buffer(s, 0, len(s) - 4)) == obj
+        assert marshal.loads(array.array('c', s)) == obj
+        m = mmap.mmap(-1, len(s))
+        m.write(s)
+        assert marshal.loads(m) == obj
+        m.close()
+        raises(EOFError, marshal.loads, buffer(s, 0, 20))
+        raises(TypeError, marshal.loads, 42)
+
+    def test_load_read_ahead(self):
+        # seekable files are read in large blocks, and the position is
+        # moved back to the end of the object afterwards
+        import marshal, io, cStringIO, mmap
+        obj1 = [4, ("hello", 7.5)] * 1000
+        obj2 = "foobar" * 20000
+        s = marshal.dumps(obj1) + marshal.dumps(obj2) + 'END'
+        m = mmap.mmap(-1, len(s))
+        m.write(s)
+        m.seek(0)
+        for f in [io.BytesIO(s), io.BufferedReader(io.BytesIO(s)),
+                  cStringIO.StringIO(s), m]:
+            assert marshal.load(f) == obj1
+            assert f.tell() == len(marshal.dumps(obj1))
+            assert marshal.load(f) == obj2
+            assert f.read() == 'END'
+            raises(EOFError, marshal.load, f)
+
+    def test_load_not_seekable(self):
+        import marshal
+        class Reader(object):
+            def __init__(self, data):
+                self.data = data
+            def read(self, n):
+                result = self.data[:n]
+                self.data = self.data[n:]
+                return result
+        r = Reader(marshal.dumps((1, 'a')) + 'END')
+        assert marshal.load(r) == (1, 'a')
+        assert r.data == 'END'
+
+    def test_dump_in_blocks(self):
+        import marshal
+        class Writer(object):
+            def __init__(self):
+                self.parts = []
+            def write(self, data):
+                self.parts.append(data)
+        obj = [str(i) for i in range(50000)]
+        w = Writer()
+        marshal.dump(obj, w)
+        assert 1 < len(w.parts) < 100
+        assert ''.join(w.parts) == marshal.dumps(obj)
+        w = Writer()
+        marshal.dump(42, w)
+        assert w.parts == [marshal.dumps(42)]
+
     def test_unicode(self):
         import marshal, sys
         self.marshal_check(u'\uFFFF')
@@ -202,3 +202,77 @@ class UnpackFormatIterator(FormatIterator):
 
     def skip(self, size):
         self.read(size) # XXX, could avoid taking the slice
+
+
+class ColumnsFormatIterator(UnpackFormatIterator):
+    """ Unpacks many consecutive records, appending the value of each field
+    to the matching Column instead of building a tuple per record. """
+
+    def __init__(self, space, buf, columns):
+        UnpackFormatIterator.__init__(self, space, buf)
+        self.columns = columns
+        self.field_index = 0
+        self.record_start = 0
+
+    def start_record(self):
+        self.field_index = 0
+        self.record_start = self.pos
+
+    def align(self, mask):
+        # the alignment is relative to the start of the record, like it
+        # would be with one SubBuffer per record
+        start = self.record_start
+        self.pos = start + ((self.pos - start + mask) & ~mask)
+
+    def finished(self):
+        pass
+
+    @specialize.argtype(1)
+    def appendobj(self, value):
+        column = self.columns[self.field_index]
+        self.field_index += 1
+        is_unsigned = (isinstance(value, r_uint) or
+                       isinstance(value, r_ulonglong))
+        if is_unsigned:
+            if value <= maxint:
+                column.append_int(self.space, intmask(value))
+            else:
+                column.append_w(self.space, self.space.newint(value))
+        elif isinstance(value, r_longlong):
+            if value == r_longlong(intmask(value)):
+                column.append_int(self.space, intmask(value))
+            else:
+                column.append_w(self.space, self.space.newint(value))
+        elif isinstance(value, bool):
+            column.append_w(self.space, self.space.newbool(value))
+        elif isinstance(value, int):
+            column.append_int(self.space, value)
+        elif isinstance(value, float):
+            column.append_float(self.space, value)
+        elif isinstance(value, str):
+            column.append_bytes(self.space, value)
+        else:
+            UnpackFormatIterator.appendobj(self, value)
+            column.append_w(self.space, self.result_w.pop())
+
+    def append_utf8(self, value):
+        column = self.columns[self.field_index]
+        self.field_index += 1
+        w_ch = self.space.newutf8(rutf8.unichr_as_utf8(r_uint(value)), 1)
+        column.append_w(self.space, w_ch)
+
+
+class FieldCountFormatIterator(FormatIterator):
+    """ Counts the values produced by unpacking the format. """
+    nfields = 0
+
+    def operate(self, fmtdesc, repetitions):
+        if fmtdesc.fmtchar == 'x':
+            pass
+        elif fmtdesc.needcount:
+            self.nfields += 1
+        else:
+            self.nfields += repetitions
+
+    def align(self, mask):
+        pass
@@ -10,8 +10,10 @@ from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter.typedef import TypeDef, interp_attrproperty
 from pypy.interpreter.typedef import make_weakref_descr
 from pypy.module.struct.formatiterator import (
-    PackFormatIterator, UnpackFormatIterator
+    PackFormatIterator, UnpackFormatIterator, ColumnsFormatIterator,
+    FieldCountFormatIterator
 )
+from pypy.objspace.std.columns import Column
 
 
 class Cache:
@@ -34,6 +36,17 @@ def _calcsize(space, format):
     return fmtiter.totalsize
 
 
+def _count_fields(space, format):
+    fmtiter = FieldCountFormatIterator()
+    try:
+        fmtiter.interpret(format)
+    except StructOverflowError as e:
+        raise OperationError(space.w_OverflowError, space.newtext(e.msg))
+    except StructError as e:
+        raise OperationError(get_error(space), space.newtext(e.msg))
+    return fmtiter.nfields
+
+
 @unwrap_spec(format='text')
 def calcsize(space, format):
     """Return size of C struct described by format string fmt."""
@@ -119,11 +132,78 @@ fmt, starting at offset. Requires len(buffer[offset:]) >= calcsize(fmt)."""
     return _unpack(space, format, buf)
 
 
+@unwrap_spec(format='text')
+def iter_unpack(space, format, w_buffer):
+    """Return an iterator which unpacks the buffer according to fmt, one
+record at a time.  The size of the buffer must be a multiple of
+calcsize(fmt)."""
+    size = _calcsize(space, format)
+    return W_UnpackIter(space, format, size, w_buffer)
+
+
+class W_UnpackIter(W_Root):
+    def __init__(self, space, format, size, w_buffer):
+        if size == 0:
+            raise oefmt(get_error(space),
+                        "cannot iteratively unpack with a struct of length 0")
+        buf = space.getarg_w('s*', w_buffer)
+        if buf.getlength() % size != 0:
+            raise oefmt(get_error(space),
+                        "iterative unpacking requires a buffer of a "
+                        "multiple of %d bytes", size)
+        self.format = format
+        self.size = size
+        self.buf = buf
+        self.index = 0
+
+    def descr_iter(self, space):
+        return self
+
+    def descr_next(self, space):
+        if self.buf is None:
+            raise OperationError(space.w_StopIteration, space.w_None)
+        if self.index >= self.buf.getlength():
+            self.buf = None
+            raise OperationError(space.w_StopIteration, space.w_None)
+        buf = SubBuffer(self.buf, self.index, self.size)
+        self.index += self.size
+        return _unpack(space, jit.promote_string(self.format), buf)
+
+    def descr_length_hint(self, space):
+        if self.buf is None:
+            return space.newint(0)
+        return space.newint((self.buf.getlength() - self.index) // self.size)
+
+W_UnpackIter.typedef = TypeDef("unpack_iterator",
+    __iter__=interp2app(W_UnpackIter.descr_iter),
+    next=interp2app(W_UnpackIter.descr_next),
+    __length_hint__=interp2app(W_UnpackIter.descr_length_hint),
+)
+W_UnpackIter.typedef.acceptable_as_base_class = False
+
+
+unpack_columns_driver = jit.JitDriver(name='struct_unpack_columns',
+                                      greens=['format'], reds='auto')
+
+def _unpack_records(space, format, buf, count, columns):
+    fmtiter = ColumnsFormatIterator(space, buf, columns)
+    try:
+        for i in range(count):
+            unpack_columns_driver.jit_merge_point(format=format)
+            fmtiter.start_record()
+            fmtiter.interpret(format)
+    except StructOverflowError as e:
+        raise OperationError(space.w_OverflowError, space.newtext(e.msg))
+    except StructError as e:
+        raise OperationError(get_error(space), space.newtext(e.msg))
+
+
 class W_Struct(W_Root):
-    _immutable_fields_ = ["format", "size"]
+    _immutable_fields_ = ["format", "size", "nfields"]
 
     format = ""
     size = -1
+    nfields = 0
 
     def descr__new__(space, w_subtype, __args__):
         return space.allocate_instance(W_Struct, w_subtype)
@@ -132,6 +212,7 @@ class W_Struct(W_Root):
     def descr__init__(self, space, format):
         self.format = format
         self.size = _calcsize(space, format)
+        self.nfields = _count_fields(space, format)
 
     def descr_pack(self, space, args_w):
         return pack(space, jit.promote_string(self.format), args_w)
@@ -147,6 +228,42 @@ class W_Struct(W_Root):
     def descr_unpack_from(self, space, w_buffer, offset=0):
         return unpack_from(space, jit.promote_string(self.format), w_buffer, offset)
 
+    def descr_iter_unpack(self, space, w_buffer):
+        return W_UnpackIter(space, self.format, self.size, w_buffer)
+
+    @unwrap_spec(offset=int, count=int)
+    def descr_unpack_columns(self, space, w_buffer, offset=0, count=-1):
+        """Unpack count records from the buffer, starting at offset, and
+return a list with one list per field, holding the values of that field.
+By default, all the records from offset to the end of the buffer are
+unpacked."""
+        format = jit.promote_string(self.format)
+        size = self.size
+        buf = space.getarg_w('s*', w_buffer)
+        if offset < 0:
+            offset += buf.getlength()
+        if offset < 0 or offset > buf.getlength():
+            raise oefmt(get_error(space), "offset out of range")
+        available = buf.getlength() - offset
+        if count < 0:
+            if size == 0:
+                raise oefmt(get_error(space),
+                            "cannot unpack columns with a struct of length 0")
+            if available % size != 0:
+                raise oefmt(get_error(space),
+                            "unpack_columns requires a buffer of a "
+                            "multiple of %d bytes", size)
+            count = available // size
+        elif size > 0 and count > available // size:
+            raise oefmt(get_error(space),
+                        "unpack_columns requires a buffer of at least %d "
+                        "bytes", size * count)
+        columns = [Column() for i in range(self.nfields)]
+        if count > 0:
+            buf = SubBuffer(buf, offset, size * count)
+            _unpack_records(space, format, buf, count, columns)
+        return space.newlist([column.wrap(space) for column in columns])
+
 W_Struct.typedef = TypeDef("Struct",
     __new__=interp2app(W_Struct.descr__new__.im_func),
     __init__=interp2app(W_Struct.descr__init__),
@@ -157,6 +274,8 @@ W_Struct.typedef = TypeDef("Struct",
     unpack=interp2app(W_Struct.descr_unpack),
     pack_into=interp2app(W_Struct.descr_pack_into),
     unpack_from=interp2app(W_Struct.descr_unpack_from),
+    iter_unpack=interp2app(W_Struct.descr_iter_unpack),
+    unpack_columns=interp2app(W_Struct.descr_unpack_columns),
     __weakref__=make_weakref_descr(W_Struct),
 )
 
@@ -447,6 +447,57 @@ class AppTestStruct(object):
     def test_overflow(self):
         raises(self.struct.error, self.struct.pack, 'i', 1<<65)
 
+    def test_iter_unpack(self):
+        struct = self.struct
+        data = struct.pack('<hi', 1, 2) + struct.pack('<hi', -3, 4)
+        it = struct.iter_unpack('<hi', data)
+        assert it.__length_hint__() == 2
+        assert list(it) == [(1, 2), (-3, 4)]
+        assert it.__length_hint__() == 0
+        raises(StopIteration, it.next)
+        s = struct.Struct('<hi')
+        assert list(s.iter_unpack(memoryview(data))) == [(1, 2), (-3, 4)]
+        assert list(s.iter_unpack('')) == []
+        raises(struct.error, struct.iter_unpack, '<hi', data[:-1])
+        raises(struct.error, struct.iter_unpack, '', '')
+
+    def test_unpack_columns(self):
+        import sys
+        struct = self.struct
+        s = struct.Struct('<hdx3sQ?')
+        records = [(i, i * 0.5, 'a%02d' % i, i * 3, i % 2 == 0)
+                   for i in range(20)]
+        data = ''.join([s.pack(*record) for record in records])
+        columns = s.unpack_columns(data)
+        assert columns == [list(column) for column in zip(*records)]
+        try:
+            from __pypy__ import strategy
+        except ImportError:
+            pass
+        else:
+            assert [strategy(column) for column in columns[:4]] == [
+                'IntegerListStrategy', 'FloatListStrategy',
+                'BytesListStrategy', 'IntegerListStrategy']
+        assert s.unpack_columns(data, s.size * 5, 2) == [
+            list(column) for column in zip(*records[5:7])]
+        assert s.unpack_columns(data, count=0) == [[], [], [], [], []]
+        assert s.unpack_columns(buffer(data), -s.size) == [
+            list(column) for column in zip(*records[-1:])]
+        raises(struct.error, s.unpack_columns, data[:-1])
+        raises(struct.error, s.unpack_columns, data, count=21)
+        raises(struct.error, s.unpack_columns, data, len(data) + 1)
+        # an unsigned field switches to a list of objects when needed
+        s = struct.Struct('=Q')
+        data = s.pack(1) + s.pack(sys.maxint + 1) + s.pack(2)
+        assert s.unpack_columns(data) == [[1, sys.maxint + 1, 2]]
+
+    def test_unpack_columns_alignment(self):
+        struct = self.struct
+        s = struct.Struct('ic')
+        records = [(i, chr(65 + i)) for i in range(5)]
+        data = ''.join([s.pack(*record) for record in records])
+        assert s.unpack_columns(data) == [range(5), list('ABCDE')]
+
     def test_unpack_fits_into_int(self):
         import sys
         for fmt in 'ILQq':
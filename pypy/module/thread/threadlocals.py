@@ -66,6 +66,11 @@ class OSThreadLocals:
         "Notification that the current thread is about to start running."
         self._set_ec(space.createexecutioncontext())
 
+    def threads_initialized(self):
+        # overridden in GILThreadLocals; without a GIL, assume that other
+        # threads can be running at any time
+        return True
+
     def try_enter_thread(self, space):
         # common case: the thread-local has already got a value
         if self.raw_thread_local.get() is not None:
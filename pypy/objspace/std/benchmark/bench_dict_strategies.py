@@ -0,0 +1,291 @@
+""" Benchmarks for the dict strategies of dictmultiobject.py and friends.
+
+Every workload is run against the strategy it is meant to exercise, and the
+strategy that the dict actually ends up with is reported next to the timing,
+so that a workload that silently devolves to ObjectDictStrategy is noticed.
+Run it with the pypy to be measured:
+
+    pypy bench_dict_strategies.py [-n REPEAT] [-s SCALE] [-k FILTER] [--csv]
+
+For every workload the best and the median of REPEAT runs are reported, as
+well as the GC memory that is still in use after the workload, with the
+dicts it created still alive.  Timings and memory are only comparable
+between runs on the same machine with the same SCALE.  On CPython the
+strategy column is empty and the memory column uses the resident set size.
+"""
+
+import sys, time, gc, random
+
+try:
+    import __pypy__
+except ImportError:
+    __pypy__ = None
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    clock = time.time
+
+
+def get_strategy(obj):
+    if __pypy__ is None:
+        return ''
+    try:
+        return __pypy__.strategy(obj)
+    except TypeError:
+        return '?'
+
+def get_memory():
+    """ Return the memory in use in bytes, after a full collection """
+    gc.collect()
+    if __pypy__ is not None:
+        return gc._get_stats().total_gc_memory
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # only grows, but better than nothing
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# ____________________________________________________________
+# workloads
+#
+# each workload is a function taking the scale; it builds its inputs, then
+# returns a function that runs the workload and returns the dict whose
+# strategy is reported.
+
+WORKLOADS = []
+
+def workload(strategy):
+    def decorate(func):
+        WORKLOADS.append((func.__name__, strategy, func))
+        return func
+    return decorate
+
+def random_bytes_keys(n, length=12, seed=42):
+    r = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_'
+    return ['k' + ''.join([r.choice(letters) for i in range(length)]) + str(i)
+            for i in range(n)]
+
+@workload('BytesDictStrategy')
+def bytes_build_lookup(scale):
+    keys = random_bytes_keys(50000 * scale)
+    missing = random_bytes_keys(10000, seed=1)
+    def run():
+        d = {}
+        for i, key in enumerate(keys):
+            d[key] = i
+        for j in range(5):
+            for key in keys:
+                d[key]
+            for key in missing:
+                key in d
+        return d
+    return run
+
+@workload('UnicodeDictStrategy')
+def unicode_build_lookup(scale):
+    keys = [key.decode('ascii') + u'\xe9'
+            for key in random_bytes_keys(50000 * scale)]
+    def run():
+        d = {}
+        for i, key in enumerate(keys):
+            d[key] = i
+        for j in range(5):
+            for key in keys:
+                d[key]
+        return d
+    return run
+
+@workload('IntDictStrategy')
+def int_build_lookup(scale):
+    r = random.Random(42)
+    keys = [r.randrange(-sys.maxint, sys.maxint) for i in range(100000 * scale)]
+    def run():
+        d = {}
+        for key in keys:
+            d[key] = key
+        for j in range(5):
+            for key in keys:
+                d[key]
+        return d
+    return run
+
+@workload('JsonDictStrategy')
+def json_records(scale):
+    import json
+    records = [{'id': i, 'name': 'user%d' % i, 'score': i * 0.5,
+                'active': bool(i % 2)} for i in range(20000 * scale)]
+    s = json.dumps(records)
+    def run():
+        res = json.loads(s)
+        total = 0
+        for record in res:
+            total += record[u'id']
+            record[u'name']
+        return res[-1]
+    return run
+
+@workload('KwargsDictStrategy')
+def kwargs_calls(scale):
+    def f(**kwargs):
+        return kwargs
+    def run():
+        for i in range(200000 * scale):
+            d = f(a=i, b=i, c=i)
+            d['a']
+            d['c']
+        return d
+    return run
+
+@workload('ModuleDictStrategy')
+def celldict_globals(scale):
+    import types
+    mod = types.ModuleType('bench_mod')
+    names = ['g%d' % i for i in range(1000)]
+    def run():
+        d = mod.__dict__
+        for j in range(50 * scale):
+            for name in names:
+                d[name] = j
+            for name in names:
+                d[name]
+        return d
+    return run
+
+@workload('MapDictStrategy')
+def mapdict_instances(scale):
+    class A(object):
+        def __init__(self, i):
+            self.x = i
+            self.y = i
+            self.z = i
+    def run():
+        objs = [A(i) for i in range(50000 * scale)]
+        total = 0
+        for obj in objs:
+            d = obj.__dict__
+            total += d['x'] + d['z']
+        return objs[-1].__dict__
+    return run
+
+@workload('ObjectDictStrategy')
+def devolution(scale):
+    # dicts that start with a specialized strategy and are switched to the
+    # generic one by a single key of another type
+    n = 100 * scale
+    def run():
+        dicts = []
+        for i in range(n):
+            d = {}
+            for j in range(200):
+                d[j] = j
+            d['x'] = i
+            for j in range(200):
+                d[j]
+            dicts.append(d)
+        return dicts[-1]
+    return run
+
+@workload('BytesDictStrategy')
+def large_resize(scale):
+    keys = random_bytes_keys(500000 * scale)
+    def run():
+        d = {}
+        for key in keys:
+            d[key] = None
+        return d
+    return run
+
+@workload('IntDictStrategy')
+def deletion_churn(scale):
+    # a dict used as a queue: the size stays constant while the keys keep
+    # moving, which stresses deleted entries and compaction
+    n = 300000 * scale
+    def run():
+        d = {}
+        for i in range(1000):
+            d[i] = i
+        for i in range(1000, n):
+            d[i] = i
+            del d[i - 1000]
+        return d
+    return run
+
+@workload('UnicodeDictStrategy')
+def iteration(scale):
+    d = dict.fromkeys([key.decode('ascii')
+                       for key in random_bytes_keys(100000)], 1)
+    def run():
+        for j in range(10 * scale):
+            for key in d:
+                pass
+            for value in d.itervalues():
+                pass
+            for key, value in d.iteritems():
+                pass
+            d.keys()
+            d.items()
+        return d
+    return run
+
+
+# ____________________________________________________________
+
+def run_workload(func, scale, repeat):
+    run = func(scale)
+    times = []
+    memory = 0
+    for i in range(repeat):
+        gc.collect()
+        t0 = clock()
+        result = run()
+        times.append(clock() - t0)
+        if i == repeat - 1:
+            memory = get_memory()
+            strategy = get_strategy(result)
+        del result
+    times.sort()
+    return times[0], times[len(times) // 2], memory, strategy
+
+def format_memory(v):
+    if v < 1000000:
+        return "%.1fkB" % (v / 1024.)
+    return "%.1fMB" % (v / 1024. / 1024.)
+
+def main(argv):
+    import optparse
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option('-n', '--repeat', type=int, default=5,
+                      help="number of runs per workload (default: 5)")
+    parser.add_option('-s', '--scale', type=int, default=1,
+                      help="multiply the size of the workloads (default: 1)")
+    parser.add_option('-k', dest='filter', default='',
+                      help="only run the workloads whose name contains this")
+    parser.add_option('--csv', action='store_true',
+                      help="print comma-separated values")
+    options, args = parser.parse_args(argv)
+    if options.csv:
+        print 'workload,expected,strategy,best,median,memory'
+    else:
+        print '%-22s %-20s %10s %10s %10s' % (
+            'workload', 'strategy', 'best', 'median', 'memory')
+    random.seed(42)
+    for name, expected, func in WORKLOADS:
+        if options.filter not in name:
+            continue
+        best, median, memory, strategy = run_workload(
+            func, options.scale, options.repeat)
+        if options.csv:
+            print '%s,%s,%s,%f,%f,%d' % (name, expected, strategy,
+                                         best, median, memory)
+            continue
+        if strategy and strategy != expected:
+            strategy = '%s (expected %s)' % (strategy, expected)
+        print '%-22s %-20s %9.3fs %9.3fs %10s' % (
+            name, strategy or expected, best, median, format_memory(memory))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
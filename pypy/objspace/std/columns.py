@@ -0,0 +1,81 @@
+"""
+Column, a builder for the lists returned by the functions that decode
+records into columns: _pypyjson.loads_columns(), the columns mode of
+_csv.block_reader() and struct.Struct.unpack_columns().
+"""
+
+EMPTY, INT, FLOAT, BYTES, OBJECT = range(5)
+
+
+class Column(object):
+    """ The values of one field of a batch of records, kept unwrapped as
+    long as they all have the same type.  wrap() returns a list with the
+    matching strategy. """
+
+    def __init__(self):
+        self.kind = EMPTY
+        self.ints = None
+        self.floats = None
+        self.strs = None
+        self.items_w = None
+
+    def append_int(self, space, value):
+        if self.kind == INT:
+            self.ints.append(value)
+        elif self.kind == EMPTY:
+            self.kind = INT
+            self.ints = [value]
+        else:
+            self.append_w(space, space.newint(value))
+
+    def append_float(self, space, value):
+        if self.kind == FLOAT:
+            self.floats.append(value)
+        elif self.kind == EMPTY:
+            self.kind = FLOAT
+            self.floats = [value]
+        else:
+            self.append_w(space, space.newfloat(value))
+
+    def append_bytes(self, space, value):
+        if self.kind == BYTES:
+            self.strs.append(value)
+        elif self.kind == EMPTY:
+            self.kind = BYTES
+            self.strs = [value]
+        else:
+            self.append_w(space, space.newbytes(value))
+
+    def append_w(self, space, w_value):
+        if self.kind != OBJECT:
+            self._switch_to_objects(space)
+        self.items_w.append(w_value)
+
+    def _switch_to_objects(self, space):
+        items_w = []
+        if self.kind == INT:
+            for intval in self.ints:
+                items_w.append(space.newint(intval))
+        elif self.kind == FLOAT:
+            for floatval in self.floats:
+                items_w.append(space.newfloat(floatval))
+        elif self.kind == BYTES:
+            for value in self.strs:
+                items_w.append(space.newbytes(value))
+        self.kind = OBJECT
+        self.ints = None
+        self.floats = None
+        self.strs = None
+        self.items_w = items_w
+
+    def wrap(self, space):
+        if self.kind == INT:
+            return space.newlist_int(self.ints)
+        elif self.kind == FLOAT:
+            return space.newlist_float(self.floats)
+        elif self.kind == BYTES:
+            return space.newlist_bytes(self.strs)
+        elif self.kind == OBJECT:
+            # the list picks the best strategy for the values by itself
+            return space.newlist(self.items_w)
+        return space.newlist([])
@@ -12,10 +12,12 @@ import operator
 import sys
 
 from rpython.rlib import debug, jit, rerased, rutf8
-from rpython.rlib.listsort import make_timsort_class
+from rpython.rlib.listsort import (
+    is_sorted_int, make_timsort_class, radixsort_int)
 from rpython.rlib.objectmodel import (
     import_from_mixin, instantiate, newlist_hint, resizelist_hint, specialize)
-from rpython.rlib.rarithmetic import ovfcheck
+from rpython.rlib.rarithmetic import LONG_BIT, ovfcheck, widen
+from rpython.rtyper.lltypesystem import rffi
 from rpython.rlib import longlong2float
 from rpython.tool.sourcetools import func_with_new_name
 from rpython.rlib.rstring import StringBuilder
@@ -43,6 +45,10 @@ __all__ = ['W_ListObject', 'make_range_list', 'make_empty_list_with_size']
 
 UNROLL_CUTOFF = 5
 
+# int lists at least that long are sorted with a radix sort instead of
+# timsort, unless they are already sorted
+RADIX_SORT_CUTOFF = 1024
+
 
 def make_range_list(space, start, step, length):
     if length <= 0:
@@ -476,6 +482,12 @@ class W_ListObject(W_Root):
         # exposed in __pypy__
         return self.strategy.physical_size(self)
 
+    def compact(self):
+        """ Drop the overallocation of the underlying list and, for lists of
+        small ints, switch to a narrower storage."""
+        # exposed in __pypy__
+        self.strategy.compact(self)
+
     def add(self, w_other):
         """ add self to w_other """
         return self.strategy.add(self, w_other)
@@ -787,6 +799,10 @@ class W_ListObject(W_Root):
         has_cmp = not space.is_none(w_cmp)
         has_key = not space.is_none(w_key)
 
+        if has_key and not has_cmp:
+            self._sort_by_key(space, w_key, reverse)
+            return
+
         # create and setup a TimSort instance
         if has_cmp:
             if has_key:
@@ -794,14 +810,11 @@ class W_ListObject(W_Root):
             else:
                 sorterclass = CustomCompareSort
         else:
-            if has_key:
-                sorterclass = CustomKeySort
+            if self.strategy is space.fromcache(ObjectListStrategy):
+                sorterclass = SimpleSort
             else:
-                if self.strategy is space.fromcache(ObjectListStrategy):
-                    sorterclass = SimpleSort
-                else:
-                    self.sort(reverse)
-                    return
+                self.sort(reverse)
+                return
 
         sorter = sorterclass(self.getitems(), self.length())
         sorter.space = space
@@ -820,8 +833,9 @@ class W_ListObject(W_Root):
                 # XXX inefficient for unwrapped strategies:
                 # we wrap the elements twice, once for the key, and once to get
                 # KeyContainers. Then unwrap carefully in the __init__ call below.
-                # Could type-specialize this.
-                _compute_keys_for_sorting(strategy, sorter.list, w_key)
+                keys_w = _compute_keys_for_sorting(strategy, sorter.list, w_key)
+                for i in range(len(keys_w)):
+                    sorter.list[i] = KeyContainer(keys_w[i], sorter.list[i])
 
             # Reverse sort stability achieved by initially reversing the list,
             # applying a stable forward sort, then reversing the final result.
@@ -852,6 +866,52 @@ class W_ListObject(W_Root):
         if mucked:
             raise oefmt(space.w_ValueError, "list modified during sort")
 
+    def _sort_by_key(self, space, w_key, reverse):
+        """ sort(key=...) without cmp. The keys are computed first; if they
+        are all ints, floats, bytes or unicodes, a list of indices is sorted
+        by comparing the unboxed keys, otherwise the items are wrapped in
+        KeyContainers and compared with space.lt(). """
+        strategy = self.strategy
+        items_w = self.getitems()
+        # The list is temporarily made empty, see descr_sort()
+        self.__init__(space, [])
+        try:
+            keys_w = _compute_keys_for_sorting(strategy, items_w, w_key)
+
+            # Reverse sort stability achieved by initially reversing the list,
+            # applying a stable forward sort, then reversing the final result.
+            if reverse:
+                items_w.reverse()
+                keys_w.reverse()
+
+            order = _sort_order_by_unboxed_keys(space, keys_w)
+            if order is not None:
+                items_w = [items_w[i] for i in order]
+            else:
+                length = len(items_w)
+                sorter = CustomKeySort(
+                    [KeyContainer(keys_w[i], items_w[i]) for i in range(length)],
+                    length)
+                sorter.space = space
+                sorter.sort()
+                for i in range(length):
+                    w_obj = sorter.list[i]
+                    assert isinstance(w_obj, KeyContainer)
+                    items_w[i] = w_obj.w_item
+
+            if reverse:
+                items_w.reverse()
+
+        finally:
+            # check if the user mucked with the list during the sort
+            mucked = self.length() > 0
+
+            # put the items back into the list
+            self.__init__(space, items_w)
+
+        if mucked:
+            raise oefmt(space.w_ValueError, "list modified during sort")
+
 def get_printable_location_sortkey(strategy_type, tp):
     return "_compute_keys_for_sorting [%s, %s]" % (strategy_type, tp.getname(tp.space), )
 
@@ -863,6 +923,7 @@ sortkey_jmp = jit.JitDriver(
 
 def _compute_keys_for_sorting(strategy, list_w, w_callable):
     space = strategy.space
+    keys_w = [None] * len(list_w)
     i = 0
     # XXX would like a new API space.greenkey_for_callable here
     # (also in min/max and map/filter)
@@ -871,10 +932,57 @@ def _compute_keys_for_sorting(strategy, list_w, w_callable):
         # bit weird: we have a list_w at this point, but we still specialize on
         # the strategy to distinguish the cases better
         sortkey_jmp.jit_merge_point(tp=tp, strategy_type=type(strategy))
-        w_item = list_w[i]
-        w_keyitem = space.call_function(w_callable, w_item)
-        list_w[i] = KeyContainer(w_keyitem, w_item)
+        keys_w[i] = space.call_function(w_callable, list_w[i])
         i += 1
+    return keys_w
+
+@specialize.arg(2, 3)
+def _unbox_sort_keys(space, keys_w, cls, methname):
+    keys = newlist_hint(len(keys_w))
+    for w_key in keys_w:
+        if type(w_key) is not cls:
+            return None
+        assert isinstance(w_key, cls)
+        keys.append(getattr(w_key, methname)(space))
+    return keys
+
+def _sort_order_by_unboxed_keys(space, keys_w):
+    """ Return the list of indices into keys_w in the (stable) order of the
+    keys, if they all have the same type among int, float, bytes and unicode.
+    Return None otherwise. """
+    order = range(len(keys_w))
+    if not keys_w:
+        return order
+    w_first = keys_w[0]
+    if type(w_first) is W_IntObject:
+        intkeys = _unbox_sort_keys(space, keys_w, W_IntObject, 'int_w')
+        if intkeys is None:
+            return None
+        sorter = IntKeySort(order, len(order))
+        sorter.keys = intkeys
+        sorter.sort()
+    elif type(w_first) is W_FloatObject:
+        floatkeys = _unbox_sort_keys(space, keys_w, W_FloatObject, 'float_w')
+        if floatkeys is None:
+            return None
+        sorter = FloatKeySort(order, len(order))
+        sorter.keys = floatkeys
+        sorter.sort()
+    else:
+        # unicode strings compare like their utf-8 encoding
+        if type(w_first) is W_BytesObject:
+            strkeys = _unbox_sort_keys(space, keys_w, W_BytesObject, 'str_w')
+        elif type(w_first) is W_UnicodeObject:
+            strkeys = _unbox_sort_keys(space, keys_w, W_UnicodeObject,
+                                       'utf8_w')
+        else:
+            return None
+        if strkeys is None:
+            return None
+        sorter = StrKeySort(order, len(order))
+        sorter.keys = strkeys
+        sorter.sort()
+    return order
 
 def get_printable_location_find(count, strategy_type, tp):
     if count:
@@ -1047,6 +1155,9 @@ class ListStrategy(object):
     def physical_size(self, w_list):
         raise oefmt(self.space.w_ValueError, "can't get physical size of list")
 
+    def compact(self, w_list):
+        pass
+
     def repr(self, w_list):
         space = self.space
         if self.length(w_list) == 0:
@@ -1849,6 +1960,12 @@ class AbstractUnwrappedStrategy(object):
         l = self.unerase(w_list.lstorage)
         return list_get_physical_size(l)
 
+    def compact(self, w_list):
+        from rpython.rlib.objectmodel import list_get_physical_size
+        l = self.unerase(w_list.lstorage)
+        if list_get_physical_size(l) > len(l):
+            w_list.lstorage = self.erase(l[:])
+
     def _unrolling_heuristic(self, w_list):
         storage = self.unerase(w_list.lstorage)
         return jit.loop_unrolling_heuristic(storage, len(storage), UNROLL_CUTOFF)
@@ -1933,8 +2050,13 @@ class IntegerListStrategy(ListStrategy):
 
     def sort(self, w_list, reverse):
         l = self.unerase(w_list.lstorage)
-        sorter = IntSort(l, len(l))
-        sorter.sort()
+        if len(l) >= RADIX_SORT_CUTOFF:
+            # timsort is linear on sorted input, the radix sort is not
+            if not is_sorted_int(l):
+                radixsort_int(l)
+        else:
+            sorter = IntSort(l, len(l))
+            sorter.sort()
         if reverse:
             l.reverse()
 
@@ -1945,7 +2067,8 @@ class IntegerListStrategy(ListStrategy):
     _base_extend_from_list = _extend_from_list
 
     def _extend_from_list(self, w_list, w_other):
-        if isinstance(w_other.strategy, BaseRangeListStrategy):
+        if (isinstance(w_other.strategy, BaseRangeListStrategy) or
+                isinstance(w_other.strategy, NarrowIntListStrategy)):
             l = self.unerase(w_list.lstorage)
             other = w_other.getitems_int()
             assert other is not None
@@ -1962,7 +2085,8 @@ class IntegerListStrategy(ListStrategy):
     _base_setslice = setslice
 
     def setslice(self, w_list, start, step, slicelength, w_other):
-        if w_other.strategy is self.space.fromcache(RangeListStrategy):
+        if (w_other.strategy is self.space.fromcache(RangeListStrategy) or
+                isinstance(w_other.strategy, NarrowIntListStrategy)):
             storage = self.erase(w_other.getitems_int())
             w_other = W_ListObject.from_storage_and_strategy(
                     self.space, storage, self)
@@ -2010,6 +2134,145 @@ class IntegerListStrategy(ListStrategy):
         res = str(self.unerase(w_list.lstorage))
         return space.newtext(res)
 
+    _base_compact = compact
+
+    def compact(self, w_list):
+        l = self.unerase(w_list.lstorage)
+        if not l:
+            return self._base_compact(w_list)
+        minval = maxval = l[0]
+        for intval in l:
+            if intval < minval:
+                minval = intval
+            elif intval > maxval:
+                maxval = intval
+        for strategy in self.space.fromcache(NarrowIntStrategies).strategies:
+            if strategy.minval <= minval and maxval <= strategy.maxval:
+                w_list.strategy = strategy
+                w_list.lstorage = strategy.erase(strategy.narrow(l))
+                return
+        self._base_compact(w_list)
+
+
+class NarrowIntListStrategy(ListStrategy):
+    """ Base class of the strategies storing ints in 8, 16 or 32 bits per
+    item. They are never chosen automatically, only by W_ListObject.compact()
+    (exposed as __pypy__.list_compact()). As soon as an item that doesn't fit
+    is stored, the list is switched back to IntegerListStrategy. """
+
+    minval = maxval = 0
+
+
+def make_narrow_int_strategy(TYPE):
+    bits = rffi.sizeof(TYPE) * 8
+    NarrowIntBaseTimSort = make_timsort_class()
+
+    # arithmetic and comparisons are not supported on the narrow types, the
+    # items have to be widened first
+    class NarrowIntSort(NarrowIntBaseTimSort):
+        def lt(self, a, b):
+            return widen(a) < widen(b)
+
+    class NarrowStrategy(NarrowIntListStrategy):
+        import_from_mixin(AbstractUnwrappedStrategy)
+
+        _none_value = rffi.cast(TYPE, 0)
+        minval = -(1 << (bits - 1))
+        maxval = (1 << (bits - 1)) - 1
+
+        def wrap(self, item):
+            return self.space.newint(widen(item))
+
+        def unwrap(self, w_int):
+            return rffi.cast(TYPE, self.space.int_w(w_int))
+
+        def _quick_cmp(self, a, b):
+            return widen(a) == widen(b)
+
+        def _safe_find_or_count(self, l, obj, start, stop, count):
+            intval = widen(obj)
+            result = 0
+            for i in range(start, min(stop, len(l))):
+                if widen(l[i]) == intval:
+                    if count:
+                        result += 1
+                    else:
+                        return i
+            if count:
+                return result
+            raise ValueError
+
+        erase, unerase = rerased.new_erasing_pair("int%d" % bits)
+        erase = staticmethod(erase)
+        unerase = staticmethod(unerase)
+
+        def is_correct_type(self, w_obj):
+            if type(w_obj) is not W_IntObject:
+                return False
+            intval = self.space.int_w(w_obj)
+            return self.minval <= intval <= self.maxval
+
+        def list_is_correct_type(self, w_list):
+            return w_list.strategy is self
+
+        def narrow(self, intlist):
+            return [rffi.cast(TYPE, intval) for intval in intlist]
+
+        def sort(self, w_list, reverse):
+            l = self.unerase(w_list.lstorage)
+            sorter = NarrowIntSort(l, len(l))
+            sorter.sort()
+            if reverse:
+                l.reverse()
+
+        def getitems_int(self, w_list):
+            return [widen(item) for item in self.unerase(w_list.lstorage)]
+
+        def switch_to_integer_strategy(self, w_list):
+            strategy = self.space.fromcache(IntegerListStrategy)
+            intlist = self.getitems_int(w_list)
+            w_list.strategy = strategy
+            w_list.lstorage = strategy.erase(intlist)
+
+        def switch_to_next_strategy(self, w_list, w_sample_item):
+            self.switch_to_integer_strategy(w_list)
+
+        _base_extend_from_list = _extend_from_list
+
+        def _extend_from_list(self, w_list, w_other):
+            if (w_other.strategy is self or
+                    w_other.strategy.is_empty_strategy()):
+                return self._base_extend_from_list(w_list, w_other)
+            self.switch_to_integer_strategy(w_list)
+            w_list.extend(w_other)
+
+        _base_setslice = setslice
+
+        def setslice(self, w_list, start, step, slicelength, w_other):
+            if w_other.strategy is not self and w_other.length() != 0:
+                self.switch_to_integer_strategy(w_list)
+                w_list.setslice(start, step, slicelength, w_other)
+                return
+            self._base_setslice(w_list, start, step, slicelength, w_other)
+
+    NarrowStrategy.__name__ = "Int%dListStrategy" % bits
+    return NarrowStrategy
+
+Int8ListStrategy = make_narrow_int_strategy(rffi.SIGNEDCHAR)
+Int16ListStrategy = make_narrow_int_strategy(rffi.SHORT)
+Int32ListStrategy = make_narrow_int_strategy(rffi.INT)
+
+
+class NarrowIntStrategies(object):
+    """ The narrow int strategies that are worth using on this platform, from
+    the narrowest to the widest. """
+
+    def __init__(self, space):
+        self.strategies = [space.fromcache(Int8ListStrategy),
+                           space.fromcache(Int16ListStrategy)]
+        if LONG_BIT > 32:
+            self.strategies.append(space.fromcache(Int32ListStrategy))
+
 
 class FloatListStrategy(ListStrategy):
     import_from_mixin(AbstractUnwrappedStrategy)
@@ -2371,6 +2634,9 @@ TimSort = make_timsort_class()
 IntBaseTimSort = make_timsort_class()
 FloatBaseTimSort = make_timsort_class()
 IntOrFloatBaseTimSort = make_timsort_class()
+IntKeyBaseTimSort = make_timsort_class()
+FloatKeyBaseTimSort = make_timsort_class()
+StrKeyBaseTimSort = make_timsort_class()
 
 
 class KeyContainer(W_Root):
@@ -2406,6 +2672,23 @@ class IntOrFloatSort(IntOrFloatBaseTimSort):
         return fa < fb
 
 
+# the KeySort classes sort a list of indices by the unboxed keys at these
+# indices, see _sort_order_by_unboxed_keys()
+class IntKeySort(IntKeyBaseTimSort):
+    def lt(self, a, b):
+        return self.keys[a] < self.keys[b]
+
+
+class FloatKeySort(FloatKeyBaseTimSort):
+    def lt(self, a, b):
+        return self.keys[a] < self.keys[b]
+
+
+class StrKeySort(StrKeyBaseTimSort):
+    def lt(self, a, b):
+        return self.keys[a] < self.keys[b]
+
+
 class CustomCompareSort(SimpleSort):
     def lt(self, a, b):
         space = self.space
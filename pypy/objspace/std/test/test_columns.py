@@ -0,0 +1,32 @@
+from pypy.objspace.std.columns import Column
+from pypy.objspace.std.listobject import (
+    EmptyListStrategy, IntegerListStrategy, FloatListStrategy,
+    BytesListStrategy)
+
+
+class TestColumn(object):
+
+    def test_unwrapped(self):
+        space = self.space
+        column = Column()
+        assert isinstance(column.wrap(space).strategy, EmptyListStrategy)
+        for append, values, strategy in [
+                (Column.append_int, [1, 2], IntegerListStrategy),
+                (Column.append_float, [1.5, 2.5], FloatListStrategy),
+                (Column.append_bytes, ['a', 'b'], BytesListStrategy)]:
+            column = Column()
+            for value in values:
+                append(column, space, value)
+            w_list = column.wrap(space)
+            assert isinstance(w_list.strategy, strategy)
+            assert space.unwrap(w_list) == values
+
+    def test_switch_to_objects(self):
+        space = self.space
+        column = Column()
+        column.append_int(space, 1)
+        column.append_float(space, 2.5)
+        column.append_bytes(space, 'x')
+        column.append_w(space, space.w_None)
+        column.append_int(space, 3)
+        assert space.unwrap(column.wrap(space)) == [1, 2.5, 'x', None, 3]
@@ -755,6 +755,57 @@ class AppTestListObject(object):
         r.sort(key=lambda x: -x)
         assert r == range(9, -1, -1)
 
+    def test_sort_key_unboxed(self):
+        # keys of one type among int, float, bytes and unicode
+        for key in [lambda x: x[0], lambda x: x[0] * 1.5,
+                    lambda x: str(x[0] + 10), lambda x: unichr(x[0] + 0xe0)]:
+            l = [(i % 7, i) for i in range(50)]
+            l.sort(key=key)
+            assert l == sorted([(i % 7, i) for i in range(50)])
+            l = [(i % 7, i) for i in range(50)]
+            l.sort(key=key, reverse=True)
+            # stable: equal keys keep their order
+            assert l == [(k, i) for k in range(6, -1, -1)
+                                for i in range(50) if i % 7 == k]
+        # mixed keys are compared with the generic code
+        l = [3, 2.5, 1, 0.5]
+        l.sort(key=lambda x: x)
+        assert l == [0.5, 1, 2.5, 3]
+        l = ['b', u'a', 'c']
+        l.sort(key=lambda x: x)
+        assert l == [u'a', 'b', 'c']
+        l = [1, 2, 3, 4]
+        l.sort(key=lambda x: (x % 2, x))
+        assert l == [2, 4, 1, 3]
+        l = [1, 2, float('nan'), 0]
+        l.sort(key=lambda x: x * 1.0)
+        assert l[0] == 1
+
+    def test_sort_key_errors(self):
+        def key(x):
+            if x == 3:
+                raise ZeroDivisionError
+            return x
+        l = [5, 3, 1]
+        raises(ZeroDivisionError, l.sort, key=key)
+        assert l == [5, 3, 1]
+        def key(x):
+            l.append(x)
+            return x
+        raises(ValueError, l.sort, key=key)
+
+    def test_sort_big_int_list(self):
+        import sys
+        l = [(i * 7919) % 10007 - 5000 for i in range(10007)]
+        l.extend([sys.maxint, -sys.maxint-1])
+        l2 = l[:]
+        l.sort()
+        assert l == sorted(l2, key=lambda x: x)
+        assert l[0] == -sys.maxint-1
+        assert l[-1] == sys.maxint
+        l.sort(reverse=True)
+        assert l[-1] == -sys.maxint-1
+
     def test_sort_reversed(self):
         l = range(10)
         l.sort(reverse=True)
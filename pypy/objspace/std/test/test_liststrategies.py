@@ -4,7 +4,8 @@ from pypy.objspace.std.listobject import (
     W_ListObject, EmptyListStrategy, ObjectListStrategy, IntegerListStrategy,
     FloatListStrategy, BytesListStrategy, RangeListStrategy,
     SimpleRangeListStrategy, make_range_list, AsciiListStrategy,
-    IntOrFloatListStrategy)
+    IntOrFloatListStrategy, Int8ListStrategy, Int16ListStrategy,
+    Int32ListStrategy)
 from pypy.objspace.std import listobject
 from pypy.objspace.std.test.test_listobject import TestW_ListObject
 
@@ -63,6 +64,73 @@ class TestW_ListStrategies(TestW_ListObject):
         l.append(self.space.wrap('a'))
         assert isinstance(l.strategy, ObjectListStrategy)
 
+    def test_compact_int(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(-128), w(127)])
+        l.compact()
+        assert isinstance(l.strategy, Int8ListStrategy)
+        assert space.unwrap(l.descr_repr(space)) == "[1, -128, 127]"
+        l.append(w(128))
+        assert isinstance(l.strategy, IntegerListStrategy)
+        l.compact()
+        assert isinstance(l.strategy, Int16ListStrategy)
+        l.setitem(0, w(-2**31))
+        assert isinstance(l.strategy, IntegerListStrategy)
+        l.compact()
+        if sys.maxint > 2**31:
+            assert isinstance(l.strategy, Int32ListStrategy)
+            l.insert(0, w(2**31))
+            assert isinstance(l.strategy, IntegerListStrategy)
+            l.compact()
+        assert isinstance(l.strategy, IntegerListStrategy)
+
+    def test_compact_int_operations(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(i) for i in [5, -1, 3, 3]])
+        l.compact()
+        assert isinstance(l.strategy, Int8ListStrategy)
+        l.sort(False)
+        assert space.unwrap(l) == [-1, 3, 3, 5]
+        l.sort(True)
+        assert space.unwrap(l) == [5, 3, 3, -1]
+        assert l.find_or_count(w(3), 0, 4, False) == 1
+        assert l.find_or_count(w(3), 0, 4, True) == 2
+        l2 = l.descr_getitem(space, space.newslice(w(1), w(3), w(1)))
+        assert l2.strategy is l.strategy
+        assert l.getitems_int() == [5, 3, 3, -1]
+        l.extend(l2)
+        assert l.strategy is l2.strategy
+        assert space.unwrap(l) == [5, 3, 3, -1, 3, 3]
+        l.extend(W_ListObject(space, [w(1000)]))
+        assert isinstance(l.strategy, IntegerListStrategy)
+        assert space.unwrap(l) == [5, 3, 3, -1, 3, 3, 1000]
+        l.compact()
+        l.append(w(1.5))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        l = W_ListObject(space, [w(1), w(2)])
+        l.compact()
+        l.setslice(0, 1, 1, W_ListObject(space, [w('a')]))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.unwrap(l) == ['a', 2]
+        l = W_ListObject(space, [w(1), w(2)])
+        l2 = W_ListObject(space, [w(3)])
+        l2.compact()
+        l.extend(l2)
+        assert isinstance(l.strategy, IntegerListStrategy)
+        assert space.unwrap(l) == [1, 2, 3]
+
+    def test_compact_shrinks(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1.5)])
+        for i in range(20):
+            l.append(w(1.5))
+        l.compact()
+        assert isinstance(l.strategy, FloatListStrategy)
+        assert l.physical_size() == 21
+
     def test_string_to_any(self):
         l = W_ListObject(self.space,
             [self.space.newbytes('a'), self.space.newbytes('b'),
@@ -17,11 +17,10 @@ class Stat(object):
     BIGOBJ = 65536   # bytes
 
     def summarize(self, filename):
-        a = self.load_dump_file(filename)
         self.summary = {}     # {typenum: [count, totalsize]}
         self.bigobjs = []     # list of individual (size, typenum)
-        for obj in self.walk(a):
-            self.add_object_summary(obj[2], obj[3])
+        for obj in iter_dump_file(filename):
+            self.add_object_summary(obj[1], obj[2])
 
     def load_typeids(self, filename_or_iter):
         self.typeids = Stat.typeids.copy()
@@ -102,6 +101,39 @@ class Stat(object):
         print('done', file=sys.stderr)
 
 
+def iter_dump_file(filename, chunksize=1024*1024):
+    """Iterate over the objects of a dump file without loading all of it:
+    yields tuples (addr, typenum, size, list_of_addrs), reading the file
+    by chunks of 'chunksize' words.  The GC roots come first, followed by
+    the marker (0, 0, 0, []).
+    """
+    f = open(filename, 'rb')
+    try:
+        pending = []
+        while True:
+            a = array.array('l')
+            try:
+                a.fromfile(f, chunksize)
+            except EOFError:
+                pass       # 'a' contains the remaining words
+            if not a:
+                break
+            words = pending + a.tolist()
+            i = 0
+            while True:
+                try:
+                    j = words.index(-1, i + 3)
+                except ValueError:
+                    break
+                yield (words[i], words[i+1], words[i+2], words[i+3:j])
+                i = j + 1
+            pending = words[i:]
+    finally:
+        f.close()
+    if pending:
+        raise ValueError("invalid or truncated dump file (or 32/64-bit mix)")
+
+
 if __name__ == '__main__':
     if len(sys.argv) <= 1:
         print(__doc__, file=sys.stderr)
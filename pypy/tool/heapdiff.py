@@ -0,0 +1,166 @@
+#! /usr/bin/env python
+"""
+Finds what grows between two dump files produced by gc.dump_rpy_heap().
+
+Syntax:  heapdiff.py  snapshot  <dumpfile>  <snapfile>  [<depth>]
+         heapdiff.py  diff  <old>  <new>  [<typeids.txt>]
+
+'snapshot' reads a dump file and writes a much smaller snapshot of it:
+the number and total size of the objects of each type, and of each
+retention path.  The retention path of an object is the list of the
+types of the objects that keep it alive, starting from a GC root, of
+which only the last <depth> ones (default 4) are kept.
+
+'diff' takes two dump files or snapshots, which must come from the same
+pypy executable, and prints the types and the retention paths whose
+total size grew the most.  By default, typeids.txt is loaded from the
+same dir as <new>.
+"""
+from __future__ import print_function
+import sys, os
+from pypy.tool.gcdump import Stat, iter_dump_file
+
+SNAPSHOT_HEADER = '# heapdiff snapshot 1\n'
+DEFAULT_DEPTH = 4
+
+
+class Snapshot(object):
+
+    def __init__(self):
+        self.types = {}       # {typenum: [count, totalsize]}
+        self.paths = {}       # {tuple_of_typenums: [count, totalsize]}
+
+    def add(self, typenum, size, path):
+        for d, key in ((self.types, typenum), (self.paths, path)):
+            try:
+                stat = d[key]
+            except KeyError:
+                stat = d[key] = [0, 0]
+            stat[0] += 1
+            stat[1] += size
+
+    def load_dump(self, filename, depth=DEFAULT_DEPTH):
+        # The dump lists every object only once, after the object through
+        # which the GC found it, so the retention paths can be computed
+        # while reading the file: 'discovered' maps the addresses that
+        # were seen in a list of references, but whose object was not
+        # read yet, to the path of the object that references them.
+        assert depth >= 1
+        discovered = {}
+        seen = set()
+        root_path = (0,)     # '<GCROOT>'
+        for addr, typenum, size, refs in iter_dump_file(filename):
+            if addr == 0:
+                root_path = None    # the marker, at the end of the roots
+                continue
+            if root_path is not None:
+                parent_path = root_path
+                discovered.pop(addr, None)
+            else:
+                parent_path = discovered.pop(addr, ())
+            path = (parent_path + (typenum,))[-depth:]
+            self.add(typenum, size, path)
+            seen.add(addr)
+            for ref in refs:
+                if ref not in seen:
+                    seen.add(ref)
+                    discovered[ref] = path
+
+    def load(self, filename):
+        f = open(filename)
+        try:
+            if f.readline() != SNAPSHOT_HEADER:
+                raise ValueError("%s: not a heapdiff snapshot" % (filename,))
+            for line in f:
+                words = line.split()
+                stat = [int(words[1]), int(words[2])]
+                if words[0] == 'T':
+                    self.types[int(words[3])] = stat
+                elif words[0] == 'P':
+                    path = tuple([int(x) for x in words[3].split(',')])
+                    self.paths[path] = stat
+        finally:
+            f.close()
+
+    def save(self, filename):
+        f = open(filename, 'w')
+        try:
+            f.write(SNAPSHOT_HEADER)
+            for typenum, stat in sorted(self.types.items()):
+                f.write('T %d %d %d\n' % (stat[0], stat[1], typenum))
+            for path, stat in sorted(self.paths.items()):
+                f.write('P %d %d %s\n' % (stat[0], stat[1],
+                                          ','.join([str(x) for x in path])))
+        finally:
+            f.close()
+
+
+def load_snapshot(filename, depth=DEFAULT_DEPTH):
+    """Load either a snapshot or a full dump file."""
+    snapshot = Snapshot()
+    f = open(filename, 'rb')
+    header = f.read(len(SNAPSHOT_HEADER))
+    f.close()
+    if header == SNAPSHOT_HEADER.encode('ascii'):
+        snapshot.load(filename)
+    else:
+        snapshot.load_dump(filename, depth)
+    return snapshot
+
+def diff_stats(old, new):
+    """Return a list of (delta_count, delta_size, key), for the keys whose
+    total size changed, sorted by decreasing delta_size."""
+    result = []
+    for key in set(old) | set(new):
+        count0, size0 = old.get(key, (0, 0))
+        count1, size1 = new.get(key, (0, 0))
+        if size1 != size0 or count1 != count0:
+            result.append((count1 - count0, size1 - size0, key))
+    result.sort(key=lambda row: (-row[1], -row[0]))
+    return result
+
+def format_path(stat, path):
+    names = [stat.get_type_name(typenum) for typenum in path]
+    if path[0] != 0:
+        names.insert(0, '...')
+    return ' -> '.join(names)
+
+def print_diff(old, new, stat, limit=20):
+    print('Types whose total size grew the most:')
+    for dcount, dsize, typenum in diff_stats(old.types, new.types)[:limit]:
+        print('%+9d %+9.2fM  %s' % (dcount, dsize / (1024.0*1024.0),
+                                    stat.get_type_name(typenum)))
+    print()
+    print('Retention paths whose total size grew the most:')
+    for dcount, dsize, path in diff_stats(old.paths, new.paths)[:limit]:
+        print('%+9d %+9.2fM  %s' % (dcount, dsize / (1024.0*1024.0),
+                                    format_path(stat, path)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4 or sys.argv[1] not in ('snapshot', 'diff'):
+        print(__doc__, file=sys.stderr)
+        sys.exit(2)
+    if sys.argv[1] == 'snapshot':
+        depth = DEFAULT_DEPTH
+        if len(sys.argv) > 4:
+            depth = int(sys.argv[4])
+        snapshot = Snapshot()
+        snapshot.load_dump(sys.argv[2], depth)
+        snapshot.save(sys.argv[3])
+        sys.exit(0)
+    old = load_snapshot(sys.argv[2])
+    new = load_snapshot(sys.argv[3])
+    #
+    stat = Stat()
+    if len(sys.argv) > 4:
+        typeid_name = sys.argv[4]
+    else:
+        typeid_name = os.path.join(os.path.dirname(sys.argv[3]), 'typeids.txt')
+    if os.path.isfile(typeid_name):
+        stat.load_typeids(typeid_name)
+    else:
+        import zlib, gc
+        stat.load_typeids(zlib.decompress(gc.get_typeids_z()).split("\n"))
+    #
+    print_diff(old, new, stat)
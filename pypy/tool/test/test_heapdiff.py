@@ -0,0 +1,65 @@
+import py, array
+from pypy.tool.gcdump import iter_dump_file
+from pypy.tool.heapdiff import Snapshot, load_snapshot, diff_stats
+
+
+def write_dump(tmpdir, name, roots, objects):
+    # each object is (addr, typenum, size, refs)
+    a = array.array('l')
+    for addr, typenum, size, refs in roots + [(0, 0, 0, [])] + objects:
+        a.extend([addr, typenum, size] + refs + [-1])
+    filename = str(tmpdir.join(name))
+    f = open(filename, 'wb')
+    a.tofile(f)
+    f.close()
+    return filename
+
+ROOTS = [(1000, 1, 16, [2000, 3000])]
+OBJECTS = [(3000, 2, 24, [4000, 2000]),
+           (4000, 3, 100, []),
+           (2000, 3, 100, [1000, 4000])]
+
+def test_iter_dump_file(tmpdir):
+    filename = write_dump(tmpdir, 'dump', ROOTS, OBJECTS)
+    for chunksize in [1, 3, 7, 1024]:
+        objs = list(iter_dump_file(filename, chunksize))
+        assert objs == ROOTS + [(0, 0, 0, [])] + OBJECTS
+
+def test_truncated_dump_file(tmpdir):
+    filename = write_dump(tmpdir, 'dump', ROOTS, OBJECTS)
+    f = open(filename, 'r+b')
+    f.truncate(array.array('l').itemsize * 18)
+    f.close()
+    py.test.raises(ValueError, list, iter_dump_file(filename))
+
+def test_load_dump(tmpdir):
+    filename = write_dump(tmpdir, 'dump', ROOTS, OBJECTS)
+    snapshot = Snapshot()
+    snapshot.load_dump(filename)
+    assert snapshot.types == {1: [1, 16], 2: [1, 24], 3: [2, 200]}
+    assert snapshot.paths == {(0, 1): [1, 16],
+                              (0, 1, 2): [1, 24],
+                              (0, 1, 2, 3): [1, 100],
+                              (0, 1, 3): [1, 100]}
+    snapshot = Snapshot()
+    snapshot.load_dump(filename, depth=2)
+    assert snapshot.paths == {(0, 1): [1, 16],
+                              (1, 2): [1, 24],
+                              (2, 3): [1, 100],
+                              (1, 3): [1, 100]}
+
+def test_save_load_diff(tmpdir):
+    old = load_snapshot(write_dump(tmpdir, 'old', ROOTS, OBJECTS))
+    more = [(5000 + i, 3, 100, []) for i in range(5)]
+    objects = [(3000, 2, 24, [4000, 2000] + [obj[0] for obj in more])]
+    filename = write_dump(tmpdir, 'new', ROOTS, objects + OBJECTS[1:] + more)
+    snapshot = Snapshot()
+    snapshot.load_dump(filename)
+    snapshot.save(str(tmpdir.join('new.snap')))
+    new = load_snapshot(str(tmpdir.join('new.snap')))
+    assert new.types == snapshot.types
+    assert new.paths == snapshot.paths
+    #
+    assert diff_stats(old.types, new.types) == [(5, 500, 3)]
+    assert diff_stats(old.paths, new.paths) == [(5, 500, (0, 1, 2, 3))]
+    assert diff_stats(new.paths, old.paths) == [(-5, -500, (0, 1, 2, 3))]
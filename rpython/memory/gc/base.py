@@ -225,6 +225,9 @@ class GCBase(object):
     def set_max_heap_size(self, size):
         raise NotImplementedError
 
+    def set_deferred_major_steps(self, max_steps):
+        pass
+
     @staticmethod
     @specialize.memo()
     def assert_callback_is_a_function(callback):
@@ -112,7 +112,13 @@ def get_total_memory_darwin(result):
 
 if sys.platform.startswith('linux'):
     def get_total_memory():
-        return get_total_memory_linux2('/proc/meminfo')
+        result = get_total_memory_linux2('/proc/meminfo')
+        cgroup = find_cgroup_memory()
+        limit = get_cgroup_memory_limit(cgroup)
+        free_cgroup_memory(cgroup)
+        if 0.0 < limit < result:
+            result = limit
+        return result
 
 elif sys.platform == 'darwin':
     def get_total_memory():
@@ -127,6 +133,251 @@ else:
         return addressable_size       # XXX implement me for other platforms
 
 
+# ____________________________________________________________
+# Memory limit and current memory usage of the cgroup (v2 or v1) in which
+# the process runs, e.g. in a container.  The files of the cgroup are found
+# once at startup from /proc/self/cgroup.  The usage is read by the GC in
+# the middle of collections, so the files are read with plain C calls
+# that neither release the GIL nor allocate GC objects.
+
+CGROUP_PROC_FILE = '/proc/self/cgroup'
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+# cgroup v1 reports the absence of limit as a huge number
+CGROUP_NO_LIMIT = 4611686018427387904.0     # 2**62
+
+# when the cgroup has a memory limit, the GC heap may grow by at most this
+# fraction of the memory left before the next major collection
+CGROUP_HEADROOM_FRACTION = 0.5
+
+# the files of the memory controller of a cgroup, raw-malloced and never
+# freed by the GC
+CGROUP_MEMORY = lltype.Struct('cgroup_memory',
+                              ('c_version', lltype.Signed),
+                              ('c_limit_file', rffi.CCHARP),
+                              ('c_usage_file', rffi.CCHARP),
+                              ('c_stat_file', rffi.CCHARP))
+NULL_CGROUP = lltype.nullptr(CGROUP_MEMORY)
+
+def _find_cgroup_path(data, controller):
+    """Return the path of the cgroup listed in the content of
+    /proc/self/cgroup for 'controller', or for cgroup v2 if 'controller'
+    is empty, or None.  The lines look like '4:memory:/path' (v1) or
+    '0::/path' (v2)."""
+    for line in data.split('\n'):
+        i = line.find(':')
+        if i < 0:
+            continue
+        j = line.find(':', i + 1)
+        if j < 0:
+            continue
+        if controller:
+            found = controller in line[i + 1:j].split(',')
+        else:
+            found = line[:i] == '0' and j == i + 1
+        if found:
+            path = line[j + 1:]
+            if path.endswith('/'):
+                stop = len(path) - 1
+                assert stop >= 0
+                path = path[:stop]
+            return path
+    return None
+
+if sys.platform.startswith('linux'):
+    _file_eci = ExternalCompilationInfo(includes=['fcntl.h', 'unistd.h'])
+    _c_open = rffi.llexternal('open', [rffi.CCHARP, rffi.INT], rffi.INT,
+                              compilation_info=_file_eci, releasegil=False,
+                              sandboxsafe=True, _nowrapper=True)
+    _c_read = rffi.llexternal('read', [rffi.INT, rffi.CCHARP, rffi.SIZE_T],
+                              rffi.SSIZE_T, compilation_info=_file_eci,
+                              releasegil=False, sandboxsafe=True,
+                              _nowrapper=True)
+    _c_close = rffi.llexternal('close', [rffi.INT], rffi.INT,
+                               compilation_info=_file_eci, releasegil=False,
+                               sandboxsafe=True, _nowrapper=True)
+
+    def _read_raw_file(c_filename, buf, bufsize):
+        """Read at most 'bufsize' bytes of the file into 'buf'.  Return
+        the number of bytes read, or -1 if the file cannot be opened."""
+        fd = rffi.cast(lltype.Signed,
+                       _c_open(c_filename, rffi.cast(rffi.INT, os.O_RDONLY)))
+        if fd < 0:
+            return -1
+        count = 0
+        while count < bufsize:
+            got = rffi.cast(lltype.Signed,
+                            _c_read(rffi.cast(rffi.INT, fd),
+                                    rffi.ptradd(buf, count),
+                                    rffi.cast(rffi.SIZE_T, bufsize - count)))
+            if got <= 0:
+                break
+            count += got
+        _c_close(rffi.cast(rffi.INT, fd))
+        return count
+
+    def _parse_number(buf, i, count):
+        result = -1.0
+        start = i
+        while i < count and '0' <= buf[i] <= '9':
+            if i == start:
+                result = 0.0
+            result = result * 10.0 + float(ord(buf[i]) - ord('0'))
+            i += 1
+        return result
+
+    def _read_number_from_file(c_filename):
+        """Return the number at the start of the file, or -1.0 if the file
+        cannot be read or does not start with a number (like 'max')."""
+        bufsize = 64
+        buf = lltype.malloc(rffi.CCHARP.TO, bufsize, flavor='raw')
+        count = _read_raw_file(c_filename, buf, bufsize)
+        result = _parse_number(buf, 0, count)
+        lltype.free(buf, flavor='raw')
+        return result
+
+    def _read_stat_from_file(c_filename, key):
+        """Return the number on the line 'key <number>' of the file, or
+        -1.0 if there is no such line."""
+        result = -1.0
+        bufsize = 16384
+        buf = lltype.malloc(rffi.CCHARP.TO, bufsize, flavor='raw')
+        count = _read_raw_file(c_filename, buf, bufsize)
+        keylen = len(key)
+        i = 0
+        while i < count:
+            # at the start of a line
+            j = 0
+            while j < keylen and i < count and buf[i] == key[j]:
+                i += 1
+                j += 1
+            if j == keylen and i < count and buf[i] == ' ':
+                result = _parse_number(buf, i + 1, count)
+                break
+            while i < count and buf[i] != '\n':
+                i += 1
+            i += 1
+        lltype.free(buf, flavor='raw')
+        return result
+
+    def _read_file(filename):
+        try:
+            fd = os.open(filename, os.O_RDONLY, 0644)
+            try:
+                return os.read(fd, 4096)
+            finally:
+                os.close(fd)
+        except OSError:
+            return ''
+
+    def find_cgroup_memory(proc_filename=CGROUP_PROC_FILE, root=CGROUP_ROOT):
+        """Return the files of the memory controller of the cgroup of the
+        process, or NULL_CGROUP.  The cgroup directory of /proc/self/cgroup
+        is tried first; inside a container it is often not visible, and
+        the files are then the ones at the root of the hierarchy."""
+        data = _read_file(proc_filename)
+        candidates = []
+        path = _find_cgroup_path(data, 'memory')
+        if path is not None:
+            candidates.append((1, root + '/memory' + path))
+        path = _find_cgroup_path(data, '')
+        if path is not None:
+            candidates.append((2, root + path))
+        candidates.append((2, root))
+        candidates.append((1, root + '/memory'))
+        for version, dirname in candidates:
+            if version == 2:
+                limit_file = dirname + '/memory.max'
+                usage_file = dirname + '/memory.current'
+            else:
+                limit_file = dirname + '/memory.limit_in_bytes'
+                usage_file = dirname + '/memory.usage_in_bytes'
+            c_usage_file = rffi.str2charp(usage_file, track_allocation=False)
+            if _read_number_from_file(c_usage_file) >= 0.0:
+                cgroup = lltype.malloc(CGROUP_MEMORY, flavor='raw',
+                                       track_allocation=False)
+                cgroup.c_version = version
+                cgroup.c_limit_file = rffi.str2charp(limit_file,
+                                                     track_allocation=False)
+                cgroup.c_usage_file = c_usage_file
+                cgroup.c_stat_file = rffi.str2charp(dirname + '/memory.stat',
+                                                    track_allocation=False)
+                return cgroup
+            lltype.free(c_usage_file, flavor='raw', track_allocation=False)
+        return NULL_CGROUP
+
+    def free_cgroup_memory(cgroup):
+        if cgroup:
+            lltype.free(cgroup.c_limit_file, flavor='raw',
+                        track_allocation=False)
+            lltype.free(cgroup.c_usage_file, flavor='raw',
+                        track_allocation=False)
+            lltype.free(cgroup.c_stat_file, flavor='raw',
+                        track_allocation=False)
+            lltype.free(cgroup, flavor='raw', track_allocation=False)
+
+    def get_cgroup_memory_limit(cgroup):
+        debug_start("gc-hardware")
+        result = -1.0
+        if cgroup:
+            result = _read_number_from_file(cgroup.c_limit_file)
+        if result <= 0.0 or result >= CGROUP_NO_LIMIT:
+            debug_print("no cgroup memory limit")
+            result = -1.0
+        else:
+            debug_print("cgroup memory limit =", result)
+        debug_stop("gc-hardware")
+        return result
+
+    def get_cgroup_memory_usage(cgroup):
+        """Return the memory used by the cgroup, not counting the page
+        cache that the kernel can reclaim (the inactive file pages), or
+        -1.0 if unknown."""
+        if not cgroup:
+            return -1.0
+        result = _read_number_from_file(cgroup.c_usage_file)
+        if result > 0.0:
+            if cgroup.c_version == 2:
+                inactive = _read_stat_from_file(cgroup.c_stat_file,
+                                                'inactive_file')
+            else:
+                inactive = _read_stat_from_file(cgroup.c_stat_file,
+                                                'total_inactive_file')
+            if inactive > 0.0:
+                result -= inactive
+                if result < 0.0:
+                    result = 0.0
+        return result
+
+else:
+    def find_cgroup_memory(proc_filename=CGROUP_PROC_FILE, root=CGROUP_ROOT):
+        return NULL_CGROUP
+
+    def free_cgroup_memory(cgroup):
+        pass
+
+    def get_cgroup_memory_limit(cgroup):
+        return -1.0
+
+    def get_cgroup_memory_usage(cgroup):
+        return -1.0
+
+def limit_major_threshold(threshold, total_memory_used, memory_limit,
+                          memory_usage):
+    """Lower the threshold of the next major collection if the process
+    comes near 'memory_limit': the GC heap may only grow by a fraction of
+    the memory left.  Nothing changes while that memory is plentiful.
+    """
+    if memory_limit <= 0.0 or memory_usage < 0.0:
+        return threshold
+    headroom = memory_limit - memory_usage
+    if headroom < 0.0:
+        headroom = 0.0
+    maximum = total_memory_used + headroom * CGROUP_HEADROOM_FRACTION
+    if threshold > maximum:
+        threshold = maximum
+    return threshold
+
 # ____________________________________________________________
 # Estimation of the nursery size, based on the L2 cache.
 
@@ -456,3 +707,43 @@ def estimate_best_nursery_size():
     on the machine we are running on.  Linux code."""
     L2cache = get_L2cache()
     return best_nursery_size_for_L2cache(L2cache)
+
+# ____________________________________________________________
+# Adapting the nursery size at run-time, from the minor collections.
+
+# below this fraction of surviving objects, a larger nursery means fewer
+# minor collections for roughly the same amount of copying
+NURSERY_LOW_SURVIVAL = 0.05
+# above this fraction, the nursery is too large to be worth it: most of
+# the objects are copied anyway, and the pauses get longer
+NURSERY_HIGH_SURVIVAL = 0.25
+
+def adapt_nursery_size(nursery_size, allocated_size, surviving_size,
+                       max_duration, max_pause, min_size, max_size):
+    """Return the nursery size to use next, given that 'surviving_size'
+    bytes survived the minor collections out of 'allocated_size' bytes
+    allocated in the nursery, and that the longest of these minor
+    collections took 'max_duration' seconds.  'max_pause' is the target
+    for that duration, or 0.0 if there is none.  The result is between
+    'min_size' and 'max_size'.
+    """
+    new_size = nursery_size
+    if max_pause > 0.0 and max_duration > max_pause:
+        # the pauses are roughly proportional to the size of the surviving
+        # objects: shrink enough to meet the target, but at most by half
+        factor = max_pause / max_duration
+        if factor < 0.5:
+            factor = 0.5
+        new_size = int(nursery_size * factor)
+    elif allocated_size > 0:
+        survival = float(surviving_size) / float(allocated_size)
+        if survival < NURSERY_LOW_SURVIVAL:
+            if max_pause <= 0.0 or max_duration * 2.0 <= max_pause:
+                new_size = nursery_size * 2
+        elif survival > NURSERY_HIGH_SURVIVAL:
+            new_size = nursery_size // 2
+    if new_size > max_size:
+        new_size = max_size
+    if new_size < min_size:
+        new_size = min_size
+    return new_size
@@ -9,17 +9,42 @@ Environment variables can be used to fine-tune the following parameters:
  PYPY_GC_NURSERY_DEBUG   If set to non-zero, will fill nursery with garbage,
                          to help debugging.
 
+ PYPY_GC_NURSERY_MAX     If set, the nursery size adapts at run-time up to
+                         this size: it grows when few objects survive the
+                         minor collections, and shrinks when many do.
+
+ PYPY_GC_NURSERY_MIN     The lower bound for the adaptive nursery size.
+                         Defaults to 1/4 of PYPY_GC_NURSERY.  Setting it
+                         also enables the adaptive nursery size.
+
+ PYPY_GC_MINOR_PAUSE     Target for the longest minor collection, in
+                         milliseconds (e.g. '2.5').  The adaptive nursery
+                         shrinks if minor collections take longer, and
+                         only grows if they take less than half of it.
+                         Setting it also enables the adaptive nursery size.
+
  PYPY_GC_INCREMENT_STEP  The size of memory marked during the marking step.
                          Default is size of nursery * 2. If you mark it too high
                          your GC is not incremental at all. The minimum is set
                          to size that survives minor collection * 1.5 so we
                          reclaim anything all the time.
 
+ PYPY_GC_DEFERRED_STEPS  The number of major collection steps that minor
+                         collections may leave to explicit calls to
+                         collect_step(), typically done by a helper thread
+                         while the program waits for I/O.  Default is 0,
+                         i.e. minor collections run the steps themselves.
+                         If more steps are pending, the next minor
+                         collection catches up with all of them.
+
  PYPY_GC_MAJOR_COLLECT   Major collection memory factor.  Default is '1.82',
                          which means trigger a major collection when the
                          memory consumed equals 1.82 times the memory
                          really used at the end of the previous major
-                         collection.
+                         collection.  On Linux, if the process runs in a
+                         cgroup with a memory limit (e.g. in a container),
+                         major collections are also triggered earlier when
+                         the memory used by the cgroup comes near that limit.
 
  PYPY_GC_GROWTH          Major collection threshold's max growth rate.
                          Default is '1.4'.  Useful to collect more often
@@ -35,8 +60,9 @@ Environment variables can be used to fine-tune the following parameters:
  PYPY_GC_MAX_DELTA       The major collection threshold will never be set
                          to more than PYPY_GC_MAX_DELTA the amount really
                          used after a collection.  Defaults to 1/8th of the
-                         total RAM size (which is constrained to be at most
-                         2/3/4GB on 32-bit systems).  Try values like '200MB'.
+                         total RAM size, or of the memory limit of the cgroup
+                         (which is constrained to be at most 2/3/4GB on
+                         32-bit systems).  Try values like '200MB'.
 
  PYPY_GC_MIN             Don't collect while the memory size is below this
                          limit.  Useful to avoid spending all the time in
@@ -308,6 +334,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.max_heap_size = 0.0
         self.max_heap_size_already_raised = False
         self.max_delta = float(r_uint(-1))
+        self.memory_limit = -1.0    # the limit of the cgroup, if any
+        self.cgroup = env.NULL_CGROUP
         self.max_number_of_pinned_objects = 0      # computed later
         #
         self.card_page_indices = card_page_indices
@@ -324,6 +352,22 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.nursery_free = llmemory.NULL
         self.nursery_top  = llmemory.NULL
         self.debug_tiny_nursery = -1
+        #
+        # Adaptive nursery size: it stays between 'nursery_size_min' and
+        # 'nursery_size_max', or it is fixed if 'nursery_size_max' is 0.
+        # The 'nursery_adapt_*' fields collect statistics about the
+        # minor collections since the last decision; see
+        # adapt_nursery_size().
+        self.nursery_size_min = 0
+        self.nursery_size_max = 0
+        self.minor_pause_max = 0.0
+        self.nursery_adapt_count = 0
+        self.nursery_adapt_allocated = 0
+        self.nursery_adapt_surviving = 0
+        self.nursery_adapt_duration = 0.0
+        # collect_and_reserve() clears 'nursery_free' before the minor
+        # collection; it saves the value here for adapt_nursery_size().
+        self.nursery_free_at_overflow = llmemory.NULL
         self.debug_rotating_nurseries = lltype.nullptr(NURSARRAY)
         self.extra_threshold = 0
         #
@@ -369,6 +413,13 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # for more details.
         self.size_objects_made_old = r_uint(0)
         self.threshold_objects_made_old = r_uint(0)
+        #
+        # The number of major GC steps that minor collections skipped,
+        # leaving them to collect_step().  Minor collections only skip
+        # steps while this is below 'max_deferred_major_steps'; see
+        # minor_collection_with_major_progress().
+        self.deferred_major_steps = 0
+        self.max_deferred_major_steps = 0
 
 
     def setup(self):
@@ -496,7 +547,14 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 self.max_delta = float(max_delta)
             else:
                 self.max_delta = 0.125 * env.get_total_memory()
+            #
+            self.cgroup = env.find_cgroup_memory()
+            self.memory_limit = env.get_cgroup_memory_limit(self.cgroup)
 
+            deferred_steps = env.read_from_env('PYPY_GC_DEFERRED_STEPS')
+            if deferred_steps > 0:
+                self.max_deferred_major_steps = deferred_steps
+            #
             gc_increment_step = env.read_uint_from_env('PYPY_GC_INCREMENT_STEP')
             if gc_increment_step > 0:
                 self.gc_increment_step = gc_increment_step
@@ -512,6 +570,17 @@ class IncrementalMiniMarkGC(MovingGCBase):
             llarena.arena_free(self.nursery)
             self.nursery_size = newsize
             self.allocate_nursery()
+            #
+            nursery_max = env.read_from_env('PYPY_GC_NURSERY_MAX')
+            nursery_min = env.read_from_env('PYPY_GC_NURSERY_MIN')
+            minor_pause = env.read_float_from_env('PYPY_GC_MINOR_PAUSE')
+            if ((nursery_max > 0 or nursery_min > 0 or minor_pause > 0.0)
+                    and self.debug_tiny_nursery < 0):
+                if nursery_min <= 0:
+                    nursery_min = newsize // 4
+                self.nursery_size_min = max(nursery_min, minsize) & ~(WORD-1)
+                self.nursery_size_max = max(nursery_max, newsize) & ~(WORD-1)
+                self.minor_pause_max = minor_pause / 1000.0
         #
         env_max_number_of_pinned_objects = os.environ.get('PYPY_GC_MAX_PINNED')
         if env_max_number_of_pinned_objects:
@@ -818,9 +887,23 @@ class IncrementalMiniMarkGC(MovingGCBase):
         old_state = self.gc_state
         self._minor_collection()
         self.major_collection_step()
+        if self.gc_state == STATE_SCANNING:
+            # the major GC cycle is over: nothing is pending any more
+            self.deferred_major_steps = 0
+        elif self.deferred_major_steps > 0:
+            self.deferred_major_steps -= 1
         self.rrc_invoke_callback()
         return rgc._encode_states(old_state, self.gc_state)
 
+    def set_deferred_major_steps(self, max_steps):
+        """Let minor collections leave up to 'max_steps' major collection
+        steps to explicit calls to collect_step().  A value of 0 restores
+        the default, where minor collections run all the steps themselves.
+        """
+        self.max_deferred_major_steps = max_steps
+        if self.deferred_major_steps > max_steps:
+            self.deferred_major_steps = max_steps
+
     def minor_collection_with_major_progress(self, extrasize=0,
                                              force_enabled=False):
         """Do a minor collection.  Then, if the GC is enabled and there
@@ -844,6 +927,16 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # 'threshold_objects_made_old' by nursery_size/2.
 
         if self.gc_state != STATE_SCANNING or self.threshold_reached(extrasize):
+            if (extrasize == 0 and
+                    self.deferred_major_steps < self.max_deferred_major_steps):
+                # Leave this step to collect_step(), which is called
+                # e.g. by a helper thread.  If that doesn't keep up, we
+                # eventually go on below, where the loop catches up with
+                # all the steps that have been skipped so far.
+                self.deferred_major_steps += 1
+                self.rrc_invoke_callback()
+                return
+            self.deferred_major_steps = 0
             self.major_collection_step(extrasize)
 
             # See documentation in major_collection_step() for target invariants
@@ -872,6 +965,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
 
         minor_collection_count = 0
         while True:
+            self.nursery_free_at_overflow = self.nursery_free
             self.nursery_free = llmemory.NULL      # debug: don't use me
             # note: no "raise MemoryError" between here and the next time
             # we initialize nursery_free!
@@ -1772,6 +1866,14 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # All nursery barriers are invalid from this point on.  They
         # are evaluated anew as part of the minor collection.
         self.nursery_barriers.delete()
+        nursery_allocated = 0
+        if self.nursery_size_max > 0:
+            nursery_free = self.nursery_free
+            if not nursery_free:      # called from collect_and_reserve()
+                nursery_free = self.nursery_free_at_overflow
+            if nursery_free:
+                nursery_allocated = nursery_free - self.nursery
+        self.nursery_free_at_overflow = llmemory.NULL
         #
         # Keeps track of surviving pinned objects. See also '_trace_drag_out()'
         # where this stack is filled.  Pinning an object only prevents it from
@@ -1968,10 +2070,57 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.total_gc_time += duration
         debug_print("time taken:", duration)
         debug_stop("gc-minor")
+        if self.nursery_size_max > 0:
+            self.adapt_nursery_size(nursery_allocated, duration)
         self.hooks.fire_gc_minor(
             duration=duration,
             total_memory_used=total_memory_used,
-            pinned_objects=self.pinned_objects_in_nursery)
+            pinned_objects=self.pinned_objects_in_nursery,
+            nursery_size=self.nursery_size,
+            surviving_size=self.nursery_surviving_size)
+
+    NURSERY_ADAPT_WINDOW = 4
+
+    def adapt_nursery_size(self, allocated, duration):
+        # Called after minor collections if the nursery size is adaptive.
+        # Every NURSERY_ADAPT_WINDOW minor collections, pick a new size
+        # from the fraction of the allocated bytes that survived, and from
+        # the longest minor collection.  We can only resize the nursery
+        # while it is empty, i.e. if there are no pinned objects in it.
+        self.nursery_adapt_count += 1
+        self.nursery_adapt_allocated += allocated
+        self.nursery_adapt_surviving += self.nursery_surviving_size
+        if duration > self.nursery_adapt_duration:
+            self.nursery_adapt_duration = duration
+        if (self.nursery_adapt_count < self.NURSERY_ADAPT_WINDOW or
+                self.pinned_objects_in_nursery > 0 or
+                self.debug_rotating_nurseries):
+            return
+        newsize = env.adapt_nursery_size(
+            self.nursery_size, self.nursery_adapt_allocated,
+            self.nursery_adapt_surviving, self.nursery_adapt_duration,
+            self.minor_pause_max, self.nursery_size_min,
+            self.nursery_size_max) & ~(WORD-1)
+        self.nursery_adapt_count = 0
+        self.nursery_adapt_allocated = 0
+        self.nursery_adapt_surviving = 0
+        self.nursery_adapt_duration = 0.0
+        if newsize != self.nursery_size:
+            self.resize_nursery(newsize)
+
+    def resize_nursery(self, newsize):
+        ll_assert(self.nursery_free == self.nursery,
+                  "resize_nursery: the nursery is not empty")
+        ll_assert(not self.nursery_barriers.non_empty(),
+                  "resize_nursery: there are pinned objects")
+        debug_start("gc-set-nursery-size")
+        debug_print("nursery size:", self.nursery_size, "=>", newsize)
+        llarena.arena_free(self.nursery)
+        self.nursery_size = newsize
+        self.nursery = self._alloc_nursery()
+        self.nursery_free = self.nursery
+        self.nursery_top = self.nursery + self.nursery_size
+        debug_stop("gc-set-nursery-size")
 
     def _reset_flag_old_objects_pointing_to_pinned(self, obj, ignore):
         ll_assert(self.header(obj).tid & GCFLAG_PINNED_OBJECT_PARENT_KNOWN != 0,
@@ -2571,10 +2720,15 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 total_memory_used -= float(self.kept_alive_by_finalizer)
                 if total_memory_used < 0:
                     total_memory_used = 0
-                bounded = self.set_major_threshold_from(
-                    min(total_memory_used * self.major_collection_threshold,
-                        total_memory_used + self.max_delta),
-                    reserving_size)
+                threshold = min(total_memory_used *
+                                    self.major_collection_threshold,
+                                total_memory_used + self.max_delta)
+                if self.memory_limit > 0.0:
+                    threshold = env.limit_major_threshold(threshold,
+                                    total_memory_used, self.memory_limit,
+                                    env.get_cgroup_memory_usage(self.cgroup))
+                bounded = self.set_major_threshold_from(threshold,
+                                                        reserving_size)
                 #
                 # Print statistics
                 debug_start("gc-collect-done")
@@ -3151,6 +3305,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
             return intmask(self.nursery_size)
         elif stats_no == rgc.TOTAL_GC_TIME:
             return int(self.total_gc_time * 1000)
+        elif stats_no == rgc.DEFERRED_MAJOR_STEPS:
+            return self.deferred_major_steps
         return 0
 
 
@@ -855,6 +855,50 @@ class TestIncrementalMiniMarkGCFull(DirectGCTest):
             (incminimark.STATE_FINALIZING, incminimark.STATE_SCANNING)
             ]
 
+    def test_deferred_major_steps(self, debuglog):
+        def pending():
+            return self.gc.get_stats(rgc.DEFERRED_MAJOR_STEPS)
+        s = self.malloc(S)
+        s.x = 42
+        self.stackroots.append(s)
+        self.gc.TEST_VISIT_SINGLE_STEP = True
+        self.gc.set_deferred_major_steps(2)
+        self.gc.collect_step()
+        assert self.gc.gc_state == incminimark.STATE_MARKING
+        #
+        # the minor collections leave the next two steps to collect_step()
+        for i in range(2):
+            debuglog.reset()
+            self.gc.collect(0)
+            assert debuglog.summary() == {'gc-minor': 1}
+            assert pending() == i + 1
+        self.gc.collect_step()
+        assert pending() == 1
+        self.gc.collect(0)
+        assert pending() == 2
+        #
+        # now they are behind: the next minor collection runs steps again
+        debuglog.reset()
+        self.gc.collect(0)
+        assert debuglog.summary()['gc-collect-step'] >= 1
+        assert pending() == 0
+        #
+        # the end of the major collection clears the pending steps
+        self.gc.collect(0)
+        assert pending() == 1
+        self.gc.gc_step_until(incminimark.STATE_FINALIZING)
+        self.gc.collect_step()
+        assert self.gc.gc_state == incminimark.STATE_SCANNING
+        assert pending() == 0
+        assert self.stackroots[0].x == 42
+        #
+        self.gc.set_deferred_major_steps(0)
+        self.gc.collect_step()
+        debuglog.reset()
+        self.gc.collect(0)
+        assert debuglog.summary() == {'gc-minor': 1, 'gc-collect-step': 1}
+        assert pending() == 0
+
     def test_gc_debug_crash_with_prebuilt_objects(self):
         from rpython.rlib import rgc
         flags = self.flags
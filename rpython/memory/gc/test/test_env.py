@@ -1,4 +1,4 @@
-import os, py
+import os, sys, py
 from rpython.memory.gc import env
 from rpython.rlib.rarithmetic import r_uint
 from rpython.tool.udir import udir
@@ -190,3 +190,112 @@ cache3          : level=3 type=Unified scope=Shared size=24576K line_size=256 as
     assert result == 24576 * 1024
     result = env.get_L2cache_linux2_cpuinfo_s390x(str(filepath), label='cache2')
     assert result == 1536 * 1024
+
+def test_adapt_nursery_size():
+    M = 1024 * 1024
+    def adapt(size, allocated, surviving, duration=0.001, max_pause=0.0):
+        return env.adapt_nursery_size(size, allocated, surviving, duration,
+                                      max_pause, 1 * M, 16 * M)
+    # few survivors: grow, up to the maximum
+    assert adapt(4 * M, 16 * M, 100000) == 8 * M
+    assert adapt(16 * M, 64 * M, 0) == 16 * M
+    # many survivors: shrink, down to the minimum
+    assert adapt(4 * M, 16 * M, 8 * M) == 2 * M
+    assert adapt(1 * M, 4 * M, 4 * M) == 1 * M
+    # in-between, or nothing allocated: unchanged
+    assert adapt(4 * M, 16 * M, 2 * M) == 4 * M
+    assert adapt(4 * M, 0, 0) == 4 * M
+    # the pause target applies even if nothing is known about allocations
+    assert adapt(4 * M, 0, 0, 0.004, 0.003) == 3 * M
+    # pause target exceeded: shrink even with few survivors, at most by half
+    assert adapt(4 * M, 16 * M, 0, 0.004, 0.003) == 3 * M
+    assert adapt(4 * M, 16 * M, 0, 0.010, 0.001) == 2 * M
+    # only grow if there is enough room left below the pause target
+    assert adapt(4 * M, 16 * M, 0, 0.002, 0.003) == 4 * M
+    assert adapt(4 * M, 16 * M, 0, 0.001, 0.003) == 8 * M
+
+def test_find_cgroup_path():
+    data = ("12:cpu,cpuacct:/docker/abc\n"
+            "4:blkio,memory:/docker/def/\n"
+            "0::/user.slice/session-1.scope\n")
+    assert env._find_cgroup_path(data, 'memory') == '/docker/def'
+    assert env._find_cgroup_path(data, 'cpu') == '/docker/abc'
+    assert env._find_cgroup_path(data, '') == '/user.slice/session-1.scope'
+    assert env._find_cgroup_path("0::/\n", '') == ''
+    assert env._find_cgroup_path("0::/\n", 'memory') is None
+    assert env._find_cgroup_path("", '') is None
+
+def make_cgroup(root, proc_data, files):
+    proc = root.join('proc_self_cgroup')
+    proc.write(proc_data, ensure=True)
+    for name, content in files.items():
+        root.join(name).write(content, ensure=True)
+    return env.find_cgroup_memory(str(proc), str(root))
+
+def test_cgroup_v2():
+    if not sys.platform.startswith('linux'):
+        py.test.skip("linux only")
+    root = udir.join('cgroup_v2')
+    cgroup = make_cgroup(root, "0::/app.slice/app.service\n", {
+        'app.slice/app.service/memory.max': "536870912\n",
+        'app.slice/app.service/memory.current': "300000000\n",
+        'app.slice/app.service/memory.stat': ("anon 100000000\n"
+                                              "file 200000000\n"
+                                              "active_file 150000000\n"
+                                              "inactive_file 50000000\n"),
+        'memory.current': "999999999\n"})
+    try:
+        assert cgroup.c_version == 2
+        assert env.get_cgroup_memory_limit(cgroup) == 536870912.0
+        # the inactive file pages are not counted
+        assert env.get_cgroup_memory_usage(cgroup) == 250000000.0
+        root.join('app.slice/app.service/memory.max').write("max\n")
+        assert env.get_cgroup_memory_limit(cgroup) == -1.0
+        root.join('app.slice/app.service/memory.stat').remove()
+        assert env.get_cgroup_memory_usage(cgroup) == 300000000.0
+    finally:
+        env.free_cgroup_memory(cgroup)
+
+def test_cgroup_v1():
+    if not sys.platform.startswith('linux'):
+        py.test.skip("linux only")
+    root = udir.join('cgroup_v1')
+    # the directory of /proc/self/cgroup is not visible, like in a
+    # container: the files at the root of the hierarchy are used
+    cgroup = make_cgroup(root, "5:memory:/docker/abc\n0::/\n", {
+        'memory/memory.limit_in_bytes': "268435456\n",
+        'memory/memory.usage_in_bytes': "200000000\n",
+        'memory/memory.stat': ("inactive_file 1000\n"
+                               "total_inactive_file 150000000\n")})
+    try:
+        assert cgroup.c_version == 1
+        assert env.get_cgroup_memory_limit(cgroup) == 268435456.0
+        assert env.get_cgroup_memory_usage(cgroup) == 50000000.0
+        root.join('memory/memory.limit_in_bytes').write(
+            "9223372036854771712\n")
+        assert env.get_cgroup_memory_limit(cgroup) == -1.0
+    finally:
+        env.free_cgroup_memory(cgroup)
+
+def test_no_cgroup():
+    root = udir.join('cgroup_missing')
+    cgroup = make_cgroup(root, "", {})
+    assert not cgroup
+    assert env.get_cgroup_memory_limit(cgroup) == -1.0
+    assert env.get_cgroup_memory_usage(cgroup) == -1.0
+
+def test_limit_major_threshold():
+    M = 1024.0 * 1024.0
+    # no limit, or no usage known: unchanged
+    assert env.limit_major_threshold(300 * M, 100 * M, -1.0, 200 * M) == (
+        300 * M)
+    assert env.limit_major_threshold(300 * M, 100 * M, 1000 * M, -1.0) == (
+        300 * M)
+    # plenty of memory left: unchanged
+    assert env.limit_major_threshold(300 * M, 100 * M, 1000 * M, 200 * M) == (
+        300 * M)
+    # near the limit: at most half of the memory left
+    assert env.limit_major_threshold(300 * M, 100 * M, 1000 * M, 900 * M) == (
+        150 * M)
+    assert env.limit_major_threshold(300 * M, 100 * M, 1000 * M, 1100 * M) == (
+        100 * M)
@@ -27,11 +27,14 @@ class MyGcHooks(GcHooks):
         self.collects = []
         self.durations = []
 
-    def on_gc_minor(self, duration, total_memory_used, pinned_objects):
+    def on_gc_minor(self, duration, total_memory_used, pinned_objects,
+                    nursery_size, surviving_size):
         self.durations.append(duration)
         self.minors.append({
             'total_memory_used': total_memory_used,
-            'pinned_objects': pinned_objects})
+            'pinned_objects': pinned_objects,
+            'nursery_size': nursery_size,
+            'surviving_size': surviving_size})
 
     def on_gc_collect_step(self, duration, oldstate, newstate):
         self.durations.append(duration)
@@ -69,8 +72,10 @@ class TestIncMiniMarkHooks(BaseDirectGCTest):
         self.gc.hooks._gc_minor_enabled = True
         self.malloc(S)
         self.gc._minor_collection()
+        nursery_size = self.gc.nursery_size
         assert self.gc.hooks.minors == [
-            {'total_memory_used': 0, 'pinned_objects': 0}
+            {'total_memory_used': 0, 'pinned_objects': 0,
+             'nursery_size': nursery_size, 'surviving_size': 0}
             ]
         assert self.gc.hooks.durations[0] > 0.
         self.gc.hooks.reset()
@@ -80,9 +85,54 @@ class TestIncMiniMarkHooks(BaseDirectGCTest):
         self.stackroots.append(self.malloc(S))
         self.gc._minor_collection()
         assert self.gc.hooks.minors == [
-            {'total_memory_used': self.size_of_S*2, 'pinned_objects': 0}
+            {'total_memory_used': self.size_of_S*2, 'pinned_objects': 0,
+             'nursery_size': nursery_size, 'surviving_size': self.size_of_S*2}
             ]
 
+    def test_on_gc_minor_adaptive_nursery(self):
+        self.gc.hooks._gc_minor_enabled = True
+        nursery_size = self.gc.nursery_size
+        self.gc.nursery_size_min = nursery_size
+        self.gc.nursery_size_max = nursery_size * 4
+        #
+        # nothing survives: the nursery grows every 4 minor collections
+        for i in range(self.gc.NURSERY_ADAPT_WINDOW):
+            self.malloc(S)
+            self.gc._minor_collection()
+        sizes = [d['nursery_size'] for d in self.gc.hooks.minors]
+        assert sizes[:-1] == [nursery_size] * (len(sizes) - 1)
+        assert sizes[-1] > nursery_size
+        assert self.gc.nursery_size == sizes[-1]
+        assert self.gc.nursery_top - self.gc.nursery == sizes[-1]
+        #
+        # everything survives: it shrinks again
+        self.gc.hooks.reset()
+        for i in range(self.gc.NURSERY_ADAPT_WINDOW):
+            self.stackroots.append(self.malloc(S))
+            self.gc._minor_collection()
+        assert self.gc.hooks.minors[-1]['nursery_size'] == nursery_size
+        assert self.gc.nursery_size == nursery_size
+
+    def test_adaptive_nursery_from_collect_and_reserve(self):
+        # the minor collections are triggered by the nursery overflowing,
+        # like in normal programs
+        self.gc.hooks._gc_minor_enabled = True
+        nursery_size = self.gc.nursery_size
+        self.gc.nursery_size_min = nursery_size
+        self.gc.nursery_size_max = nursery_size * 4
+        while not self.gc.hooks.minors:
+            self.malloc(S)
+        while len(self.gc.hooks.minors) < 4 * self.gc.NURSERY_ADAPT_WINDOW:
+            self.malloc(S)
+        assert self.gc.nursery_size == nursery_size * 4
+        #
+        # a pause target that is always exceeded shrinks it again
+        self.gc.minor_pause_max = 1e-9
+        self.gc.hooks.reset()
+        while len(self.gc.hooks.minors) < 4 * self.gc.NURSERY_ADAPT_WINDOW:
+            self.malloc(S)
+        assert self.gc.nursery_size == nursery_size
+
     def test_on_gc_collect(self):
         from rpython.memory.gc import incminimark as m
         self.gc.hooks._gc_collect_step_enabled = True
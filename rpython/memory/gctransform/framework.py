@@ -487,6 +487,9 @@ class BaseFrameworkGCTransformer(GCTransformer):
                                            [s_gc,
                                             annmodel.SomeInteger(nonneg=True)],
                                            annmodel.s_None)
+        self.set_deferred_major_steps_ptr = getfn(
+            GCClass.set_deferred_major_steps.im_func,
+            [s_gc, annmodel.SomeInteger(nonneg=True)], annmodel.s_None)
 
         if hasattr(GCClass, 'rawrefcount_init'):
             self.rawrefcount_init_ptr = getfn(
@@ -1207,6 +1210,12 @@ class BaseFrameworkGCTransformer(GCTransformer):
                                   self.c_const_gc,
                                   v_size])
 
+    def gct_gc_set_deferred_major_steps(self, hop):
+        [v_max_steps] = hop.spaceop.args
+        hop.genop("direct_call", [self.set_deferred_major_steps_ptr,
+                                  self.c_const_gc,
+                                  v_max_steps])
+
     def gct_gc_pin(self, hop):
         if not hasattr(self, 'pin_ptr'):
             c_false = rmodel.inputconst(lltype.Bool, False)
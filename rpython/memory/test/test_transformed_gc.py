@@ -1427,7 +1427,8 @@ class MyGcHooks(GcHooks):
     def is_gc_collect_enabled(self):
         return True
 
-    def on_gc_minor(self, duration, total_memory_used, pinned_objects):
+    def on_gc_minor(self, duration, total_memory_used, pinned_objects,
+                    nursery_size, surviving_size):
         self.stats.minors += 1
 
     def on_gc_collect_step(self, duration, oldstate, newstate):
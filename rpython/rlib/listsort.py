@@ -1,4 +1,4 @@
-from rpython.rlib.rarithmetic import ovfcheck
+from rpython.rlib.rarithmetic import LONG_BIT, intmask, ovfcheck, r_uint
 from rpython.rlib.objectmodel import specialize
 
 
@@ -678,3 +678,59 @@ def make_timsort_class(getitem=None, setitem=None, length=None,
     return TimSort
 
 TimSort = make_timsort_class() #backward compatible interface
+
+
+## ------------------------------------------------------------------------
+## LSD radix sort for lists of machine-sized ints.  It does LONG_BIT/8
+## counting passes over the list, but skips the passes where all the items
+## have the same byte, which is most of them for small ints.  It is not
+## adaptive like timsort, so sorted or nearly sorted lists should not be
+## passed to it, see is_sorted_int().
+## ------------------------------------------------------------------------
+
+RADIX_BITS = 8
+RADIX_SIZE = 1 << RADIX_BITS
+RADIX_MASK = RADIX_SIZE - 1
+_SIGN_BIT = r_uint(1) << (LONG_BIT - 1)
+
+def _radix_digit(x, shift):
+    # flipping the sign bit makes the unsigned order match the signed one
+    return intmask(((r_uint(x) ^ _SIGN_BIT) >> shift) & RADIX_MASK)
+
+def is_sorted_int(lst):
+    "Check if a list of ints is sorted in ascending order."
+    for i in range(1, len(lst)):
+        if lst[i - 1] > lst[i]:
+            return False
+    return True
+
+def radixsort_int(lst):
+    """Sort a list of ints in-place.  Needs a temporary list of the same
+    length."""
+    n = len(lst)
+    if n < 2:
+        return
+    src = lst
+    dst = [0] * n
+    counts = [0] * RADIX_SIZE
+    shift = 0
+    while shift < LONG_BIT:
+        for i in range(RADIX_SIZE):
+            counts[i] = 0
+        for x in src:
+            counts[_radix_digit(x, shift)] += 1
+        if counts[_radix_digit(src[0], shift)] != n:
+            total = 0
+            for i in range(RADIX_SIZE):
+                count = counts[i]
+                counts[i] = total
+                total += count
+            for x in src:
+                digit = _radix_digit(x, shift)
+                dst[counts[digit]] = x
+                counts[digit] += 1
+            src, dst = dst, src
+        shift += RADIX_BITS
+    if src is not lst:
+        for i in range(n):
+            lst[i] = src[i]
@@ -63,6 +63,13 @@ def set_max_heap_size(nbytes):
     """
     pass
 
+def set_deferred_major_steps(max_steps):
+    """Let minor collections leave up to 'max_steps' major collection steps
+    to explicit calls to collect_step(); get_stats(DEFERRED_MAJOR_STEPS)
+    returns how many are currently pending.  Only incminimark supports it.
+    """
+    pass
+
 def must_split_gc_address_space():
     """Returns True if we have a "split GC address space", i.e. if
     we are translating with an option that doesn't support taking raw
@@ -226,6 +233,19 @@ class SetMaxHeapSizeEntry(ExtRegistryEntry):
         return hop.genop('gc_set_max_heap_size', [v_nbytes],
                          resulttype=lltype.Void)
 
+class SetDeferredMajorStepsEntry(ExtRegistryEntry):
+    _about_ = set_deferred_major_steps
+
+    def compute_result_annotation(self, s_max_steps):
+        from rpython.annotator import model as annmodel
+        return annmodel.s_None
+
+    def specialize_call(self, hop):
+        [v_max_steps] = hop.inputargs(lltype.Signed)
+        hop.exception_cannot_occur()
+        return hop.genop('gc_set_deferred_major_steps', [v_max_steps],
+                         resulttype=lltype.Void)
+
 def can_move(p):
     """Check if the GC object 'p' is at an address that can move.
     Must not be called with None.  With non-moving GCs, it is always False.
@@ -845,7 +865,7 @@ def cast_gcref_to_int(gcref):
 (TOTAL_MEMORY, TOTAL_ALLOCATED_MEMORY, TOTAL_MEMORY_PRESSURE,
  PEAK_MEMORY, PEAK_ALLOCATED_MEMORY, TOTAL_ARENA_MEMORY,
  TOTAL_RAWMALLOCED_MEMORY, PEAK_ARENA_MEMORY, PEAK_RAWMALLOCED_MEMORY,
- NURSERY_SIZE, TOTAL_GC_TIME) = range(11)
+ NURSERY_SIZE, TOTAL_GC_TIME, DEFERRED_MAJOR_STEPS) = range(12)
 
 @not_rpython
 def get_stats(stat_no):
@@ -497,6 +497,40 @@ def read(fd, count):
         got = handle_posix_error('read', c_read(fd, void_buf, count))
         return buf.str(got)
 
+if not _WIN32:
+    class CConfig:
+        _compilation_info_ = ExternalCompilationInfo(
+            includes=['sys/uio.h', 'limits.h'],
+        )
+        IOVEC = rffi_platform.Struct('struct iovec', [
+            ('iov_base', rffi.VOIDP),
+            ('iov_len', rffi.SIZE_T)])
+        IOV_MAX = rffi_platform.DefinedConstantInteger('IOV_MAX')
+    iovec_config = rffi_platform.configure(CConfig)
+    IOVEC = iovec_config['IOVEC']
+    IOV_MAX = iovec_config['IOV_MAX'] or 1024
+    IOVECARRAY = lltype.Array(IOVEC, hints={'nolength': True})
+
+    c_readv = external('readv',
+                       [rffi.INT, lltype.Ptr(IOVECARRAY), rffi.INT],
+                       POSIX_SSIZE_T,
+                       compilation_info=CConfig._compilation_info_,
+                       save_err=rffi.RFFI_SAVE_ERRNO)
+
+    def readv(fd, addresses, lengths):
+        """Read into the raw buffers addresses[i] of lengths[i] bytes, in
+        order, with a single readv() call. Returns the number of bytes read.
+        """
+        count = len(addresses)
+        assert len(lengths) == count
+        if count > IOV_MAX:
+            raise OSError(errno.EINVAL, None)
+        with lltype.scoped_alloc(IOVECARRAY, count) as iov:
+            for i in range(count):
+                iov[i].c_iov_base = rffi.cast(rffi.VOIDP, addresses[i])
+                rffi.setintfield(iov[i], 'c_iov_len', lengths[i])
+            return handle_posix_error('readv', c_readv(fd, iov, count))
+
 @replace_os_function('write')
 @signature(types.int(), types.any(), returns=types.any())
 def write(fd, data):
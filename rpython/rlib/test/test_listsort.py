@@ -1,6 +1,7 @@
 import py
-from rpython.rlib.listsort import TimSort, powerloop
-import random, os
+from rpython.rlib.listsort import TimSort, powerloop, radixsort_int
+from rpython.rlib.listsort import is_sorted_int
+import random, os, sys
 
 from hypothesis import given, strategies as st, example
 
@@ -56,6 +57,23 @@ def test_file():
             sorttest(lines1)
 
 
+@given(st.lists(st.integers(min_value=-sys.maxint-1, max_value=sys.maxint)))
+@example([3, -1, 2, -sys.maxint-1, sys.maxint, 0, 256, 255, -256])
+def test_radixsort_int(l):
+    l2 = l[:]
+    radixsort_int(l2)
+    assert l2 == sorted(l)
+    assert is_sorted_int(l2)
+
+def test_radixsort_int_translated():
+    from rpython.rtyper.test.test_llinterp import interpret
+    def f(n):
+        l = [(i * 7919) % n - n // 2 for i in range(n)]
+        radixsort_int(l)
+        return is_sorted_int(l) and l[0] == -(n // 2)
+    assert interpret(f, [100])
+
+
 def power(s1, n1, n2, n):
     # from Tim's Python sketch code here: https://bugs.python.org/issue34561
     assert s1 >= 0
@@ -6,6 +6,7 @@ from rpython.translator.c.test.test_genc import compile
 from rpython.tool.pytest.expecttest import ExpectTest
 from rpython.tool.udir import udir
 from rpython.rlib import rposix, rposix_stat, rstring
+from rpython.rtyper.lltypesystem import lltype, rffi
 import os, sys
 import errno
 import py
@@ -784,6 +785,25 @@ def test_pwrite():
         os.close(fd)
     py.test.raises(OSError, rposix.pwrite, fd, b'ea', 1)
 
+@rposix_requires('readv')
+def test_readv():
+    fname = str(udir.join('os_test_readv.txt'))
+    fd = os.open(fname, os.O_RDWR | os.O_CREAT, 0777)
+    buf1 = lltype.malloc(rffi.CCHARP.TO, 5, flavor='raw')
+    buf2 = lltype.malloc(rffi.CCHARP.TO, 10, flavor='raw')
+    try:
+        os.write(fd, b'Hello world')
+        os.lseek(fd, 0, 0)
+        assert rposix.readv(fd, [buf1, buf2], [5, 10]) == 11
+        assert rffi.charpsize2str(buf1, 5) == b'Hello'
+        assert rffi.charpsize2str(buf2, 6) == b' world'
+        assert rposix.readv(fd, [buf1], [5]) == 0
+    finally:
+        lltype.free(buf1, flavor='raw')
+        lltype.free(buf2, flavor='raw')
+        os.close(fd)
+    py.test.raises(OSError, rposix.readv, fd, [], [])
+
 @rposix_requires('posix_fadvise')
 def test_posix_fadvise():
     if sys.maxint <= 2**32:
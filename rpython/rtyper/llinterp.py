@@ -930,6 +930,9 @@ class LLFrame(object):
     def op_gc_set_max_heap_size(self, maxsize):
         raise NotImplementedError("gc_set_max_heap_size")
 
+    def op_gc_set_deferred_major_steps(self, max_steps):
+        raise NotImplementedError("gc_set_deferred_major_steps")
+
     def op_gc_stack_bottom(self):
         # Marker when we enter RPython code from C code.  It used to be
         # essential for trackgcroot.py.  Nowaways it is mostly unused,
@@ -493,6 +493,7 @@ LL_OPERATIONS = {
     'gc_id':                LLOp(sideeffects=False, canmallocgc=True),
     'gc_obtain_free_space': LLOp(revdb_protect=True),
     'gc_set_max_heap_size': LLOp(revdb_protect=True),
+    'gc_set_deferred_major_steps': LLOp(revdb_protect=True),
     'gc_can_move'         : LLOp(sideeffects=False),
     'gc_thread_run'       : LLOp(),
     'gc_thread_start'     : LLOp(),